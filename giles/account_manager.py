@@ -14,6 +14,12 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from multiprocessing.pool import ThreadPool
+
+import hashlib
+import hmac
+import json
+import os
 import os.path
 import sqlite3
 import sys
@@ -22,29 +28,257 @@ import sys
 # it'll do.
 ACCOUNT_PATH = os.path.join(sys.path[0], 'data', 'accounts.db')
 
+# Passwords are stretched with PBKDF2; the iteration count is stored with
+# each hash, so raising it only affects passwords set afterwards.
+KDF_NAME = "pbkdf2_sha256"
+KDF_ITERATIONS = 100000
+SALT_BYTES = 16
+
+# Hashing is deliberately slow, so it happens on these threads rather than
+# in the main loop.  hashlib lets go of the GIL while it works.
+KDF_THREADS = 2
+
+# The parts of a player's config that follow their account around.  The
+# rest (last channel, focused table, and so on) only makes sense for the
+# session it was set in.
+SAVED_CONFIG = ("channel_aliases", "player_aliases", "table_aliases",
+                "color", "timestamps", "live_board", "compact_board")
+ALIAS_CONFIG = ("channel_aliases", "player_aliases", "table_aliases")
+
+# sqlite3 keeps each connection's compiled statements in a cache keyed by
+# their text, so using the same strings every time means every query after
+# the first skips the parser.
+STATEMENT_CACHE_SIZE = 32
+
+SELECT_ACCOUNT = "SELECT name, pw_hash, config FROM accounts WHERE name = ? COLLATE NOCASE"
+INSERT_ACCOUNT = "INSERT INTO accounts (name, pw_hash, config) VALUES (?, ?, ?)"
+UPDATE_CONFIG = "UPDATE accounts SET config = ? WHERE name = ? COLLATE NOCASE"
+SELECT_DUPLICATES = "SELECT name FROM accounts GROUP BY name COLLATE NOCASE HAVING COUNT(*) > 1"
+
+def hash_password(password):
+
+    # Returns the string stored in the database for a password.
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password, salt, KDF_ITERATIONS)
+    return "%s$%d$%s$%s" % (KDF_NAME, KDF_ITERATIONS, salt.encode("hex"),
+                            digest.encode("hex"))
+
+def check_password(password, pw_hash):
+
+    try:
+        kdf, iterations, salt, digest = pw_hash.split("$")
+        if kdf != KDF_NAME:
+            return False
+        attempt = hashlib.pbkdf2_hmac("sha256", password, salt.decode("hex"),
+                                      int(iterations))
+        return hmac.compare_digest(attempt, digest.decode("hex"))
+    except (ValueError, TypeError):
+        return False
+
+class DoneResult(object):
+    """Stands in for a pool result that's already known, so callers can
+    treat every answer as if it came from the thread pool.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def ready(self):
+        return True
+
+    def get(self):
+        return self.value
+
 class AccountManager(object):
+    """Keeps track of registered accounts: their password hashes and their
+    saved configuration.  If the database can't be opened, everyone is a
+    guest; if it holds the same name twice, the server doesn't start.
+
+    Configuration changes are written behind: flush(), which the server
+    calls on a timer, saves the configs that changed since the last flush
+    in a single transaction, however many times each one changed.
+    """
 
     def __init__(self, server):
 
         self.server = server
 
+        # The config last saved for each logged-in account, as stored, and
+        # the ones waiting to be written.
+        self.saved_configs = {}
+        self.dirty_configs = {}
+
+        self.conn = None
+        self.pool = None
+        self.open()
+
+    def log(self, message):
+        self.server.log.log("[ACCT] %s" % message)
+
+    def open(self):
+
         try:
-            self.conn = sqlite3.connect(ACCOUNT_PATH)
+            self.conn = sqlite3.connect(ACCOUNT_PATH,
+                                        cached_statements=STATEMENT_CACHE_SIZE)
+            self.conn.text_factory = str
 
-            # Attempt to set up the database properly.
+            # Attempt to set up the database properly.  With write-ahead
+            # logging, commits append to the log rather than rewriting the
+            # database, and a normal sync is then still crash-safe.
             cursor = self.conn.cursor()
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
             cursor.execute("""CREATE TABLE IF NOT EXISTS accounts (
                 id INTEGER PRIMARY KEY,
                 name TEXT,
                 pw_hash TEXT,
                 config BLOB
             )""")
+            cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS accounts_name
+                ON accounts (name COLLATE NOCASE)""")
+            self.conn.commit()
 
             cursor.close()
 
-        except:
-            self.log("Unable to open account database.")
+        except sqlite3.IntegrityError as e:
+
+            # Names have to be unique whatever their case; with accounts
+            # switched off anyone could log in as anyone, so it's better
+            # not to start at all until an admin sorts out whose is whose.
+            names = [x[0] for x in self.conn.execute(SELECT_DUPLICATES)]
+            self.log("Account database has duplicate names (%s): %s" % (e, ", ".join(names)))
+            self.log("Remove the duplicates from %s and start again." % ACCOUNT_PATH)
+            sys.exit(1)
+
+        except sqlite3.Error as e:
+            self.log("Unable to open account database: %s" % e)
             self.conn = None
 
-    def log(self, message):
-        self.server.log.log("[ACCT] %s" % message)
+        if self.conn:
+            self.pool = ThreadPool(KDF_THREADS)
+
+    def get_account(self, name):
+
+        if not self.conn:
+            return None
+        return self.conn.execute(SELECT_ACCOUNT, (name,)).fetchone()
+
+    def is_registered(self, name):
+
+        return self.get_account(name) is not None
+
+    def hash_password(self, password):
+
+        # Returns a result whose get() is the hash to register with, once
+        # ready() says so.
+        return self.pool.apply_async(hash_password, (password,))
+
+    def check_password(self, name, password):
+
+        # Returns a result whose get() says whether the password is right,
+        # once ready() says so.  The hash is looked up here, as the database
+        # belongs to the main thread.
+        account = self.get_account(name)
+        if not account:
+            return DoneResult(False)
+        return self.pool.apply_async(check_password, (password, account[1]))
+
+    def register(self, player, name, pw_hash):
+
+        # Creates an account and logs the player in to it.  Returns False if
+        # someone else got there first.  There's no config to save until
+        # they've settled in; the next flush takes care of it.
+        try:
+            with self.conn:
+                self.conn.execute(INSERT_ACCOUNT, (name, pw_hash, None))
+        except sqlite3.IntegrityError:
+            return False
+
+        self.log("%s registered the name %s." % (player, name))
+        player.account = name.lower()
+        return True
+
+    def dump_config(self, config):
+
+        return json.dumps(dict((x, config[x]) for x in SAVED_CONFIG),
+                          sort_keys=True, separators=(",", ":"))
+
+    def load_config(self, player):
+
+        # Applies the player's saved config over their current one.  Returns
+        # whether there was any.
+        if not player.account:
+            return False
+        account = self.get_account(player.account)
+        if not account or not account[2]:
+            return False
+
+        saved = json.loads(account[2])
+        for key in SAVED_CONFIG:
+            if key not in saved:
+                continue
+            value = saved[key]
+
+            # JSON only has string keys, and aliases are numbered.
+            if key in ALIAS_CONFIG:
+                value = dict((int(x), y.encode("utf-8"))
+                             for x, y in value.items())
+            player.config[key] = value
+
+        player.client.use_ansi = player.config["color"]
+        self.track(player)
+        return True
+
+    def track(self, player):
+
+        # Notes the player's config as saved, so it's only written out when
+        # it changes.
+        if player.account:
+            self.saved_configs[player.account] = self.dump_config(player.config)
+
+    def note_changes(self, player):
+
+        if not player.account:
+            return
+        config = self.dump_config(player.config)
+        if config != self.saved_configs.get(player.account):
+            self.dirty_configs[player.account] = config
+
+    def remove_player(self, player):
+
+        # Hold on to anything they changed until the next flush.
+        self.note_changes(player)
+        self.saved_configs.pop(player.account, None)
+
+    def flush(self):
+
+        if not self.conn:
+            return
+
+        for player in self.server.players:
+            self.note_changes(player)
+        if not self.dirty_configs:
+            return
+
+        try:
+            with self.conn:
+                self.conn.executemany(UPDATE_CONFIG,
+                   [(y, x) for x, y in self.dirty_configs.items()])
+        except sqlite3.Error as e:
+            self.log("Unable to save configs: %s" % e)
+            return
+
+        for account, config in self.dirty_configs.items():
+            if account in self.saved_configs:
+                self.saved_configs[account] = config
+        self.dirty_configs = {}
+
+    def close(self):
+
+        self.flush()
+        if self.pool:
+            self.pool.terminate()
+            self.pool = None
+        if self.conn:
+            self.conn.close()
+            self.conn = None
@@ -282,6 +282,14 @@ class AdminManager(object):
         self.log("%s shut down the server." % player)
         self.server.should_run = False
 
+    def upgrade(self, player):
+
+        # The server hands itself off to a fresh copy at the end of this
+        # trip through its loop, so that this command's output goes along.
+        self.log("%s upgraded the server." % player)
+        player.tell_cc("Upgrading the server.  Hold on.\n")
+        self.server.should_upgrade = True
+
     def handle(self, player, admin_str):
 
         if not admin_str or type(admin_str) != str or not len(admin_str):
@@ -342,6 +350,10 @@ class AdminManager(object):
                 self.shutdown(player)
                 handled = True
 
+            elif primary in ("upgrade",):
+                self.upgrade(player)
+                handled = True
+
         if not handled:
             player.tell_cc("Invalid admin command.\n")
             self.log("%s attempted an invalid admin command." % player)
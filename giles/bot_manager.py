@@ -0,0 +1,311 @@
+# Giles: bot_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles.journal import AbsentPlayer
+from giles.utils import Struct
+
+import importlib
+import multiprocessing
+import os
+import random
+import signal
+import stat
+import time
+import traceback
+
+# Bots are called this and a number.  No player can have a name with a
+# hyphen in it, so they can never be mistaken for one.
+BOT_NAME_PREFIX = "Bot-"
+
+# How long a bot thinks about a move, in seconds, unless it's told
+# otherwise, and how long it can be told to.
+DEFAULT_BOT_SECONDS = 3
+MIN_BOT_SECONDS = 1
+MAX_BOT_SECONDS = 30
+
+# How many searches can be waiting for or using each worker at once.
+# Searches past that wait in the server until one finishes.
+JOBS_PER_PROCESS = 4
+
+# How many file descriptors to check in the workers when the system won't
+# say how many a process can have.
+FALLBACK_FD_COUNT = 1024
+
+# The cancel flags of the searches in flight, one per job slot.  Workers
+# get them when the pool starts them.
+_cancel_flags = None
+
+def _get_open_fds():
+
+    # Linux lists a process's open file descriptors under /proc; anywhere
+    # else, try every descriptor the process could have open.
+    try:
+        return [int(x) for x in os.listdir("/proc/self/fd")]
+    except OSError:
+        pass
+    try:
+        fd_count = os.sysconf("SC_OPEN_MAX")
+    except (AttributeError, ValueError, OSError):
+        fd_count = FALLBACK_FD_COUNT
+    if fd_count < 0:
+        fd_count = FALLBACK_FD_COUNT
+    return range(fd_count)
+
+def _init_worker(cancel_flags):
+
+    # Workers are forked from the server, so they start out holding its
+    # listening socket and every client connection; let go of those, or a
+    # player who quits would stay connected until the worker died.  The
+    # pool talks to its workers over pipes, which are left alone.
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    random.seed()
+    for fd in _get_open_fds():
+        try:
+            if stat.S_ISSOCK(os.fstat(fd).st_mode):
+                os.close(fd)
+        except OSError:
+            pass
+
+def _think(engine_path, position, seconds, slot):
+
+    # Runs in a worker: search the position until the time is up or the
+    # server cancels the search, and return the command to send.
+    deadline = time.time() + seconds
+
+    def should_stop():
+        return _cancel_flags[slot] or time.time() >= deadline
+
+    engine = importlib.import_module(engine_path)
+    return engine.choose_move(position, should_stop)
+
+class BotPlayer(AbsentPlayer):
+    """A computer player.  Like an absent player, anything said to a bot
+    goes nowhere; unlike one, it gets asked for a move whenever it's its
+    turn, and sends that move to its table like anybody else would.
+    """
+
+    def __init__(self, number, server):
+
+        super(BotPlayer, self).__init__("%s%d" % (BOT_NAME_PREFIX, number),
+                                        server)
+        self.number = number
+
+class BotManager(object):
+    """Plays the bots seated at tables.
+
+    Whenever it's a bot's turn, the table's bot engine boils the game down
+    to a small position, and a search of it is handed to a pool of worker
+    processes, one per core, so that the server carries on while the bot
+    thinks.  The move that comes back is sent to the table through the
+    game master, journaled like any other command, unless the game has
+    moved on or finished in the meantime; searches for tables that have
+    finished are cancelled.
+    """
+
+    def __init__(self, server):
+
+        self.server = server
+        self.bots = {}
+        self.engines = {}
+        self.pool = None
+        self.cancel_flags = None
+        self.free_slots = []
+        self.jobs = {}
+        self.cancelled = []
+        self.stalled = {}
+        self.dropped = {}
+
+    def log(self, message):
+        self.server.log.log("[BOT] %s" % message)
+
+    def get_bot_by_name(self, name):
+
+        # Returns the bot with this name, or None if it isn't one.
+        prefix = BOT_NAME_PREFIX.lower()
+        lower_name = name.lower()
+        if not lower_name.startswith(prefix):
+            return None
+        number_str = lower_name[len(prefix):]
+        if not number_str.isdigit():
+            return None
+        number = int(number_str)
+        if number not in self.bots:
+            self.bots[number] = BotPlayer(number, self.server)
+        return self.bots[number]
+
+    def get_bot(self, table):
+
+        # The lowest-numbered bot not already sitting at the table.  The
+        # same commands always seat the same bots, so replaying a table
+        # from the journal finds them where they were.
+        number = 1
+        while table.get_seat_of_player(self.get_bot_by_name("%s%d" % (BOT_NAME_PREFIX, number))):
+            number += 1
+        return self.bots[number]
+
+    def get_engine(self, engine_path):
+
+        if engine_path not in self.engines:
+            self.engines[engine_path] = importlib.import_module(engine_path)
+        return self.engines[engine_path]
+
+    def start_pool(self):
+
+        processes = multiprocessing.cpu_count()
+        slot_count = processes * JOBS_PER_PROCESS
+        self.cancel_flags = multiprocessing.RawArray("b", slot_count)
+        self.free_slots = range(slot_count)
+        self.pool = multiprocessing.Pool(processes, _init_worker,
+                                         (self.cancel_flags,))
+        self.log("Started %d bot worker(s)." % processes)
+
+    def close(self):
+
+        # Stops the workers and forgets every search.  The pool is started
+        # again the next time a bot needs it.
+        if self.pool:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self.log("Stopped the bot workers.")
+        self.jobs = {}
+        self.cancelled = []
+        self.stalled = {}
+
+    def is_live(self, table):
+
+        return (table in self.server.game_master.tables and
+                table.state.get() != "finished")
+
+    def get_position(self, table, seat):
+
+        # What the table's engine makes of the game from this seat: None
+        # unless it's the seat's turn.
+        return self.get_engine(table.bot_engine).get_position(table, seat)
+
+    def submit(self, table, seat, position):
+
+        if not self.pool:
+            self.start_pool()
+        if not self.free_slots:
+            return False
+
+        slot = self.free_slots.pop()
+        self.cancel_flags[slot] = 0
+        seconds = table.bot_seconds.get(seat, DEFAULT_BOT_SECONDS)
+        job = Struct()
+        job.bot = seat.player
+        job.slot = slot
+        job.position = position
+        job.result = self.pool.apply_async(_think, (table.bot_engine, position,
+                                                    seconds, slot))
+        self.jobs[(table, seat)] = job
+        return True
+
+    def collect(self, job):
+
+        # Returns the move a finished search came up with, freeing up its
+        # slot, or None if it crashed.
+        self.free_slots.append(job.slot)
+        try:
+            return job.result.get(0)
+        except Exception as e:
+            self.log("A bot search crashed: %s\n%s" % (e, traceback.format_exc()))
+            return None
+
+    def drop_bot(self, table, seat):
+
+        # The table's engine choked on this bot's seat; stop playing it
+        # there, rather than letting one broken table stall every bot on
+        # the server, until it leaves the seat or the table goes away.
+        self.log("%s crashed at %s; dropping it.\n%s" % (seat.player, table.table_display_name, traceback.format_exc()))
+        table.channel.broadcast_cc("%s just crashed! ^RAlert the admin^~.\n" % seat.player)
+        self.dropped[(table, seat)] = seat.player
+        self.stalled.pop((table, seat), None)
+
+    def tick(self):
+
+        game_master = self.server.game_master
+
+        # Searches that were cancelled still hold their slots until the
+        # workers notice.
+        for job in list(self.cancelled):
+            if job.result.ready():
+                self.cancelled.remove(job)
+                self.collect(job)
+
+        if self.dropped:
+            self.dropped = dict((x, y) for x, y in self.dropped.items()
+                                if self.is_live(x[0]) and x[1].player == y)
+
+        # Play the moves that are ready, as long as nothing has happened at
+        # the table since the bot started thinking; cancel the searches of
+        # tables that are gone.
+        for key, job in self.jobs.items():
+            table, seat = key
+            if not self.is_live(table) or seat.player != job.bot:
+                self.cancel_flags[job.slot] = 1
+                self.cancelled.append(job)
+                del self.jobs[key]
+            elif job.result.ready():
+                del self.jobs[key]
+                move = self.collect(job)
+                try:
+                    if self.get_position(table, seat) != job.position:
+                        continue
+                    if move:
+                        game_master.handle(job.bot, table.table_name, move)
+
+                    # A search that crashed, or came up with a move the
+                    # table turned down, would only do the same again;
+                    # leave the bot be until something changes.  That's
+                    # judged by the position rather than the turn, which in
+                    # the card games can come straight back to the same
+                    # seat.
+                    if self.get_position(table, seat) == job.position:
+                        self.log("%s found no move at %s (|%s|)." % (job.bot, table.table_display_name, move))
+                        self.stalled[key] = job.position
+                except Exception:
+                    self.drop_bot(table, seat)
+
+        for key, position in self.stalled.items():
+            table, seat = key
+            try:
+                if (not self.is_live(table) or
+                   self.get_position(table, seat) != position):
+                    del self.stalled[key]
+            except Exception:
+                self.drop_bot(table, seat)
+
+        # Start searches for the bots whose turn it now is.
+        for table in game_master.tables:
+            engine_path = getattr(table, "bot_engine", None)
+            if not engine_path or not table.active or not self.is_live(table):
+                continue
+            for seat in table.seats:
+                key = (table, seat)
+                if (not isinstance(seat.player, BotPlayer) or
+                   key in self.jobs or key in self.stalled or
+                   key in self.dropped):
+                    continue
+                try:
+                    position = self.get_position(table, seat)
+                    if position is not None and not self.submit(table, seat, position):
+                        return
+                except Exception:
+                    self.drop_bot(table, seat)
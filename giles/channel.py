@@ -14,6 +14,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.utils import Snapshot
+
 class Channel(object):
     """Channels are alternate communication paths that players can
     connect to and disconnect from.  Messages sent to a channel go to
@@ -82,8 +84,11 @@ class Channel(object):
 
     def broadcast_cc(self, msg):
 
+        # Everyone gets the same text, so build it once and let the
+        # listeners share its colorized forms.
+        snapshot = Snapshot("^G*%s*^~ %s" % (self, msg))
         for player in self.listeners:
-            player.tell_cc("^G*%s*^~ %s" % (self, msg))
+            player.tell_cc(snapshot)
 
     def send(self, player, msg):
 
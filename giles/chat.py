@@ -38,15 +38,18 @@ class Chat(object):
         if substate == None:
 
             # The player just entered chat.  Welcome them, place them, subscribe
-            # them to the global channel.
+            # them to the global channel.  Anything their account remembers
+            # comes back first, so chat looks the way they left it.
+            remembered = self.server.account_manager.load_config(player)
             player.tell("\nWelcome to chat.  For help, type 'help' (without the quotes).\n\n")
             player.move(self.server.get_space("main"),
                         custom_join="^!%s^. has connected to the server.\n" % player)
             self.list_players_in_space(player.location, player)
             self.server.channel_manager.connect(player, "global")
 
-            # Turn timestamps on for them.
-            player.config["timestamps"] = True
+            # Turn timestamps on for them, unless they've said otherwise.
+            if not remembered:
+                player.config["timestamps"] = True
             state.set_sub("prompt")
 
         elif substate == "prompt":
@@ -58,6 +61,9 @@ class Chat(object):
 
             command = player.client.get_command()
 
+            if command is not None:
+                player.note_input()
+
             if command:
 
                 # Wipe out extraneous whitespace.
@@ -173,7 +179,7 @@ class Chat(object):
                 self.move(secondary, player)
 
             elif primary in ('who', 'w'):
-                self.who(player)
+                self.who(secondary, player)
 
             elif primary in ('game', 'games', 'g'):
                 self.game(secondary, player)
@@ -211,6 +217,24 @@ class Chat(object):
             elif primary in ('uptime',):
                 self.uptime(player)
 
+            elif primary in ('history', 'hist'):
+                self.history(secondary, player)
+
+            elif primary in ('record', 'rec'):
+                self.record(secondary, player)
+
+            elif primary in ('ratings', 'rating'):
+                self.ratings(secondary, player)
+
+            elif primary in ('seek',):
+                self.seek(secondary, player)
+
+            elif primary in ('unseek',):
+                self.server.seek_manager.unseek(player, secondary)
+
+            elif primary in ('tournament', 'tourney', 'tn'):
+                self.server.tournament_manager.handle(player, secondary)
+
             elif primary in ('quit', 'exit',):
                 self.quit(player)
                 did_quit = True
@@ -413,7 +437,14 @@ class Chat(object):
         else:
             player.tell("You must give a player and a message.\n")
 
-    def list_players_in_space(self, location, player):
+    def get_who_str(self, other, game):
+
+        # With a game, players are shown with their rating at it.
+        if game:
+            return "%s (^C%s^~)" % (other, self.server.results_manager.get_rating_str(other.name, game))
+        return "%s" % other
+
+    def list_players_in_space(self, location, player, game=None):
 
         player.tell_cc("Players in ^Y%s^~:\n" % location.name)
 
@@ -421,15 +452,15 @@ class Chat(object):
         state = "bold"
         for other in location.players:
             if state == "bold":
-                list_str += "^!%s^. " % other
+                list_str += "^!%s^. " % self.get_who_str(other, game)
                 state = "regular"
             elif state == "regular":
-                list_str += "%s " % other
+                list_str += "%s " % self.get_who_str(other, game)
                 state = "bold"
 
         player.tell_cc(list_str + "\n\n")
 
-    def list_players_not_in_space(self, location, player):
+    def list_players_not_in_space(self, location, player, game=None):
 
         player.tell_cc("Players elsewhere:\n")
 
@@ -438,10 +469,10 @@ class Chat(object):
         for other in self.server.players:
             if other.location != location:
                 if state == "bold":
-                    list_str += "^!%s^. " % other
+                    list_str += "^!%s^. " % self.get_who_str(other, game)
                     state = "regular"
                 elif state == "regular":
-                    list_str += "%s " % other
+                    list_str += "%s " % self.get_who_str(other, game)
                     state = "bold"
 
         player.tell_cc(list_str + "\n\n")
@@ -458,11 +489,13 @@ class Chat(object):
         else:
             player.tell("You must give a space to move to.\n")
 
-    def who(self, player):
+    def who(self, game, player):
 
         player.tell("\n")
-        self.list_players_in_space(player.location, player)
-        self.list_players_not_in_space(player.location, player)
+        if game:
+            game = game.lower()
+        self.list_players_in_space(player.location, player, game)
+        self.list_players_not_in_space(player.location, player, game)
 
     def roll(self, roll_string, player, secret=False):
 
@@ -752,6 +785,52 @@ class Chat(object):
 
         player.tell_cc("It has been up for ^Y%0.2d:%0.2d:%0.2d:%0.2d^~.\n" % (days, hours, minutes, seconds))
 
+    def history(self, history_string, player):
+
+        # history [<player> [<game>]]
+        name = player.display_name
+        game = None
+        if history_string:
+            history_bits = history_string.split()
+            if len(history_bits) > 2:
+                player.tell("Invalid history request.\n")
+                return
+            name = history_bits[0]
+            if len(history_bits) == 2:
+                game = history_bits[1]
+
+        self.server.results_manager.show_history(player, name, game)
+
+    def record(self, record_string, player):
+
+        name = player.display_name
+        if record_string:
+            name = record_string
+        self.server.results_manager.show_record(player, name)
+
+    def ratings(self, ratings_string, player):
+
+        name = player.display_name
+        if ratings_string:
+            name = ratings_string
+        self.server.results_manager.show_ratings(player, name)
+
+    def seek(self, seek_string, player):
+
+        # seek [<game> [<range>|any]]
+        if not seek_string:
+            self.server.seek_manager.list_seeks(player)
+            return
+
+        seek_bits = seek_string.split()
+        if len(seek_bits) > 2:
+            player.tell("Invalid seek.\n")
+            return
+        range_str = None
+        if len(seek_bits) == 2:
+            range_str = seek_bits[1]
+        self.server.seek_manager.seek(player, seek_bits[0], range_str)
+
     def show_help(self, player):
 
         player.tell("\n\nCOMMUNICATION:\n")
@@ -766,17 +845,31 @@ class Chat(object):
         player.tell("\nWORLD INTERACTION:\n")
         player.tell_cc("             ^!move^. <space>, ^!m^.      Move to space <space>.\n")
         player.tell_cc("                      ^!who^., ^!w^.      List players in your space/elsewhere.\n")
+        player.tell_cc("                  ^!who^. <game>      List players with their <game> ratings.\n")
         player.tell("\nGAMING:\n")
         player.tell_cc("             ^!game^. list, ^!g^. ls      List available games.\n")
         player.tell_cc("           ^!game^. active, ^!g^. ac      List active tables.\n")
         player.tell_cc(" ^!game^. new <game> <tablename>      New table of <game> named <tablename>.\n")
         player.tell_cc("      ^!table^. <table> <cmd>, ^!/^.      Send <table> <cmd>.\n")
         player.tell_cc("                      ^!\\^.<cmd>      Send the last table played <cmd>.\n")
+        player.tell_cc("                        ^!seek^.      List games people are seeking.\n")
+        player.tell_cc("   ^!seek^. <game> [<range>|any]      Find an opponent [rated within <range>].\n")
+        player.tell_cc("             ^!unseek^. [<game>]      Stop seeking [<game>].\n")
+        player.tell_cc("              ^!tournament^., ^!tn^.      List tournaments.\n")
+        player.tell_cc("^!tn new^. <nm> <game> <sty> [<r>]    New swiss|rr|ko tournament [of <r> rounds].\n")
+        player.tell_cc("        ^!tn join^.|^!leave^. <name>      Join/leave tournament <name>.\n")
+        player.tell_cc("      ^!tn start^.|^!cancel^. <name>      Start/cancel the tournament you direct.\n")
+        player.tell_cc("^!tn standings^.|^!pairings^. <name>      Show standings/this round's games.\n")
         player.tell_cc("   ^!roll^. [X]d<Y>[+/-/*<Z>], ^!r^.      Roll [X] Y-sided/F/% dice [modified].\n")
         player.tell_cc(" ^!sroll^. [X]d<Y>[+/-/*<Z>], ^!sr^.      Secret roll.\n")
+        player.tell_cc(" ^!history^. [<plr> [<game>]], ^!hist^.   List recent games [of <plr>].\n")
+        player.tell_cc("       ^!record^. [<player>], ^!rec^.      Show win/loss record [of <player>].\n")
+        player.tell_cc("          ^!ratings^. [<player>]      Show ratings [of <player>].\n")
         player.tell("\nCONFIGURATION:\n")
         player.tell_cc("^!set timestamp^. on|off, ^!set ts^.      Enable/disable timestamps.\n")
         player.tell_cc("     ^!set color^. on|off, ^!set c^.      Enable/disable color.\n")
+        player.tell_cc("      ^!set live^. on|off, ^!set l^.      Update boards in place (needs ANSI).\n")
+        player.tell_cc("^!set board^. compact|full, ^!set b^.     Use small, frameless boards.\n")
         player.tell("\nMETA:\n")
         player.tell_cc("            ^!become^. <newname>      Set name to <newname>.\n")
         player.tell_cc("   ^!alias^. <type> <name> <num>      Alias table/channel <name> to <num>.\n")
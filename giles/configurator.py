@@ -58,6 +58,16 @@ class Configurator(object):
                         is_valid = False
                     else:
                         is_valid = self.set_color(config_bits[1], player)
+                elif primary in ('live', 'l'):
+                    if len(config_bits) != 2:
+                        is_valid = False
+                    else:
+                        is_valid = self.set_live_board(config_bits[1], player)
+                elif primary in ('board', 'b'):
+                    if len(config_bits) != 2:
+                        is_valid = False
+                    else:
+                        is_valid = self.set_board_style(config_bits[1], player)
 
         if not is_valid:
             player.tell("Invalid configuration.\n")
@@ -98,3 +108,36 @@ class Configurator(object):
             player.server.log.log("%s turned color off." % player)
 
         return True
+
+    def set_live_board(self, msg, player):
+
+        # Returns whether or not it was successful, not the value set.
+
+        action = booleanize(msg)
+        if not action:
+            return False
+
+        if action > 0:
+            player.config["live_board"] = True
+            player.server.log.log("%s turned live boards on." % player)
+        else:
+            player.config["live_board"] = False
+            player.live_board = None
+            player.server.log.log("%s turned live boards off." % player)
+
+        return True
+
+    def set_board_style(self, msg, player):
+
+        # Returns whether or not it was successful, not the value set.
+
+        if msg in ('compact', 'c'):
+            player.config["compact_board"] = True
+            player.server.log.log("%s switched to compact boards." % player)
+        elif msg in ('full', 'f', 'normal', 'n'):
+            player.config["compact_board"] = False
+            player.server.log.log("%s switched to full boards." % player)
+        else:
+            return False
+
+        return True
@@ -35,6 +35,10 @@ class GameHandle(object):
         self.name = ".".join((path, class_name))
         self.admin_only = admin_only
 
+        # The name tables of this game go by, which isn't necessarily the
+        # key it was loaded under; known once a table has been made.
+        self.game_name = None
+
         # Load in the game.
         self.game_class = None
         self.tags = None
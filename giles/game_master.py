@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from giles.game_handle import GameHandle
+from giles.journal import AbsentPlayer, Journal, get_live_records
 from giles.utils import name_is_valid
 
 import ConfigParser
@@ -33,6 +34,12 @@ class GameMaster(object):
         self.server = server
         self.games = {}
         self.tables = []
+        self.journal = Journal()
+        self.replaying = False
+
+        # The seed for the table being made, which it picks up as it's
+        # built.
+        self.table_seed = None
         self.load_games_from_conf()
 
     def log(self, message):
@@ -127,6 +134,17 @@ class GameMaster(object):
 
         return None
 
+    def get_free_table_name(self, prefix, ids):
+
+        # Returns the first name made of the prefix and a number from ids
+        # that no table or channel is using yet.  For tables the server
+        # makes on players' behalf.
+        while True:
+            table_name = "%s%d" % (prefix, next(ids))
+            if (not self.get_table(table_name) and
+               not self.server.channel_manager.has_channel(table_name)):
+                return table_name
+
     def handle(self, player, table_name, command_str):
 
         if table_name and command_str and type(command_str) == str:
@@ -135,7 +153,16 @@ class GameMaster(object):
             table = self.get_table(table_name)
             if table:
                 try:
-                    table.handle(player, command_str)
+
+                    # Journal the command before running it, along with
+                    # the seed for any randomness it uses, so that replaying
+                    # it deals the same cards.
+                    seed = self.journal.new_seed()
+                    self.journal.record("cmd", table.journal_id, seed,
+                                        repr(player), command_str)
+                    table.random.set_seed(seed)
+                    self.run_command(table, player, command_str)
+                    table.publish_gmcp_state()
                 except Exception as e:
                     table.channel.broadcast_cc("This table just crashed on a command! ^RAlert the admin^~.\n")
                     self.log("%scrashed on command |%s|.\n%s" % (table.log_prefix, command_str, traceback.format_exc()))
@@ -148,7 +175,7 @@ class GameMaster(object):
             player.send("Invalid table command.\n")
 
     def new_table(self, player, game_name, table_name, scope="local",
-                  private=False):
+                  private=False, seed=None):
 
         if not name_is_valid(table_name):
             player.tell_cc("Invalid table name.\n")
@@ -172,20 +199,32 @@ class GameMaster(object):
         if lower_game_name in self.games:
 
             # If this game is admin-only, verify that the player is an admin.
-            if self.games[lower_game_name].admin_only:
+            # (Tables being rebuilt from the journal were already checked.)
+            if self.games[lower_game_name].admin_only and not self.replaying:
                 if not self.server.admin_manager.is_admin(player):
                     player.tell_cc("You cannot create a table; this game is admin-only.\n")
                     self.log("Non-admin %s failed to create table of admin-only game %s." % (player, lower_game_name))
                     return False
 
-            # Okay.  Create the new table.
+            # Okay.  Create the new table, seeded like a command, as some
+            # games shuffle up as soon as they're made.
+            if seed is None:
+                seed = self.journal.new_seed()
+            self.table_seed = seed
             try:
                 table = self.games[lower_game_name].game_class(self.server, table_name)
             except Exception as e:
                 player.tell_cc("Creating the table failed!  ^RAlert the admin^~.\n")
                 self.log("Creating table %s of game %s failed.\n%s" % (table_name, lower_game_name, traceback.format_exc()))
                 return False
+            finally:
+                self.table_seed = None
             table.private = private
+            self.games[lower_game_name].game_name = table.game_name
+            table.journal_id = self.journal.new_table_id()
+            self.journal.record("new", table.journal_id, lower_game_name,
+                                table.table_display_name, repr(player), private,
+                                table.created, seed)
 
             # Connect the player to its channel, because presumably they
             # want to actually hear what's going on.
@@ -206,6 +245,7 @@ class GameMaster(object):
                 player.location.notify_cc("%s created a new table of ^M%s^~ called ^R%s^~.\n" % (player, table.game_display_name, table.table_display_name))
                 self.log("%s created new local table %s of %s (%s)." % (player, table.table_display_name, table.game_name, table.game_display_name))
             self.tables.append(table)
+            table.publish_gmcp_state()
             return True
 
         player.tell_cc("No such game ^R%s^~.\n" % game_name)
@@ -246,6 +286,20 @@ class GameMaster(object):
         else:
             self.log("%s requested the list of all available games." % player)
 
+    def get_ratings_str(self, table):
+
+        # The players at a rated table, with their ratings at its game.
+        # Ratings of logged-in players are cached, so this is cheap.
+        sides = table.get_rating_sides()
+        if not sides:
+            return ""
+        results_manager = self.server.results_manager
+        players = ["%s ^C%s^~" % (x.player, results_manager.get_rating_str(x.player.name, table.game_name))
+                   for y in sides for x in y if x.player]
+        if not players:
+            return ""
+        return "[%s]" % ", ".join(players)
+
     def list_tables(self, player, show_private=False):
 
         player.tell_cc("\n^RACTIVE GAMES^~:\n")
@@ -271,7 +325,7 @@ class GameMaster(object):
                     table_color_code = "^Y"
                     game_color_code = "^C"
                     state = "magenta"
-                player.tell_cc("   %s%s^~ (%s%s^~) %s\n" % (table_color_code, table.table_display_name, game_color_code, table.game_display_name, private_str))
+                player.tell_cc("   %s%s^~ (%s%s^~) %s%s\n" % (table_color_code, table.table_display_name, game_color_code, table.game_display_name, private_str, self.get_ratings_str(table)))
 
         # If there were no visible tables, say so.
         if not found_a_table:
@@ -280,18 +334,50 @@ class GameMaster(object):
         player.tell("\n")
         self.log("%s requested a list of active tables." % player)
 
+    def run_command(self, table, player, command_str):
+
+        # Hands a table a command, counting it as a move if it came from a
+        # seated player and either passed the turn or ended the game.
+        turn = getattr(table, "turn", None)
+        was_finished = table.state.get() == "finished"
+        table.handle(player, command_str)
+        if (table.get_seat_of_player(player) and
+           (getattr(table, "turn", None) != turn or
+            (not was_finished and table.state.get() == "finished"))):
+            table.move_count += 1
+
     def remove_player(self, player):
 
         # Remove the player from every table they might be at.
+        self.journal.record("leave", None, repr(player))
         for table in self.tables:
             table.remove_player(player)
 
+    def reseat_player(self, player, notify=True):
+
+        # Put a player who just logged in back at any tables they were at
+        # when the server went down.
+        for table in self.tables:
+            table.reseat_player(player, notify)
+
+    def tick_table(self, table, seed):
+
+        # Ticks are seeded like commands, but most don't touch the random
+        # number generator, so only journal the ones that did.  Returns
+        # whether this one did.
+        table.random.set_seed(seed)
+        table.tick()
+        return table.random.seed_used()
+
     def tick(self):
 
         # Send ticks to all tables under our control.
         for table in self.tables:
             try:
-                table.tick()
+                seed = self.journal.new_seed()
+                if self.tick_table(table, seed):
+                    self.journal.record("tick", table.journal_id, seed)
+                table.publish_gmcp_state()
             except Exception as e:
                 table.channel.broadcast_cc("This table just crashed on tick()! ^RAlert the admin^~.\n")
                 self.log("%scrashed on tick().\n%s" % (table.log_prefix, traceback.format_exc()))
@@ -307,16 +393,143 @@ class GameMaster(object):
                 player.config["focus_table"] = None
                 if player.state.get() == "chat":
                     player.prompt()
+        self.journal.record("end", table.journal_id)
+        self.server.tournament_manager.remove_table(table)
         self.tables.remove(table)
         del table
 
+        # Once enough tables have come and gone, drop their records, so
+        # that the journal only ever holds much more than the live tables
+        # need for a moment.
+        if self.journal.should_compact():
+            self.compact_journal()
+
+    def compact_journal(self):
+
+        # Cut the journal down to the live tables.  If that fails, carry on
+        # appending to it as it was; it's only bigger than it needs to be.
+        try:
+            self.journal.compact([x.journal_id for x in self.tables])
+        except (IOError, OSError) as e:
+            self.log("Unable to compact the table journal: %s" % e)
+            if not self.journal.file:
+                self.journal.open()
+
+    def replay_tick(self, table, tick_seeds):
+
+        # During replay, tick a table after each of its records, as the
+        # server would have between commands.  A tick that uses randomness
+        # takes the next seed the table journaled for one.
+        if tick_seeds:
+            seed = tick_seeds[0]
+        else:
+            seed = self.journal.new_seed()
+        if self.tick_table(table, seed) and tick_seeds:
+            tick_seeds.pop(0)
+
+    def recover_tables(self):
+
+        # Rebuild the tables that were running when the server went down
+        # by replaying the journal, with absent players standing in for
+        # everyone, then cut the journal down to just those tables and
+        # start appending to it again.
+        try:
+            records = self.journal.read()
+        except IOError as e:
+            self.log("Unable to read the table journal: %s" % e)
+            return
+
+        # Tables that ended have nothing to rebuild, however much history
+        # they left behind, so they're skipped entirely.
+        ended = set(x[1] for x in records if x[0] == "end")
+        records = [x for x in records if x[0] == "leave" or x[1] not in ended]
+
+        absent_players = {}
+        tick_seeds = {}
+        name_index = {"new": 4, "cmd": 3, "leave": 2}
+        for record in records:
+            if record[0] in name_index:
+                name = record[name_index[record[0]]]
+                if name not in absent_players:
+                    absent_players[name] = (self.server.bot_manager.get_bot_by_name(name) or
+                                            AbsentPlayer(name, self.server))
+            elif record[0] == "tick":
+                tick_seeds.setdefault(record[1], []).append(record[2])
+
+        # Bots come back as themselves, and carry on playing once we're
+        # done.  Absent players need to be findable by name, for commands
+        # like replace, but only while we're replaying.
+        self.server.players.extend(absent_players.values())
+        self.server.log.muted = True
+        self.replaying = True
+
+        live = {}
+        for record in records:
+            kind = record[0]
+            if kind == "new":
+                table_id, game_name, table_name, creator, private = record[1:6]
+
+                # Older journals don't say how the table was seeded.
+                seed = None
+                if len(record) > 7:
+                    seed = record[7]
+                if self.new_table(absent_players[creator], game_name,
+                                  table_name, "personal", private, seed):
+                    table = self.tables[-1]
+                    table.journal_id = table_id
+
+                    # Older journals don't say when the table was created.
+                    if len(record) > 6:
+                        table.created = record[6]
+                    live[table_id] = table
+                continue
+
+            if kind == "leave":
+                tables = live.values()
+            elif record[1] in live:
+                tables = [live[record[1]]]
+            else:
+                tables = []
+
+            for table in tables:
+                try:
+                    if kind == "cmd":
+                        table.random.set_seed(record[2])
+                        self.run_command(table, absent_players[record[3]],
+                                         record[4])
+                        self.replay_tick(table, tick_seeds.get(record[1]))
+                    elif kind == "tick":
+                        self.replay_tick(table, tick_seeds.get(record[1]))
+                    elif kind == "leave":
+                        table.remove_player(absent_players[record[2]])
+                except Exception as e:
+                    self.log("Dropping table %s; it crashed during replay.\n%s" % (table.table_display_name, traceback.format_exc()))
+                    del live[table.journal_id]
+                    self.tables.remove(table)
+
+        self.replaying = False
+        self.server.log.muted = False
+        for absent_player in absent_players.values():
+            self.server.players.remove(absent_player)
+
+        # Keep the records of the tables that survived, and any leaves
+        # that came after the oldest of them.
+        try:
+            self.journal.rewrite(get_live_records(records, live))
+        except (IOError, OSError) as e:
+            self.log("Unable to rewrite the table journal: %s" % e)
+            return
+        self.log("Recovered %d table(s) from the journal." % len(live))
+
 
     def cleanup(self):
 
-        # Remove tables whose state is "finished".
+        # Remove tables whose state is "finished", keeping their results.
+        # (Walk a copy, as removing tables shifts the list underneath us.)
 
-        for table in self.tables:
+        for table in list(self.tables):
             if table.state.get() == "finished":
 
                 self.log("Deleting stale game table %s (%s)." % (table.table_display_name, table.game_display_name))
+                self.server.results_manager.record(table)
                 self.remove_table(table)
@@ -15,9 +15,10 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from giles.state import State
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.seat import Seat
-from giles.utils import demangle_move
+from giles.utils import demangle_move, get_snapshot, Struct
 
 MIN_SIZE = 5
 MAX_SIZE = 26
@@ -30,6 +31,9 @@ PIT = "pit"
 
 COLS = "abcdefghijklmnopqrstuvwxyz"
 
+# The sides, in the order snapshots write them.
+SIDES = (RED, BLUE, GREEN, YELLOW)
+
 TAGS = ["abstract", "capture", "square", "2p", "4p"]
 
 CONFIG_PARAMS = (
@@ -37,6 +41,59 @@ CONFIG_PARAMS = (
     ("size", "Board size"),
 )
 
+# The board is stored as one integer bitboard per side, plus one for the
+# pits.  Cells are numbered row-major, so (row, col) is bit row * size + col.
+# The masks needed to work with a board depend only on its size, so they are
+# built once per size and shared by every table.
+_MASK_CACHE = {}
+
+def get_masks(size):
+
+    if size in _MASK_CACHE:
+        return _MASK_CACHE[size]
+
+    masks = Struct()
+    masks.size = size
+    masks.full = (1 << (size * size)) - 1
+
+    # Shifting left or right by one wraps pieces around the edges of the
+    # board; these masks strip the wrapped pieces back off.
+    masks.not_left = 0
+    masks.not_right = 0
+
+    # For every cell, the cells a piece there can grow into (the adjacent
+    # ones) and the cells it can reach at all (those within two).
+    masks.clone = []
+    masks.reach = []
+    for r in range(size):
+        for c in range(size):
+            bit = 1 << (r * size + c)
+            if c != 0:
+                masks.not_left |= bit
+            if c != size - 1:
+                masks.not_right |= bit
+
+            clone = 0
+            reach = 0
+            for r_d in range(-2, 3):
+                for c_d in range(-2, 3):
+                    new_r = r + r_d
+                    new_c = c + c_d
+                    if ((r_d or c_d) and new_r >= 0 and new_r < size and
+                       new_c >= 0 and new_c < size):
+                        other_bit = 1 << (new_r * size + new_c)
+                        reach |= other_bit
+                        if abs(r_d) < 2 and abs(c_d) < 2:
+                            clone |= other_bit
+            masks.clone.append(clone)
+            masks.reach.append(reach)
+
+    _MASK_CACHE[size] = masks
+    return masks
+
+def popcount(bits):
+    return bin(bits).count("1")
+
 class Ataxx(SeatedGame):
     """An Ataxx game table implementation.  Invented in 1988 by Dave Crummack
     and Craig Galley.
@@ -58,10 +115,17 @@ class Ataxx(SeatedGame):
         self.prefix = "(^RAtaxx^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.ataxx.ataxx_bot"
 
         # Ataxx-specific stuff.
-        self.board = None
+        self.bits = None
+        self.pits = 0
+        self.open_cells = 0
+        self.masks = None
         self.printable_board = None
+        self.board_snapshot = None
+        self.dirty_rows = set()
+        self.drawn_last = None
         self.sides = {}
         self.size = 7
         self.player_mode = 2
@@ -74,9 +138,10 @@ class Ataxx(SeatedGame):
 
     def init_board(self):
 
-        self.board = []
-        for r in range(self.size):
-            self.board.append([None] * self.size)
+        self.masks = get_masks(self.size)
+        self.bits = {RED: 0, BLUE: 0, GREEN: 0, YELLOW: 0}
+        self.pits = 0
+        self.open_cells = self.masks.full
 
         # Place starting pieces, depending on the number of players.
         bottom_left = BLUE
@@ -85,13 +150,61 @@ class Ataxx(SeatedGame):
             bottom_left = YELLOW
             bottom_right = GREEN
 
-        self.board[0][0] = RED
-        self.board[0][self.size - 1] = BLUE
-        self.board[self.size - 1][0] = bottom_left
-        self.board[self.size - 1][self.size - 1] = bottom_right
+        self.set_loc(0, 0, RED)
+        self.set_loc(0, self.size - 1, BLUE)
+        self.set_loc(self.size - 1, 0, bottom_left)
+        self.set_loc(self.size - 1, self.size - 1, bottom_right)
 
+        # A fresh board needs every row drawn from scratch.
+        self.printable_board = None
         self.update_printable_board()
 
+    def get_loc(self, row, col):
+
+        # Returns whatever is at a location: a side, a pit, or None.
+        bit = 1 << (row * self.size + col)
+        if self.pits & bit:
+            return PIT
+        for side in self.bits:
+            if self.bits[side] & bit:
+                return side
+        return None
+
+    def set_loc(self, row, col, thing):
+
+        # Puts a side, a pit, or nothing at a location, clearing whatever
+        # was there before.
+        bit = 1 << (row * self.size + col)
+        self.pits &= ~bit
+        for side in self.bits:
+            self.bits[side] &= ~bit
+
+        if thing == PIT:
+            self.pits |= bit
+        elif thing:
+            self.bits[thing] |= bit
+        self.dirty_rows.add(row)
+
+        # The cells that aren't pits only change with the pit layout, so we
+        # keep them handy rather than recomputing them for every check.
+        self.open_cells = self.masks.full & ~self.pits
+
+    def get_empty(self):
+
+        occupied = 0
+        for side in self.bits:
+            occupied |= self.bits[side]
+        return self.open_cells & ~occupied
+
+    def spread(self, bits):
+
+        # Grow a set of cells by one in every direction, including the
+        # diagonals.
+        masks = self.masks
+        bits |= ((bits << 1) & masks.not_left) | ((bits >> 1) & masks.not_right)
+        bits |= (bits << masks.size) | (bits >> masks.size)
+        return bits & masks.full
+
     def init_seats(self):
 
         # If we're in 2-player mode, and there are 4 seats, delete the
@@ -153,34 +266,52 @@ class Ataxx(SeatedGame):
         # ...and reinitialize the board.
         self.init_board()
 
+    def get_printable_row(self, r):
+
+        cells = ["%2d ^m|^~ " % (r + 1)]
+        for c in range(self.size):
+            if r == self.last_r and c == self.last_c:
+                cells.append("^I")
+            loc = self.get_loc(r, c)
+            if loc == RED:
+                cells.append("^RR^~ ")
+            elif loc == BLUE:
+                cells.append("^BB^~ ")
+            elif loc == GREEN:
+                cells.append("^GG^~ ")
+            elif loc == YELLOW:
+                cells.append("^YY^~ ")
+            elif loc == PIT:
+                cells.append("^Ko^~ ")
+            else:
+                cells.append("^M.^~ ")
+        cells.append("^m|^~ %d\n" % (r + 1))
+        return "".join(cells)
+
     def update_printable_board(self):
 
-        self.printable_board = []
-        col_str = "    " + "".join([" " + COLS[i] for i in range(self.size)])
-        self.printable_board.append(col_str + "\n")
-        self.printable_board.append("   ^m.=" + "".join(["=="] * self.size) + ".^~\n")
-        for r in range(self.size):
-            this_str = "%2d ^m|^~ " % (r + 1)
-            for c in range(self.size):
-                if r == self.last_r and c == self.last_c:
-                    this_str += "^I"
-                loc = self.board[r][c]
-                if loc == RED:
-                    this_str += "^RR^~ "
-                elif loc == BLUE:
-                    this_str += "^BB^~ "
-                elif loc == GREEN:
-                    this_str += "^GG^~ "
-                elif loc == YELLOW:
-                    this_str += "^YY^~ "
-                elif loc == PIT:
-                    this_str += "^Ko^~ "
-                else:
-                    this_str += "^M.^~ "
-            this_str += "^m|^~ %d" % (r + 1)
-            self.printable_board.append(this_str + "\n")
-        self.printable_board.append("   ^m`=" + "".join(["=="] * self.size) + "'^~\n")
-        self.printable_board.append(col_str + "\n")
+        # Draw the frame and every row the first time through; after that,
+        # only the rows that changed (or gained or lost the last-move
+        # marker) are redrawn.
+        if not self.printable_board:
+            col_str = "    " + "".join([" " + COLS[i] for i in range(self.size)])
+            self.printable_board = [col_str + "\n"]
+            self.printable_board.append("   ^m.=" + "".join(["=="] * self.size) + ".^~\n")
+            self.printable_board.extend([None] * self.size)
+            self.printable_board.append("   ^m`=" + "".join(["=="] * self.size) + "'^~\n")
+            self.printable_board.append(col_str + "\n")
+            self.dirty_rows = set(range(self.size))
+
+        if self.drawn_last != (self.last_r, self.last_c):
+            if self.drawn_last:
+                self.dirty_rows.add(self.drawn_last[0])
+            self.dirty_rows.add(self.last_r)
+            self.drawn_last = (self.last_r, self.last_c)
+
+        for r in self.dirty_rows:
+            if r is not None and r >= 0 and r < self.size:
+                self.printable_board[r + 2] = self.get_printable_row(r)
+        self.dirty_rows = set()
 
     def get_info_str(self):
 
@@ -211,8 +342,8 @@ class Ataxx(SeatedGame):
 
         if not self.printable_board:
             self.update_printable_board()
-        for line in self.printable_board:
-            player.tell_cc(line)
+        self.board_snapshot = get_snapshot(self.board_snapshot, self.printable_board)
+        player.tell_cc(self.board_snapshot)
         player.tell_cc(self.get_info_str())
 
     def send_board(self):
@@ -233,19 +364,12 @@ class Ataxx(SeatedGame):
         # Returns whether or not a given piece has a potential move.
 
         # Bail on dud data.
-        if not self.is_valid(row, col) or not self.board[row][col]:
+        if not self.is_valid(row, col) or not self.get_loc(row, col):
             return False
 
         # Okay.  A piece can potentially move anywhere in a 5x5 area centered
         # on its location.
-        found_move = False
-        for r_d in range(-2, 3): # <--- why I hate range syntax.
-            for c_d in range(-2, 3):
-                if not found_move and self.is_valid(row + r_d, col + c_d) and not self.board[row + r_d][col + c_d]:
-                    found_move = True
-
-        # Return whether we found a move or not.
-        return found_move
+        return bool(self.masks.reach[row * self.size + col] & self.get_empty())
 
     def color_has_move(self, color):
 
@@ -262,14 +386,10 @@ class Ataxx(SeatedGame):
            (color == YELLOW and self.seats[3].data.resigned)):
             return False
 
-        # Okay.  Scan the board for pieces...
-        for r in range(self.size):
-            for c in range(self.size):
-                if self.board[r][c] == color and self.piece_has_move(r, c):
-                    return True
-
-        # Found no moves.  This color has no valid moves.
-        return False
+        # Okay.  Every cell within two of one of this side's pieces is
+        # reachable; if any of them are empty, there's a move.
+        reachable = self.spread(self.spread(self.bits[color]))
+        return bool(reachable & self.get_empty())
 
     def loc_to_str(self, row, col):
         return "%s%s" % (COLS[col], row + 1)
@@ -300,7 +420,7 @@ class Ataxx(SeatedGame):
 
         # Do they have a piece at the source?
         color = seat.data.side
-        if self.board[src_r][src_c] != color:
+        if self.get_loc(src_r, src_c) != color:
             player.tell_cc(self.prefix + "You don't have a piece at ^C%s^~.\n" % src_str)
             return False
 
@@ -310,7 +430,7 @@ class Ataxx(SeatedGame):
             return False
 
         # Is the destination empty?
-        if self.board[dst_r][dst_c]:
+        if self.get_loc(dst_r, dst_c):
             player.tell_cc(self.prefix + "^C%s^~ is already occupied.\n" % dst_str)
             return False
 
@@ -319,35 +439,41 @@ class Ataxx(SeatedGame):
         self.last_c = dst_c
 
         # Now, is it a split or a leap?
+        dst_index = dst_r * self.size + dst_c
+        color_bits = self.bits[color] | (1 << dst_index)
         if abs(src_r - dst_r) < 2 and abs(src_c - dst_c) < 2:
 
-            # Split.  Add a new piece, increase the count.
+            # Split.  Add a new piece.
             action_str = "^Mgrew^~ into"
-            self.board[dst_r][dst_c] = color
-            seat.data.count += 1
         else:
 
-            # Leap.  Move the piece, don't increase the count.
+            # Leap.  Move the piece.
             action_str = "^Cjumped^~ to"
-            self.board[src_r][src_c] = None
-            self.board[dst_r][dst_c] = color
+            color_bits &= ~(1 << (src_r * self.size + src_c))
 
-        # Whichever action occurred, check all cells surrounding the
-        # destination.  If they are opponents, transform them.
+        # Whichever action occurred, every opponent piece surrounding the
+        # destination is transformed, all at once.
         change_count = 0
         change_str = ""
-        for r_d in range(-1, 2):
-            for c_d in range(-1, 2):
-                if self.is_valid(dst_r + r_d, dst_c + c_d):
-                    occupier = self.board[dst_r + r_d][dst_c + c_d]
-                    if occupier and occupier != color and occupier != PIT:
-
-                        # Another player.  Uh oh!  Flip it and decrement that
-                        # player's count.
-                        self.board[dst_r + r_d][dst_c + c_d] = color
-                        seat.data.count += 1
-                        self.sides[occupier].data.count -= 1
-                        change_count += 1
+        neighbors = self.masks.clone[dst_index]
+        for side in self.bits:
+            if side != color:
+                flipped = self.bits[side] & neighbors
+                if flipped:
+                    self.bits[side] &= ~flipped
+                    color_bits |= flipped
+                    change_count += popcount(flipped)
+        self.bits[color] = color_bits
+
+        # Everything that changed is on the source row or within a row of
+        # the destination.
+        self.dirty_rows.add(src_r)
+        for r in range(dst_r - 1, dst_r + 2):
+            self.dirty_rows.add(r)
+
+        # Update everyone's piece counts.
+        for side in self.sides:
+            self.sides[side].data.count = popcount(self.bits[side])
 
         if change_count:
             change_str = ", ^!converting %d piece" % change_count
@@ -376,7 +502,7 @@ class Ataxx(SeatedGame):
                 return
 
             # Bail if a starting piece is there.
-            thing_there = self.board[row][col]
+            thing_there = self.get_loc(row, col)
             if thing_there and not (thing_there == PIT):
                 player.tell_cc(self.prefix + "Cannot put a pit on a starting piece.\n")
                 return
@@ -390,14 +516,14 @@ class Ataxx(SeatedGame):
                 action_str = "^Cadded^~"
 
             # Tentative place the thing.
-            self.board[row][col] = new_thing
+            self.set_loc(row, col, new_thing)
 
             # Does it keep red or blue (which, in a 4p game, is equivalent to
             # all four players) from being able to make a move?  If so, it's
             # invalid.  Put the board back the way it was.
             if not self.color_has_move(RED) or not self.color_has_move(BLUE):
                 player.tell_cc(self.prefix + "Players must have a valid move.\n")
-                self.board[row][col] = thing_there
+                self.set_loc(row, col, thing_there)
                 return
 
             loc_list = [(row, col)]
@@ -408,17 +534,17 @@ class Ataxx(SeatedGame):
             # but not if that's the same location as the one we just placed
             # (on the center line on odd-sized boards).
             if (edge - row) != row:
-                self.board[edge - row][col] = new_thing
+                self.set_loc(edge - row, col, new_thing)
                 loc_list.append((edge - row, col))
 
                 # Handle the 4p down-reflection if necessary.
                 if self.player_mode == 4 and (edge - col) != col:
-                    self.board[edge - row][edge - col] = new_thing
+                    self.set_loc(edge - row, edge - col, new_thing)
                     loc_list.append((edge - row, edge - col))
 
             # Handle the 4p right-reflection if necessary.
             if self.player_mode == 4 and (edge - col) != col:
-                self.board[row][edge - col] = new_thing
+                self.set_loc(row, edge - col, new_thing)
                 loc_list.append((row, edge - col))
 
             # Generate the list of locations.
@@ -631,7 +757,52 @@ class Ataxx(SeatedGame):
         else:
             return None
 
+    def encode_state(self, encoder):
+
+        super(Ataxx, self).encode_state(encoder)
+        encoder.write_varint(self.player_mode)
+        encoder.write_varint(self.size)
+        self.encode_seats(encoder)
+        for seat in self.seats:
+            encoder.write_varint(seat.data.count)
+            encoder.write_bool(seat.data.resigned)
+        encoder.write_index(self.turn, (None,) + SIDES)
+        encoder.write_optional_int(self.last_r)
+        encoder.write_optional_int(self.last_c)
+
+        # The bitboards are written as they are; varints don't mind their
+        # size.
+        for side in SIDES:
+            encoder.write_varint(self.bits[side])
+        encoder.write_varint(self.pits)
+
+    def decode_state(self, decoder):
+
+        # The player mode decides how many seats there are, so it has to be
+        # in place before they're read.
+        super(Ataxx, self).decode_state(decoder)
+        player_mode = decoder.read_varint()
+        if player_mode not in (2, 4):
+            raise CodecError("Invalid player mode %d." % player_mode)
+        self.size = decoder.read_varint()
+        self.change_player_mode(player_mode)
+        self.init_board()
+        self.decode_seats(decoder)
+        for seat in self.seats:
+            seat.data.count = decoder.read_varint()
+            seat.data.resigned = decoder.read_bool()
+        self.turn = decoder.read_index((None,) + SIDES)
+        self.last_r = decoder.read_optional_int()
+        self.last_c = decoder.read_optional_int()
+        for side in SIDES:
+            self.bits[side] = decoder.read_varint()
+        self.pits = decoder.read_varint()
+        self.open_cells = self.masks.full & ~self.pits
+        self.printable_board = None
+        self.update_printable_board()
+
     def resolve(self, winner):
+        self.set_winners([winner])
         self.send_board()
         self.channel.broadcast_cc(self.prefix + "^C%s^~ wins!\n" % winner)
 
@@ -642,20 +813,25 @@ class Ataxx(SeatedGame):
         # We look at the number of pieces each player has.  Highest wins.
         high_count = -1
         high_list = None
+        high_seats = None
         for seat in self.seats:
             if seat.data.count > high_count:
                 high_count = seat.data.count
                 high_list = ["^C%s^~" % seat.player_name]
+                high_seats = [seat]
             elif seat.data.count == high_count:
 
                 # Potential tie.
                 high_list.append("^C%s^~" % seat.player_name)
+                high_seats.append(seat)
+
+        self.set_winners(high_seats)
 
         # If a single player has the highest count, they win; otherwise, tie.
         if len(high_list) == 1:
             self.channel.broadcast_cc(self.prefix + "%s wins with ^Y%d^~ pieces!\n" % (high_list[0], high_count))
         else:
-            self.channel.broadcast_cc(self.prefix + "These players ^Rtied^~ for first with ^Y%d^~ pieces: %s\n" % (", ".join(high_list)))
+            self.channel.broadcast_cc(self.prefix + "These players ^Rtied^~ for first with ^Y%d^~ pieces: %s\n" % (high_count, ", ".join(high_list)))
 
     def show_help(self, player):
 
@@ -0,0 +1,144 @@
+# Giles: ataxx_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Ataxx bot, an alpha-beta search over the table's bitboards.  In the
+# four-player game, the other three are assumed to be playing against the
+# bot together, which keeps it careful.  A state is every seat's bits, in
+# seat order, and the index of the seat to move, or None once nobody else
+# can move and the game is over.
+
+from giles.games.ataxx.ataxx import COLS, get_masks, popcount
+from giles.games.search import alpha_beta
+
+# Pieces are all that matter in the end.
+WIN_SCORE = 1000000
+
+def get_position(table, seat):
+
+    if table.state.get() != "playing" or table.turn != seat.data.side:
+        return None
+    bits = tuple(table.bits[x.data.side] for x in table.seats)
+    resigned = tuple(x.data.resigned for x in table.seats)
+    return (table.size, table.pits, bits, resigned, table.seats.index(seat))
+
+def spread(masks, bits):
+
+    # The same growth as the table's: every cell next to one in bits.
+    bits |= ((bits << 1) & masks.not_left) | ((bits >> 1) & masks.not_right)
+    bits |= (bits << masks.size) | (bits >> masks.size)
+    return bits & masks.full
+
+def choose_move(position, should_stop):
+
+    size, pits, bits, resigned, me = position
+    masks = get_masks(size)
+    open_cells = masks.full & ~pits
+    seat_count = len(bits)
+
+    def get_empty(side_bits):
+        occupied = 0
+        for x in side_bits:
+            occupied |= x
+        return open_cells & ~occupied
+
+    def has_move(side_bits, index):
+        if resigned[index] or not side_bits[index]:
+            return False
+        return bool(spread(masks, spread(masks, side_bits[index])) &
+                    get_empty(side_bits))
+
+    def get_moves(state):
+
+        side_bits, index = state
+        if index is None:
+            return []
+        own = side_bits[index]
+        empty = get_empty(side_bits)
+
+        # Growing into a cell is the same move whichever neighbour grows
+        # into it, so there's one of those per cell, and they come first,
+        # as they never leave a hole behind.
+        moves = []
+        grow = spread(masks, own) & empty
+        while grow:
+            low_bit = grow & -grow
+            dst = low_bit.bit_length() - 1
+            src_bits = masks.clone[dst] & own
+            moves.append(((src_bits & -src_bits).bit_length() - 1, dst))
+            grow ^= low_bit
+
+        jumps = []
+        pieces = own
+        while pieces:
+            low_bit = pieces & -pieces
+            src = low_bit.bit_length() - 1
+            targets = masks.reach[src] & ~masks.clone[src] & empty
+            while targets:
+                target_bit = targets & -targets
+                jumps.append((src, target_bit.bit_length() - 1))
+                targets ^= target_bit
+            pieces ^= low_bit
+        return moves + jumps
+
+    def play(state, move):
+
+        side_bits, index = state
+        src, dst = move
+        new_bits = list(side_bits)
+        own = new_bits[index] | (1 << dst)
+        if not masks.clone[dst] & (1 << src):
+            own &= ~(1 << src)
+        neighbors = masks.clone[dst]
+        for other in range(seat_count):
+            if other != index and new_bits[other] & neighbors:
+                own |= new_bits[other] & neighbors
+                new_bits[other] &= ~neighbors
+        new_bits[index] = own
+
+        # As at the table, the turn goes to the next seat with a move; if
+        # it comes back around to the mover, that's the game.
+        next_index = (index + 1) % seat_count
+        while next_index != index:
+            if has_move(new_bits, next_index):
+                return (new_bits, next_index)
+            next_index = (next_index + 1) % seat_count
+        return (new_bits, None)
+
+    def evaluate(state):
+
+        side_bits, index = state
+        counts = [popcount(x) for x in side_bits]
+        mine = counts[me]
+        best_other = max(counts[x] for x in range(seat_count) if x != me)
+        live = [x for x in range(seat_count) if counts[x] and not resigned[x]]
+        if live == [me] or (index is None and mine > best_other):
+            return WIN_SCORE + mine
+        if not mine or (index is None and mine < best_other):
+            return -WIN_SCORE + mine
+        if index is None:
+            return 0
+        return mine * (seat_count - 1) - (sum(counts) - mine)
+
+    def is_max(state):
+        return state[1] == me
+
+    move = alpha_beta((list(bits), me), get_moves, play, evaluate, is_max,
+                      should_stop)
+    if not move:
+        return "resign"
+    src_r, src_c = divmod(move[0], size)
+    dst_r, dst_c = divmod(move[1], size)
+    return "move %s%d %s%d" % (COLS[src_c], src_r + 1, COLS[dst_c], dst_r + 1)
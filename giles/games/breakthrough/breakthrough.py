@@ -19,7 +19,7 @@ from giles.games.piece import Piece
 from giles.games.seat import Seat
 from giles.games.square_grid_layout import SquareGridLayout, COLS
 from giles.state import State
-from giles.utils import demangle_move
+from giles.utils import demangle_move, Struct
 
 # Some useful default values.
 MAX_HEIGHT = 26
@@ -35,6 +35,91 @@ CONFIG_PARAMS = (
     ("rows", "Number of rows with pieces"),
 )
 
+# The game itself is tracked with one integer bitboard per side; the layout
+# is only used for display.  Cells are numbered row-major, so (row, col) is
+# bit row * width + col.  Black moves towards higher rows (a left shift by
+# the width), White towards lower ones.  Everything below works on plain
+# integers, so it can be used to evaluate positions without a table.
+_MASK_CACHE = {}
+
+def get_masks(width, height):
+
+    if (width, height) in _MASK_CACHE:
+        return _MASK_CACHE[(width, height)]
+
+    masks = Struct()
+    masks.width = width
+    masks.height = height
+    masks.full = (1 << (width * height)) - 1
+    masks.first_row = (1 << width) - 1
+    masks.last_row = masks.first_row << (width * (height - 1))
+
+    # Diagonal moves shift pieces around the edges of the board; these masks
+    # strip the wrapped pieces back off.
+    col_mask = 0
+    for r in range(height):
+        col_mask |= 1 << (r * width)
+    masks.not_left = masks.full & ~col_mask
+    masks.not_right = masks.full & ~(col_mask << (width - 1))
+
+    _MASK_CACHE[(width, height)] = masks
+    return masks
+
+def get_start_bits(masks, rows):
+
+    # Returns the starting bitboards for Black and White with the given
+    # number of rows of pieces.
+    rows_bits = (1 << (masks.width * rows)) - 1
+    return rows_bits, rows_bits << (masks.width * (masks.height - rows))
+
+def shift(bits, delta):
+
+    if delta > 0:
+        return bits << delta
+    return bits >> -delta
+
+def get_move_targets(masks, own, other, row_delta):
+
+    # Returns the destinations reachable by moving straight forward, forward
+    # to the left (a lower column), and forward to the right (a higher one),
+    # along with the shift that makes each move.  Straight moves need an
+    # empty destination; diagonal ones just can't land on our own pieces.
+    forward = row_delta * masks.width
+    straight = shift(own, forward) & masks.full & ~(own | other)
+    left = shift(own, forward - 1) & masks.not_right & ~own
+    right = shift(own, forward + 1) & masks.not_left & ~own
+    return ((straight, forward), (left, forward - 1), (right, forward + 1))
+
+def get_moves(masks, own, other, row_delta):
+
+    # Returns every legal move as a (source index, destination index) tuple.
+    move_list = []
+    for targets, delta in get_move_targets(masks, own, other, row_delta):
+        while targets:
+            low_bit = targets & -targets
+            dst = low_bit.bit_length() - 1
+            move_list.append((dst - delta, dst))
+            targets ^= low_bit
+    return move_list
+
+def count_captures(masks, own, other, row_delta):
+
+    # Returns how many of the opponent's pieces could be captured right now.
+    targets = 0
+    for bits, delta in get_move_targets(masks, own, other, row_delta)[1:]:
+        targets |= bits
+    return popcount(targets & other)
+
+def has_broken_through(masks, own, row_delta):
+
+    # Black wins by reaching the last row, White by reaching the first.
+    if row_delta > 0:
+        return bool(own & masks.last_row)
+    return bool(own & masks.first_row)
+
+def popcount(bits):
+    return bin(bits).count("1")
+
 class Breakthrough(SeatedGame):
     """A Breakthrough game table implementation.  Invented in 2000 by Dan Troyka.
     """
@@ -55,6 +140,7 @@ class Breakthrough(SeatedGame):
         self.prefix = "(^RBreakthrough^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.breakthrough.breakthrough_bot"
 
         # Breakthrough-specific stuff.
         self.width = 8
@@ -62,9 +148,12 @@ class Breakthrough(SeatedGame):
         self.rows = 2
         self.turn = None
         self.black = self.seats[0]
+        self.black.data.row_delta = 1
         self.white = self.seats[1]
+        self.white.data.row_delta = -1
         self.resigner = None
         self.layout = None
+        self.masks = None
 
         # We cheat and create a black and white piece here.  Breakthrough
         # doesn't differentiate between pieces, so this allows us to do
@@ -85,6 +174,11 @@ class Breakthrough(SeatedGame):
         self.layout = SquareGridLayout()
         self.layout.resize(self.width, self.height)
 
+        # The bitboards are the real state of the game.
+        self.masks = get_masks(self.width, self.height)
+        self.black.data.bits, self.white.data.bits = get_start_bits(self.masks,
+                                                                    self.rows)
+
         for i in range(self.rows):
             # Some stupid math to get proper row numbers for White.
             white_row = self.height - (1 + i)
@@ -93,10 +187,19 @@ class Breakthrough(SeatedGame):
                 self.layout.place(self.wp, white_row, j, update=False)
 
         # Set the piece counts.
-        self.white.data.piece_count = self.width * self.rows
-        self.black.data.piece_count = self.width * self.rows
+        self.white.data.piece_count = popcount(self.white.data.bits)
+        self.black.data.piece_count = popcount(self.black.data.bits)
         self.layout.update()
 
+    def get_legal_moves(self, seat):
+
+        # Returns the list of legal moves for a seat as ((src_r, src_c),
+        # (dst_r, dst_c)) tuples.
+        other = self.next_seat(seat)
+        return [(divmod(src, self.width), divmod(dst, self.width))
+                for src, dst in get_moves(self.masks, seat.data.bits,
+                                          other.data.bits, seat.data.row_delta)]
+
     def show(self, player):
 
         player.tell_cc(self.layout)
@@ -144,17 +247,14 @@ class Breakthrough(SeatedGame):
             return False
 
         # Does the player even have a piece there?
-        src_loc = self.layout.grid[src_r][src_c]
-        if not src_loc or src_loc.data.owner != self.turn:
+        src_bit = 1 << (src_r * self.width + src_c)
+        dst_bit = 1 << (dst_r * self.width + dst_c)
+        if not seat.data.bits & src_bit:
             self.tell_pre(player, "You don't have a piece at ^C%s^~.\n" % src_str)
             return False
 
         # Is the destination within range?
-        if self.turn == self.black:
-            row_delta = 1
-        else:
-            row_delta = -1
-
+        row_delta = seat.data.row_delta
         if src_r + row_delta != dst_r:
             self.tell_pre(player, "You can't move from ^C%s^~ to row ^R%d^~.\n" % (src_str, dst_r + 1))
             return False
@@ -164,24 +264,23 @@ class Breakthrough(SeatedGame):
 
         # Okay, this is actually (gasp) a potentially legitimate move.  If
         # it's a move forward, it only works if the forward space is empty.
-        if src_c == dst_c and self.layout.grid[dst_r][dst_c]:
+        opponent = self.next_seat(seat)
+        if src_c == dst_c and dst_bit & (seat.data.bits | opponent.data.bits):
             self.tell_pre(player, "A straight-forward move can only be into an empty space.\n")
             return False
 
         # Otherwise, it must not have one of the player's own pieces in it.
-        dst_loc = self.layout.grid[dst_r][dst_c]
-        if src_loc == dst_loc:
+        if dst_bit & seat.data.bits:
             self.tell_pre(player, "A diagonal-forward move cannot be onto your own piece.\n")
             return False
 
         additional_str = ""
-        opponent = self.seats[0]
-        if seat == self.seats[0]:
-            opponent = self.seats[1]
-        if dst_loc:
+        if dst_bit & opponent.data.bits:
             # It's a capture.
             additional_str = ", capturing one of ^R%s^~'s pieces" % (opponent.player)
-            opponent.data.piece_count -= 1
+            opponent.data.bits &= ~dst_bit
+            opponent.data.piece_count = popcount(opponent.data.bits)
+        seat.data.bits = (seat.data.bits & ~src_bit) | dst_bit
         self.bc_pre("^Y%s^~ moves a piece from ^C%s^~ to ^G%s^~%s.\n" % (seat.player, src_str, dst_str, additional_str))
 
         # Make the move on the layout.
@@ -360,22 +459,59 @@ class Breakthrough(SeatedGame):
 
         # If someone resigned, this is the easiest thing ever.  Same if
         # they lost all their pieces.
-        if self.resigner == self.white or self.seats[1].data.piece_count == 0:
+        if self.resigner == self.white or not self.white.data.bits:
             return self.seats[0].player_name
-        elif self.resigner == self.black or self.seats[1].data.piece_count == 0:
+        elif self.resigner == self.black or not self.black.data.bits:
             return self.seats[1].player_name
 
         # Aw, we have to do work.  If black has a piece on the last row,
         # they win; if white has a piece on the first row, they win.
-        if self.bp in self.layout.grid[-1]:
+        if has_broken_through(self.masks, self.black.data.bits, 1):
             return self.seats[0].player_name
-        if self.wp in self.layout.grid[0]:
+        if has_broken_through(self.masks, self.white.data.bits, -1):
             return self.seats[1].player_name
 
         # ...that wasn't really much work, but there's no winner yet.
         return None
 
+    def encode_state(self, encoder):
+
+        super(Breakthrough, self).encode_state(encoder)
+        encoder.write_varint(self.width)
+        encoder.write_varint(self.height)
+        encoder.write_varint(self.rows)
+        self.encode_seats(encoder)
+        seats = [None] + self.seats
+        encoder.write_index(self.turn, seats)
+        encoder.write_index(self.resigner, seats)
+        self.layout.encode(encoder, [None, self.bp, self.wp])
+
+    def decode_state(self, decoder):
+
+        super(Breakthrough, self).decode_state(decoder)
+        self.width = decoder.read_varint()
+        self.height = decoder.read_varint()
+        self.rows = decoder.read_varint()
+        self.decode_seats(decoder)
+        seats = [None] + self.seats
+        self.turn = decoder.read_index(seats)
+        self.resigner = decoder.read_index(seats)
+        self.init_board()
+        self.layout.decode(decoder, [None, self.bp, self.wp])
+
+        # The bitboards follow from the layout.
+        self.black.data.bits = 0
+        self.white.data.bits = 0
+        for r in range(self.height):
+            for c in range(self.width):
+                piece = self.layout.grid[r][c]
+                if piece:
+                    piece.data.owner.data.bits |= 1 << (r * self.width + c)
+        self.black.data.piece_count = popcount(self.black.data.bits)
+        self.white.data.piece_count = popcount(self.white.data.bits)
+
     def resolve(self, winner):
+        self.set_winners([winner])
         self.send_board()
         self.bc_pre("^C%s^~ wins!\n" % winner)
 
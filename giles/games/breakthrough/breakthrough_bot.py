@@ -0,0 +1,111 @@
+# Giles: breakthrough_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Breakthrough bot, an alpha-beta search over the same bitboards the
+# table plays on.  A state is the two sides' bits, Black's first, and the
+# index of the side to move.
+
+from giles.games.breakthrough.breakthrough import get_masks, get_moves
+from giles.games.breakthrough.breakthrough import has_broken_through, popcount
+from giles.games.search import alpha_beta
+from giles.games.square_grid_layout import COLS
+
+# Black moves up the board, White down it.
+ROW_DELTAS = (1, -1)
+
+# Scores are material first, then how far up the board it's got.  A win
+# beats any of them.
+PIECE_SCORE = 100
+ROW_SCORE = 4
+WIN_SCORE = 1000000
+
+def get_position(table, seat):
+
+    if table.state.get() != "playing" or table.turn != seat:
+        return None
+    index = table.seats.index(seat)
+    return (table.width, table.height,
+            (table.black.data.bits, table.white.data.bits), index)
+
+def get_winner(masks, bits):
+
+    # Returns the index of the side that has won, if either has.
+    for index in (0, 1):
+        if (has_broken_through(masks, bits[index], ROW_DELTAS[index]) or
+           not bits[1 - index]):
+            return index
+    return None
+
+def get_advancement(masks, bits, index):
+
+    # How many rows the side's pieces have come, all told.
+    total = 0
+    row_bits = masks.first_row
+    for r in range(masks.height):
+        count = popcount(bits & (row_bits << (r * masks.width)))
+        if index:
+            total += count * (masks.height - 1 - r)
+        else:
+            total += count * r
+    return total
+
+def choose_move(position, should_stop):
+
+    width, height, bits, me = position
+    masks = get_masks(width, height)
+
+    def list_moves(state):
+        side_bits, index = state
+        if get_winner(masks, side_bits) is not None:
+            return []
+
+        # Captures first; they're the moves most likely to cut the search
+        # short.
+        other = side_bits[1 - index]
+        moves = get_moves(masks, side_bits[index], other, ROW_DELTAS[index])
+        moves.sort(key=lambda x: not (other >> x[1]) & 1)
+        return moves
+
+    def play(state, move):
+        side_bits, index = state
+        src, dst = move
+        dst_bit = 1 << dst
+        new_bits = [0, 0]
+        new_bits[index] = (side_bits[index] & ~(1 << src)) | dst_bit
+        new_bits[1 - index] = side_bits[1 - index] & ~dst_bit
+        return (new_bits, 1 - index)
+
+    def evaluate(state):
+        side_bits = state[0]
+        winner = get_winner(masks, side_bits)
+        if winner is not None:
+            return WIN_SCORE if winner == me else -WIN_SCORE
+        score = PIECE_SCORE * (popcount(side_bits[me]) -
+                               popcount(side_bits[1 - me]))
+        score += ROW_SCORE * (get_advancement(masks, side_bits[me], me) -
+                              get_advancement(masks, side_bits[1 - me], 1 - me))
+        return score
+
+    def is_max(state):
+        return state[1] == me
+
+    move = alpha_beta((list(bits), me), list_moves, play, evaluate, is_max,
+                      should_stop)
+    if not move:
+        return "resign"
+    src_r, src_c = divmod(move[0], width)
+    dst_r, dst_c = divmod(move[1], width)
+    return "move %s%d %s%d" % (COLS[src_c], src_r + 1, COLS[dst_c], dst_r + 1)
@@ -32,6 +32,9 @@ LETTERS = giles.games.goban.LETTERS
 
 TAGS = ["abstract", "capture", "square", "2p"]
 
+# Everything the turn and resigner can be, for snapshots.
+SIDES = (None, BLACK, WHITE)
+
 CONFIG_PARAMS = (
     ("goban.height", "Board height"),
     ("goban.width", "Board width"),
@@ -59,6 +62,7 @@ class CaptureGo(SeatedGame):
         self.prefix = "(^RCapture Go^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.capture_go.capture_go_bot"
 
         # Capture Go-specific stuff.
         self.turn = None
@@ -73,10 +77,7 @@ class CaptureGo(SeatedGame):
 
     def show(self, player):
 
-        if not self.goban.printable_board:
-            self.goban.update_printable_board()
-        for line in self.goban.printable_board:
-            player.tell_cc(line)
+        player.tell_cc(self.goban)
         player.tell_cc(self.get_supplemental_str())
 
     def send_board(self):
@@ -363,9 +364,38 @@ class CaptureGo(SeatedGame):
         return None
 
     def resolve(self, winner):
+        self.set_winners([winner])
         self.send_board()
         self.channel.broadcast_cc(self.prefix + "^C%s^~ wins!\n" % winner)
 
+    def encode_state(self, encoder):
+
+        super(CaptureGo, self).encode_state(encoder)
+        encoder.write_varint(self.capture_goal)
+        self.encode_seats(encoder)
+        for seat in self.seats:
+            encoder.write_varint(len(seat.data.capture_list))
+            for row, col in seat.data.capture_list:
+                encoder.write_varint(row)
+                encoder.write_varint(col)
+        encoder.write_index(self.turn, SIDES)
+        encoder.write_index(self.resigner, SIDES)
+        encoder.write_varint(self.turn_number)
+        self.goban.encode(encoder)
+
+    def decode_state(self, decoder):
+
+        super(CaptureGo, self).decode_state(decoder)
+        self.capture_goal = decoder.read_varint()
+        self.decode_seats(decoder)
+        for seat in self.seats:
+            seat.data.capture_list = [(decoder.read_varint(), decoder.read_varint())
+                                      for x in range(decoder.read_varint())]
+        self.turn = decoder.read_index(SIDES)
+        self.resigner = decoder.read_index(SIDES)
+        self.turn_number = decoder.read_varint()
+        self.goban.decode(decoder)
+
     def show_help(self, player):
 
         super(CaptureGo, self).show_help(player)
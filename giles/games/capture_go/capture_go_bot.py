@@ -0,0 +1,176 @@
+# Giles: capture_go_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Capture Go bot.  Playouts are random games run until someone reaches
+# the capture goal, on a flat board of its own that's far quicker to play
+# on than the goban; Monte Carlo tree search does the rest.
+
+from giles.games.goban import Goban, BLACK, WHITE, LETTERS, SQUARE_DELTAS
+from giles.games.search import monte_carlo
+
+import random
+
+# Points are 0 for empty or the side's number; (row, col) is
+# row * width + col.
+SIDE_NUMBERS = {None: 0, BLACK: 1, WHITE: 2}
+
+# Playouts that go on this many times longer than there are points are
+# scored on the captures so far.
+PLAYOUT_LENGTH_FACTOR = 3
+
+_NEIGHBOR_CACHE = {}
+
+def get_neighbors(width, height):
+
+    if (width, height) in _NEIGHBOR_CACHE:
+        return _NEIGHBOR_CACHE[(width, height)]
+
+    neighbors = []
+    for r in range(height):
+        for c in range(width):
+            neighbors.append([(r + r_d) * width + c + c_d
+                              for r_d, c_d in SQUARE_DELTAS
+                              if 0 <= r + r_d < height and 0 <= c + c_d < width])
+    _NEIGHBOR_CACHE[(width, height)] = neighbors
+    return neighbors
+
+def get_position(table, seat):
+
+    if table.state.get() != "playing" or table.turn != seat.data.side:
+        return None
+    goban = table.goban
+    cells = tuple(SIDE_NUMBERS[x] for row in goban.board for x in row)
+    captures = (len(table.seats[0].data.capture_list),
+                len(table.seats[1].data.capture_list))
+    return (goban.width, goban.height, cells, SIDE_NUMBERS[table.turn],
+            captures, table.capture_goal, tuple(goban.prev_board_list))
+
+def get_group(cells, neighbors, start):
+
+    # Returns the group of stones at start, or None as soon as it turns
+    # out to have a liberty.
+    color = cells[start]
+    group = set([start])
+    stack = [start]
+    while stack:
+        index = stack.pop()
+        for other in neighbors[index]:
+            if not cells[other]:
+                return None
+            if cells[other] == color and other not in group:
+                group.add(other)
+                stack.append(other)
+    return group
+
+def place(cells, neighbors, index, side):
+
+    # Puts a stone down on a list of cells, removing whatever it captures,
+    # and returns the side that lost stones and how many.  As at the
+    # table, the opponent's stones go first; only if none do is it a
+    # suicide.
+    cells[index] = side
+    captured = set()
+    for other in neighbors[index]:
+        if cells[other] == 3 - side and other not in captured:
+            group = get_group(cells, neighbors, other)
+            if group:
+                captured |= group
+    if captured:
+        for other in captured:
+            cells[other] = 0
+        return 3 - side, len(captured)
+
+    group = get_group(cells, neighbors, index)
+    if group:
+        for other in group:
+            cells[other] = 0
+        return side, len(group)
+    return None, 0
+
+def choose_move(position, should_stop):
+
+    width, height, cells, mover, captures, goal, prev_boards = position
+    neighbors = get_neighbors(width, height)
+
+    # A state is the points, the side to move, and each side's captures.
+    def get_winner(state_captures):
+        if state_captures[0] >= goal:
+            return 1
+        if state_captures[1] >= goal:
+            return 2
+        return None
+
+    def get_mover(state):
+        return state[1]
+
+    def get_moves(state):
+        if state is root_state:
+            return list(legal_moves)
+        if get_winner(state[2]):
+            return []
+        return [i for i, x in enumerate(state[0]) if not x]
+
+    def play(state, move):
+        new_cells = list(state[0])
+        loser, count = place(new_cells, neighbors, move, state[1])
+        new_captures = list(state[2])
+        if loser:
+            new_captures[2 - loser] += count
+        return (new_cells, 3 - state[1], new_captures)
+
+    def playout(state):
+        new_cells = list(state[0])
+        side = state[1]
+        new_captures = list(state[2])
+        for i in range(len(new_cells) * PLAYOUT_LENGTH_FACTOR):
+            winner = get_winner(new_captures)
+            if winner:
+                return winner
+            empty = [x for x, y in enumerate(new_cells) if not y]
+            loser, count = place(new_cells, neighbors, random.choice(empty),
+                                 side)
+            if loser:
+                new_captures[2 - loser] += count
+            side = 3 - side
+        if new_captures[0] == new_captures[1]:
+            return None
+        return 1 if new_captures[0] > new_captures[1] else 2
+
+    # Moves that would repeat an earlier board can't be made at all, so
+    # the search never sees them; deeper in, they're allowed, as checking
+    # would cost far more than it's worth.
+    goban = Goban()
+    goban.width = width
+    goban.height = height
+    color = BLACK if mover == 1 else WHITE
+    goban.board = [[(None, BLACK, WHITE)[cells[r * width + c]]
+                    for c in range(width)] for r in range(height)]
+    goban.prev_board_list = list(prev_boards)
+    legal_moves = [i for i, x in enumerate(cells) if not x and
+                   not goban.move_causes_repeat(color, *divmod(i, width))]
+    if not legal_moves:
+        return "resign"
+
+    root_state = (cells, mover, captures)
+    root = monte_carlo(root_state, get_mover, get_moves, play, playout,
+                       should_stop)
+    best = root.get_best_child()
+    if best:
+        move = best.move
+    else:
+        move = random.choice(legal_moves)
+    r, c = divmod(move, width)
+    return "move %s%d" % (LETTERS[c], r + 1)
@@ -0,0 +1,275 @@
+# Giles: codec.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A small binary codec for game state.  Games write their state as a
+# sequence of plain values (varints, strings, packed board cells, card
+# codes) with an Encoder, and read it back in the same order with a
+# Decoder; nothing about the layout is self-describing, so the two sides
+# must agree, which is what the snapshot version numbers are for.
+
+# Cells are packed this many to a byte, by bits per cell.
+CELLS_PER_BYTE = {1: 8, 2: 4, 4: 2, 8: 1}
+
+class CodecError(ValueError):
+    """Raised when encoded state can't be decoded: it's truncated, has
+    bytes left over, or doesn't belong to the game reading it.
+    """
+    pass
+
+def cell_bits(count):
+
+    # The fewest bits per cell that can hold count different values.
+    for bits in sorted(CELLS_PER_BYTE):
+        if count <= 1 << bits:
+            return bits
+    raise CodecError("Too many cell values to pack: %d" % count)
+
+def pack_cells(cells, bits):
+
+    # Packs a list of small non-negative integers, low bits first.
+    per_byte = CELLS_PER_BYTE[bits]
+    packed = []
+    for i in range(0, len(cells), per_byte):
+        byte = 0
+        for j, cell in enumerate(cells[i:i + per_byte]):
+            byte |= cell << (j * bits)
+        packed.append(chr(byte))
+    return "".join(packed)
+
+def unpack_cells(packed, bits, count):
+
+    per_byte = CELLS_PER_BYTE[bits]
+    mask = (1 << bits) - 1
+    cells = []
+    for byte in packed:
+        byte = ord(byte)
+        for j in range(per_byte):
+            cells.append((byte >> (j * bits)) & mask)
+    return cells[:count]
+
+class Encoder(object):
+    """Builds up encoded state.  Call the write_ methods in order, then
+    get_bytes() for the result.
+    """
+
+    def __init__(self):
+
+        self.chunks = []
+
+    def get_bytes(self):
+
+        return "".join(self.chunks)
+
+    def write_varint(self, value):
+
+        # Seven bits at a time, low first, high bit set on all but the last.
+        if value < 0:
+            raise CodecError("Negative varint: %d" % value)
+        chunk = []
+        while value > 0x7f:
+            chunk.append(chr((value & 0x7f) | 0x80))
+            value >>= 7
+        chunk.append(chr(value))
+        self.chunks.append("".join(chunk))
+
+    def write_int(self, value):
+
+        # Zigzag encoding keeps small negative numbers small.
+        if value < 0:
+            self.write_varint(-value * 2 - 1)
+        else:
+            self.write_varint(value * 2)
+
+    def write_optional_int(self, value):
+
+        self.write_bool(value is not None)
+        if value is not None:
+            self.write_int(value)
+
+    def write_bool(self, value):
+
+        self.chunks.append(chr(1) if value else chr(0))
+
+    def write_str(self, value):
+
+        self.write_varint(len(value))
+        self.chunks.append(value)
+
+    def write_optional_str(self, value):
+
+        self.write_bool(value is not None)
+        if value is not None:
+            self.write_str(value)
+
+    def write_index(self, value, choices):
+
+        # Writes which of a short list of choices a value is, None included
+        # if the list has it.
+        try:
+            self.write_varint(choices.index(value))
+        except ValueError:
+            raise CodecError("%r is not one of %r" % (value, choices))
+
+    def write_int_list(self, values):
+
+        self.write_varint(len(values))
+        for value in values:
+            self.write_int(value)
+
+    def write_str_list(self, values):
+
+        self.write_varint(len(values))
+        for value in values:
+            self.write_str(value)
+
+    def write_cells(self, cells, bits):
+
+        # cells is a list of small non-negative integers, packed bits to a
+        # cell.  The count is written too, so boards can be any size.
+        self.write_varint(len(cells))
+        self.chunks.append(pack_cells(cells, bits))
+
+    def write_choice_cells(self, values, choices):
+
+        # Like write_index(), for a whole board of values at once, packed
+        # as tightly as the number of choices allows.
+        try:
+            cells = [choices.index(x) for x in values]
+        except ValueError:
+            raise CodecError("Cell values must be among %r" % (choices,))
+        self.write_cells(cells, cell_bits(len(choices)))
+
+    def write_card(self, card):
+
+        # Cards are written as their codes, or as None for no card.
+        if card is None:
+            self.write_varint(0)
+        else:
+            self.write_varint(card.code + 1)
+
+    def write_cards(self, cards):
+
+        self.write_varint(len(cards))
+        for card in cards:
+            self.write_card(card)
+
+class Decoder(object):
+    """Reads back state written by an Encoder, one value at a time, in the
+    order it was written.  Running off the end raises CodecError.
+    """
+
+    def __init__(self, data):
+
+        self.data = data
+        self.pos = 0
+
+    def read_raw(self, length):
+
+        end = self.pos + length
+        if end > len(self.data):
+            raise CodecError("Encoded state is truncated.")
+        raw = self.data[self.pos:end]
+        self.pos = end
+        return raw
+
+    def finish(self):
+
+        # Complains if there's anything left unread.
+        if self.pos != len(self.data):
+            raise CodecError("%d unread bytes of encoded state." %
+                             (len(self.data) - self.pos))
+
+    def read_varint(self):
+
+        value = 0
+        shift = 0
+        while True:
+            byte = ord(self.read_raw(1))
+            value |= (byte & 0x7f) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def read_int(self):
+
+        value = self.read_varint()
+        if value & 1:
+            return -(value + 1) / 2
+        return value / 2
+
+    def read_optional_int(self):
+
+        if self.read_bool():
+            return self.read_int()
+        return None
+
+    def read_bool(self):
+
+        return self.read_raw(1) != chr(0)
+
+    def read_str(self):
+
+        return self.read_raw(self.read_varint())
+
+    def read_optional_str(self):
+
+        if self.read_bool():
+            return self.read_str()
+        return None
+
+    def read_index(self, choices):
+
+        index = self.read_varint()
+        if index >= len(choices):
+            raise CodecError("Choice %d out of range." % index)
+        return choices[index]
+
+    def read_int_list(self):
+
+        return [self.read_int() for i in range(self.read_varint())]
+
+    def read_str_list(self):
+
+        return [self.read_str() for i in range(self.read_varint())]
+
+    def read_cells(self, bits):
+
+        count = self.read_varint()
+        per_byte = CELLS_PER_BYTE[bits]
+        packed = self.read_raw((count + per_byte - 1) / per_byte)
+        return unpack_cells(packed, bits, count)
+
+    def read_choice_cells(self, choices):
+
+        cells = self.read_cells(cell_bits(len(choices)))
+        if [x for x in cells if x >= len(choices)]:
+            raise CodecError("Cell value out of range.")
+        return [choices[x] for x in cells]
+
+    def read_card(self, from_code):
+
+        # from_code turns a card code back into a card.
+        code = self.read_varint()
+        if not code:
+            return None
+        try:
+            return from_code(code - 1)
+        except (IndexError, KeyError):
+            raise CodecError("Unknown card code %d." % (code - 1))
+
+    def read_cards(self, from_code):
+
+        return [self.read_card(from_code) for i in range(self.read_varint())]
@@ -17,11 +17,12 @@
 # TODO: Reimplement the skew for even boards as a shift by one half-cell
 # to reduce the racing element.
 
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.seat import Seat
 from giles.state import State
 from giles.utils import booleanize
-from giles.utils import demangle_move
+from giles.utils import demangle_move, get_snapshot
 
 # Some useful default values.
 MIN_SIZE = 3
@@ -32,6 +33,9 @@ WHITE = "white"
 
 COLS = "abcdefghijklmnopqrstuvwxyz"
 
+# Everything a location, the turn, or the resigner can be, for snapshots.
+SIDES = (None, BLACK, WHITE)
+
 TAGS = ["abstract", "connection", "square", "2p"]
 
 # 0 1 2
@@ -77,6 +81,7 @@ class Crossway(SeatedGame):
         # Crossway-specific stuff.
         self.board = None
         self.printable_board = None
+        self.board_snapshot = None
         self.size = 19
         self.is_skewed = False
         self.turn = None
@@ -145,8 +150,8 @@ class Crossway(SeatedGame):
 
         if not self.printable_board:
             self.update_printable_board()
-        for line in self.printable_board:
-            player.tell_cc(line)
+        self.board_snapshot = get_snapshot(self.board_snapshot, self.printable_board)
+        player.tell_cc(self.board_snapshot)
         player.tell_cc(self.get_turn_str() + "\n")
 
     def send_board(self):
@@ -521,7 +526,39 @@ class Crossway(SeatedGame):
         for r_delta, c_delta in CONNECTION_DELTAS:
             self.recurse_adjacency(color, row + r_delta, col + c_delta)
 
+    def encode_state(self, encoder):
+
+        super(Crossway, self).encode_state(encoder)
+        encoder.write_varint(self.size)
+        encoder.write_bool(self.is_skewed)
+        self.encode_seats(encoder)
+        encoder.write_index(self.turn, SIDES)
+        encoder.write_varint(self.turn_number)
+        encoder.write_index(self.resigner, SIDES)
+        encoder.write_optional_int(self.last_r)
+        encoder.write_optional_int(self.last_c)
+        encoder.write_choice_cells([x for row in self.board for x in row], SIDES)
+
+    def decode_state(self, decoder):
+
+        super(Crossway, self).decode_state(decoder)
+        self.size = decoder.read_varint()
+        self.is_skewed = decoder.read_bool()
+        self.decode_seats(decoder)
+        self.turn = decoder.read_index(SIDES)
+        self.turn_number = decoder.read_varint()
+        self.resigner = decoder.read_index(SIDES)
+        self.last_r = decoder.read_optional_int()
+        self.last_c = decoder.read_optional_int()
+        cells = decoder.read_choice_cells(SIDES)
+        if len(cells) != self.size * self.size:
+            raise CodecError("Snapshot board is the wrong size.")
+        self.board = [cells[r * self.size:(r + 1) * self.size]
+                      for r in range(self.size)]
+        self.update_printable_board()
+
     def resolve(self, winner):
+        self.set_winners([winner])
         self.send_board()
         self.channel.broadcast_cc(self.prefix + "^C%s^~ wins!\n" % winner)
 
@@ -14,15 +14,16 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.hand import Hand
 from giles.games.seat import Seat
 from giles.state import State
-from giles.utils import Struct, get_plural_str
+from giles.utils import Struct, get_plural_str, get_snapshot
 
 from giles.games.expeditions.expeditions_card import ExpeditionsCard
-from giles.games.expeditions.expeditions_card import card_to_str, get_color_code, hand_to_str, value_to_str, sorted_hand, str_to_card, str_to_suit
-from giles.games.expeditions.expeditions_card import DEFAULT_SUITS, YELLOW, BLUE, WHITE, GREEN, RED, CYAN, MAGENTA
+from giles.games.expeditions.expeditions_card import card_to_str, code_to_card, get_color_code, hand_to_str, value_to_str, sorted_hand, str_to_card, str_to_suit
+from giles.games.expeditions.expeditions_card import ALL_SUITS, DEFAULT_SUITS, YELLOW, BLUE, WHITE, GREEN, RED, CYAN, MAGENTA
 from giles.games.expeditions.expeditions_card import AGREEMENT, SHORT, LONG
 
 # Some useful default values.
@@ -43,6 +44,9 @@ RIGHT = "right"
 
 NUMERICAL_RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10']
 
+# The suit last discarded to, if any, for snapshots.
+SUIT_CHOICES = [None] + ALL_SUITS
+
 TAGS = ["card", "random", "2p"]
 
 CONFIG_PARAMS = (
@@ -108,6 +112,7 @@ class Expeditions(SeatedGame):
         self.just_discarded_to = None
 
         self.printable_layout = None
+        self.layout_snapshot = None
         self.init_hand()
 
     def init_hand(self):
@@ -138,6 +143,13 @@ class Expeditions(SeatedGame):
                 pile.suit = suit
                 pile.hand = Hand()
                 pile.value = 0
+
+            # Expeditions also keep running totals and their printed form, so
+            # that neither has to be worked out from the cards every move.
+            for pile in (left_expedition, right_expedition):
+                pile.total = 0
+                pile.multiplier = 1
+                pile.card_str = ""
             self.left.data.expeditions.append(left_expedition)
             self.right.data.expeditions.append(right_expedition)
             self.discards.append(discard_pile)
@@ -154,7 +166,7 @@ class Expeditions(SeatedGame):
                 self.draw_pile.add(ExpeditionsCard(AGREEMENT, suit))
 
         # Lastly, shuffle the draw deck and initialize hands.
-        self.draw_pile.shuffle()
+        self.draw_pile.shuffle(self.random)
         self.left.data.hand = Hand()
         self.right.data.hand = Hand()
 
@@ -165,14 +177,6 @@ class Expeditions(SeatedGame):
             return(value_to_str(discard_pile.hand[-1].value()))
         return "."
 
-    def get_expedition_str(self, expedition):
-
-        to_return = ""
-        for card in expedition:
-            to_return += value_to_str(card.value())
-
-        return to_return
-
     def get_sp_str(self, seat):
 
         if seat == self.left:
@@ -180,6 +184,27 @@ class Expeditions(SeatedGame):
         else:
             return "^M%s^~" % self.right.player_name
 
+    def get_row_str(self, row):
+
+        left = self.left.data.expeditions[row]
+        right = self.right.data.expeditions[row]
+        suit_char = left.suit[0].upper()
+        left_suit_char = suit_char
+        right_suit_char = suit_char
+
+        # The left expedition grows towards the middle, so it reads
+        # backwards.
+        expedition_str = get_color_code(left.suit)
+        expedition_str += left.card_str[::-1].rjust(18)
+        if self.bonus and len(left.hand) >= self.bonus_length:
+            left_suit_char = "*"
+        if self.bonus and len(right.hand) >= self.bonus_length:
+            right_suit_char = "*"
+        expedition_str += " %s %s %s " % (left_suit_char, self.get_discard_str(row), right_suit_char)
+        expedition_str += right.card_str
+        expedition_str += "^~\n"
+        return expedition_str
+
     def update_printable_layout(self):
 
         self.printable_layout = []
@@ -187,26 +212,21 @@ class Expeditions(SeatedGame):
 
         # Loop through all table rows.
         for row in range(self.suit_count):
-            left = self.left.data.expeditions[row]
-            right = self.right.data.expeditions[row]
-            suit_char = left.suit[0].upper()
-            left_suit_char = suit_char
-            right_suit_char = suit_char
-            expedition_str = get_color_code(left.suit)
-            expedition_str += self.get_expedition_str(left.hand.reversed()).rjust(18)
-            if self.bonus and len(left.hand) >= self.bonus_length:
-                left_suit_char = "*"
-            if self.bonus and len(right.hand) >= self.bonus_length:
-                right_suit_char = "*"
-            expedition_str += " %s %s %s " % (left_suit_char, self.get_discard_str(row), right_suit_char)
-            expedition_str += self.get_expedition_str(right.hand)
-            expedition_str += "^~\n"
-            self.printable_layout.append(expedition_str)
+            self.printable_layout.append(self.get_row_str(row))
             self.printable_layout.append("                   |   |\n")
 
         # Replace the last unnecessary separator row with the end of the board.
         self.printable_layout[-1] = "                   `---'\n"
 
+    def update_printable_row(self, row):
+
+        # Only one row changes with any given move, so there's no need to
+        # rebuild the rest of the layout.
+        if not self.printable_layout:
+            self.update_printable_layout()
+        else:
+            self.printable_layout[row * 2 + 1] = self.get_row_str(row)
+
     def get_metadata_str(self):
 
         to_return = "^Y%s^~ remain in the draw pile.\n" % get_plural_str(len(self.draw_pile), "card")
@@ -229,8 +249,8 @@ class Expeditions(SeatedGame):
         if not self.printable_layout:
             self.update_printable_layout()
         player.tell_cc("%s         %s\n" % (self.get_sp_str(self.left).rjust(21), self.get_sp_str(self.right)))
-        for line in self.printable_layout:
-            player.tell_cc(line)
+        self.layout_snapshot = get_snapshot(self.layout_snapshot, self.printable_layout)
+        player.tell_cc(self.layout_snapshot)
         if show_metadata:
             player.tell_cc("\n" + self.get_metadata_str())
 
@@ -437,6 +457,45 @@ class Expeditions(SeatedGame):
 
         return None
 
+    def get_expedition_value(self, total, multiplier, length):
+
+        # No cards, no cost.  Otherwise it's the penalty plus the point
+        # cards, times the multiplier, plus any length bonus.
+        if not length:
+            return 0
+
+        value = (total - self.penalty) * multiplier
+        if self.bonus and length >= self.bonus_length:
+            value += self.bonus_points
+        return value
+
+    def get_play_value(self, expedition, card):
+
+        # Returns what the expedition would be worth with this card added
+        # to it, without actually adding it.
+        total = expedition.total
+        multiplier = expedition.multiplier
+        if card.value() == 1:
+            multiplier += 1
+        else:
+            total += card.value()
+        return self.get_expedition_value(total, multiplier, len(expedition.hand) + 1)
+
+    def add_to_expedition(self, seat, expedition, card):
+
+        # Puts the card on the expedition, updating the expedition's totals,
+        # its printed form, and the seat's score to match.
+        new_value = self.get_play_value(expedition, card)
+        if card.value() == 1:
+            expedition.multiplier += 1
+        else:
+            expedition.total += card.value()
+        expedition.hand.add(card)
+        expedition.card_str += value_to_str(card.value())
+
+        seat.data.curr_score += new_value - expedition.value
+        expedition.value = new_value
+
     def evaluate(self, player):
 
         for seat in self.seats:
@@ -488,7 +547,10 @@ class Expeditions(SeatedGame):
             return False
 
         # Passed the tests.  Play it and clear the discard tracker.
-        exp_hand.add(seat.data.hand.discard_specific(potential_card))
+        loc = self.suit_to_loc(potential_card.suit)
+        self.add_to_expedition(seat, seat.data.expeditions[loc],
+                               seat.data.hand.discard_specific(potential_card))
+        self.update_printable_row(loc)
         self.just_discarded_to = None
 
         self.bc_pre("%s played %s.\n" % (self.get_sp_str(seat),
@@ -524,9 +586,11 @@ class Expeditions(SeatedGame):
             return False
 
         # All right, they can discard it.  Get the appropriate discard pile...
-        discard_pile = self.discards[self.suit_to_loc(potential_card.suit)].hand
+        loc = self.suit_to_loc(potential_card.suit)
+        discard_pile = self.discards[loc].hand
 
         discard_pile.add(seat.data.hand.discard_specific(potential_card))
+        self.update_printable_row(loc)
 
         # Note the pile we just discarded to, so the player can't just pick it
         # back up as their next play.
@@ -606,6 +670,7 @@ class Expeditions(SeatedGame):
         dis_card = discard_pile.discard()
         seat.data.hand.add(dis_card)
         seat.data.hand = sorted_hand(seat.data.hand)
+        self.update_printable_row(loc)
 
         self.bc_pre("%s retrieved %s from the discards.\n" % (self.get_sp_str(seat),
                                                   card_to_str(dis_card, mode=LONG)))
@@ -749,10 +814,8 @@ class Expeditions(SeatedGame):
 
                     substate = self.state.get_sub()
 
-                    # Okay, something happened on the layout.  Update scores
-                    # and the layout.
-                    self.update_scores()
-                    self.update_printable_layout()
+                    # Scores and the layout were kept up to date by the
+                    # move itself.
 
                     # Is the game over?
                     if not len(self.draw_pile) or self.resigner:
@@ -798,53 +861,6 @@ class Expeditions(SeatedGame):
         if not handled:
             self.tell_pre(player, "Invalid command.\n")
 
-    def update_scores(self):
-
-        for seat in self.left, self.right:
-
-            # Start at 0.
-            total = 0
-
-            # For each expedition, if they're even on it...
-            for exp in seat.data.expeditions:
-
-                curr = 0
-                multiplier = 1
-
-                if len(exp.hand):
-
-                    # Immediately assign the penalty.
-                    curr -= self.penalty
-
-                    # Now loop through the cards.
-                    for card in exp.hand:
-
-                        value = card.value()
-                        if value == 1:
-
-                            # Agreement; adjust multiplier.
-                            multiplier += 1
-
-                        else:
-
-                            # Scoring card; increase current score.
-                            curr += value
-
-                    # Adjust the current score by the multiplier.
-                    curr *= multiplier
-
-                    # If bonuses are active, and this meets it, add it.
-                    if self.bonus and len(exp.hand) >= self.bonus_length:
-                        curr += self.bonus_points
-
-                # No matter what, add curr to total and set it on the
-                # pile.
-                total += curr
-                exp.value = curr
-
-            # Set the current score for the seat.
-            seat.data.curr_score = total
-
     def resolve_hand(self):
 
         for seat in self.left, self.right:
@@ -891,8 +907,83 @@ class Expeditions(SeatedGame):
         return None
 
     def resolve(self, winner):
+        self.set_winners([winner])
         self.bc_pre("%s wins!\n" % self.get_sp_str(winner))
 
+    def encode_state(self, encoder):
+
+        super(Expeditions, self).encode_state(encoder)
+        encoder.write_varint(self.hand_size)
+        encoder.write_varint(self.suit_count)
+        encoder.write_varint(self.agreement_count)
+        encoder.write_varint(self.penalty)
+        encoder.write_bool(self.bonus)
+        encoder.write_varint(self.bonus_length)
+        encoder.write_varint(self.bonus_points)
+        encoder.write_varint(self.goal)
+        self.encode_seats(encoder)
+
+        # Whether the player to move is playing or drawing.
+        encoder.write_optional_str(self.state.get_sub())
+        seats = [None] + self.seats
+        encoder.write_index(self.turn, seats)
+        encoder.write_index(self.first_player, seats)
+        encoder.write_index(self.resigner, seats)
+        encoder.write_index(self.just_discarded_to, SUIT_CHOICES)
+
+        # The current scores and expedition totals all follow from the
+        # cards on the expeditions, so only the overall scores are needed.
+        for seat in self.seats:
+            encoder.write_int(seat.data.overall_score)
+            encoder.write_cards(seat.data.hand)
+            for expedition in seat.data.expeditions:
+                encoder.write_cards(expedition.hand)
+        for discard_pile in self.discards:
+            encoder.write_cards(discard_pile.hand)
+        encoder.write_cards(self.draw_pile)
+
+    def decode_state(self, decoder):
+
+        super(Expeditions, self).decode_state(decoder)
+        self.hand_size = decoder.read_varint()
+        self.suit_count = decoder.read_varint()
+        if not MIN_SUITS <= self.suit_count <= MAX_SUITS:
+            raise CodecError("Invalid suit count %d." % self.suit_count)
+        self.agreement_count = decoder.read_varint()
+        self.penalty = decoder.read_varint()
+        self.bonus = decoder.read_bool()
+        self.bonus_length = decoder.read_varint()
+        self.bonus_points = decoder.read_varint()
+        self.goal = decoder.read_varint()
+        self.decode_seats(decoder)
+
+        self.state.set_sub(decoder.read_optional_str())
+        seats = [None] + self.seats
+        self.turn = decoder.read_index(seats)
+        self.first_player = decoder.read_index(seats)
+        self.resigner = decoder.read_index(seats)
+        self.just_discarded_to = decoder.read_index(SUIT_CHOICES)
+
+        # init_hand() builds the piles for the suits in play; then the cards
+        # go back where they were, played ones through add_to_expedition()
+        # so the totals and scores are rebuilt along the way.
+        self.init_hand()
+        for seat in self.seats:
+            seat.data.overall_score = decoder.read_int()
+            seat.data.curr_score = 0
+            for card in decoder.read_cards(code_to_card):
+                seat.data.hand.add(card)
+            for expedition in seat.data.expeditions:
+                for card in decoder.read_cards(code_to_card):
+                    self.add_to_expedition(seat, expedition, card)
+        for discard_pile in self.discards:
+            for card in decoder.read_cards(code_to_card):
+                discard_pile.hand.add(card)
+        self.draw_pile = Hand()
+        for card in decoder.read_cards(code_to_card):
+            self.draw_pile.add(card)
+        self.update_printable_layout()
+
     def show_help(self, player):
 
         super(Expeditions, self).show_help(player)
@@ -44,6 +44,9 @@ LONG = "long"
 
 DEFAULT_SUITS = [YELLOW, BLUE, WHITE, GREEN, RED]
 
+# Every suit a game can use, in the order card codes count them.
+ALL_SUITS = DEFAULT_SUITS + [CYAN, MAGENTA]
+
 class ExpeditionsCard(PlayingCard):
     """Implements a Expeditions card.  By default there are five suits; each
     suit has one card of every rank from 2 to 10, along with three identical
@@ -56,6 +59,18 @@ class ExpeditionsCard(PlayingCard):
 
         super(ExpeditionsCard, self).__init__(r, s)
 
+        # Our ranks don't match the playing card ones, so the value the
+        # parent class cached is wrong for Agreements; replace it.
+        self.val = self.value()
+
+        # Likewise the code, which playing cards only have for the standard
+        # deck; ours are suit-major, rank-minor across ALL_SUITS.
+        rank = str(r) if type(r) == int else r
+        if rank in RANKS and s in ALL_SUITS:
+            self.code = ALL_SUITS.index(s) * len(RANKS) + RANKS.index(rank)
+        else:
+            self.code = None
+
     def __repr__(self):
         if self.rank == AGREEMENT:
             return ("a %s Agreement" % (self.suit))
@@ -71,6 +86,12 @@ class ExpeditionsCard(PlayingCard):
         if r.isdigit():
             return int(r)
 
+def code_to_card(code):
+
+    # Cards with the same code are indistinguishable, so a fresh one will do.
+    suit_index, rank_index = divmod(code, len(RANKS))
+    return ExpeditionsCard(RANKS[rank_index], ALL_SUITS[suit_index])
+
 SUIT_SHORTHANDS = ['y', 'b', 'w', 'g', 'r', 'c', 'm', 'p']
 AGREEMENT_SHORTHANDS = ['a', 'h', 'i', '1']
 
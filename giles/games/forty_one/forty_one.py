@@ -17,16 +17,18 @@
 from giles.games.four_player_card_game_layout import FourPlayerCardGameLayout, NORTH, SOUTH, EAST, WEST
 from giles.games.seated_game import SeatedGame
 from giles.games.hand import Hand
-from giles.games.playing_card import new_deck, str_to_card, card_to_str, hand_to_str, LONG, HEARTS
+from giles.games.playing_card import PlayingCardHand, cards_to_hand, code_to_card, new_deck, str_to_card, card_to_str, hand_to_str, LONG, HEARTS, SUITS
 from giles.games.seat import Seat
-from giles.games.trick import handle_trick, hand_has_suit, sorted_hand
+from giles.games.trick import handle_trick, sorted_hand
 from giles.state import State
 from giles.utils import booleanize, get_plural_str
 
-import random
 
 TAGS = ["card", "partnership", "random", "trick", "trump", "4p"]
 
+# Trumps and the led suit are one of the suits or unset, for snapshots.
+SUIT_CHOICES = [None] + SUITS
+
 CONFIG_PARAMS = (
     ("goal", "Goal score to win"),
     ("positive", "Must both partners have a positive score to win?"),
@@ -65,6 +67,8 @@ class FortyOne(SeatedGame):
         self.prefix = "(^RForty-One^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.forty_one.forty_one_bot"
+        self.snapshot_version = 2
 
         # 41-specific stuff.
         self.goal = 41
@@ -120,7 +124,7 @@ class FortyOne(SeatedGame):
 
     def display(self, player):
 
-        player.tell_cc("%s" % self.layout)
+        player.tell_cc(self.layout)
 
     def get_color_code(self, seat):
         if seat == self.north or seat == self.south:
@@ -188,6 +192,21 @@ class FortyOne(SeatedGame):
 
         return to_return
 
+    def get_gmcp_state(self):
+
+        state = super(FortyOne, self).get_gmcp_state()
+        state["trump"] = self.trump_suit
+        return state
+
+    def get_gmcp_private_state(self, player):
+
+        # Seated players get their hand, and their legal plays on their turn.
+        seat = self.get_seat_of_player(player)
+        if not seat or getattr(seat.data, "hand", None) is None:
+            return None
+        may_play = self.state.get() == "playing" and seat == self.turn
+        return seat.data.hand.get_state(self.led_suit, may_play)
+
     def show(self, player):
         self.display(player)
         player.tell_cc(self.get_metadata())
@@ -314,12 +333,13 @@ class FortyOne(SeatedGame):
 
         self.bc_pre("^R%s^~ (%s%s^~) gives the cards a good shuffle...\n" % (dealer_name, self.get_color_code(self.dealer), self.dealer))
         deck = new_deck()
-        deck.shuffle()
+        deck.shuffle(self.random)
 
         # Deal out all of the cards.
         self.bc_pre("^R%s^~ deals the cards out to all of the players.\n" % dealer_name)
         for seat in self.seats:
-            seat.data.hand = Hand()
+            seat.data.hand = PlayingCardHand()
+            seat.data.voids = []
         for _ in range(13):
             for seat in self.seats:
                 seat.data.hand.add(deck.discard())
@@ -418,12 +438,16 @@ class FortyOne(SeatedGame):
         if self.led_suit:
 
             this_suit = potential_card.suit
-            if this_suit != self.led_suit and hand_has_suit(seat.data.hand, self.led_suit):
+            if this_suit != self.led_suit and seat.data.hand.has_suit(self.led_suit):
 
                 # You can't play off-suit if you can match the led suit.
                 self.tell_pre(player, "You can't throw off; you have the led suit.\n")
                 return False
 
+            # They're out of the led suit, which the bots want to know.
+            if this_suit != self.led_suit and self.led_suit not in seat.data.voids:
+                seat.data.voids.append(self.led_suit)
+
         else:
 
             # No led suit; they're the leader.
@@ -453,7 +477,7 @@ class FortyOne(SeatedGame):
             self.clear_trick()
 
             # Pick a starting dealer at random.
-            self.dealer = random.choice(self.seats)
+            self.dealer = self.random.choice(self.seats)
             self.bc_pre("Fate has spoken, and the starting dealer is %s!\n" % self.get_sp_str(self.dealer))
             self.new_deal()
 
@@ -744,7 +768,7 @@ class FortyOne(SeatedGame):
 
         # If we're in positive mode, strip entries from the list if their
         # partners don't have a positive score.
-        if self.positive:
+        if self.positive and high_list:
             high_list = [x for x in high_list if x.data.partner.data.score > 0]
 
         # If the list is empty, we can flat-out bail.
@@ -766,10 +790,80 @@ class FortyOne(SeatedGame):
     def resolve(self, winning_seat):
 
         if self.north == winning_seat or self.south == winning_seat:
-            name_one = self.north.player_name
-            name_two = self.south.player_name
+            seat_one, seat_two = self.north, self.south
         else:
-            name_one = self.west.player_name
-            name_two = self.east.player_name
+            seat_one, seat_two = self.west, self.east
+        self.set_winners([seat_one, seat_two])
+        name_one = seat_one.player_name
+        name_two = seat_two.player_name
 
         self.bc_pre("^G%s^~ and ^G%s^~ win!\n" % (name_one, name_two))
+
+    def get_rating_sides(self):
+
+        return [[self.north, self.south], [self.west, self.east]]
+
+    def encode_state(self, encoder):
+
+        super(FortyOne, self).encode_state(encoder)
+        encoder.write_varint(self.goal)
+        encoder.write_varint(self.double)
+        encoder.write_varint(self.minimum)
+        encoder.write_varint(self.current_minimum)
+        encoder.write_bool(self.decay)
+        encoder.write_bool(self.whist)
+        encoder.write_bool(self.positive)
+        self.encode_seats(encoder)
+
+        # Scores can go negative.
+        for seat in self.seats:
+            encoder.write_int(seat.data.score)
+
+        # Nothing else exists until the first deal.
+        dealt = self.dealer is not None
+        encoder.write_bool(dealt)
+        if dealt:
+            seats = [None] + self.seats
+            encoder.write_index(self.trump_suit, SUIT_CHOICES)
+            encoder.write_index(self.led_suit, SUIT_CHOICES)
+            encoder.write_index(self.turn, seats)
+            encoder.write_index(self.dealer, seats)
+            for seat in self.seats:
+                encoder.write_varint(seat.data.tricks)
+                encoder.write_varint(seat.data.bid)
+                encoder.write_cards(seat.data.hand)
+                encoder.write_card(seat.data.card)
+                encoder.write_str_list(seat.data.voids)
+            encoder.write_cards(self.trick)
+        self.layout.encode(encoder)
+
+    def decode_state(self, decoder):
+
+        super(FortyOne, self).decode_state(decoder)
+        self.goal = decoder.read_varint()
+        self.double = decoder.read_varint()
+        self.minimum = decoder.read_varint()
+        self.current_minimum = decoder.read_varint()
+        self.decay = decoder.read_bool()
+        self.whist = decoder.read_bool()
+        self.positive = decoder.read_bool()
+        self.decode_seats(decoder)
+        for seat in self.seats:
+            seat.data.score = decoder.read_int()
+
+        if decoder.read_bool():
+            seats = [None] + self.seats
+            self.trump_suit = decoder.read_index(SUIT_CHOICES)
+            self.led_suit = decoder.read_index(SUIT_CHOICES)
+            self.turn = decoder.read_index(seats)
+            self.dealer = decoder.read_index(seats)
+            for seat in self.seats:
+                seat.data.tricks = decoder.read_varint()
+                seat.data.bid = decoder.read_varint()
+                seat.data.hand = cards_to_hand(decoder.read_cards(code_to_card))
+                seat.data.card = decoder.read_card(code_to_card)
+                seat.data.voids = decoder.read_str_list()
+            self.trick = Hand()
+            for card in decoder.read_cards(code_to_card):
+                self.trick.add(card)
+        self.layout.decode(decoder, code_to_card)
@@ -0,0 +1,81 @@
+# Giles: forty_one_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Forty-One bot.  It bids the tricks it takes on average when the deal
+# is dealt out at random and played out, and plays by determinized Monte
+# Carlo search, for the most points its partnership can make over the
+# other's once every bid is made or broken.
+
+from giles.games.trick_search import choose_card, get_deal, index_to_str, play_out, sample_deals
+
+# North and South are partners, as are West and East.
+TEAMS = (0, 1, 0, 1)
+
+def get_position(table, seat):
+
+    state = table.state.get()
+    if state not in ("bidding", "playing") or table.turn != seat:
+        return None
+
+    deal = get_deal(table, seat)
+    if state == "bidding":
+
+        # Eldest leads to the first trick once the bidding's done.
+        leader = table.seats.index(table.next_seat(table.dealer))
+        return (state, deal, leader)
+    tricks = tuple(x.data.tricks for x in table.seats)
+    bids = tuple(x.data.bid for x in table.seats)
+    return (state, deal, tricks, bids, table.double)
+
+def choose_move(position, should_stop):
+
+    if position[0] == "bidding":
+        state, deal, leader = position
+        me = deal[0]
+        trump = deal[5]
+        total = 0
+        samples = 0
+        hands = list(deal[1])
+        tricks = [0] * len(hands)
+        for dealt in sample_deals(deal, should_stop):
+            hands[:] = dealt
+            tricks[:] = [0] * len(hands)
+            play_out(hands, tricks, TEAMS, trump, None, leader, None, None,
+                     None, 0)
+            total += tricks[me]
+            samples += 1
+        return "bid %d" % max(1, total // samples)
+
+    state, deal, tricks, bids, double = position
+    side = TEAMS[deal[0]]
+
+    def score(sim_tricks):
+        total = 0
+        for seat, bid in enumerate(bids):
+            if double and bid >= double:
+                points = bid * 2
+            else:
+                points = bid
+            if sim_tricks[seat] < bid:
+                points = -points
+            if TEAMS[seat] == side:
+                total += points
+            else:
+                total -= points
+        return total
+
+    card = choose_card(deal, tricks, TEAMS, score, None, should_stop)
+    return "play %s" % index_to_str(card)
@@ -30,6 +30,9 @@ NONE_POINTER = "++"
 
 BLANK_ROW = "       |                    |\n"
 
+# Everywhere a card can be played from, or None, for snapshots.
+POSITIONS = (None, NORTH, EAST, SOUTH, WEST)
+
 class FourPlayerCardGameLayout(Layout):
     """A standard layout for a 4-player card game, with North, East, South,
     and West sitting at a table.
@@ -71,8 +74,12 @@ class FourPlayerCardGameLayout(Layout):
         self.representation = "\n"
         if not self.turn:
             self.representation += "   A shuffled deck of playing cards lies face-down on the table.\n"
+            self.compact_representation = None
             return
 
+        # The compact layout is just the table on one line.
+        self.compact_representation = "\n ^RN^~ %s ^ME^~ %s ^RS^~ %s ^MW^~ %s  %s\n" % (self.card_str(NORTH), self.card_str(EAST), self.card_str(SOUTH), self.card_str(WEST), self.turn_pointer)
+
         self.representation += "       .--------------------.\n"
         self.representation += "       |         ^RNN^~         |\n"
         self.representation += BLANK_ROW
@@ -85,6 +92,19 @@ class FourPlayerCardGameLayout(Layout):
         self.representation += "       |         ^RSS^~         |\n"
         self.representation += "       `--------------------'\n"
 
+    def get_state(self):
+
+        # The card in front of each player, if any, and who played last.
+        return {
+            "cards": {
+                NORTH: card_to_str(self.north_card).strip() or None,
+                EAST: card_to_str(self.east_card).strip() or None,
+                SOUTH: card_to_str(self.south_card).strip() or None,
+                WEST: card_to_str(self.west_card).strip() or None,
+            },
+            "last_played": self.last_played,
+        }
+
     def change_turn(self, who):
 
         self.turn = who
@@ -101,6 +121,26 @@ class FourPlayerCardGameLayout(Layout):
 
         self.update()
 
+    def encode(self, encoder):
+
+        encoder.write_card(self.north_card)
+        encoder.write_card(self.east_card)
+        encoder.write_card(self.south_card)
+        encoder.write_card(self.west_card)
+        encoder.write_index(self.last_played, POSITIONS)
+        encoder.write_index(self.turn, POSITIONS)
+
+    def decode(self, decoder, from_code):
+
+        self.north_card = decoder.read_card(from_code)
+        self.east_card = decoder.read_card(from_code)
+        self.south_card = decoder.read_card(from_code)
+        self.west_card = decoder.read_card(from_code)
+        self.last_played = decoder.read_index(POSITIONS)
+
+        # change_turn() sets the pointer and redraws the table.
+        self.change_turn(decoder.read_index(POSITIONS))
+
     def resize(self):
 
         # Cannot be resized.
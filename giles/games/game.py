@@ -14,9 +14,94 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.games.codec import CodecError, Decoder, Encoder
+from giles.journal import AbsentPlayer
 from giles.state import State
 from giles.utils import rgetattr
 
+import random
+import time
+
+# The GMCP package game state is published under.
+GMCP_PACKAGE = "Giles.Game"
+
+# Every snapshot starts with this and the version of the snapshot format
+# itself; each game versions its own part separately.
+SNAPSHOT_MAGIC = "GS"
+SNAPSHOT_FORMAT = 1
+
+class TableRandom(random.Random):
+    """A table's own random number generator.  The game master hands it a
+    seed from the journal before the table is made and before every command
+    and tick, and it is only actually seeded the first time it's drawn on,
+    so a tick that doesn't use it costs nothing and seed_used() can tell
+    whether its seed needs journaling.
+    """
+
+    def __init__(self):
+
+        random.Random.__init__(self)
+        self.pending_seed = None
+
+    def set_seed(self, seed):
+        self.pending_seed = seed
+
+    def seed_used(self):
+
+        # Whether the last seed handed over was drawn on; it's dropped if
+        # it wasn't.
+        used = self.pending_seed is None
+        self.pending_seed = None
+        return used
+
+    def take_seed(self):
+
+        seed = self.pending_seed
+        self.pending_seed = None
+        self.seed(seed)
+
+    # Everything else the generator does goes through these two.
+    def random(self):
+
+        if self.pending_seed is not None:
+            self.take_seed()
+        return random.Random.random(self)
+
+    def getrandbits(self, k):
+
+        if self.pending_seed is not None:
+            self.take_seed()
+        return random.Random.getrandbits(self, k)
+
+def get_state_changes(old_state, new_state):
+
+    # Returns a dictionary of the keys whose values differ between two
+    # game states, with None for any that went away.  A board that keeps
+    # its shape is sent as a list of changed [row, col, cell] triples in
+    # "board_cells" rather than again in full.
+    changes = {}
+    for key in new_state:
+        if key not in old_state or old_state[key] != new_state[key]:
+            changes[key] = new_state[key]
+    for key in old_state:
+        if key not in new_state:
+            changes[key] = None
+
+    old_board = old_state.get("board")
+    new_board = changes.get("board")
+    if (isinstance(old_board, list) and isinstance(new_board, list) and
+       [len(x) for x in old_board] == [len(x) for x in new_board]):
+        cells = []
+        for r, row in enumerate(new_board):
+            if row != old_board[r]:
+                for c, cell in enumerate(row):
+                    if cell != old_board[r][c]:
+                        cells.append([r, c, cell])
+        del changes["board"]
+        changes["board_cells"] = cells
+
+    return changes
+
 class Game(object):
     """The base Game class.  Does a lot of the boring footwork that all
     games need to handle: adding players, generating the chat channel for
@@ -42,6 +127,12 @@ class Game(object):
         self.active = False
         self.private = False
 
+        # Games draw their random numbers from this, never the random
+        # module, so that replaying a table from the journal deals the same
+        # cards.
+        self.random = TableRandom()
+        self.random.set_seed(server.game_master.table_seed)
+
         self.state = State("config")
         self.prefix = "(^RGame^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
@@ -50,6 +141,20 @@ class Game(object):
         # done debugging them.
         self.debug = False
 
+        # What GMCP subscribers last saw of the game, and who saw it.
+        self.gmcp_state = None
+        self.gmcp_synced = set()
+        self.gmcp_private = {}
+
+        # Bump this in your subclass whenever its encode_state() changes,
+        # so that older snapshots are refused rather than misread.
+        self.snapshot_version = 1
+
+        # For the results store: when the table was created, and how many
+        # moves have been made at it, which the game master counts.
+        self.created = time.time()
+        self.move_count = 0
+
     def __repr__(self):
         return ("%s (%s)" % (self.table_display_name, self.game_display_name))
 
@@ -95,6 +200,122 @@ class Game(object):
         # This function should /absolutely/ be overridden by any games.
         self.tell_pre(player, "This is the default game class; nothing to show.\n")
 
+    def get_gmcp_state(self):
+
+        # Returns the public state of the game as plain values, for clients
+        # that take it over GMCP rather than reading the board.  Games can
+        # extend this; a layout or goban with a get_state() supplies the
+        # board.
+        state = {
+            "table": self.table_display_name,
+            "game": self.game_name,
+            "state": self.state.get(),
+        }
+        board = getattr(self, "layout", None) or getattr(self, "goban", None)
+        if board and hasattr(board, "get_state"):
+            state["board"] = board.get_state()
+        return state
+
+    def get_gmcp_private_state(self, player):
+
+        # Override this function to send a player what only they should
+        # see, such as their hand and the moves open to them.
+        return None
+
+    def publish_gmcp_state(self):
+
+        # Sends GMCP subscribers watching the table whatever changed since
+        # they last heard: the full state for anyone new, just the changes
+        # for everyone else, and their private state when it changes.  The
+        # game master calls this after every command and tick, so games
+        # don't need to.
+        listeners = [x for x in self.channel.listeners
+                     if x.wants_gmcp(GMCP_PACKAGE)]
+        if not listeners:
+            self.gmcp_state = None
+            self.gmcp_synced = set()
+            self.gmcp_private = {}
+            return
+
+        state = self.get_gmcp_state()
+        changes = None
+        if self.gmcp_state is not None:
+            changes = get_state_changes(self.gmcp_state, state)
+            if changes:
+                changes["table"] = state["table"]
+
+        private = {}
+        for player in listeners:
+            if changes is not None and player in self.gmcp_synced:
+                if changes:
+                    player.send_gmcp(GMCP_PACKAGE + ".Update", changes)
+            else:
+                player.send_gmcp(GMCP_PACKAGE + ".State", state)
+
+            private[player] = self.get_gmcp_private_state(player)
+            if (private[player] is not None and
+               private[player] != self.gmcp_private.get(player)):
+                player.send_gmcp(GMCP_PACKAGE + ".Private",
+                                 dict(private[player], table=state["table"]))
+
+        self.gmcp_state = state
+        self.gmcp_synced = set(listeners)
+        self.gmcp_private = private
+
+    def snapshot(self):
+        """Return the state of the game as a compact string of bytes.
+
+        restore() on a freshly created table of the same game brings it
+        back.  Players aren't part of the state; seats come back holding
+        absent players, who are swapped out by reseat_player().
+        """
+
+        encoder = Encoder()
+        encoder.write_str(SNAPSHOT_MAGIC)
+        encoder.write_varint(SNAPSHOT_FORMAT)
+        encoder.write_str(self.game_name)
+        encoder.write_varint(self.snapshot_version)
+        self.encode_state(encoder)
+        return encoder.get_bytes()
+
+    def restore(self, data):
+        """Load state returned by snapshot() into this table, which should
+        be freshly created.  Raises CodecError if the snapshot is damaged
+        or belongs to another game or version of this one.
+        """
+
+        decoder = Decoder(data)
+        if (decoder.read_str() != SNAPSHOT_MAGIC or
+           decoder.read_varint() != SNAPSHOT_FORMAT):
+            raise CodecError("Not a game snapshot.")
+        game_name = decoder.read_str()
+        if game_name != self.game_name:
+            raise CodecError("Snapshot is of %s, not %s." % (game_name, self.game_name))
+        version = decoder.read_varint()
+        if version != self.snapshot_version:
+            raise CodecError("Snapshot is version %d, not %d." % (version, self.snapshot_version))
+        self.decode_state(decoder)
+        decoder.finish()
+
+    def encode_state(self, encoder):
+
+        # Override this function to write your game's state with the
+        # encoder, calling this version first.  Write plain values (the
+        # configuration, the board cells, cards, whose turn it is) rather
+        # than the structures derived from them; decode_state() should read
+        # them back in the same order and rebuild the rest.
+        encoder.write_str(self.state.get())
+        encoder.write_bool(self.private)
+        encoder.write_bool(self.active)
+
+    def decode_state(self, decoder):
+
+        self.state.set(decoder.read_str())
+        self.private = decoder.read_bool()
+        self.active = decoder.read_bool()
+        if self.state.get() == "finished":
+            self.channel.persistent = False
+
     def show_config(self, player):
 
         if getattr(self, "config_params", None):
@@ -145,6 +366,22 @@ class Game(object):
         # may or may not have useful implementations extant.
         pass
 
+    def reseat_player(self, player, notify=True):
+        """Put a returning player back in place of their stand-in.
+
+        Tables rebuilt from the journal after a crash have absent players
+        wherever the real ones were; when a player logs back in, this is
+        called on every table so it can swap them back in by name.  With
+        notify off, as when a server upgrade is being kept invisible, the
+        player isn't told.
+        """
+
+        for index, listener in enumerate(self.channel.listeners):
+            if isinstance(listener, AbsentPlayer) and listener.name == player.name:
+                self.channel.listeners[index] = player
+                if notify:
+                    self.tell_pre(player, "You have been returned to this table.\n")
+
     def handle_common_commands(self, player, command_str):
 
         # This handles certain command bits common to all games.
@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from bitstring.bitstring import Bits
+from giles.games.codec import CodecError, pack_cells
 import copy
 
 WHITE = "white"
@@ -26,16 +26,21 @@ MAX_SIZE = 26
 # Deltas for a square grid.  Pretty easy.
 SQUARE_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
-# Bitstring values for None, Black, and White.
-NONE_BITS = "00"
-BLACK_BITS = "01"
-WHITE_BITS = "10"
+# Point values for None, Black, and White, packed two bits to a point.
+POINTS = (None, BLACK, WHITE)
+POINT_BITS = 2
 
-from giles.utils import LETTERS
+# Characters for each point in get_state().
+STATE_CHARS = {None: ".", BLACK: "x", WHITE: "o"}
+
+from giles.utils import get_snapshot, LETTERS
 
 class Goban(object):
     """A Goban (Go board) implementation, meant for use by various games
     that use Go's rules of capture.
+
+    get_snapshot(True) gives a compact board without the frame, footer, or
+    spacing between points, drawn only when someone asks for it.
     """
 
     def __init__(self):
@@ -44,6 +49,12 @@ class Goban(object):
         self.height = 19
         self.board = None
         self.printable_board = None
+        self.snapshot = None
+        self.dirty_rows = set()
+        self.drawn_last = None
+        self.compact_board = None
+        self.compact_snapshot = None
+        self.compact_dirty_rows = set()
 
         self.last_row = None
         self.last_col = None
@@ -58,32 +69,105 @@ class Goban(object):
         self.board = []
         for r in range(self.height):
             self.board.append([None] * self.width)
+        self.dirty_rows = set(range(self.height))
 
         # Update the printable version.
         self.update_printable_board()
 
+    def get_printable_row(self, r):
+
+        cells = ["%2d ^m|^~ " % (r + 1)]
+        for c in range(self.width):
+            if r == self.last_row and c == self.last_col:
+                cells.append("^5")
+            loc = self.board[r][c]
+            if loc == WHITE:
+                cells.append("^Wo^~ ")
+            elif loc == BLACK:
+                cells.append("^Kx^~ ")
+            else:
+                cells.append("^M.^~ ")
+        cells.append("^m|^~ %d\n" % (r + 1))
+        return "".join(cells)
+
+    def get_compact_row(self, r):
+
+        cells = ["%2d " % (r + 1)]
+        for c in range(self.width):
+            if r == self.last_row and c == self.last_col:
+                cells.append("^5")
+            loc = self.board[r][c]
+            if loc == WHITE:
+                cells.append("^Wo^~")
+            elif loc == BLACK:
+                cells.append("^Kx^~")
+            else:
+                cells.append("^M.^~")
+        cells.append("\n")
+        return "".join(cells)
+
     def update_printable_board(self):
 
-        self.printable_board = []
-        col_str = "    " + "".join([" " + LETTERS[i] for i in range(self.width)])
-        self.printable_board.append(col_str + "\n")
-        self.printable_board.append("   ^m.=" + "".join(["=="] * self.width) + ".^~\n")
-        for r in range(self.height):
-            this_str = "%2d ^m|^~ " % (r + 1)
-            for c in range(self.width):
-                if r == self.last_row and c == self.last_col:
-                    this_str += "^5"
-                loc = self.board[r][c]
-                if loc == WHITE:
-                    this_str += "^Wo^~ "
-                elif loc == BLACK:
-                    this_str += "^Kx^~ "
-                else:
-                    this_str += "^M.^~ "
-            this_str += "^m|^~ %d" % (r + 1)
-            self.printable_board.append(this_str + "\n")
-        self.printable_board.append("   ^m`=" + "".join(["=="] * self.width) + "'^~\n")
-        self.printable_board.append(col_str + "\n")
+        # If the board has changed shape (or was never drawn), draw all of
+        # it.  Otherwise, only redraw the rows that have changed since last
+        # time, including the ones gaining or losing the last-move marker.
+        if (not self.printable_board or
+           len(self.printable_board) != self.height + 4 or
+           len(self.printable_board[0]) != self.width * 2 + 5):
+            col_str = "    " + "".join([" " + LETTERS[i] for i in range(self.width)])
+            self.printable_board = [col_str + "\n"]
+            self.printable_board.append("   ^m.=" + "".join(["=="] * self.width) + ".^~\n")
+            self.printable_board.extend([None] * self.height)
+            self.printable_board.append("   ^m`=" + "".join(["=="] * self.width) + "'^~\n")
+            self.printable_board.append(col_str + "\n")
+            self.dirty_rows = set(range(self.height))
+            self.compact_board = None
+
+        if self.drawn_last != (self.last_row, self.last_col):
+            if self.drawn_last:
+                self.dirty_rows.add(self.drawn_last[0])
+            self.dirty_rows.add(self.last_row)
+            self.drawn_last = (self.last_row, self.last_col)
+
+        for r in self.dirty_rows:
+            if r is not None and r >= 0 and r < self.height:
+                self.printable_board[r + 2] = self.get_printable_row(r)
+        self.compact_dirty_rows.update(self.dirty_rows)
+        self.dirty_rows = set()
+
+    def update_compact_board(self):
+
+        # Same idea as the printable board, but only called when a player
+        # who wants compact boards is looking.
+        if not self.compact_board:
+            self.compact_board = ["   " + LETTERS[:self.width] + "\n"]
+            self.compact_board.extend([None] * self.height)
+            self.compact_dirty_rows = set(range(self.height))
+
+        for r in self.compact_dirty_rows:
+            if r is not None and r >= 0 and r < self.height:
+                self.compact_board[r + 1] = self.get_compact_row(r)
+        self.compact_dirty_rows = set()
+
+    def get_snapshot(self, compact=False):
+
+        if not self.printable_board:
+            self.update_printable_board()
+        if compact:
+            self.update_compact_board()
+            self.compact_snapshot = get_snapshot(self.compact_snapshot,
+                                                 self.compact_board)
+            return self.compact_snapshot
+        self.snapshot = get_snapshot(self.snapshot, self.printable_board)
+        return self.snapshot
+
+    def get_state(self):
+
+        # One string per row: "x" for black, "o" for white, "." for empty.
+        rows = []
+        for row in self.board:
+            rows.append("".join([STATE_CHARS[x] for x in row]))
+        return rows
 
     def resize(self, width, height):
 
@@ -130,6 +214,7 @@ class Goban(object):
                     self.last_col = dest_c
 
         self.board = new_board
+        self.dirty_rows = set(range(self.height))
         self.update_printable_board()
 
     def is_valid(self, row, col):
@@ -140,19 +225,40 @@ class Goban(object):
 
     def board_to_bits(self, board):
 
-        # This function takes a board and generates a bitstring out of it.
-
-        bit_str = "0b"
+        # This function takes a board and packs it into a string, two bits
+        # to a point, for cheap storage and comparison.
+        cells = []
         for r in range(self.height):
             for c in range(self.width):
-                if board[r][c] == BLACK:
-                    bit_str += BLACK_BITS
-                elif board[r][c] == WHITE:
-                    bit_str += WHITE_BITS
-                else:
-                    bit_str += NONE_BITS
+                cells.append(POINTS.index(board[r][c]))
+
+        return pack_cells(cells, POINT_BITS)
+
+    def encode(self, encoder):
 
-        return Bits(bin=bit_str)
+        # Writes the board, the last move, and the boards seen so far.
+        encoder.write_varint(self.width)
+        encoder.write_varint(self.height)
+        encoder.write_choice_cells([x for row in self.board for x in row], POINTS)
+        encoder.write_optional_int(self.last_row)
+        encoder.write_optional_int(self.last_col)
+        encoder.write_str_list(self.prev_board_list)
+
+    def decode(self, decoder):
+
+        self.width = decoder.read_varint()
+        self.height = decoder.read_varint()
+        cells = decoder.read_choice_cells(POINTS)
+        if len(cells) != self.width * self.height:
+            raise CodecError("Snapshot board is the wrong size.")
+        self.board = []
+        for r in range(self.height):
+            self.board.append(cells[r * self.width:(r + 1) * self.width])
+        self.last_row = decoder.read_optional_int()
+        self.last_col = decoder.read_optional_int()
+        self.prev_board_list = decoder.read_str_list()
+        self.dirty_rows = set(range(self.height))
+        self.update_printable_board()
 
     def move_causes_repeat(self, color, row, col):
 
@@ -219,6 +325,7 @@ class Goban(object):
 
         # Okay, it's an unoccupied space.  Let's place the piece...
         self.board[row][col] = color
+        self.dirty_rows.add(row)
         self.last_row = row
         self.last_col = col
 
@@ -229,7 +336,7 @@ class Goban(object):
         if color_captured:
             for capture_row, capture_col in capture_list:
                 self.board[capture_row][capture_col] = None
-
+                self.dirty_rows.add(capture_row)
 
         # Update the printable board representation...
         self.update_printable_board()
@@ -38,6 +38,9 @@ SQUARE_DELTAS = giles.games.goban.SQUARE_DELTAS
 
 TAGS = ["abstract", "capture", "connection", "square", "2p"]
 
+# Everything the turn and resigner can be, for snapshots.
+SIDES = (None, BLACK, WHITE)
+
 CONFIG_PARAMS = (
     ("goban.height", "Board height"),
     ("goban.width", "Board width"),
@@ -84,10 +87,7 @@ class Gonnect(SeatedGame):
 
     def show(self, player):
 
-        if not self.goban.printable_board:
-            self.goban.update_printable_board()
-        for line in self.goban.printable_board:
-            player.tell_cc(line)
+        player.tell_cc(self.goban)
         player.tell_cc(self.get_supplemental_str())
 
     def send_board(self):
@@ -459,7 +459,30 @@ class Gonnect(SeatedGame):
             self.recurse_adjacencies(color, row + r_delta, col + c_delta,
                test_dir)
 
+    def encode_state(self, encoder):
+
+        super(Gonnect, self).encode_state(encoder)
+        encoder.write_bool(self.directional)
+        self.encode_seats(encoder)
+        encoder.write_index(self.turn, SIDES)
+        encoder.write_index(self.resigner, SIDES)
+        encoder.write_varint(self.turn_number)
+        self.goban.encode(encoder)
+
+    def decode_state(self, decoder):
+
+        # The adjacency map is scratch space for find_winner(), rebuilt
+        # every time it's called, so it isn't kept.
+        super(Gonnect, self).decode_state(decoder)
+        self.directional = decoder.read_bool()
+        self.decode_seats(decoder)
+        self.turn = decoder.read_index(SIDES)
+        self.resigner = decoder.read_index(SIDES)
+        self.turn_number = decoder.read_varint()
+        self.goban.decode(decoder)
+
     def resolve(self, winner):
+        self.set_winners([winner])
         self.send_board()
         self.channel.broadcast_cc(self.prefix + "^C%s^~ wins!\n" % winner)
 
@@ -52,10 +52,7 @@ class Hand(object):
         return self.cards.__iter__()
 
     def __contains__(self, needle):
-        if needle in self.cards:
-            return True
-        else:
-            return False
+        return needle in self.cards
 
     def discard(self, n=-1):
         """Discard from a hand.  By default, discards the top item (item [-1]),
@@ -84,18 +81,19 @@ class Hand(object):
     def discard_specific(self, needle):
         """Used to discard a specific item by example, or None if not found in
         the Hand.  Discard is returned."""
-        if needle in self.cards:
+        try:
             self.cards.remove(needle)
-            return needle
-        else:
+        except ValueError:
             return None
+        return needle
 
-    def discard_random(self):
-        """Discard a random item from the Hand, or None if empty."""
+    def discard_random(self, rng=random):
+        """Discard a random item from the Hand, or None if empty.  Tables
+        should pass in their own random number generator."""
         if len(self.cards) == 0:
             return None
         else:
-            chosen_card = random.choice(self.cards)
+            chosen_card = rng.choice(self.cards)
             return self.discard_specific(chosen_card)
 
     def add(self, c):
@@ -106,8 +104,11 @@ class Hand(object):
             return True
         return False
 
-    def shuffle(self):
-        random.shuffle(self.cards)
+    def shuffle(self, rng=random):
+
+        # Tables should pass in their own random number generator, so that
+        # replays shuffle the same way.
+        rng.shuffle(self.cards)
         return None
 
     def sort(self):
@@ -15,8 +15,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from giles.utils import booleanize
-from giles.utils import demangle_move
+from giles.utils import demangle_move, get_snapshot
 from giles.state import State
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.seat import Seat
 
@@ -38,6 +39,11 @@ BLACK = "black"
 
 COL_CHARACTERS = "abcdefghijklmnopqrstuvwxyz"
 
+# Everything a cell, the turn, or the resigner can be, and the kinds of
+# entries in the move list, for snapshots.
+SIDES = (None, WHITE, BLACK)
+MOVE_KINDS = ("move", "swap", "resign")
+
 TAGS = ["abstract", "connection", "hex", "2p"]
 
 CONFIG_PARAMS = (
@@ -67,6 +73,7 @@ class Hex(SeatedGame):
         self.prefix = "(^RHex^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.hex.hex_bot"
 
         # Hex-specific guff.
         self.seats[0].data.color = WHITE
@@ -75,6 +82,9 @@ class Hex(SeatedGame):
         self.seats[1].data.color_code = "^K"
         self.board = None
         self.printable_board = None
+        self.board_snapshot = None
+        self.compact_board = None
+        self.compact_snapshot = None
         self.size = 14
         self.turn = None
         self.turn_number = 0
@@ -152,6 +162,7 @@ class Hex(SeatedGame):
     def update_printable_board(self):
 
         self.printable_board = []
+        self.compact_board = None
         slash_line = " "
         char_line = ""
         for x in range(self.size):
@@ -180,12 +191,39 @@ class Hex(SeatedGame):
         self.printable_board.append(slash_line + "\n")
         self.printable_board.append(char_line + "\n")
 
+    def update_compact_board(self):
+
+        # The compact board is the same rhombus sheared into a square: no
+        # indentation, no spacing, and just the letters across the top.
+        self.compact_board = ["   " + COL_CHARACTERS[:self.size] + "\n"]
+        for x in range(self.size):
+            msg = "%2d " % (x + 1)
+            for y in range(self.size):
+                piece = self.board[y][x]
+                if y == self.last_x and x == self.last_y:
+                    msg += "^5"
+                if piece == BLACK:
+                    msg += "^Kx^~"
+                elif piece == WHITE:
+                    msg += "^Wo^~"
+                elif y % 2 == 0:
+                    msg += "^m,^~"
+                else:
+                    msg += "^M.^~"
+            self.compact_board.append(msg + "\n")
+
     def print_board(self, player):
 
         if not self.printable_board:
             self.update_printable_board()
-        for line in self.printable_board:
-            player.tell_cc(line)
+        if player.config["compact_board"]:
+            if not self.compact_board:
+                self.update_compact_board()
+            self.compact_snapshot = get_snapshot(self.compact_snapshot, self.compact_board)
+            player.tell_cc(self.compact_snapshot)
+            return
+        self.board_snapshot = get_snapshot(self.board_snapshot, self.printable_board)
+        player.tell_cc(self.board_snapshot)
 
     def get_turn_str(self):
         if self.state.get() == "playing":
@@ -458,5 +496,56 @@ class Hex(SeatedGame):
         for x_delta, y_delta in HEX_DELTAS:
             self.update_adjacency(x + x_delta, y + y_delta, color)
 
+    def encode_state(self, encoder):
+
+        super(Hex, self).encode_state(encoder)
+        encoder.write_varint(self.size)
+        encoder.write_bool(self.is_quickstart)
+        self.encode_seats(encoder)
+        encoder.write_index(self.turn, SIDES)
+        encoder.write_varint(self.turn_number)
+        encoder.write_index(self.resigner, SIDES)
+        encoder.write_optional_int(self.last_x)
+        encoder.write_optional_int(self.last_y)
+        encoder.write_choice_cells([x for column in self.board for x in column], SIDES)
+
+        # The move list holds coordinates for moves, and just the word for
+        # swaps and resignations.
+        encoder.write_varint(len(self.move_list))
+        for move in self.move_list:
+            if isinstance(move, tuple):
+                encoder.write_index("move", MOVE_KINDS)
+                encoder.write_varint(move[0])
+                encoder.write_varint(move[1])
+            else:
+                encoder.write_index(move, MOVE_KINDS)
+
+    def decode_state(self, decoder):
+
+        super(Hex, self).decode_state(decoder)
+        self.size = decoder.read_varint()
+        self.is_quickstart = decoder.read_bool()
+        self.decode_seats(decoder)
+        self.turn = decoder.read_index(SIDES)
+        self.turn_number = decoder.read_varint()
+        self.resigner = decoder.read_index(SIDES)
+        self.last_x = decoder.read_optional_int()
+        self.last_y = decoder.read_optional_int()
+        cells = decoder.read_choice_cells(SIDES)
+        if len(cells) != self.size * self.size:
+            raise CodecError("Snapshot board is the wrong size.")
+        self.board = [cells[x * self.size:(x + 1) * self.size]
+                      for x in range(self.size)]
+
+        self.move_list = []
+        for i in range(decoder.read_varint()):
+            kind = decoder.read_index(MOVE_KINDS)
+            if kind == "move":
+                self.move_list.append((decoder.read_varint(), decoder.read_varint()))
+            else:
+                self.move_list.append(kind)
+        self.update_printable_board()
+
     def resolve(self, winner):
+        self.set_winners([winner])
         self.channel.broadcast_cc(self.prefix + "^C%s^~ wins!\n" % (winner))
@@ -0,0 +1,104 @@
+# Giles: hex_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Hex bot.  Hex can't end in a draw, and filling the rest of the board
+# can't change who has connected their sides, so a playout just fills the
+# board at random and sees who won; Monte Carlo tree search does the rest.
+
+from giles.games.hex.hex import COL_CHARACTERS, HEX_DELTAS, WHITE, BLACK
+from giles.games.search import monte_carlo
+
+import random
+
+# Cells are 0 for empty, or the side's number; the board is flattened so
+# that (x, y) is x * size + y.
+SIDE_NUMBERS = {None: 0, WHITE: 1, BLACK: 2}
+
+_NEIGHBOR_CACHE = {}
+
+def get_neighbors(size):
+
+    if size in _NEIGHBOR_CACHE:
+        return _NEIGHBOR_CACHE[size]
+
+    neighbors = []
+    for x in range(size):
+        for y in range(size):
+            neighbors.append([(x + x_d) * size + y + y_d
+                              for x_d, y_d in HEX_DELTAS
+                              if 0 <= x + x_d < size and 0 <= y + y_d < size])
+    _NEIGHBOR_CACHE[size] = neighbors
+    return neighbors
+
+def get_position(table, seat):
+
+    if table.state.get() != "playing" or table.turn != seat.data.color:
+        return None
+    cells = tuple(SIDE_NUMBERS[x] for column in table.board for x in column)
+    return (table.size, cells, SIDE_NUMBERS[table.turn])
+
+def get_winner(size, cells):
+
+    # On a full board, White has won if their stones join x = 0 to
+    # x = size - 1, and Black has won otherwise.
+    neighbors = get_neighbors(size)
+    seen = set()
+    stack = [y for y in range(size) if cells[y] == 1]
+    goal = (size - 1) * size
+    while stack:
+        index = stack.pop()
+        if index in seen:
+            continue
+        seen.add(index)
+        if index >= goal:
+            return 1
+        stack.extend(x for x in neighbors[index] if cells[x] == 1)
+    return 2
+
+def choose_move(position, should_stop):
+
+    size, cells, mover = position
+
+    def get_mover(state):
+        return state[1]
+
+    def get_moves(state):
+        return [i for i, x in enumerate(state[0]) if not x]
+
+    def play(state, move):
+        new_cells = list(state[0])
+        new_cells[move] = state[1]
+        return (new_cells, 3 - state[1])
+
+    def playout(state):
+        new_cells = list(state[0])
+        empty = [i for i, x in enumerate(new_cells) if not x]
+        random.shuffle(empty)
+        side = state[1]
+        for index in empty:
+            new_cells[index] = side
+            side = 3 - side
+        return get_winner(size, new_cells)
+
+    root = monte_carlo((cells, mover), get_mover, get_moves, play, playout,
+                       should_stop)
+    best = root.get_best_child()
+    if best:
+        move = best.move
+    else:
+        move = random.choice(get_moves((cells, mover)))
+    x, y = divmod(move, size)
+    return "move %s%d" % (COL_CHARACTERS[x], y + 1)
@@ -16,18 +16,21 @@
 
 from giles.games.four_player_card_game_layout import FourPlayerCardGameLayout, NORTH, SOUTH, EAST, WEST
 from giles.games.three_player_card_game_layout import ThreePlayerCardGameLayout
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.hand import Hand
-from giles.games.playing_card import PlayingCard, new_deck, str_to_card, card_to_str, hand_to_str, SHORT, LONG, CLUBS, DIAMONDS, HEARTS, SPADES, JACK, QUEEN, KING, ACE
+from giles.games.playing_card import PlayingCardHand, cards_to_hand, code_to_card, get_card, new_deck, str_to_card, card_to_str, hand_to_str, SHORT, LONG, CLUBS, DIAMONDS, HEARTS, SPADES, SUITS, JACK, QUEEN, KING, ACE
 from giles.games.seat import Seat
-from giles.games.trick import handle_trick, hand_has_suit, sorted_hand
+from giles.games.trick import handle_trick, sorted_hand
 from giles.state import State
 from giles.utils import Struct, booleanize, get_plural_str
 
-import random
 
 TAGS = ["card", "partnership", "random", "trick", "trump", "3p", "4p"]
 
+# Trumps and the led suit are one of the suits or unset, for snapshots.
+SUIT_CHOICES = [None] + SUITS
+
 CONFIG_PARAMS = (
     ("mode", "Player count"),
     ("short", "Use a short deck (3p only)?"),
@@ -53,6 +56,8 @@ class Hokm(SeatedGame):
         self.prefix = "(^RHokm^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.hokm.hokm_bot"
+        self.snapshot_version = 2
 
         # Hokm-specific stuff.
         self.goal = 7
@@ -142,7 +147,7 @@ class Hokm(SeatedGame):
 
     def display(self, player):
 
-        player.tell_cc("%s" % self.layout)
+        player.tell_cc(self.layout)
 
     def get_color_code(self, seat):
         if self.mode == 4:
@@ -189,6 +194,26 @@ class Hokm(SeatedGame):
 
         return to_return
 
+    def get_gmcp_state(self):
+
+        # Three-player games keep scores on the seats; four-player games
+        # keep them on the partnerships.
+        state = super(Hokm, self).get_gmcp_state()
+        if self.mode == 4:
+            state["scores"] = {"North/South": self.ns.score,
+                               "East/West": self.ew.score}
+        state["trump"] = self.trump_suit
+        return state
+
+    def get_gmcp_private_state(self, player):
+
+        # Seated players get their hand, and their legal plays on their turn.
+        seat = self.get_seat_of_player(player)
+        if not seat or getattr(seat.data, "hand", None) is None:
+            return None
+        may_play = self.state.get() == "playing" and seat == self.turn
+        return seat.data.hand.get_state(self.led_suit, may_play)
+
     def show(self, player):
         self.display(player)
         player.tell_cc(self.get_metadata())
@@ -279,11 +304,11 @@ class Hokm(SeatedGame):
             self.deck = Hand()
             for suit in (CLUBS, DIAMONDS, HEARTS, SPADES):
                 for rank in full_ranks:
-                    self.deck.add(PlayingCard(rank, suit))
+                    self.deck.add(get_card(rank, suit))
 
             # We only want three of the short rank.  No hearts, because.
             for suit in (CLUBS, DIAMONDS, SPADES):
-                self.deck.add(PlayingCard(short_rank, suit))
+                self.deck.add(get_card(short_rank, suit))
 
     def start_deal(self):
 
@@ -300,12 +325,13 @@ class Hokm(SeatedGame):
 
         self.bc_pre("^R%s^~ (%s%s^~) gives the cards a good shuffle...\n" % (dealer_name, self.get_color_code(self.dealer), self.dealer))
         self.new_deck()
-        self.deck.shuffle()
+        self.deck.shuffle(self.random)
 
         # Deal out five cards each.
         self.bc_pre("^R%s^~ deals five cards out to each of the players.\n" % dealer_name)
         for seat in self.seats:
-            seat.data.hand = Hand()
+            seat.data.hand = PlayingCardHand()
+            seat.data.voids = []
         for i in range(5):
             for seat in self.seats:
                 seat.data.hand.add(self.deck.discard())
@@ -394,12 +420,16 @@ class Hokm(SeatedGame):
 
             this_suit = potential_card.suit
             if (this_suit != self.led_suit and
-               hand_has_suit(seat.data.hand, self.led_suit)):
+               seat.data.hand.has_suit(self.led_suit)):
 
                 # You can't play off-suit if you can match the led suit.
                 self.tell_pre(player, "You can't throw off; you have the led suit.\n")
                 return False
 
+            # Note the void; the bots won't deal this seat that suit.
+            if this_suit != self.led_suit and self.led_suit not in seat.data.voids:
+                seat.data.voids.append(self.led_suit)
+
         else:
 
             # No led suit; they're the leader.
@@ -430,7 +460,7 @@ class Hokm(SeatedGame):
             self.clear_trick()
 
             # Pick a hakem at random.
-            self.hakem = random.choice(self.seats)
+            self.hakem = self.random.choice(self.seats)
             self.bc_pre("Fate has spoken, and the starting hakem is %s!\n" % self.get_sp_str(self.hakem))
 
             # The dealer is always the player before the hakem.
@@ -756,11 +786,93 @@ class Hokm(SeatedGame):
 
         if self.mode == 4:
             if self.ns == winner:
-                name_one = self.seats[0].player_name
-                name_two = self.seats[2].player_name
+                seat_one, seat_two = self.seats[0], self.seats[2]
             else:
-                name_one = self.seats[1].player_name
-                name_two = self.seats[3].player_name
+                seat_one, seat_two = self.seats[1], self.seats[3]
+            self.set_winners([seat_one, seat_two])
+            name_one = seat_one.player_name
+            name_two = seat_two.player_name
             self.bc_pre("^G%s^~ and ^G%s^~ win!\n" % (name_one, name_two))
         else:
+            self.set_winners([winner])
             self.bc_pre("^G%s^~ wins!\n" % winner.player_name)
+
+    def get_rating_sides(self):
+
+        if self.mode == 4:
+            return [[self.seats[0], self.seats[2]], [self.seats[1], self.seats[3]]]
+        return super(Hokm, self).get_rating_sides()
+
+    def encode_state(self, encoder):
+
+        super(Hokm, self).encode_state(encoder)
+
+        # The mode decides the seats, so it has to come first.
+        encoder.write_varint(self.mode)
+        encoder.write_bool(self.short)
+        encoder.write_varint(self.goal)
+        self.encode_seats(encoder)
+        if self.mode == 4:
+            scorers = [self.ns, self.ew]
+        else:
+            scorers = [x.data for x in self.seats]
+        for scorer in scorers:
+            encoder.write_varint(scorer.score)
+
+        # Nothing else exists until the first deal.
+        dealt = self.dealer is not None
+        encoder.write_bool(dealt)
+        if dealt:
+            seats = [None] + self.seats
+            for scorer in scorers:
+                encoder.write_varint(scorer.tricks)
+            encoder.write_index(self.trump_suit, SUIT_CHOICES)
+            encoder.write_index(self.led_suit, SUIT_CHOICES)
+            encoder.write_index(self.turn, seats)
+            encoder.write_index(self.dealer, seats)
+            encoder.write_index(self.hakem, seats)
+            for seat in self.seats:
+                encoder.write_cards(seat.data.hand)
+                encoder.write_card(seat.data.card)
+                encoder.write_str_list(seat.data.voids)
+            encoder.write_cards(self.trick)
+            encoder.write_cards(self.deck)
+        self.layout.encode(encoder)
+
+    def decode_state(self, decoder):
+
+        super(Hokm, self).decode_state(decoder)
+        self.mode = decoder.read_varint()
+        if self.mode not in (3, 4):
+            raise CodecError("Invalid Hokm mode %d." % self.mode)
+        self.short = decoder.read_bool()
+        self.goal = decoder.read_varint()
+        self.setup_mode()
+        self.decode_seats(decoder)
+        if self.mode == 4:
+            scorers = [self.ns, self.ew]
+        else:
+            scorers = [x.data for x in self.seats]
+        for scorer in scorers:
+            scorer.score = decoder.read_varint()
+
+        if decoder.read_bool():
+            seats = [None] + self.seats
+            for scorer in scorers:
+                scorer.tricks = decoder.read_varint()
+            self.trump_suit = decoder.read_index(SUIT_CHOICES)
+            self.led_suit = decoder.read_index(SUIT_CHOICES)
+            self.turn = decoder.read_index(seats)
+            self.dealer = decoder.read_index(seats)
+            self.hakem = decoder.read_index(seats)
+            for seat in self.seats:
+                seat.data.hand = cards_to_hand(decoder.read_cards(code_to_card))
+                seat.data.card = decoder.read_card(code_to_card)
+                seat.data.voids = decoder.read_str_list()
+            self.trick = Hand()
+            for card in decoder.read_cards(code_to_card):
+                self.trick.add(card)
+            self.deck = Hand()
+            for card in decoder.read_cards(code_to_card):
+                self.deck.add(card)
+        self.layout.decode(decoder, code_to_card)
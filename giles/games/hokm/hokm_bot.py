@@ -0,0 +1,116 @@
+# Giles: hokm_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Hokm bot.  It plays by determinized Monte Carlo search, and as hakem
+# picks trumps the same way: the rest of the deal is dealt out at random
+# over and over, played out under each suit in turn, and the suit that
+# does best is the one it calls.  A hand is over as soon as it's decided,
+# and is worth the points it scores, for or against the bot's side.
+
+from giles.games.playing_card import SUITS
+from giles.games.trick_search import choose_card, get_deal, index_to_str, play_out, sample_deals
+
+# In the four-player game, North and South play West and East; in the
+# three-player game, everyone is on their own.
+TEAMS = {4: (0, 1, 0, 1), 3: (0, 1, 2)}
+
+def get_position(table, seat):
+
+    state = table.state.get()
+    if state not in ("choosing", "playing") or table.turn != seat:
+        return None
+
+    # The four-player table counts tricks by side; those are as good as
+    # by seat here, as long as the sides come first.
+    if table.mode == 4:
+        tricks = (table.ns.tricks, table.ew.tricks, 0, 0)
+    else:
+        tricks = tuple(x.data.tricks for x in table.seats)
+    hakem = table.seats.index(table.hakem)
+    if state == "choosing":
+        deal = get_deal(table, seat, table.deck)
+    else:
+        deal = get_deal(table, seat)
+    return (state, deal, tricks, hakem)
+
+def get_hand_winner(tricks, tricks_left):
+
+    # The same tests as the table's, returning the winning team.
+    if len(tricks) == 4:
+        for side in (0, 1):
+            if tricks[side] + tricks[side + 2] > 6:
+                return side
+        return None
+
+    for seat in range(3):
+        our_tricks = tricks[seat]
+        prev_tricks = tricks[seat - 1]
+        next_tricks = tricks[(seat + 1) % 3]
+        if (our_tricks > prev_tricks + tricks_left and
+           our_tricks > next_tricks + tricks_left):
+            return seat
+        if not tricks_left and prev_tricks == next_tricks:
+            return seat
+        if our_tricks == 7 and not prev_tricks and not next_tricks:
+            return seat
+    return None
+
+def is_over(tricks, tricks_left):
+    return get_hand_winner(tricks, tricks_left) is not None
+
+def choose_move(position, should_stop):
+
+    state, deal, tricks, hakem = position
+    teams = TEAMS[len(tricks)]
+    team = teams[deal[0]]
+
+    def score(sim_tricks):
+
+        winner = get_hand_winner(sim_tricks, 0)
+        if winner is None:
+            return 0
+
+        # A sweep is worth two to the hakem's side and three to anyone
+        # else; any other win, one.
+        if any(sim_tricks[x] for x in range(len(sim_tricks))
+               if teams[x] != winner):
+            points = 1
+        elif winner == teams[hakem]:
+            points = 2
+        else:
+            points = 3
+        if winner == team:
+            return points
+        return -points
+
+    if state == "playing":
+        card = choose_card(deal, tricks, teams, score, is_over, should_stop)
+        return "play %s" % index_to_str(card)
+
+    # Choosing trumps.  Every suit is tried on the same deals, with the
+    # hakem leading, as they will.
+    me = deal[0]
+    totals = [0.0] * len(SUITS)
+    hands = list(deal[1])
+    sim_tricks = list(tricks)
+    for dealt in sample_deals(deal, should_stop):
+        for trump in range(len(SUITS)):
+            hands[:] = dealt
+            sim_tricks[:] = tricks
+            play_out(hands, sim_tricks, teams, trump, is_over, me, None, None,
+                     None, 0)
+            totals[trump] += score(sim_tricks)
+    return "choose %s" % SUITS[totals.index(max(totals))].lower()
@@ -14,6 +14,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.utils import get_snapshot
+
 class Layout(object):
     """A layout for a game.  For a board game, this would be the board and
     representations of the pieces on that board; for a card game, this
@@ -30,11 +32,20 @@ class Layout(object):
     gathered via get() or __str__(), it will simply spit out the saved
     representation.  If you muck with a layout in other ways, be forewarned
     that the internal strings will need to be updated as well.
+
+    get_snapshot() wraps the current representation in a Snapshot, which
+    is reused until the representation changes; tell_cc() accepts layouts
+    directly and sends that snapshot.  Layouts can also offer a compact
+    representation for players who have asked for low-bandwidth boards;
+    get_snapshot(True) sends that instead.
     """
 
     def __init__(self):
 
         self.representation = ""
+        self.compact_representation = None
+        self.snapshot = None
+        self.compact_snapshot = None
 
     def __repr__(self):
 
@@ -48,10 +59,36 @@ class Layout(object):
 
         return self.__repr__()
 
+    def get_compact(self):
+
+        # Override this function if the compact representation is built
+        # on demand rather than by update().  Layouts without a compact
+        # representation just use the full one.
+        if self.compact_representation is None:
+            return self.representation
+        return self.compact_representation
+
+    def get_snapshot(self, compact=False):
+
+        if compact:
+            self.compact_snapshot = get_snapshot(self.compact_snapshot,
+                                                 [self.get_compact()])
+            return self.compact_snapshot
+        self.snapshot = get_snapshot(self.snapshot, [self.representation])
+        return self.snapshot
+
+    def get_state(self):
+
+        # Override this function to describe the layout as plain values
+        # (lists, dictionaries, strings, and numbers) for clients that
+        # take game state over GMCP.
+        return None
+
     def update(self):
 
         # Override this function with the bits that actually generate the
-        # internal representation based on the current state.
+        # internal representation based on the current state, and the
+        # compact representation too if the layout has one.
 
         self.representation = "I have been updated.\n"
 
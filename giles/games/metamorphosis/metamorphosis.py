@@ -14,11 +14,12 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.seat import Seat
 from giles.state import State
 from giles.utils import booleanize
-from giles.utils import demangle_move
+from giles.utils import demangle_move, get_snapshot
 
 # Some useful default values.
 MIN_SIZE = 4
@@ -29,6 +30,9 @@ WHITE = "white"
 
 COLS = "abcdefghijklmnopqrstuvwxyz"
 
+# Everything a location, the turn, or the resigner can be, for snapshots.
+SIDES = (None, BLACK, WHITE)
+
 # Adjacency in Metamorphosis is strictly orthogonal.
 CONNECTION_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
@@ -65,6 +69,7 @@ class Metamorphosis(SeatedGame):
         # Metamorphosis-specific stuff.
         self.board = None
         self.printable_board = None
+        self.board_snapshot = None
         self.size = 12
         self.ko_fight = True
         self.group_count = None
@@ -133,8 +138,8 @@ class Metamorphosis(SeatedGame):
 
         if not self.printable_board:
             self.update_printable_board()
-        for line in self.printable_board:
-            player.tell_cc(line)
+        self.board_snapshot = get_snapshot(self.board_snapshot, self.printable_board)
+        player.tell_cc(self.board_snapshot)
         player.tell_cc(self.get_turn_str() + "\n")
 
     def send_board(self):
@@ -571,7 +576,45 @@ class Metamorphosis(SeatedGame):
         for r_delta, c_delta in CONNECTION_DELTAS:
             self.recurse_adjacency(color, row + r_delta, col + c_delta)
 
+    def encode_state(self, encoder):
+
+        super(Metamorphosis, self).encode_state(encoder)
+        encoder.write_varint(self.size)
+        encoder.write_bool(self.ko_fight)
+        self.encode_seats(encoder)
+        for seat in self.seats:
+            encoder.write_bool(seat.data.last_was_ko)
+        encoder.write_index(self.turn, SIDES)
+        encoder.write_varint(self.turn_number)
+        encoder.write_index(self.resigner, SIDES)
+        encoder.write_optional_int(self.last_r)
+        encoder.write_optional_int(self.last_c)
+        encoder.write_varint(self.group_count)
+        encoder.write_choice_cells([x for row in self.board for x in row], SIDES)
+
+    def decode_state(self, decoder):
+
+        super(Metamorphosis, self).decode_state(decoder)
+        self.size = decoder.read_varint()
+        self.ko_fight = decoder.read_bool()
+        self.decode_seats(decoder)
+        for seat in self.seats:
+            seat.data.last_was_ko = decoder.read_bool()
+        self.turn = decoder.read_index(SIDES)
+        self.turn_number = decoder.read_varint()
+        self.resigner = decoder.read_index(SIDES)
+        self.last_r = decoder.read_optional_int()
+        self.last_c = decoder.read_optional_int()
+        self.group_count = decoder.read_varint()
+        cells = decoder.read_choice_cells(SIDES)
+        if len(cells) != self.size * self.size:
+            raise CodecError("Snapshot board is the wrong size.")
+        self.board = [cells[r * self.size:(r + 1) * self.size]
+                      for r in range(self.size)]
+        self.update_printable_board()
+
     def resolve(self, winner):
+        self.set_winners([winner])
         self.send_board()
         self.channel.broadcast_cc(self.prefix + "^C%s^~ wins!\n" % winner)
 
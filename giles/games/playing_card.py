@@ -14,10 +14,10 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from random import choice
-
 from giles.games.hand import Hand
 
+import random
+
 ACE = "Ace"
 JACK = "Jack"
 QUEEN = "Queen"
@@ -35,10 +35,42 @@ RED = "Red"
 
 RANKS = [ACE, '2', '3', '4', '5', '6', '7', '8', '9', '10', JACK, QUEEN, KING]
 SUITS = [CLUBS, DIAMONDS, HEARTS, SPADES]
+JOKER_SUITS = [BLACK, RED]
 
 SHORT = "short"
 LONG = "long"
 
+# Values for the face cards; the numbered ranks are simply their own value.
+# Aces are handled separately, as they can be either high or low.
+FACE_VALUES = {JACK: 11, QUEEN: 12, KING: 13}
+
+def rank_value(r, ace_high=True):
+
+    # Returns the numeric value of a rank, or None if it doesn't have one
+    # (jokers, or ranks we don't know about).
+    if r is None or r == JOKER:
+        return None
+    if type(r) == int:
+        return r
+    if r.isdigit():
+        return int(r)
+    if r == ACE:
+        if ace_high:
+            return 14
+        return 1
+    return FACE_VALUES.get(r)
+
+def short_rank_str(value, r):
+
+    # Returns the single-character rank used when printing short cards.
+    if value in range(2, 10):
+        return str(value)
+    elif value == 10:
+        return "t"
+    elif value:
+        return "%s" % r[0].lower()
+    return "?"
+
 class PlayingCard(object):
     """PlayingCard is an implementation of a traditional 52-card deck of playing
     cards.
@@ -52,14 +84,28 @@ class PlayingCard(object):
     is not a bug; it allows for simple constructions such as "if mycard in
     myhand" without having to go through absurd gymnastics.
 
+    Cards never change once created, so the value, the integer code (0-51
+    for the standard deck, 52 and 53 for the jokers) and the short string
+    are all worked out once, up front.  The standard cards are interned;
+    use get_card() rather than building new ones so that every Ace of
+    Spades in play is the same object.
+
     Methods of note are:  __repr__(), value(), and all ordinal comparisons, e.g.
     __lt__().
     """
 
+    __slots__ = ("rank", "suit", "ace_high", "val", "code", "short_str")
+
     def __init__(self, r=None, s=None, ace_high=True):
         self.rank = r
         self.suit = s
         self.ace_high = ace_high
+        self.val = rank_value(r, ace_high)
+        self.code = card_code(r, s)
+        if s:
+            self.short_str = "%s%s" % (short_rank_str(self.val, r), s[0].upper())
+        else:
+            self.short_str = "  "
 
     def __repr__(self):
         if self.rank == JOKER:
@@ -68,66 +114,221 @@ class PlayingCard(object):
             return ("the %s of %s" % (self.rank, self.suit))
 
     def __lt__(self, other):
-        if not (self.value() or other.value()):
+        if not (self.val or other.val):
             return NotImplemented
         else:
-            return self.value() < other.value()
+            return self.val < other.val
 
     def __le__(self, other):
-        if not (self.value() or other.value()):
+        if not (self.val or other.val):
             return NotImplemented
         else:
-            return self.value() <= other.value()
+            return self.val <= other.val
 
     def __eq__(self, other):
-        if not (self.value() or other.value()):
+        if self is other:
+            return True
+        if not (self.val or other.val):
             return NotImplemented
         else:
             # okay, so here's an interesting edge case.  Cards of differing
             # ranks of course can be compared.  however, the Three of Clubs is
             # not the same card as the Three of Diamonds.
-            return self.value() == other.value() and self.suit == other.suit
+            return self.val == other.val and self.suit == other.suit
 
     def __ge__(self, other):
-        if not (self.value() or other.value()):
+        if not (self.val or other.val):
             return NotImplemented
         else:
-            return self.value() >= other.value()
+            return self.val >= other.val
 
     def __gt__(self, other):
-        if not (self.value() or other.value()):
+        if not (self.val or other.val):
             return NotImplemented
         else:
-            return self.value() > other.value()
+            return self.val > other.val
 
     def __ne__(self, other):
-        if not (self.value() or other.value()):
+        if self is other:
+            return False
+        if not (self.val or other.val):
             return NotImplemented
         else:
-            return self.value() != other.value() or self.suit != other.suit
+            return self.val != other.val or self.suit != other.suit
 
     def value(self):
-        r = self.rank
-        if r == JOKER:
+        return self.val
+
+def card_code(r, s):
+
+    # Returns the integer code for a rank and suit: suit-major, rank-minor
+    # for the standard 52, then the black and red jokers.  Anything else
+    # (cards from other decks that borrow this class) gets None.
+    if type(r) == int:
+        r = str(r)
+    if r == JOKER:
+        if s in JOKER_SUITS:
+            return len(RANKS) * len(SUITS) + JOKER_SUITS.index(s)
+        return None
+    if r in RANKS and s in SUITS:
+        return SUITS.index(s) * len(RANKS) + RANKS.index(r)
+    return None
+
+# The interned cards, keyed by (rank, suit, ace_high) and by code.  Two full
+# sets are kept, as aces order differently depending on the game.
+_CARDS = {}
+_CARDS_BY_CODE = {True: [], False: []}
+
+def _intern_cards():
+    for ace_high in (True, False):
+        by_code = _CARDS_BY_CODE[ace_high]
+        for s in SUITS:
+            for r in RANKS:
+                card = PlayingCard(r, s, ace_high)
+                _CARDS[(r, s, ace_high)] = card
+                by_code.append(card)
+        for s in JOKER_SUITS:
+            card = PlayingCard(JOKER, s, ace_high)
+            _CARDS[(JOKER, s, ace_high)] = card
+            by_code.append(card)
+
+def get_card(r, s, ace_high=True):
+
+    # Returns the interned card for a rank and suit.  Integer ranks are
+    # accepted as well as the string forms used in RANKS.
+    if type(r) == int:
+        r = str(r)
+    return _CARDS.get((r, s, ace_high))
+
+def code_to_card(code, ace_high=True):
+    return _CARDS_BY_CODE[ace_high][code]
+
+def _get_suit_masks():
+
+    # One bit per card code; each suit's thirteen cards are contiguous.
+    masks = {}
+    for i, s in enumerate(SUITS):
+        masks[s] = ((1 << len(RANKS)) - 1) << (i * len(RANKS))
+    for i, s in enumerate(JOKER_SUITS):
+        masks[s] = 1 << (len(RANKS) * len(SUITS) + i)
+    return masks
+
+SUIT_MASKS = _get_suit_masks()
+
+class PlayingCardHand(Hand):
+    """A Hand of standard playing cards that keeps track of what's in it.
+
+    Alongside the ordinary list of cards, the hand keeps a bitmask of card
+    codes and a count of cards in each suit, both updated as cards come and
+    go, so membership, void and follow-suit checks don't walk the hand.
+    Rendered strings are cached until the hand next changes.  It assumes a
+    single deck; a hand holding two identical cards would confuse the mask.
+    """
+
+    def __init__(self):
+        super(PlayingCardHand, self).__init__()
+        self.mask = 0
+        self.suit_counts = dict((x, 0) for x in SUIT_MASKS)
+        self.str_cache = {}
+
+    def _track(self, card):
+        self.mask |= 1 << card.code
+        self.suit_counts[card.suit] += 1
+        self.str_cache = {}
+
+    def _untrack(self, card):
+        self.mask &= ~(1 << card.code)
+        self.suit_counts[card.suit] -= 1
+        self.str_cache = {}
+
+    def _retrack(self):
+        self.mask = 0
+        self.suit_counts = dict((x, 0) for x in SUIT_MASKS)
+        for card in self.cards:
+            self._track(card)
+        self.str_cache = {}
+
+    def __setitem__(self, key, value):
+        super(PlayingCardHand, self).__setitem__(key, value)
+        self._retrack()
+
+    def __delitem__(self, key):
+        super(PlayingCardHand, self).__delitem__(key)
+        self._retrack()
+
+    def __contains__(self, needle):
+        code = getattr(needle, "code", None)
+        if code is None:
+            return False
+        return bool(self.mask & (1 << code))
+
+    def discard(self, n=-1):
+        card = super(PlayingCardHand, self).discard(n)
+        if card:
+            self._untrack(card)
+        return card
+
+    def discard_specific(self, needle):
+
+        # Match on the card code, so that the mask and the list agree about
+        # what's in the hand.
+        if needle not in self:
             return None
-        if type(r) == int:
-            return r
-        if r.isdigit():
-            return int(r)
-        else:
-            if r == ACE:
-                if self.ace_high:
-                    return 14
-                else:
-                    return 1
-            elif r == JACK:
-                return 11
-            elif r == QUEEN:
-                return 12
-            elif r == KING:
-                return 13
-            else:
-                return None
+        for i, card in enumerate(self.cards):
+            if card.code == needle.code:
+                self.cards.pop(i)
+                self._untrack(card)
+                return card
+
+    def add(self, c):
+        if super(PlayingCardHand, self).add(c):
+            self._track(c)
+            return True
+        return False
+
+    def shuffle(self, rng=random):
+        super(PlayingCardHand, self).shuffle(rng)
+        self.str_cache = {}
+
+    def sort(self):
+        super(PlayingCardHand, self).sort()
+        self.str_cache = {}
+
+    def has_suit(self, suit):
+        return self.suit_counts.get(suit, 0) > 0
+
+    def count_suit(self, suit):
+        return self.suit_counts.get(suit, 0)
+
+    def legal_mask(self, led_suit=None):
+
+        # Returns the mask of cards that may be played to a trick: anything
+        # if leading or void in the led suit, otherwise only that suit.
+        if led_suit and self.has_suit(led_suit):
+            return self.mask & SUIT_MASKS[led_suit]
+        return self.mask
+
+    def legal_cards(self, led_suit=None):
+        if led_suit and self.has_suit(led_suit):
+            return [x for x in self.cards if x.suit == led_suit]
+        return list(self.cards)
+
+    def get_state(self, led_suit=None, may_play=False):
+
+        # The hand as short card strings for GMCP clients, along with the
+        # cards that can be played to the trick if it's the owner's turn.
+        state = {"hand": [x.short_str for x in self.cards]}
+        if may_play:
+            state["legal"] = [x.short_str for x in self.legal_cards(led_suit)]
+        return state
+
+def cards_to_hand(cards):
+
+    # Builds a PlayingCardHand holding the cards given, in order.
+    hand = PlayingCardHand()
+    for card in cards:
+        hand.add(card)
+    return hand
 
 def str_to_card(card_str):
 
@@ -211,16 +412,16 @@ def str_to_card(card_str):
         return None
 
     # If we got here, we have a suit and a rank.
-    return PlayingCard(rank, suit)
+    return get_card(rank, suit)
 
 def random_card():
-    return PlayingCard(choice(RANKS), choice(SUITS))
+    return get_card(random.choice(RANKS), random.choice(SUITS))
 
 def new_deck(ace_high=True):
     deck = Hand()
     for r in RANKS:
         for s in SUITS:
-            deck.add(PlayingCard(r, s, ace_high))
+            deck.add(get_card(r, s, ace_high))
     return deck
 
 def card_to_str(card, mode=SHORT):
@@ -233,17 +434,7 @@ def card_to_str(card, mode=SHORT):
 
         if not card:
             return "  "
-        short_suit = card.suit[0].upper()
-        value = card.value()
-        if value in range(2, 10):
-            short_rank = str(value)
-        elif value == 10:
-            short_rank = "t"
-        elif value:
-            short_rank = "%s" % card.rank[0].lower()
-        else:
-            short_rank = "?"
-        return ("%s%s" % (short_rank, short_suit))
+        return card.short_str
     elif mode == LONG:
         return (repr(card))
 
@@ -256,7 +447,16 @@ def hand_to_str(hand, trump_suit=None, is_sorted=True):
     # spades are gray.  Note that this function expects the hand to be
     # sorted by default, and will put in dividers between suits; if it is
     # not, pass in False to is_sorted, and it won't bother trying to be
-    # clever.
+    # clever.  PlayingCardHands remember what they last rendered to.
+
+    if isinstance(hand, PlayingCardHand):
+        key = (trump_suit, is_sorted)
+        if key not in hand.str_cache:
+            hand.str_cache[key] = render_hand(hand, trump_suit, is_sorted)
+        return hand.str_cache[key]
+    return render_hand(hand, trump_suit, is_sorted)
+
+def render_hand(hand, trump_suit, is_sorted):
 
     last_suit = None
     to_return = ""
@@ -274,3 +474,5 @@ def hand_to_str(hand, trump_suit=None, is_sorted=True):
         to_return += "%s%s^~ " % (color_code, card_to_str(card))
 
     return to_return
+
+_intern_cards()
@@ -14,7 +14,6 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import random
 
 from giles.utils import get_plural_str
 from giles.state import State
@@ -36,6 +35,9 @@ TAGS = ["bluff", "random", "3p", "4p", "5p", "6p", "7p", "8p", "9p", "10p"]
 _ANTIDOTE_LIST = ('antidote', 'anti', 'a')
 _POISON_LIST = ('poison', 'pois', 'poi', 'p')
 
+# Everything a racked potion can be, for snapshots.
+_POTIONS = ('antidote', 'poison')
+
 _BID_LIST = ('bid', 'b')
 _INVENTORY_LIST = ('inventory', 'inv', 'i')
 _PICK_LIST = ('pick', 'pi', 'choose', 'ch', 'quaff', 'qu')
@@ -201,7 +203,7 @@ class Poison(SeatedGame):
             seat.data.poisons = self.poison_count
 
         # Pick a random starting player.
-        first_player = random.choice(self.seats)
+        first_player = self.random.choice(self.seats)
         self.bc_pre("Fate has chosen, and the starting player is %s!\n" % self.get_sp_str(first_player))
         self.new_round(first_player)
 
@@ -382,6 +384,7 @@ class Poison(SeatedGame):
         return True
 
     def win(self, seat):
+        self.set_winners([seat])
         self.bc_pre("^G%s^~ has won the game!\n" % seat.player_name)
         self.finish()
 
@@ -424,7 +427,7 @@ class Poison(SeatedGame):
                             self.get_sp_str(seat))
                 potion_list = ["antidote" for _ in range(seat.data.antidotes)]
                 potion_list.extend(["poison" for _ in range(seat.data.poisons)])
-                dropped_potion = random.choice(potion_list)
+                dropped_potion = self.random.choice(potion_list)
                 if dropped_potion == "antidote":
                     self.tell_pre(player, "An ^Cantidote^~ shatters on the hard stone.\n")
                     seat.data.antidotes -= 1
@@ -761,6 +764,67 @@ class Poison(SeatedGame):
             if not handled:
                 self.tell_pre(player, "Invalid command.\n")
 
+    def encode_state(self, encoder):
+
+        super(Poison, self).encode_state(encoder)
+        encoder.write_varint(self.antidote_count)
+        encoder.write_varint(self.poison_count)
+        encoder.write_varint(self.goal)
+
+        # Once the game starts, the empty seats are gone and every seat has
+        # its data; before that, there's nothing but the seats themselves.
+        started = self.turn is not None
+        encoder.write_bool(started)
+        if started:
+            encoder.write_str_list([x.name for x in self.seats])
+        self.encode_seats(encoder)
+        if not started:
+            return
+
+        for seat in self.seats:
+            encoder.write_bool(seat.data.is_dead)
+            encoder.write_varint(seat.data.score)
+            encoder.write_varint(seat.data.antidotes)
+            encoder.write_varint(seat.data.poisons)
+            encoder.write_bool(seat.data.is_bidding)
+            encoder.write_varint(seat.data.bid)
+            encoder.write_varint(seat.data.quaffed)
+            encoder.write_varint(len(seat.data.potion_rack))
+            for potion in seat.data.potion_rack:
+                encoder.write_index(potion, _POTIONS)
+        seats = [None] + self.seats
+        encoder.write_index(self.turn, seats)
+        encoder.write_index(self.highest_bidder, seats)
+
+    def decode_state(self, decoder):
+
+        super(Poison, self).decode_state(decoder)
+        self.antidote_count = decoder.read_varint()
+        self.poison_count = decoder.read_varint()
+        self.goal = decoder.read_varint()
+
+        started = decoder.read_bool()
+        if started:
+            names = decoder.read_str_list()
+            self.seats = [x for x in self.seats if x.name in names]
+        self.decode_seats(decoder)
+        if not started:
+            return
+
+        for seat in self.seats:
+            seat.data.is_dead = decoder.read_bool()
+            seat.data.score = decoder.read_varint()
+            seat.data.antidotes = decoder.read_varint()
+            seat.data.poisons = decoder.read_varint()
+            seat.data.is_bidding = decoder.read_bool()
+            seat.data.bid = decoder.read_varint()
+            seat.data.quaffed = decoder.read_varint()
+            seat.data.potion_rack = [decoder.read_index(_POTIONS)
+                                     for x in range(decoder.read_varint())]
+        seats = [None] + self.seats
+        self.turn = decoder.read_index(seats)
+        self.highest_bidder = decoder.read_index(seats)
+
     def tick(self):
 
         # If all seats are full and active, autostart.
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.piece import Piece
 from giles.games.seat import Seat
@@ -28,6 +29,11 @@ MAX_SIZE = 26
 # Deltas are useful.
 CONNECTION_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
+# What each cell of the board is written as in snapshots: empty, Black,
+# White, or a redstone.
+EMPTY_CELL, BLACK_CELL, WHITE_CELL, RED_CELL = range(4)
+CELL_BITS = 2
+
 TAGS = ["abstract", "capture", "square", "2p"]
 
 CONFIG_PARAMS = (
@@ -63,20 +69,17 @@ class Redstone(SeatedGame):
         self.black = self.seats[0]
         self.black.data.seat_str = "^KBlack^~"
         self.black.data.made_move = False
+        self.black.data.count = 0
         self.white = self.seats[1]
         self.white.data.seat_str = "^WWhite^~"
         self.white.data.made_move = False
+        self.white.data.count = 0
         self.resigner = None
         self.layout = None
 
-        # Like most abstracts, Redstone doesn't need to differentiate between
-        # the pieces on the board.
-        self.bp = Piece("^K", "x", "X")
-        self.bp.data.owner = self.black
-        self.black.data.piece = self.bp
-        self.wp = Piece("^W", "o", "O")
-        self.wp.data.owner = self.white
-        self.white.data.piece = self.wp
+        # Redstones are neutral and never captured, so a single shared piece
+        # will do for all of them.  Player stones are created as they are
+        # placed, as each one tracks the group it belongs to.
         self.rp = Piece("^R", "r", "R")
         self.rp.data.owner = None
 
@@ -88,6 +91,8 @@ class Redstone(SeatedGame):
         # Create the layout.  Empty, so easy.
         self.layout = SquareGridLayout(highlight_color="^I")
         self.layout.resize(self.width, self.height)
+        self.black.data.count = 0
+        self.white.data.count = 0
 
     def get_sp_str(self, seat):
 
@@ -146,88 +151,117 @@ class Redstone(SeatedGame):
         self.bc_pre("^R%s^~ has set the board size to ^C%d^Gx^C%d^~.\n" % (player, w, h))
         self.init_layout()
 
-    def recurse_capture(self, seat, row, col, visited):
-
-        # If it's a dud coordinate, bail.
-        if not self.layout.is_valid(row, col):
-            return None
+    def get_new_piece(self, seat):
 
-        # If we've been here, bail.
-        if visited[row][col]:
-            return None
+        if seat == self.black:
+            p = Piece("^K", "x", "X")
+        else:
+            p = Piece("^W", "o", "O")
 
-        # If it's an empty space, then it's a liberty.
-        pos = self.layout.grid[row][col]
-        if not pos:
-            return []
+        # Every stone starts out as its own group.  Groups are tracked with
+        # a union-find structure; only the root stone of a group (the one
+        # that is its own parent) has meaningful group data: the locations
+        # it covers and its liberties.
+        p.data.owner = seat
+        p.data.parent = p
+        p.data.cells = set()
+        p.data.liberties = set()
 
-        # If it's a piece of the other player, bail.
-        if pos.data.owner != seat:
-            return None
+        return p
 
-        # Okay.  New piece, right color.  Mark it visited.
-        visited[row][col] = True
+    def find(self, piece):
 
-        # Recurse on adjacencies.  If any return an empty list, this group has
-        # a liberty and we return an empty list as well; otherwise we return a
-        # concatenation of pieces found further on, for easy removal.
-        return_list = [(row, col)]
-        for r_delta, c_delta in CONNECTION_DELTAS:
-            result = self.recurse_capture(seat, row + r_delta, col + c_delta, visited)
-            if result == []:
+        # Find the root stone of this stone's group, compressing the path
+        # along the way.
+        root = piece
+        while root.data.parent != root:
+            root = root.data.parent
 
-                # Liberty!  Bail.
-                return []
-            elif result:
+        while piece != root:
+            next_piece = piece.data.parent
+            piece.data.parent = root
+            piece = next_piece
 
-                # Found a subgroup with no liberties.  Extend.
-                return_list.extend(result)
+        return root
 
-        # We never found a liberty.  Return the list of pieces.
-        return return_list
+    def merge_groups(self, group, other):
 
-    def move_is_capture(self, piece, row, col):
+        # Merge two groups of the same owner, folding the smaller one into
+        # the larger.  Returns the surviving group.
+        if len(group.data.cells) < len(other.data.cells):
+            group, other = other, group
 
-        # Tentatively place the piece here.
-        self.layout.place(piece, row, col, update=False)
+        other.data.parent = group
+        group.data.cells.update(other.data.cells)
+        group.data.liberties.update(other.data.liberties)
+        other.data.cells = set()
+        other.data.liberties = set()
 
-        # Build the visitation list.
-        visited = []
-        for r in range(self.height):
-            visited.append([None] * self.width)
+        return group
 
-        # If this piece is not a redstone, we check its own liberties.  We
-        # can quickly bail if this succeeds.
-        if piece != self.rp:
-            if self.recurse_capture(piece.data.owner, row, col, visited):
-                self.layout.remove(row, col, update=False)
-                return True
+    def get_adjacent_groups(self, row, col):
 
-        # Now we check the liberties of all four adjacent locations, assuming
-        # there's a piece there and it's not a redstone.
+        # Returns the list of empty locations next to this one and the set of
+        # stone groups next to it.  Redstones are neither.
+        empty_list = []
+        group_set = set()
         for r_delta, c_delta in CONNECTION_DELTAS:
             new_r = row + r_delta
             new_c = col + c_delta
             if self.layout.is_valid(new_r, new_c):
                 pos = self.layout.grid[new_r][new_c]
-                if pos and pos != self.rp:
+                if not pos:
+                    empty_list.append((new_r, new_c))
+                elif pos != self.rp:
+                    group_set.add(self.find(pos))
+
+        return empty_list, group_set
 
-                    # We have to rebuild the visited list for each piece we
-                    # check, because of the recursive "bail fast" method we use
-                    # for detecting liberties.  This should be improved.
-                    visited = []
-                    for r in range(self.height):
-                        visited.append([None] * self.width)
+    def get_captures(self, piece, row, col):
 
-                    if self.recurse_capture(pos.data.owner, new_r, new_c, visited):
+        # Returns the list of groups that would lose their last liberty if
+        # the piece were placed at this (empty) location.  A player's stone
+        # can only capture the other player's groups; a redstone captures
+        # anyone's.
+        empty_list, group_set = self.get_adjacent_groups(row, col)
+        owner = piece.data.owner
+        return [x for x in group_set if x.data.owner != owner and
+                x.data.liberties == set([(row, col)])]
 
-                        # Bail.
-                        self.layout.remove(row, col, update=False)
-                        return True
+    def move_is_capture(self, piece, row, col):
+
+        # A player's stone also captures if the group it joins would be left
+        # without a liberty.  That's the case if there's no empty location
+        # next to it and none of the friendly groups it joins has a liberty
+        # other than this location.
+        if piece != self.rp:
+            empty_list, group_set = self.get_adjacent_groups(row, col)
+            if not empty_list:
+                if not [x for x in group_set if x.data.owner == piece.data.owner
+                        and len(x.data.liberties) > 1]:
+                    return True
+
+        return bool(self.get_captures(piece, row, col))
+
+    def add_piece(self, piece, row, col):
+
+        # Put the piece on the board, updating the liberties of the groups
+        # around it and, for a player's stone, merging it into any friendly
+        # groups it touches.
+        self.layout.place(piece, row, col, True)
+        empty_list, group_set = self.get_adjacent_groups(row, col)
+        for group in group_set:
+            group.data.liberties.discard((row, col))
 
-        # We never found a capture.  Remove and return.
-        self.layout.remove(row, col, update=False)
-        return False
+        if piece != self.rp:
+            owner = piece.data.owner
+            owner.data.count += 1
+            piece.data.cells.add((row, col))
+            piece.data.liberties.update(empty_list)
+            group = piece
+            for other in group_set:
+                if other.data.owner == owner:
+                    group = self.merge_groups(group, other)
 
     def move(self, player, move_bits):
 
@@ -253,14 +287,14 @@ class Redstone(SeatedGame):
             return False
 
         # Is it a capturing move?
-        piece = seat.data.piece
+        piece = self.get_new_piece(seat)
         if self.move_is_capture(piece, row, col):
             self.tell_pre(player, "That would cause a capture.\n")
             return False
 
         # Valid.  Put a piece there.
         move_str = "%s%s" % (COLS[col], row + 1)
-        self.layout.place(piece, row, col, True)
+        self.add_piece(piece, row, col)
 
         # Update the board.
         self.bc_pre("%s places a piece at ^C%s^~.\n" % (self.get_sp_str(seat), move_str))
@@ -268,41 +302,32 @@ class Redstone(SeatedGame):
         seat.data.made_move = True
         return True
 
-    def capture(self, row, col):
-
-        # If for some reason this is called and there's not a redstone at this
-        # location, bail.
-        if self.layout.grid[row][col] != self.rp:
-            return -1
-
-        # All right.  Check all four adjacencies; if they no longer have a
-        # liberty, capture them.  Note that we come up with the list first,
-        # and /then/ execute the captures, as doing them as we find them may
-        # give groups liberties during the removal process.
-
-        visited = []
-        for r in range(self.height):
-            visited.append([None] * self.width)
-
-        capture_list = []
-        for r_delta, c_delta in CONNECTION_DELTAS:
-            new_r = row + r_delta
-            new_c = col + c_delta
-            if self.layout.is_valid(new_r, new_c):
-                loc = self.layout.grid[new_r][new_c]
-                if loc and loc != self.rp:
-                    captures = self.recurse_capture(loc.data.owner, new_r, new_c, visited)
-                    if captures:
-                        capture_list.extend([x for x in captures if x not in capture_list])
-
-        # Remove all pieces in the capture list.
-        for capture_r, capture_c in capture_list:
-            self.layout.remove(capture_r, capture_c, update=False)
+    def capture(self, capture_list):
+
+        # Remove every group in the capture list.  The list is worked out
+        # before anything is removed, as doing the captures as we find them
+        # may give groups liberties during the removal process.
+        capture_count = 0
+        for group in capture_list:
+            for capture_r, capture_c in group.data.cells:
+                self.layout.remove(capture_r, capture_c, update=False)
+            group.data.owner.data.count -= len(group.data.cells)
+            capture_count += len(group.data.cells)
+
+        # The freed locations are now liberties of whatever groups are next
+        # to them.
+        for group in capture_list:
+            for capture_r, capture_c in group.data.cells:
+                empty_list, group_set = self.get_adjacent_groups(capture_r, capture_c)
+                for other in group_set:
+                    other.data.liberties.add((capture_r, capture_c))
+            group.data.cells = set()
+            group.data.liberties = set()
 
         self.layout.update()
 
         # Return the number of pieces captured.
-        return len(capture_list)
+        return capture_count
 
     def red(self, player, move_bits):
 
@@ -329,16 +354,17 @@ class Redstone(SeatedGame):
 
         # Is it not a capturing move?
         piece = self.rp
-        if not self.move_is_capture(piece, row, col):
+        capture_list = self.get_captures(piece, row, col)
+        if not capture_list:
             self.tell_pre(player, "That would not cause a capture.\n")
             return False
 
         # Valid.  Put the piece there.
         move_str = "%s%s" % (COLS[col], row + 1)
-        self.layout.place(piece, row, col, True)
+        self.add_piece(piece, row, col)
 
         # Redstones by definition make captures.
-        capture_count = self.capture(row, col)
+        capture_count = self.capture(capture_list)
 
         self.bc_pre("%s places a ^Rredstone^~ at ^C%s^~, ^Ycapturing %s^~.\n" % (self.get_sp_str(seat), move_str, get_plural_str(capture_count, "stone")))
 
@@ -458,16 +484,8 @@ class Redstone(SeatedGame):
 
         # If one player has no pieces left, the other player won.  If neither
         # player has a piece, mover wins.
-        found_white = False
-        found_black = False
-        for r in range(self.height):
-            for c in range(self.width):
-                loc = self.layout.grid[r][c]
-                if loc:
-                    if loc.data.owner == self.black:
-                        found_black = True
-                    elif loc.data.owner == self.white:
-                        found_white = True
+        found_white = self.white.data.count > 0
+        found_black = self.black.data.count > 0
 
         if not found_black and self.black.data.made_move:
             if not found_white and self.white.data.made_move:
@@ -482,8 +500,66 @@ class Redstone(SeatedGame):
         # No winner yet.
         return None
 
+    def encode_state(self, encoder):
+
+        super(Redstone, self).encode_state(encoder)
+        encoder.write_varint(self.width)
+        encoder.write_varint(self.height)
+        self.encode_seats(encoder)
+        seats = [None] + self.seats
+        encoder.write_index(self.turn, seats)
+        encoder.write_index(self.resigner, seats)
+        encoder.write_bool(self.black.data.made_move)
+        encoder.write_bool(self.white.data.made_move)
+
+        # Groups are rebuilt on the way back in, so only the stones are kept.
+        cells = []
+        for row in self.layout.grid:
+            for piece in row:
+                if not piece:
+                    cells.append(EMPTY_CELL)
+                elif piece == self.rp:
+                    cells.append(RED_CELL)
+                elif piece.data.owner == self.black:
+                    cells.append(BLACK_CELL)
+                else:
+                    cells.append(WHITE_CELL)
+        encoder.write_cells(cells, CELL_BITS)
+        encoder.write_int_list([x for move in self.layout.last_moves for x in move])
+
+    def decode_state(self, decoder):
+
+        super(Redstone, self).decode_state(decoder)
+        self.width = decoder.read_varint()
+        self.height = decoder.read_varint()
+        self.decode_seats(decoder)
+        seats = [None] + self.seats
+        self.turn = decoder.read_index(seats)
+        self.resigner = decoder.read_index(seats)
+        self.black.data.made_move = decoder.read_bool()
+        self.white.data.made_move = decoder.read_bool()
+
+        # Putting the stones back one at a time rebuilds the groups, their
+        # liberties, and the stone counts.
+        self.init_layout()
+        cells = decoder.read_cells(CELL_BITS)
+        if len(cells) != self.width * self.height:
+            raise CodecError("Snapshot board is the wrong size.")
+        for i, cell in enumerate(cells):
+            row, col = divmod(i, self.width)
+            if cell == RED_CELL:
+                self.add_piece(self.rp, row, col)
+            elif cell == BLACK_CELL:
+                self.add_piece(self.get_new_piece(self.black), row, col)
+            elif cell == WHITE_CELL:
+                self.add_piece(self.get_new_piece(self.white), row, col)
+        moves = decoder.read_int_list()
+        self.layout.last_moves = zip(moves[::2], moves[1::2])
+        self.layout.update()
+
     def resolve(self, winner):
 
+        self.set_winners([winner])
         self.send_board()
         self.bc_pre("%s wins!\n" % self.get_sp_str(winner))
 
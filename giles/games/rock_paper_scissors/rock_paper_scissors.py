@@ -20,6 +20,9 @@ from giles.games.seat import Seat
 
 TAGS = ["abstract", "turnless", "2p"]
 
+# Everything a seat's play can be, for snapshots.
+PLAYS = (None, "rock", "paper", "scissors")
+
 class RockPaperScissors(SeatedGame):
     """A Rock-Paper-Scissors game table implementation.
     """
@@ -148,14 +151,30 @@ class RockPaperScissors(SeatedGame):
         self.channel.broadcast_cc(self.prefix + "%s throws ^!%s^.; %s throws ^!%s^.!\n" % (one_name, one, two_name, two))
         if one == two:
             msg = "It's a tie!\n"
+            self.set_winners([])
         elif ((one == "rock" and two == "paper") or
            (one == "paper" and two == "scissors") or
            (one == "scissors" and two == "rock")):
             msg = two_name + " wins!\n"
+            self.set_winners([self.seats[1]])
         else:
             msg = one_name + " wins!\n"
+            self.set_winners([self.seats[0]])
         self.channel.broadcast_cc(msg)
 
+    def encode_state(self, encoder):
+
+        super(RockPaperScissors, self).encode_state(encoder)
+        self.encode_seats(encoder)
+        for play in self.plays:
+            encoder.write_index(play, PLAYS)
+
+    def decode_state(self, decoder):
+
+        super(RockPaperScissors, self).decode_state(decoder)
+        self.decode_seats(decoder)
+        self.plays = [decoder.read_index(PLAYS) for x in self.plays]
+
     def remove_player(self, player):
 
         # Not only do we want to do the standard things, but if this person
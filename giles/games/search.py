@@ -0,0 +1,182 @@
+# Giles: search.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Game tree searches for the bot engines.  Neither knows anything about
+# any game; they're handed a state and functions that list the moves from
+# a state and make one, returning a new state and leaving the old one be.
+# Both search until should_stop() says they're out of time and return the
+# best they've found, so they run in the bot workers, never the server.
+
+import math
+import random
+
+# How much Monte Carlo tree search favours trying moves it knows little
+# about over the ones that have done well so far.
+EXPLORATION = 0.7
+
+# How deep alpha-beta search goes at most, however much time it has.
+MAX_DEPTH = 32
+
+class MonteCarloNode(object):
+    """A state in a Monte Carlo search tree: the move that led to it, who
+    is to move from it, and how the playouts through it turned out for the
+    player who made that move.
+    """
+
+    __slots__ = ("move", "parent", "mover", "untried", "children", "visits",
+                 "wins")
+
+    def __init__(self, move, parent, mover, moves):
+
+        self.move = move
+        self.parent = parent
+        self.mover = mover
+        self.untried = moves
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self):
+
+        # UCT: the child with the best mix of results and uncertainty.
+        log_visits = math.log(self.visits)
+        best_score = None
+        best_child = None
+        for child in self.children:
+            score = (child.wins / child.visits +
+                     EXPLORATION * math.sqrt(log_visits / child.visits))
+            if best_score is None or score > best_score:
+                best_score = score
+                best_child = child
+        return best_child
+
+    def get_best_child(self):
+
+        # The move played the most is the one the search trusts most.
+        if not self.children:
+            return None
+        return max(self.children, key=lambda x: x.visits)
+
+def monte_carlo(state, get_mover, get_moves, play, playout, should_stop):
+    """Search a state by Monte Carlo tree search, returning the root of the
+    tree; its best child is the move to make.
+
+    get_mover(state) is whoever is to move.  playout(state) plays the game
+    out from a state however it likes, usually at random, and returns the
+    winner, or None for a draw.  A state with no moves has to be one
+    playout() can score as it is.
+    """
+
+    root = MonteCarloNode(None, None, get_mover(state), get_moves(state))
+    while not should_stop():
+
+        # Walk down the tree to a state with moves nobody has tried...
+        node = root
+        node_state = state
+        while not node.untried and node.children:
+            node = node.select_child()
+            node_state = play(node_state, node.move)
+
+        # ...try one of them...
+        if node.untried:
+            move = node.untried.pop(random.randrange(len(node.untried)))
+            node_state = play(node_state, move)
+            child = MonteCarloNode(move, node, get_mover(node_state),
+                                   get_moves(node_state))
+            node.children.append(child)
+            node = child
+
+        # ...and play the game out from there, crediting the moves on the
+        # way back up to whoever made them.
+        winner = playout(node_state)
+        while node:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif node.parent and winner == node.parent.mover:
+                node.wins += 1
+            node = node.parent
+
+    return root
+
+class _OutOfTime(Exception):
+    pass
+
+def alpha_beta(state, get_moves, play, evaluate, is_max, should_stop):
+    """Search a state by alpha-beta, deepening a ply at a time until time
+    runs out, and return the best move of the deepest search that finished,
+    or None if there are no moves.
+
+    evaluate(state) scores a state for the player searching, and is_max(state)
+    is whether that player is the one to move; opponents are all assumed
+    to be out to get them.  A state with no moves counts as the end of the
+    game.
+    """
+
+    moves = get_moves(state)
+    if not moves:
+        return None
+    best_move = moves[0]
+
+    def search(node_state, depth, alpha, beta):
+
+        if should_stop():
+            raise _OutOfTime()
+        if not depth:
+            return evaluate(node_state)
+        node_moves = get_moves(node_state)
+        if not node_moves:
+            return evaluate(node_state)
+
+        if is_max(node_state):
+            for move in node_moves:
+                alpha = max(alpha, search(play(node_state, move), depth - 1,
+                                          alpha, beta))
+                if alpha >= beta:
+                    break
+            return alpha
+        for move in node_moves:
+            beta = min(beta, search(play(node_state, move), depth - 1,
+                                    alpha, beta))
+            if alpha >= beta:
+                break
+        return beta
+
+    maximizing = is_max(state)
+    for depth in range(1, MAX_DEPTH + 1):
+
+        # Try the best move so far first, as it most likely still is, and
+        # makes for the most cutoffs.
+        moves.remove(best_move)
+        moves.insert(0, best_move)
+        try:
+            alpha = float("-inf")
+            beta = float("inf")
+            depth_best = None
+            for move in moves:
+                score = search(play(state, move), depth - 1, alpha, beta)
+                if maximizing and score > alpha:
+                    alpha = score
+                    depth_best = move
+                elif not maximizing and score < beta:
+                    beta = score
+                    depth_best = move
+            if depth_best is not None:
+                best_move = depth_best
+        except _OutOfTime:
+            break
+
+    return best_move
@@ -14,8 +14,11 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.bot_manager import DEFAULT_BOT_SECONDS, MIN_BOT_SECONDS, MAX_BOT_SECONDS
+from giles.games.codec import CodecError
 from giles.games.game import Game
 from giles.games.seat import Seat
+from giles.journal import AbsentPlayer
 
 class SeatedGame(Game):
     """The base SeatedGame class.  Extends game to handle stuff for a
@@ -39,6 +42,16 @@ class SeatedGame(Game):
         self.num_players = 0
         self.activate_on_sitting = True
 
+        # The seats that won, once resolve() has had its say; an empty list
+        # is a draw.  Games that end without a result leave this as None.
+        self.winners = None
+
+        # Games that bots can play set this to the path of the module that
+        # plays them; see the bot manager.  Bot seats think for as long as
+        # they were told to when they were filled.
+        self.bot_engine = None
+        self.bot_seconds = {}
+
     def next_seat(self, seat):
 
         # This utility function returns the next seat, in order, from the
@@ -87,6 +100,82 @@ class SeatedGame(Game):
 
         return None
 
+    def set_winners(self, winners):
+
+        # Notes who won, for the results store.  winners is a list of
+        # seats, or of the names of the players in them, as some games
+        # pass those around instead.  If every player tied, it's a draw.
+        self.winners = [x for x in self.seats
+                        if x in winners or x.player_name in winners]
+        seated = [x for x in self.seats if x.player]
+        if len(self.winners) > 1 and len(self.winners) == len(seated):
+            self.winners = []
+
+        # A tournament may be waiting on this result.
+        self.server.tournament_manager.note_result(self)
+
+    def get_rating_sides(self):
+
+        # Returns the two sides whose ratings this game's result moves, as
+        # lists of seats, or None if it shouldn't move any.  By default,
+        # only two-player games are rated; games with partnerships pair
+        # up their seats instead.
+        seated = [x for x in self.seats if x.player]
+        if len(seated) == 2:
+            return [[seated[0]], [seated[1]]]
+        return None
+
+    def encode_seats(self, encoder):
+
+        # Writes who is sitting where.  Games call this from encode_state()
+        # once the configuration is written, as the number of seats can
+        # depend on it; anything a game keeps in seat.data is up to it.
+        encoder.write_varint(self.num_players)
+        encoder.write_varint(len(self.seats))
+        for seat in self.seats:
+            encoder.write_bool(seat.active)
+            encoder.write_optional_str(repr(seat.player) if seat.player else None)
+            encoder.write_str(seat.player_name)
+
+    def decode_seats(self, decoder):
+
+        self.num_players = decoder.read_varint()
+        if decoder.read_varint() != len(self.seats):
+            raise CodecError("Snapshot has the wrong number of seats.")
+        for seat in self.seats:
+            seat.active = decoder.read_bool()
+            name = decoder.read_optional_str()
+            if name:
+                seat.player = (self.server.bot_manager.get_bot_by_name(name) or
+                               AbsentPlayer(name, self.server))
+            else:
+                seat.player = None
+            seat.player_name = decoder.read_str()
+
+    def get_gmcp_state(self):
+
+        # Add the seats, with scores where the game keeps them per seat,
+        # and whose turn it is.
+        state = super(SeatedGame, self).get_gmcp_state()
+        seats = []
+        for seat in self.seats:
+            seat_state = {
+                "name": seat.display_name,
+                "player": repr(seat.player) if seat.player else None,
+                "active": seat.active,
+            }
+            if hasattr(seat.data, "score"):
+                seat_state["score"] = seat.data.score
+            seats.append(seat_state)
+        state["seats"] = seats
+
+        turn = getattr(self, "turn", None)
+        if turn in self.seats:
+            state["turn"] = turn.display_name
+        elif turn is not None:
+            state["turn"] = str(turn)
+        return state
+
     def show_help(self, player):
         self.log_pre("%s asked for help with the game." % player)
         player.tell_cc("\nVIEWING:\n\n")
@@ -97,6 +186,8 @@ class SeatedGame(Game):
         player.tell_cc("\nPARTICIPATING:\n\n")
         player.tell_cc("   ^!join^. [<seat>], ^!add^., ^!sit^., ^!j^.     Join the game [in seat <seat>].\n")
         player.tell_cc("                 ^!leave^., ^!stand^.     Leave the game.\n")
+        if self.bot_engine:
+            player.tell_cc("     ^!bot^. [<seat>] [<seconds>]     Seat a bot [in <seat>] [thinking <seconds>].\n")
         player.tell_cc("      ^!replace^. <seat> <player>     Replace <seat> with <player>.\n")
         player.tell_cc("            ^!terminate^., ^!finish^.     Terminate game.\n")
         if self.debug:
@@ -156,6 +247,57 @@ class SeatedGame(Game):
         self.log_pre("Failed to seat %s." % player)
         return False
 
+    def add_bot(self, player, bot_bits):
+
+        if not self.bot_engine:
+            self.tell_pre(player, "There are no bots for this game.\n")
+            return False
+
+        # A number is how long the bot thinks about each move; anything
+        # else is the seat to put it in.
+        seat_name = None
+        seconds = DEFAULT_BOT_SECONDS
+        for bit in bot_bits:
+            if bit.isdigit():
+                seconds = int(bit)
+            else:
+                seat_name = bit.lower()
+        if seconds < MIN_BOT_SECONDS or seconds > MAX_BOT_SECONDS:
+            self.tell_pre(player, "Bots can think for %d to %d seconds.\n" % (MIN_BOT_SECONDS, MAX_BOT_SECONDS))
+            return False
+
+        # Before the game starts, a bot joins like anyone else.  Once it's
+        # going, a bot can only take over the seat of someone who left.
+        state = self.state.get()
+        if state == "need_players":
+            seats = [x for x in self.seats if not x.player]
+            if self.num_players >= self.max_players:
+                seats = []
+        elif state == "setup":
+            self.tell_pre(player, "Not looking for players.\n")
+            return False
+        else:
+            seats = [x for x in self.seats if x.active and not x.player]
+        if seat_name:
+            seats = [x for x in seats if x.name == seat_name]
+        if not seats:
+            self.tell_pre(player, "There's no seat for a bot to take.\n")
+            return False
+
+        seat = seats[0]
+        bot = self.server.bot_manager.get_bot(self)
+        if state == "need_players":
+            self.add_player(bot, seat.name)
+        else:
+            seat.sit(bot)
+            self.num_players += 1
+            if not self.channel.is_connected(bot):
+                self.channel.connect(bot)
+            self.bc_pre("^Y%s^~ has taken over seat ^C%s^~.\n" % (bot, seat))
+        self.bot_seconds[seat] = seconds
+        self.log_pre("%s seated %s in seat %s." % (player, bot, seat))
+        return True
+
     def replace(self, player, seat_name, player_name):
 
         # First, easiest bit: make sure the player is valid...
@@ -201,6 +343,13 @@ class SeatedGame(Game):
 
         self.update_active()
 
+    def reseat_player(self, player, notify=True):
+
+        super(SeatedGame, self).reseat_player(player, notify)
+        for seat in self.seats:
+            if isinstance(seat.player, AbsentPlayer) and seat.player.name == player.name:
+                seat.player = player
+
     def leave(self, player):
 
         # Is this player even at the table?
@@ -284,6 +433,7 @@ class SeatedGame(Game):
         #   * replace (replace a player at the table)
         #   * leave (leave the table)
         #   * list (show players at the table)
+        #   * bot (seat a bot, for games that have them)
         #
         # We also return whether or not we handled the command, which may
         # be useful to games that call us.
@@ -324,6 +474,10 @@ class SeatedGame(Game):
         elif primary in ('add', 'join', 'sit', 'j'):
             handled = self.join(player, command_bits[1:])
 
+        elif primary in ('bot',):
+            self.add_bot(player, command_bits[1:])
+            handled = True
+
         # If we've done something, update the active state.
         if handled:
             self.update_active()
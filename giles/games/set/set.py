@@ -14,15 +14,16 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import random
+from collections import deque
 import time
 
+from giles.games.codec import CodecError
 from giles.state import State
 from giles.utils import booleanize
 from giles.utils import demangle_move
 from giles.games.seated_game import SeatedGame
 from giles.games.seat import Seat
-from giles.utils import Struct, get_plural_str
+from giles.utils import Struct, get_plural_str, get_snapshot
 
 # Some useful default values.
 DEFAULT_MAX_CARDS = 24
@@ -78,13 +79,30 @@ SQUIGGLE = Struct()
 SQUIGGLE.art = "/\\/\\"
 SQUIGGLE.display = "squiggle"
 
-# Bitfields!
-BITFIELDS = [
-   {1: ONE, 2: TWO, 4: THREE, ONE: 1, TWO: 2, THREE: 4},
-   {1: SMOOTH, 2: WAVY, 4: CHUNKY, SMOOTH: 1, WAVY: 2, CHUNKY: 4},
-   {1: MAGENTA, 2: RED, 4: GREEN, MAGENTA: 1, RED: 2, GREEN: 4},
-   {1: BLOB, 2: LOZENGE, 4: SQUIGGLE, BLOB: 1, LOZENGE: 2, SQUIGGLE: 4},
-]
+# Cards!  Each card is an integer from 0 to 80, with each of its four
+# attributes a base-3 digit: number, fill, color, and shape, from most to
+# least significant.  CARD_ATTRIBUTES turns a card back into its attributes.
+NUMBERS = (ONE, TWO, THREE)
+FILLS = (SMOOTH, WAVY, CHUNKY)
+COLORS = (MAGENTA, RED, GREEN)
+SHAPES = (BLOB, LOZENGE, SQUIGGLE)
+CARD_ATTRIBUTES = [(number, fill, color, shape) for number in NUMBERS
+                   for fill in FILLS for color in COLORS for shape in SHAPES]
+
+def _get_third_card(one, two):
+
+    # For any two cards, the third card to make it a set can be determined
+    # easily.  For each attribute, if the two cards are the same, the third
+    # must be the same as well; if different, it's the remaining value.
+    # Either way, the three digits sum to a multiple of 3.
+    three = 0
+    for place in (27, 9, 3, 1):
+        digit_sum = (one / place) % 3 + (two / place) % 3
+        three += place * (-digit_sum % 3)
+    return three
+
+# The third card for every pair of cards, precomputed.
+THIRD_CARD = [[_get_third_card(x, y) for y in range(81)] for x in range(81)]
 
 TAGS = ["card", "random", "turnless", "anyp"]
 
@@ -118,7 +136,9 @@ class Set(SeatedGame):
         self.deal_delay = DEFAULT_DEAL_DELAY
         self.layout = None
         self.printable_layout = None
+        self.layout_snapshot = None
         self.deck = None
+        self.table_mask = 0
         self.last_play_time = None
         self.max_card_count = 81
         self.has_borders = True
@@ -126,27 +146,29 @@ class Set(SeatedGame):
     def build_deck(self):
 
         # Generate the deck...
-        self.deck = []
-        for count in (ONE, TWO, THREE):
-            fill_list = (SMOOTH,)
-            if self.has_borders:
-                fill_list = (SMOOTH, WAVY, CHUNKY)
-            for fill in fill_list:
-                for color in (MAGENTA, RED, GREEN):
-                    for shape in (BLOB, LOZENGE, SQUIGGLE):
-                        self.deck.append((count, fill, color, shape))
+        deck = [x for x in range(81)
+                if self.has_borders or CARD_ATTRIBUTES[x][1] == SMOOTH]
 
         # ...and shuffle it.
-        random.shuffle(self.deck)
+        self.random.shuffle(deck)
 
         # Trim it to at most the max count.
-        self.deck = self.deck[:self.max_card_count]
+        self.deck = deque(deck[:self.max_card_count])
+
+    def deal_card(self):
+
+        # Take the top card off the deck, noting that it's on the table.
+        card = self.deck.popleft()
+        self.table_mask |= 1 << card
+        return card
 
     def build_layout(self):
 
         # Put the first twelve cards on the table.
-        self.layout = self.deck[:12]
-        self.deck = self.deck[12:]
+        self.table_mask = 0
+        self.layout = []
+        while self.deck and len(self.layout) < 12:
+            self.layout.append(self.deal_card())
 
     def update_layout(self):
 
@@ -159,12 +181,11 @@ class Set(SeatedGame):
         layout_len = len(self.layout)
         if len(self.layout) <= 12:
             for i in range(layout_len):
-                if not self.layout[i] and self.deck:
-                    self.layout[i] = self.deck[0]
-                    self.deck = self.deck[1:]
+                if self.layout[i] is None and self.deck:
+                    self.layout[i] = self.deal_card()
 
         else:
-            new_layout = [x for x in self.layout if x]
+            new_layout = [x for x in self.layout if x is not None]
             while len(new_layout) < 12:
                 new_layout.append(None)
             self.layout = new_layout
@@ -182,9 +203,9 @@ class Set(SeatedGame):
 
         # At the end of the game, we will sometimes print blank
         # spaces where cards should go.  Handle that.
-        if not card:
+        if card is None:
             return "      "
-        count, fill, color, shape = card
+        count, fill, color, shape = CARD_ATTRIBUTES[card]
 
         # If a line has a piece of art, it looks like this...
         art_bit = "%s%s^~" % (color.code, shape.art)
@@ -248,8 +269,8 @@ class Set(SeatedGame):
 
         if not self.printable_layout:
             self.update_printable_layout()
-        for line in self.printable_layout:
-            player.tell_cc(line)
+        self.layout_snapshot = get_snapshot(self.layout_snapshot, self.printable_layout)
+        player.tell_cc(self.layout_snapshot)
 
     def send_layout(self):
         for listener in self.channel.listeners:
@@ -353,6 +374,10 @@ class Set(SeatedGame):
                 self.show_scores(player)
                 handled = True
 
+            elif primary in ("hint", "sets"):
+                self.show_hint(player)
+                handled = True
+
             elif state == "need_players":
                 if primary in ("column", "columns"):
                     if len(command_bits) == 2:
@@ -435,8 +460,7 @@ class Set(SeatedGame):
         # Yup.  Deal out three new cards.
         for i in range(3):
             if self.deck:
-                self.layout.append(self.deck[0])
-                self.deck = self.deck[1:]
+                self.layout.append(self.deal_card())
 
         self.update_printable_layout()
         self.send_layout()
@@ -486,7 +510,7 @@ class Set(SeatedGame):
         cards = [self.layout[x] for x in card_locations]
 
         # Bail if any of these are empty locations.
-        if not cards[0] or not cards[1] or not cards[2]:
+        if None in cards:
             player.tell_cc(self.prefix + "You can't pick empty spaces.\n")
             return
 
@@ -498,6 +522,7 @@ class Set(SeatedGame):
             # zomg.  Is an actual set!  Notify the press.  Update the layout
             # and send it out.
             for i in card_locations:
+                self.table_mask &= ~(1 << self.layout[i])
                 self.layout[i] = None
             self.update_layout()
             self.update_printable_layout()
@@ -518,20 +543,7 @@ class Set(SeatedGame):
 
     def third_card(self, one, two):
 
-        # For any two cards, the third card to make it a set can be
-        # determined easily.  For each element, if the two cards are
-        # the same, the third must have the same one as well; if
-        # different, use BITFIELDS to find the missing one.  Since
-        # there are 3 possible values, subtract 7 from the summation
-        # of the two's bit values to get the third one.
-        three = []
-        for k in range(4):
-            if one[k] == two[k]:
-                three.append(one[k])
-            else:
-                three.append(BITFIELDS[k][7 - (BITFIELDS[k][one[k]] +
-                   BITFIELDS[k][two[k]])])
-        return tuple(three)
+        return THIRD_CARD[one][two]
 
     def is_a_set(self, cards):
 
@@ -541,8 +553,9 @@ class Set(SeatedGame):
 
         card_str_list = []
         for card in cards:
-            card_str = card[2].code + " ".join([x.display for x in card])
-            if card[0] != ONE:
+            attributes = CARD_ATTRIBUTES[card]
+            card_str = attributes[2].code + " ".join([x.display for x in attributes])
+            if attributes[0] != ONE:
                 card_str += "s"
             card_str_list.append(card_str + "^~")
 
@@ -557,24 +570,110 @@ class Set(SeatedGame):
             return False
 
         # Okay, now, get a list of cards on the layout.
-        cards_left = [x for x in self.layout if x]
+        cards_left = [x for x in self.layout if x is not None]
 
-        count_left = len(cards_left)
         # If there are more than 20 cards on the table, we know for a fact
         # that there has to be a set left.
-        if count_left > 20:
+        if len(cards_left) > 20:
             return False
 
+        return not self.count_sets(stop_at_first=True)
+
+    def count_sets(self, stop_at_first=False):
+
         # Take every unique pair of cards on the layout and determine what
         # the third card would be that makes them a set.  If that card is
-        # still on the table, we have a valid set left.
-        for i in range(count_left):
-            for j in range(i + 1, count_left):
-                if self.third_card(cards_left[i], cards_left[j]) in cards_left:
-                    return False
+        # still on the table, we have a valid set.  Each set is only counted
+        # from its two lowest cards, so it is counted exactly once.
+        cards_left = sorted([x for x in self.layout if x is not None])
+        table_mask = self.table_mask
+        count = 0
+        for i, one in enumerate(cards_left):
+            thirds = THIRD_CARD[one]
+            for two in cards_left[i + 1:]:
+                three = thirds[two]
+                if three > two and (table_mask >> three) & 1:
+                    if stop_at_first:
+                        return 1
+                    count += 1
+
+        return count
+
+    def show_hint(self, player):
+
+        if self.state.get() != "playing":
+            player.tell_cc(self.prefix + "There's nothing on the table yet.\n")
+            return
 
-        # No sets found.
-        return True
+        set_count = self.count_sets()
+        if set_count == 1:
+            verb = "is"
+        else:
+            verb = "are"
+        player.tell_cc(self.prefix + "There %s ^C%s^~ on the table.\n" % (verb, get_plural_str(set_count, "set")))
+
+    def encode_state(self, encoder):
+
+        super(Set, self).encode_state(encoder)
+        encoder.write_varint(self.max_cards_on_table)
+        encoder.write_varint(self.deal_delay)
+        encoder.write_varint(self.max_card_count)
+        encoder.write_bool(self.has_borders)
+
+        # Seats come and go with the players, so their names come first.
+        encoder.write_str_list([x.display_name for x in self.seats])
+        self.encode_seats(encoder)
+        for seat in self.seats:
+            encoder.write_varint(seat.data.score)
+
+        # Cards are already small integers; gaps in the layout are written
+        # as 0 and everything else shifted up by one.
+        encoder.write_bool(self.deck is not None)
+        if self.deck is not None:
+            encoder.write_int_list(list(self.deck))
+            encoder.write_varint(len(self.layout))
+            for card in self.layout:
+                encoder.write_varint(0 if card is None else card + 1)
+
+        # The time of the last play is kept as how long ago it was, as the
+        # clock may well have moved on by the time this is restored.
+        if self.last_play_time is None:
+            encoder.write_optional_int(None)
+        else:
+            encoder.write_optional_int(int((time.time() - self.last_play_time) * 1000))
+
+    def decode_state(self, decoder):
+
+        super(Set, self).decode_state(decoder)
+        self.max_cards_on_table = decoder.read_varint()
+        self.deal_delay = decoder.read_varint()
+        self.max_card_count = decoder.read_varint()
+        self.has_borders = decoder.read_bool()
+
+        self.seats = [Seat(x) for x in decoder.read_str_list()]
+        self.decode_seats(decoder)
+        for seat in self.seats:
+            seat.data.score = decoder.read_varint()
+
+        if decoder.read_bool():
+            self.deck = deque(decoder.read_int_list())
+            self.layout = []
+            self.table_mask = 0
+            for i in range(decoder.read_varint()):
+                card = decoder.read_varint() - 1
+                if card < 0:
+                    self.layout.append(None)
+                else:
+                    self.layout.append(card)
+                    self.table_mask |= 1 << card
+            if [x for x in list(self.deck) + self.layout if x is not None and
+                not 0 <= x < len(CARD_ATTRIBUTES)]:
+                raise CodecError("Snapshot has cards that don't exist.")
+            self.update_printable_layout()
+
+        elapsed = decoder.read_optional_int()
+        if elapsed is not None:
+            self.last_play_time = time.time() - elapsed / 1000.0
 
     def resolve(self):
 
@@ -589,6 +688,7 @@ class Set(SeatedGame):
         winner_score_list = sorted(winner_dict.keys(), reverse=True)
 
         winner_score = winner_score_list[0]
+        self.set_winners(winner_dict[winner_score])
         self.send_scores()
         if len(winner_dict[winner_score]) == 1:
             self.channel.broadcast_cc(self.prefix + "^Y%s^~ is the winner!\n" % (winner_dict[winner_score][0]))
@@ -629,3 +729,4 @@ class Set(SeatedGame):
         player.tell_cc("\nSET PLAY:\n\n")
         player.tell_cc("                   ^!l1^., ^!l2^., ^!l3^.     Declare <l1>, <l2>, <l3> a set.\n")
         player.tell_cc("                       ^!scores^.     See the current scores.\n")
+        player.tell_cc("                  ^!hint^., ^!sets^.     Count the sets on the table.\n")
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.games.codec import CodecError
 from giles.games.layout import Layout
 
 COLS = "abcdefghijklmnopqrstuvwxyz"
@@ -24,6 +25,15 @@ class SquareGridLayout(Layout):
     externally (it's a list of (row, col) tuples); that said, all of place, move,
     and remove can optionally replace the list with the destination locations (and,
     in the case of move, both the source /and/ destination).
+
+    Rendered rows are cached; update() only redraws the rows that place(),
+    move(), and remove() touched, plus any whose last-move highlighting
+    changed.  If you change the grid some other way, call mark_dirty() on
+    the affected rows (or mark_all_dirty()) before updating.
+
+    The compact representation drops the frame, the footer, and the
+    spacing between cells; its rows are cached the same way, but only
+    drawn when someone asks for them.
     """
 
     def __init__(self, board_color=None, cell_color=None, highlight_color=None):
@@ -37,6 +47,12 @@ class SquareGridLayout(Layout):
         self.top_row = ""
         self.bottom_row = ""
         self.grid = []
+        self.rows = []
+        self.dirty_rows = set()
+        self.drawn_last_moves = []
+        self.compact_col_str = ""
+        self.compact_rows = []
+        self.compact_dirty_rows = set()
 
         if not board_color:
             board_color = "^m"
@@ -56,32 +72,118 @@ class SquareGridLayout(Layout):
         else:
             return False
 
-    def update(self):
+    def mark_dirty(self, row):
+
+        self.dirty_rows.add(row)
+
+    def mark_all_dirty(self):
+
+        self.dirty_rows = set(range(self.height))
+
+    def render_row(self, r):
 
-        self.representation = "\n" + self.col_str
-        self.representation += self.top_row
-        for r in range(self.height):
-            r_disp = r + 1
-            this_row = "%2d %s|^~ " % (r_disp, self.board_color)
-            for c in range(self.width):
-                last_move = False
-                if (r, c) in self.last_moves:
-                    last_move = True
-                    this_row += self.highlight_color
-                loc = self.grid[r][c]
-                if loc:
-                    this_row += loc.color
-                    if last_move:
-                        this_row += loc.last_char
-                    else:
-                        this_row += loc.char
-                    this_row += "^~ "
+        r_disp = r + 1
+        cells = ["%2d %s|^~ " % (r_disp, self.board_color)]
+        for c in range(self.width):
+            last_move = False
+            if (r, c) in self.last_moves:
+                last_move = True
+                cells.append(self.highlight_color)
+            loc = self.grid[r][c]
+            if loc:
+                if last_move:
+                    cells.append("%s%s^~ " % (loc.color, loc.last_char))
                 else:
-                    this_row += self.cell_color + ".^~ "
-            this_row += self.board_color + "|^~ %d\n" % r_disp
-            self.representation += this_row
-        self.representation += self.bottom_row
-        self.representation += self.col_str
+                    cells.append("%s%s^~ " % (loc.color, loc.char))
+            else:
+                cells.append(self.cell_color + ".^~ ")
+        cells.append(self.board_color + "|^~ %d\n" % r_disp)
+        return "".join(cells)
+
+    def render_compact_row(self, r):
+
+        cells = ["%2d " % (r + 1)]
+        for c in range(self.width):
+            last_move = False
+            if (r, c) in self.last_moves:
+                last_move = True
+                cells.append(self.highlight_color)
+            loc = self.grid[r][c]
+            if loc:
+                if last_move:
+                    cells.append("%s%s^~" % (loc.color, loc.last_char))
+                else:
+                    cells.append("%s%s^~" % (loc.color, loc.char))
+            else:
+                cells.append(self.cell_color + ".^~")
+        cells.append("\n")
+        return "".join(cells)
+
+    def update(self):
+
+        # The last moves may have been changed from outside, so compare
+        # them against what was last drawn; rows that lose or gain a
+        # highlight need redrawing too.
+        if self.last_moves != self.drawn_last_moves:
+            for r, c in self.drawn_last_moves:
+                self.dirty_rows.add(r)
+            for r, c in self.last_moves:
+                self.dirty_rows.add(r)
+            self.drawn_last_moves = list(self.last_moves)
+
+        for r in self.dirty_rows:
+            if r >= 0 and r < self.height:
+                self.rows[r] = self.render_row(r)
+        if self.dirty_rows:
+            self.compact_dirty_rows.update(self.dirty_rows)
+            self.compact_representation = None
+        self.dirty_rows = set()
+
+        self.representation = "".join(["\n", self.col_str, self.top_row] +
+                                      self.rows +
+                                      [self.bottom_row, self.col_str])
+
+    def get_compact(self):
+
+        if self.compact_representation is None:
+            for r in self.compact_dirty_rows:
+                if r >= 0 and r < self.height:
+                    self.compact_rows[r] = self.render_compact_row(r)
+            self.compact_dirty_rows = set()
+            self.compact_representation = "".join(["\n", self.compact_col_str] +
+                                                  self.compact_rows)
+        return self.compact_representation
+
+    def get_state(self):
+
+        # One string per row, one character per cell, "." for empty.
+        return ["".join([x.char if x else "." for x in row])
+                for row in self.grid]
+
+    def encode(self, encoder, pieces):
+
+        # Writes the grid, each cell as its index in pieces, which should
+        # list every piece the game uses, with None (an empty cell) first,
+        # and then the last moves.
+        encoder.write_varint(self.width)
+        encoder.write_varint(self.height)
+        encoder.write_choice_cells([x for row in self.grid for x in row], pieces)
+        encoder.write_int_list([x for move in self.last_moves for x in move])
+
+    def decode(self, decoder, pieces):
+
+        width = decoder.read_varint()
+        height = decoder.read_varint()
+        self.resize(width, height)
+        cells = decoder.read_choice_cells(pieces)
+        if len(cells) != width * height:
+            raise CodecError("Snapshot grid is the wrong size.")
+        for r in range(height):
+            self.grid[r] = cells[r * width:(r + 1) * width]
+        moves = decoder.read_int_list()
+        self.last_moves = zip(moves[::2], moves[1::2])
+        self.mark_all_dirty()
+        self.update()
 
     def resize(self, width, height=None):
 
@@ -97,8 +199,13 @@ class SquareGridLayout(Layout):
 
         self.width = width
         self.height = height
+        self.rows = [None] * height
+        self.compact_rows = [None] * height
+        self.compact_dirty_rows = set()
+        self.mark_all_dirty()
 
         self.col_str = "    " + "".join([" " + COLS[i] for i in range(self.width)]) + "\n"
+        self.compact_col_str = "   " + COLS[:self.width] + "\n"
         equals_str = "".join(["=="] * self.width)
         self.top_row = "   " + self.board_color + ".=" + equals_str + ".^~\n"
         self.bottom_row = "   " + self.board_color + "`=" + equals_str + "'^~\n"
@@ -109,6 +216,7 @@ class SquareGridLayout(Layout):
 
         if self.is_valid(row, col):
             self.grid[row][col] = piece
+            self.dirty_rows.add(row)
             if update_last_moves:
                 self.last_moves = [(row, col)]
             if update:
@@ -124,6 +232,8 @@ class SquareGridLayout(Layout):
 
             self.grid[dst_r][dst_c] = self.grid[src_r][src_c]
             self.grid[src_r][src_c] = None
+            self.dirty_rows.add(src_r)
+            self.dirty_rows.add(dst_r)
             if update_last_moves:
                 self.last_moves = [(src_r, src_c), (dst_r, dst_c)]
             if update:
@@ -136,6 +246,7 @@ class SquareGridLayout(Layout):
 
         if self.is_valid(row, col) and self.grid[row][col]:
             self.grid[row][col] = None
+            self.dirty_rows.add(row)
             if update_last_moves:
                 self.last_moves = [(row, col)]
             if update:
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.piece import Piece
 from giles.games.seat import Seat
@@ -28,6 +29,10 @@ MAX_SIZE = 26
 # Deltas are useful.
 CONNECTION_DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
 
+# What each cell of the board is written as in snapshots.
+EMPTY_CELL, BLACK_CELL, WHITE_CELL = range(3)
+CELL_BITS = 2
+
 TAGS = ["abstract", "capture", "square", "2p"]
 
 CONFIG_PARAMS = (
@@ -62,11 +67,13 @@ class SquareOust(SeatedGame):
         self.turn = None
         self.black = self.seats[0]
         self.black.data.seat_str = "^KBlack^~"
-        self.black.data.groups = []
+        self.black.data.groups = set()
+        self.black.data.legal = set()
         self.black.data.made_move = False
         self.white = self.seats[1]
         self.white.data.seat_str = "^WWhite^~"
-        self.white.data.groups = []
+        self.white.data.groups = set()
+        self.white.data.legal = set()
         self.white.data.made_move = False
         self.resigner = None
         self.layout = None
@@ -81,6 +88,13 @@ class SquareOust(SeatedGame):
         self.layout = SquareGridLayout(highlight_color="^I")
         self.layout.resize(self.width, self.height)
 
+        # On an empty board, every location is a legal play for both seats.
+        all_locs = set((r, c) for r in range(self.height)
+                       for c in range(self.width))
+        for seat in (self.black, self.white):
+            seat.data.groups = set()
+            seat.data.legal = set(all_locs)
+
     def get_sp_str(self, seat):
 
         return "^C%s^~ (%s)" % (seat.player_name, seat.data.seat_str)
@@ -144,112 +158,156 @@ class SquareOust(SeatedGame):
             p = Piece("^K", "x", "X")
         else:
             p = Piece("^W", "o", "O")
+
+        # Every piece starts out as its own group.  Groups are tracked with
+        # a union-find structure; only the root piece of a group (the one
+        # that is its own parent) has meaningful group data: its size, the
+        # locations it covers, the empty locations next to it (its
+        # frontier), and the set of enemy groups it touches.
         p.data.owner = seat
-        p.data.adjacencies = []
+        p.data.parent = p
         p.data.size = 1
-        p.data.num = id(p)
+        p.data.cells = set()
+        p.data.frontier = set()
+        p.data.adjacencies = set()
 
         return p
 
-    def replace(self, old, new):
+    def find(self, piece):
 
-        # First step: Replace the actual pieces on the board.
-        for r in range(self.height):
-            for c in range(self.width):
-                if self.layout.grid[r][c] == old:
-                    self.layout.place(new, r, c, update=False)
-        self.layout.update()
+        # Find the root piece of this piece's group, compressing the path
+        # along the way.
+        root = piece
+        while root.data.parent != root:
+            root = root.data.parent
+
+        while piece != root:
+            next_piece = piece.data.parent
+            piece.data.parent = root
+            piece = next_piece
+
+        return root
 
-        # Second step: Get rid of it from the group list of its owner.
-        owner = new.data.owner
-        owner.data.groups.remove(old)
+    def merge_groups(self, group, other):
 
-        # Third step: Replace instances of it in the other player's group
-        # adjacencies.
-        for group in self.next_seat(owner).data.groups:
-            if old in group.data.adjacencies:
-                group.data.adjacencies.remove(old)
-                if new not in group.data.adjacencies:
-                    group.data.adjacencies.append(new)
+        # Merge two groups of the same owner, folding the smaller one into
+        # the larger.  Returns the surviving group.
+        if group.data.size < other.data.size:
+            group, other = other, group
+
+        other.data.parent = group
+        group.data.size += other.data.size
+        group.data.cells.update(other.data.cells)
+        group.data.frontier.update(other.data.frontier)
+
+        # The enemy groups next to the absorbed group now touch the
+        # surviving one instead.
+        for enemy in other.data.adjacencies:
+            enemy.data.adjacencies.discard(other)
+            enemy.data.adjacencies.add(group)
+        group.data.adjacencies.update(other.data.adjacencies)
+
+        group.data.owner.data.groups.discard(other)
+        other.data.cells = set()
+        other.data.frontier = set()
+        other.data.adjacencies = set()
+
+        return group
 
     def remove(self, dead_group):
 
-        # Like above, except removing this time.
-        for r in range(self.height):
-            for c in range(self.width):
-                if self.layout.grid[r][c] == dead_group:
-                    self.layout.remove(r, c, update=False)
+        # Take the group's pieces off of the board.
+        for r, c in dead_group.data.cells:
+            self.layout.remove(r, c, update=False)
         self.layout.update()
 
         owner = dead_group.data.owner
-        owner.data.groups.remove(dead_group)
-
-        for group in self.next_seat(owner).data.groups:
-            if dead_group in group.data.adjacencies:
-                group.data.adjacencies.remove(dead_group)
+        owner.data.groups.discard(dead_group)
+
+        for group in dead_group.data.adjacencies:
+            group.data.adjacencies.discard(dead_group)
+
+        # The freed locations are now on the frontier of whatever groups
+        # are next to them.
+        for r, c in dead_group.data.cells:
+            for r_delta, c_delta in CONNECTION_DELTAS:
+                new_r = r + r_delta
+                new_c = c + c_delta
+                if self.layout.is_valid(new_r, new_c):
+                    loc = self.layout.grid[new_r][new_c]
+                    if loc:
+                        self.find(loc).data.frontier.add((r, c))
 
     def update_board(self, row, col):
 
         # We just put a fresh piece at this location; it will have to be
         # incorporated into everything else that's on the board.
         this_piece = self.layout.grid[row][col]
-
-        # Look at all of the adjacencies and collapse the same-color groups
-        # into one.  Collate the unique enemy groups as well, as we may be
-        # capturing them.
-        other_adjacencies = []
-        potential_capture = False
+        owner = this_piece.data.owner
+        this_piece.data.cells.add((row, col))
+
+        # Look at all of the adjacencies, noting the same-color groups to
+        # collapse into one and the unique enemy groups, as we may be
+        # capturing them.  This location is no longer on anyone's frontier.
+        same_groups = set()
+        other_adjacencies = set()
         for r_delta, c_delta in CONNECTION_DELTAS:
             new_r = row + r_delta
             new_c = col + c_delta
             if self.layout.is_valid(new_r, new_c):
                 loc = self.layout.grid[new_r][new_c]
-                if loc and loc.data.owner == this_piece.data.owner:
-                    potential_capture = True
-                    if loc != this_piece:
-
-                        # New same-color group to collapse.
-                        other_adjacencies.extend([x for x in loc.data.adjacencies
-                           if x not in other_adjacencies])
-                        new_size = this_piece.data.size + loc.data.size
-                        if this_piece.data.num < loc.data.num:
-                            self.replace(loc, this_piece)
-                        else:
-                            self.replace(this_piece, loc)
-                            this_piece = loc
+                if not loc:
+                    this_piece.data.frontier.add((new_r, new_c))
+                else:
+                    group = self.find(loc)
+                    group.data.frontier.discard((row, col))
+                    if group.data.owner == owner:
+                        same_groups.add(group)
+                    else:
+                        other_adjacencies.add(group)
 
-                        # Whichever "won," set the new size.
-                        this_piece.data.size = new_size
-                elif loc:
+        this_group = this_piece
+        for group in same_groups:
+            this_group = self.merge_groups(this_group, group)
 
-                    # A group of the other player.  Add to other adjacencies if
-                    # it's not already there.
-                    if loc not in other_adjacencies:
-                        other_adjacencies.append(loc)
+        # Track the locations whose legality might have changed, starting
+        # with the one we just filled.
+        dirty = set([(row, col)])
 
         # After having collapsed all of the same-colored groups, we look to see
         # if this is a potential capture.  If not, we can't affect the opponent's
         # groups, other than to become adjacent to them.  If so, all groups in the
         # list of other adjacencies must be removed from the board.
-        if potential_capture:
+        if same_groups:
+            other_adjacencies.update(this_group.data.adjacencies)
             for group in other_adjacencies:
+
+                # Everything around the dead group, as well as the frontier
+                # of every group it touched, might change legality.
+                dirty.update(group.data.cells)
+                dirty.update(group.data.frontier)
+                for adjacent in group.data.adjacencies:
+                    dirty.update(adjacent.data.frontier)
                 self.remove(group)
 
             # By definition, a capturing group has no enemy adjacencies.
-            this_piece.data.adjacencies = []
+            this_group.data.adjacencies = set()
+            dirty.update(this_group.data.frontier)
+            self.update_legal(dirty)
 
             # Return the number of groups we captured.
             return len(other_adjacencies)
 
         else:
 
-            # Set the adjacency list.
-            this_piece.data.adjacencies = other_adjacencies
-
-            # Add ourselves to those pieces' adjacency lists.
+            # Set the adjacency set, and add ourselves to those groups'
+            # adjacency sets.
+            this_group.data.adjacencies = other_adjacencies
             for group in other_adjacencies:
-                if this_piece not in group.data.adjacencies:
-                    group.data.adjacencies.append(this_piece)
+                group.data.adjacencies.add(this_group)
+                dirty.update(group.data.frontier)
+            dirty.update(this_group.data.frontier)
+            self.update_legal(dirty)
 
             # No captures.
             return 0
@@ -273,14 +331,14 @@ class SquareOust(SeatedGame):
             return False
 
         # Is this move a valid play?
-        if not self.is_valid_play(seat, row, col):
+        if (row, col) not in seat.data.legal:
             self.tell_pre(player, "That move is not valid.\n")
             return False
 
         # Valid.  Put a piece there.
         move_str = "%s%s" % (COLS[col], row + 1)
         piece = self.get_new_piece(seat)
-        seat.data.groups.append(piece)
+        seat.data.groups.add(piece)
         self.layout.place(piece, row, col, True)
 
         # Update the board, making any captures.
@@ -416,7 +474,7 @@ class SquareOust(SeatedGame):
         # are any pieces owned by this seat, the sum total of their sizes must
         # be equal to the largest enemy group adjacent either to them or this
         # new piece.  If there are no pieces owned by this seat, it's valid.
-        same_list = []
+        same_set = set()
         same_total = 0
         largest_other = 0
 
@@ -425,16 +483,17 @@ class SquareOust(SeatedGame):
             new_c = col + c_delta
             if self.layout.is_valid(new_r, new_c):
                 loc = self.layout.grid[new_r][new_c]
-                if loc and loc.data.owner == seat:
-                    if loc not in same_list:
-                        same_list.append(loc)
-                        same_total += loc.data.size
-                        for other in loc.data.adjacencies:
-                            if other.data.size > largest_other:
-                                largest_other = other.data.size
-                elif loc:
-                    if loc.data.size > largest_other:
-                        largest_other = loc.data.size
+                if loc:
+                    group = self.find(loc)
+                    if group.data.owner == seat:
+                        if group not in same_set:
+                            same_set.add(group)
+                            same_total += group.data.size
+                            for other in group.data.adjacencies:
+                                if other.data.size > largest_other:
+                                    largest_other = other.data.size
+                    elif group.data.size > largest_other:
+                        largest_other = group.data.size
 
         # If we didn't find an adjacent same-colored piece, it is immediately
         # valid.
@@ -454,15 +513,21 @@ class SquareOust(SeatedGame):
         # Not a valid play.
         return False
 
-    def has_move(self, seat):
+    def update_legal(self, loc_set):
 
-        for r in range(self.height):
-            for c in range(self.width):
-                if self.is_valid_play(seat, r, c):
-                    return True
+        # Recheck the given locations for both seats, updating the sets of
+        # legal plays.
+        for row, col in loc_set:
+            for seat in (self.black, self.white):
+                if self.is_valid_play(seat, row, col):
+                    seat.data.legal.add((row, col))
+                else:
+                    seat.data.legal.discard((row, col))
 
-        # We checked every location and found no legitimate location.  No move.
-        return False
+    def has_move(self, seat):
+
+        # The legal play sets are kept up to date after every move.
+        return bool(seat.data.legal)
 
     def find_winner(self):
 
@@ -481,8 +546,107 @@ class SquareOust(SeatedGame):
         # No winner.
         return None
 
+    def rebuild_groups(self):
+
+        # Works out the groups, their frontiers and adjacencies, and the
+        # legal plays from scratch for whatever pieces are on the board.
+        # Only used when restoring a snapshot; moves keep all of this up to
+        # date as they go.
+        locs = [(r, c) for r in range(self.height) for c in range(self.width)]
+        for row, col in locs:
+            piece = self.layout.grid[row][col]
+            if piece:
+                piece.data.cells.add((row, col))
+                piece.data.owner.data.groups.add(piece)
+
+        for row, col in locs:
+            piece = self.layout.grid[row][col]
+            if piece:
+                for r_delta, c_delta in CONNECTION_DELTAS[1::2]:
+                    new_r = row + r_delta
+                    new_c = col + c_delta
+                    if self.layout.is_valid(new_r, new_c):
+                        loc = self.layout.grid[new_r][new_c]
+                        if loc and loc.data.owner == piece.data.owner:
+                            group = self.find(piece)
+                            other = self.find(loc)
+                            if group != other:
+                                self.merge_groups(group, other)
+
+        for row, col in locs:
+            piece = self.layout.grid[row][col]
+            if piece:
+                group = self.find(piece)
+                for r_delta, c_delta in CONNECTION_DELTAS:
+                    new_r = row + r_delta
+                    new_c = col + c_delta
+                    if self.layout.is_valid(new_r, new_c):
+                        loc = self.layout.grid[new_r][new_c]
+                        if not loc:
+                            group.data.frontier.add((new_r, new_c))
+                        elif loc.data.owner != piece.data.owner:
+                            group.data.adjacencies.add(self.find(loc))
+
+        self.update_legal(locs)
+
+    def encode_state(self, encoder):
+
+        super(SquareOust, self).encode_state(encoder)
+        encoder.write_varint(self.width)
+        encoder.write_varint(self.height)
+        self.encode_seats(encoder)
+        seats = [None] + self.seats
+        encoder.write_index(self.turn, seats)
+        encoder.write_index(self.resigner, seats)
+        encoder.write_bool(self.black.data.made_move)
+        encoder.write_bool(self.white.data.made_move)
+        encoder.write_bool(self.move_was_capture)
+
+        # Only the pieces are kept; the groups are rebuilt from them.
+        cells = []
+        for row in self.layout.grid:
+            for piece in row:
+                if not piece:
+                    cells.append(EMPTY_CELL)
+                elif piece.data.owner == self.black:
+                    cells.append(BLACK_CELL)
+                else:
+                    cells.append(WHITE_CELL)
+        encoder.write_cells(cells, CELL_BITS)
+        encoder.write_int_list([x for move in self.layout.last_moves for x in move])
+
+    def decode_state(self, decoder):
+
+        super(SquareOust, self).decode_state(decoder)
+        self.width = decoder.read_varint()
+        self.height = decoder.read_varint()
+        self.decode_seats(decoder)
+        seats = [None] + self.seats
+        self.turn = decoder.read_index(seats)
+        self.resigner = decoder.read_index(seats)
+        self.black.data.made_move = decoder.read_bool()
+        self.white.data.made_move = decoder.read_bool()
+        self.move_was_capture = decoder.read_bool()
+
+        self.init_layout()
+        cells = decoder.read_cells(CELL_BITS)
+        if len(cells) != self.width * self.height:
+            raise CodecError("Snapshot board is the wrong size.")
+        for i, cell in enumerate(cells):
+            row, col = divmod(i, self.width)
+            if cell == BLACK_CELL:
+                self.layout.grid[row][col] = self.get_new_piece(self.black)
+            elif cell == WHITE_CELL:
+                self.layout.grid[row][col] = self.get_new_piece(self.white)
+        self.rebuild_groups()
+        moves = decoder.read_int_list()
+        self.layout.last_moves = zip(moves[::2], moves[1::2])
+        self.layout.mark_all_dirty()
+        self.layout.update()
+
     def resolve(self, winner):
 
+        self.set_winners([winner])
         self.send_board()
         self.bc_pre("%s wins!\n" % self.get_sp_str(winner))
 
@@ -421,8 +421,29 @@ class Talpa(SeatedGame):
         for r_delta, c_delta in CONNECTION_DELTAS:
             self.recurse(seat, row + r_delta, col + c_delta)
 
+    def encode_state(self, encoder):
+
+        super(Talpa, self).encode_state(encoder)
+        encoder.write_varint(self.size)
+        self.encode_seats(encoder)
+        seats = [None] + self.seats
+        encoder.write_index(self.turn, seats)
+        encoder.write_index(self.resigner, seats)
+        self.layout.encode(encoder, [None, self.rp, self.bp])
+
+    def decode_state(self, decoder):
+
+        super(Talpa, self).decode_state(decoder)
+        self.size = decoder.read_varint()
+        self.decode_seats(decoder)
+        seats = [None] + self.seats
+        self.turn = decoder.read_index(seats)
+        self.resigner = decoder.read_index(seats)
+        self.layout.decode(decoder, [None, self.rp, self.bp])
+
     def resolve(self, winner):
 
+        self.set_winners([winner])
         self.send_board()
         self.bc_pre("%s wins!\n" % self.get_sp_str(winner))
 
@@ -65,6 +65,7 @@ class Tanbo(SeatedGame):
         self.white.data.root_list = []
         self.resigner = None
         self.layout = None
+        self.roots = []
 
         # Initialize the starting layout.
         self.init_layout()
@@ -77,6 +78,8 @@ class Tanbo(SeatedGame):
 
         p.data.owner = seat
         p.data.num = num
+        p.data.cells = set()
+        p.data.growth = set()
         return p
 
     def init_layout(self):
@@ -90,6 +93,10 @@ class Tanbo(SeatedGame):
         self.black.data.root_list = []
         self.white.data.root_list = []
 
+        # Every root the board started with, dead or alive, in the order
+        # they were created; snapshots refer to roots by their place here.
+        self.roots = []
+
         # There are different layouts depending on the size.  All of them
         # alternate between black and white pieces; the smallest sizes have
         # 4 roots, the standard sizes 16, and the 21x21 board has 36.
@@ -127,12 +134,18 @@ class Tanbo(SeatedGame):
                     p = self.get_root_piece(self.white, white_count)
                     self.white.data.root_list.append(p)
                     white_count += 1
+                self.roots.append(p)
                 row = offset + i * jump_delta
                 col = offset + j * jump_delta
                 p.data.start = (row, col)
+                p.data.cells.add((row, col))
                 self.layout.place(p, row, col, update=False)
         self.layout.update()
 
+        # Now that all of the roots are down, figure out where they can grow.
+        for root in self.black.data.root_list + self.white.data.root_list:
+            self.update_growth_around([root.data.start])
+
     def get_sp_str(self, seat):
 
         return "^C%s^~ (%s)" % (seat.player_name, seat.data.seat_str)
@@ -197,89 +210,92 @@ class Tanbo(SeatedGame):
         else:
             return None
 
-    def recurse_is_bound(self, piece, row, col, prev_row, prev_col):
-
-        # Thanks to the way Tanbo placement works, we don't have to worry about
-        # loops, so we can get away with not using an adjacenty map and instead
-        # just track the direction we came from.
-        #
-        # Bail if this isn't a valid location.
-        if not self.layout.is_valid(row, col):
-            return True
-
-        loc = self.layout.grid[row][col]
+    def update_growth_point(self, row, col):
 
-        # If there's no piece here, see if we can place one.
-        if not loc:
-            if self.can_place_at(piece.data.owner, row, col):
-
-                # Yup.  This root isn't bound.
-                return False
-
-            else:
-
-                # No, this location is binding.
-                return True
+        # Recompute which root, if any, can grow into the location at
+        # row, col.  We first drop the location from the growth sets of
+        # every root next to it, then hand it back to the one root (at
+        # most one per seat) that can actually grow there.  The set of
+        # roots we touched is returned so that callers know which roots
+        # might have just become bound.
+        touched = set()
+        for r_delta, c_delta in CONNECTION_DELTAS:
+            new_r = row + r_delta
+            new_c = col + c_delta
+            if self.layout.is_valid(new_r, new_c):
+                loc = self.layout.grid[new_r][new_c]
+                if loc:
+                    loc.data.growth.discard((row, col))
+                    touched.add(loc)
 
-        elif loc != piece:
+        if not self.layout.grid[row][col]:
+            for seat in (self.black, self.white):
+                piece = self.can_place_at(seat, row, col)
+                if piece:
+                    piece.data.growth.add((row, col))
 
-            # Some other root.  Definitely binding.
-            return True
+        return touched
 
-        else:
+    def update_growth_around(self, loc_list):
 
-            # Okay, it's another part of this root.  Recurse, but don't double
-            # back.
+        # A change at any of these locations can only change the growth
+        # status of the locations themselves and their empty neighbours.
+        points = set()
+        for row, col in loc_list:
+            points.add((row, col))
             for r_delta, c_delta in CONNECTION_DELTAS:
                 new_r = row + r_delta
                 new_c = col + c_delta
-                if new_r != prev_row or new_c != prev_col:
-                    if not self.recurse_is_bound(piece, new_r, new_c, row, col):
+                if (self.layout.is_valid(new_r, new_c) and
+                   not self.layout.grid[new_r][new_c]):
+                    points.add((new_r, new_c))
 
-                        # A recursive call found a liberty.  Awesome!
-                        return False
+        touched = set()
+        for row, col in points:
+            touched.update(self.update_growth_point(row, col))
 
-            # All of the recursive calls returned that they were bound.  This
-            # (sub)root is bound.
-            return True
+        return touched
 
     def root_is_bound(self, piece):
 
-        # We'll just start recursing at the root's starting location and find
-        # whether it's bound or not.
-        row, col = piece.data.start
-        return self.recurse_is_bound(piece, row, col, None, None)
+        # Since every root tracks the locations it can grow into, a root is
+        # bound exactly when it has nowhere left to grow.
+        return not piece.data.growth
 
     def kill_root(self, piece):
 
-        # We could do this recursively, but we're lazy.
-        for r in range(self.size):
-            for c in range(self.size):
-                loc = self.layout.grid[r][c]
-                if loc == piece:
-                    self.layout.remove(r, c, update=False)
+        # Each root knows its own cells, so there's no need to scan the
+        # board to find them.
+        cells = piece.data.cells
+        for r, c in cells:
+            self.layout.remove(r, c, update=False)
         self.layout.update()
 
-        # Remove this root from the owner's root list.
+        # Remove this root from the owner's root list, then hand the freed
+        # locations out to any roots that can now grow into them.
         piece.data.owner.data.root_list.remove(piece)
+        piece.data.cells = set()
+        piece.data.growth = set()
+        self.update_growth_around(cells)
 
     def update_roots(self, row, col):
 
-        # If the piece at row, col is part of a bounded root, that root is killed.
+        # Add the new location to its root and update the growth points
+        # around it.  Only roots touching the changed locations can have
+        # lost growth points, so those are the only ones we check.
         piece = self.layout.grid[row][col]
+        piece.data.cells.add((row, col))
+        touched = self.update_growth_around([(row, col)])
+
+        # If the piece at row, col is part of a bounded root, that root is killed.
         if self.root_is_bound(piece):
             self.kill_root(piece)
 
             # -1 indicates a suicide.
             return -1
 
-        # Not a suicide; loop through all roots, finding bound ones.
-        bound_root_list = []
-        all_roots = self.black.data.root_list[:]
-        all_roots.extend(self.white.data.root_list)
-        for root in all_roots:
-            if self.root_is_bound(root):
-                bound_root_list.append(root)
+        # Not a suicide; find the bound roots among the ones we touched.
+        bound_root_list = [x for x in touched if self.root_is_bound(x)]
 
         bound_count = 0
         for bound_root in bound_root_list:
@@ -442,8 +458,45 @@ class Tanbo(SeatedGame):
         # No winner.
         return None
 
+    def encode_state(self, encoder):
+
+        super(Tanbo, self).encode_state(encoder)
+        encoder.write_varint(self.size)
+        self.encode_seats(encoder)
+        seats = [None] + self.seats
+        encoder.write_index(self.turn, seats)
+        encoder.write_index(self.resigner, seats)
+        self.layout.encode(encoder, [None] + self.roots)
+        for root in self.roots:
+            encoder.write_bool(root in root.data.owner.data.root_list)
+
+    def decode_state(self, decoder):
+
+        super(Tanbo, self).decode_state(decoder)
+        self.size = decoder.read_varint()
+        self.decode_seats(decoder)
+        seats = [None] + self.seats
+        self.turn = decoder.read_index(seats)
+        self.resigner = decoder.read_index(seats)
+        self.init_layout()
+        self.layout.decode(decoder, [None] + self.roots)
+        dead_roots = [x for x in self.roots if not decoder.read_bool()]
+        for root in dead_roots:
+            root.data.owner.data.root_list.remove(root)
+
+        # The roots' cells and growth points follow from the board.
+        locs = [(r, c) for r in range(self.size) for c in range(self.size)]
+        for root in self.roots:
+            root.data.cells = set()
+            root.data.growth = set()
+        for row, col in locs:
+            if self.layout.grid[row][col]:
+                self.layout.grid[row][col].data.cells.add((row, col))
+        self.update_growth_around(locs)
+
     def resolve(self, winner):
 
+        self.set_winners([winner])
         self.send_board()
         self.bc_pre("%s wins!\n" % self.get_sp_str(winner))
 
@@ -17,6 +17,8 @@
 # This file holds a number of functions useful for card games, specifically
 # trick-taking games such as Whist, Spades, Bridge, Bourre, Hokm, and Hearts.
 
+from itertools import islice
+
 from giles.games.hand import Hand
 
 def handle_trick(hand, trump_suit=None, last_wins=False):
@@ -58,7 +60,8 @@ def handle_trick(hand, trump_suit=None, last_wins=False):
     if led_suit == trump_suit:
         trumps_played = True
 
-    for this_card in hand[1:]:
+    # islice() rather than a slice, so we don't copy the hand every trick.
+    for this_card in islice(hand, 1, None):
 
         # We always evaluate trumps.
         if this_card.suit == trump_suit:
@@ -91,9 +94,9 @@ def handle_trick(hand, trump_suit=None, last_wins=False):
 def hand_has_suit(hand, suit):
 
     # Returns true if the hand has at least one card in a given suit.
-    cards_in_suit = [x for x in hand if x.suit == suit]
-    if len(cards_in_suit):
-        return True
+    for card in hand:
+        if card.suit == suit:
+            return True
     return False
 
 def sorted_hand(hand, trump_suit=None):
@@ -101,27 +104,14 @@ def sorted_hand(hand, trump_suit=None):
     remaining suits arbitrarily.  Returns this newly-sorted hand.
     """
 
-    trump_cards = Hand()
-    other_suits = {}
-    for card in hand:
-        this_suit = card.suit
-        if card.suit == trump_suit:
-            hand_to_add_to = trump_cards
-        else:
-            if this_suit not in other_suits:
-                other_suits[this_suit] = Hand()
-            hand_to_add_to = other_suits[this_suit]
-        hand_to_add_to.add(card)
-
-    # Now that they're sorted out, combine them back together.
-    s_hand = Hand()
-    trump_cards.sort()
-    for card in trump_cards:
+    # A single sort does the lot: trumps before everything else, then the
+    # other suits in name order, then the cards themselves within a suit.
+    # Hand subclasses get one of their own kind back.
+    if isinstance(hand, Hand):
+        s_hand = hand.__class__()
+    else:
+        s_hand = Hand()
+    for card in sorted(hand, key=lambda card: (card.suit != trump_suit,
+                                               card.suit, card)):
         s_hand.add(card)
-    for suit in sorted(other_suits.keys()):
-        suit_hand = other_suits[suit]
-        suit_hand.sort()
-        for card in suit_hand:
-            s_hand.add(card)
-
     return s_hand
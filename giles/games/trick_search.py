@@ -0,0 +1,308 @@
+# Giles: trick_search.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Determinized Monte Carlo search for the trick-taking bots.  The cards a
+# bot can't see are dealt out at random, in any way that fits the suits
+# each seat has shown it's out of, and the rest of the deal is played out
+# on each of those deals for every card the bot could play; the card that
+# does best across all of them is the one it plays.
+#
+# None of this touches the table's cards.  A card here is its suit times
+# thirteen plus its rank, deuce low and ace high, and a hand is a bitmask
+# of those, so playing out a deal shuffles a handful of integers about
+# and never builds a card, a Hand, or a string.
+
+from giles.games.playing_card import SUITS
+
+import random
+
+RANK_COUNT = 13
+RANK_CHARS = "23456789tjqka"
+SUIT_CHARS = "".join(x[0].lower() for x in SUITS)
+SUIT_MASKS = tuple(((1 << RANK_COUNT) - 1) << (x * RANK_COUNT)
+                   for x in range(len(SUITS)))
+
+# How many times to try dealing the unseen cards around everyone's voids
+# before dealing them without.
+DEAL_TRIES = 20
+
+def card_index(card):
+    return SUITS.index(card.suit) * RANK_COUNT + card.val - 2
+
+def index_to_str(index):
+    suit, rank = divmod(index, RANK_COUNT)
+    return RANK_CHARS[rank] + SUIT_CHARS[suit]
+
+def cards_to_mask(cards):
+
+    mask = 0
+    for card in cards:
+        mask |= 1 << card_index(card)
+    return mask
+
+def mask_to_list(mask):
+
+    indices = []
+    while mask:
+        low_bit = mask & -mask
+        indices.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return indices
+
+def get_deal(table, seat, undealt=()):
+    """Return what a seat can see of the deal at a trick-taking table: the
+    seat's index, each seat's known cards (only its own) and how many more
+    it holds or is yet to be dealt, each seat's voids as a mask of suits,
+    the mask of cards it can't see, the trump suit, and the leader and
+    cards of the trick so far.  The tables all keep their hands, trick,
+    trumps and turn the same way, and note the suits each seat has failed
+    to follow in seat.data.voids.  undealt is the stock still to be dealt
+    out evenly, if any.
+    """
+
+    me = table.seats.index(seat)
+    share = len(undealt) // len(table.seats)
+    known = []
+    extra = []
+    voids = []
+    unseen = cards_to_mask(undealt)
+    for other in table.seats:
+        if other is seat:
+            known.append(cards_to_mask(other.data.hand))
+            extra.append(share)
+        else:
+            known.append(0)
+            extra.append(len(other.data.hand) + share)
+            unseen |= cards_to_mask(other.data.hand)
+        void_mask = 0
+        for suit in other.data.voids:
+            void_mask |= 1 << SUITS.index(suit)
+        voids.append(void_mask)
+
+    if table.trump_suit:
+        trump = SUITS.index(table.trump_suit)
+    else:
+        trump = None
+    played = tuple(card_index(x) for x in table.trick)
+    leader = (me - len(played)) % len(table.seats)
+    return (me, tuple(known), tuple(extra), tuple(voids), unseen, trump,
+            leader, played)
+
+def get_unseen_cards(unseen, voids):
+
+    # The unseen cards, those of the suits the most seats are out of first,
+    # as they're the ones that leave the dealer with the least choice.
+    cards = mask_to_list(unseen)
+    cards.sort(key=lambda x: -sum((y >> (x // RANK_COUNT)) & 1 for y in voids))
+    return cards
+
+def deal_unseen(cards, known, extra, voids, hands, room):
+    """Deal the unseen cards out at random on top of the cards each seat is
+    known to hold, filling in hands, a list with a slot per seat, in place;
+    room is another, for scratch.  Each seat gets as many as it's short and
+    none of a suit it's out of, unless the voids can't be satisfied after
+    several tries, in which case they're ignored.
+    """
+
+    seat_count = len(known)
+    for attempt in range(DEAL_TRIES + 1):
+        use_voids = attempt < DEAL_TRIES
+        hands[:] = known
+        room[:] = extra
+        for card in cards:
+
+            # Every card goes to a seat with room for it in proportion to
+            # how much room it has, which is a fair deal when there are no
+            # voids to get in the way.
+            suit_bit = 1 << (card // RANK_COUNT)
+            total = 0
+            for seat in range(seat_count):
+                if not (use_voids and voids[seat] & suit_bit):
+                    total += room[seat]
+            if not total:
+                break
+            pick = random.randrange(total)
+            for seat in range(seat_count):
+                if not (use_voids and voids[seat] & suit_bit):
+                    pick -= room[seat]
+                    if pick < 0:
+                        break
+            hands[seat] |= 1 << card
+            room[seat] -= 1
+        else:
+            return
+
+def get_random_card(mask):
+
+    count = bin(mask).count("1")
+    for i in range(random.randrange(count)):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+def get_low_card(mask, trump):
+
+    # The lowest-ranked card in a mask, keeping trumps back if there's
+    # anything else.
+    low_card = None
+    low_rank = RANK_COUNT
+    for suit in range(len(SUIT_MASKS)):
+        bits = mask & SUIT_MASKS[suit]
+        if bits and suit != trump:
+            card = (bits & -bits).bit_length() - 1
+            if card - suit * RANK_COUNT < low_rank:
+                low_card = card
+                low_rank = card - suit * RANK_COUNT
+    if low_card is None:
+        low_card = (mask & -mask).bit_length() - 1
+    return low_card
+
+def pick_card(hand, seat, teams, trump, led, best, winner):
+    """Choose a card the way everyone plays in a playout: lead at random;
+    follow with the cheapest card that takes the trick, unless a partner
+    already has it; otherwise get rid of the lowest card going.
+    """
+
+    if led is None:
+        return get_random_card(hand)
+
+    suit_bits = hand & SUIT_MASKS[led]
+    legal = suit_bits or hand
+    if teams[winner] != teams[seat]:
+        best_suit = best // RANK_COUNT
+        higher = ~((2 << best) - 1)
+        if suit_bits:
+            if best_suit == led:
+                takers = suit_bits & higher
+            else:
+                takers = 0
+        elif trump is not None:
+            takers = hand & SUIT_MASKS[trump]
+            if best_suit == trump:
+                takers &= higher
+        else:
+            takers = 0
+        if takers:
+            return (takers & -takers).bit_length() - 1
+    return get_low_card(legal, trump)
+
+def get_trick_state(played, leader, seat_count, trump):
+
+    # The led suit, winning card and winning seat of a trick so far.
+    led = best = winner = None
+    seat = leader
+    for card in played:
+        suit = card // RANK_COUNT
+        if led is None:
+            led = suit
+            best = card
+            winner = seat
+        else:
+            best_suit = best // RANK_COUNT
+            if ((suit == best_suit and card > best) or
+               (suit == trump and best_suit != trump)):
+                best = card
+                winner = seat
+        seat = (seat + 1) % seat_count
+    return led, best, winner
+
+def play_out(hands, tricks, teams, trump, is_over, turn, led, best, winner,
+             count):
+    """Play a deal out from the middle of a trick, with count cards down so
+    far, taking the cards from hands and counting each seat's tricks in
+    tricks, both in place.  is_over(tricks, tricks_left), if given, says
+    whether the deal has been decided with tricks still to play.
+    """
+
+    seat_count = len(hands)
+    while True:
+        while count < seat_count:
+            hand = hands[turn]
+            card = pick_card(hand, turn, teams, trump, led, best, winner)
+            hands[turn] = hand & ~(1 << card)
+            suit = card // RANK_COUNT
+            if led is None:
+                led = suit
+                best = card
+                winner = turn
+            else:
+                best_suit = best // RANK_COUNT
+                if ((suit == best_suit and card > best) or
+                   (suit == trump and best_suit != trump)):
+                    best = card
+                    winner = turn
+            turn = (turn + 1) % seat_count
+            count += 1
+
+        tricks[winner] += 1
+        hand = hands[winner]
+        if not hand or (is_over and is_over(tricks, bin(hand).count("1"))):
+            return
+        turn = winner
+        led = None
+        count = 0
+
+def choose_card(deal, tricks, teams, score, is_over, should_stop):
+    """Choose a card to play for the seat whose turn it is, given the deal
+    as get_deal() sees it and each seat's tricks so far.  score(tricks)
+    is how good a finished deal is for the seat.  Returns the card index.
+    """
+
+    me, known, extra, voids, unseen, trump, leader, played = deal
+    seat_count = len(known)
+    led, best, winner = get_trick_state(played, leader, seat_count, trump)
+
+    hand = known[me]
+    if led is not None and hand & SUIT_MASKS[led]:
+        candidates = mask_to_list(hand & SUIT_MASKS[led])
+    else:
+        candidates = mask_to_list(hand)
+    if len(candidates) == 1:
+        return candidates[0]
+
+    # Every card is tried on the same deals, so that the luck of the deal
+    # falls on all of them alike.
+    hands = list(known)
+    sim_tricks = list(tricks)
+    totals = [0.0] * len(candidates)
+    for dealt in sample_deals(deal, should_stop):
+        for i, card in enumerate(candidates):
+            hands[:] = dealt
+            sim_tricks[:] = tricks
+            hands[me] &= ~(1 << card)
+            card_led, card_best, card_winner = get_trick_state(
+                played + (card,), leader, seat_count, trump)
+            play_out(hands, sim_tricks, teams, trump, is_over,
+                     (me + 1) % seat_count, card_led, card_best, card_winner,
+                     len(played) + 1)
+            totals[i] += score(sim_tricks)
+
+    return candidates[totals.index(max(totals))]
+
+def sample_deals(deal, should_stop):
+    """Deal the unseen cards out at random, as choose_card() does, until
+    should_stop() says to stop, yielding the hands of each deal; they're
+    the same list each time, so copy them before changing them.
+    """
+
+    me, known, extra, voids, unseen, trump, leader, played = deal
+    cards = get_unseen_cards(unseen, voids)
+    dealt = list(known)
+    room = list(extra)
+    samples = 0
+    while not samples or not should_stop():
+        deal_unseen(cards, known, extra, voids, dealt, room)
+        yield dealt
+        samples += 1
@@ -17,14 +17,17 @@
 from giles.games.four_player_card_game_layout import FourPlayerCardGameLayout, NORTH, SOUTH, EAST, WEST
 from giles.games.seated_game import SeatedGame
 from giles.games.hand import Hand
-from giles.games.playing_card import new_deck, str_to_card, card_to_str, hand_to_str, LONG
+from giles.games.playing_card import PlayingCardHand, cards_to_hand, code_to_card, new_deck, str_to_card, card_to_str, hand_to_str, LONG, SUITS
 from giles.games.seat import Seat
-from giles.games.trick import handle_trick, hand_has_suit, sorted_hand
+from giles.games.trick import handle_trick, sorted_hand
 from giles.state import State
 from giles.utils import Struct, get_plural_str
 
 TAGS = ["card", "partnership", "random", "trick", "trump", "4p"]
 
+# Trumps and the led suit are one of the suits or unset, for snapshots.
+SUIT_CHOICES = [None] + SUITS
+
 CONFIG_PARAMS = (
     ("goal", "Goal score to win"),
 )
@@ -54,6 +57,8 @@ class Whist(SeatedGame):
         self.prefix = "(^RWhist^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.whist.whist_bot"
+        self.snapshot_version = 2
 
         # Whist-specific guff.
         self.ns = Struct()
@@ -88,7 +93,7 @@ class Whist(SeatedGame):
 
     def display(self, player):
 
-        player.tell_cc("%s" % self.layout)
+        player.tell_cc(self.layout)
 
     def get_score_str(self):
         return "          ^RNorth/South^~: %d    ^MEast/West^~: %d\n" % (self.ns.score, self.ew.score)
@@ -115,6 +120,23 @@ class Whist(SeatedGame):
 
         return to_return
 
+    def get_gmcp_state(self):
+
+        state = super(Whist, self).get_gmcp_state()
+        state["scores"] = {"North/South": self.ns.score,
+                           "East/West": self.ew.score}
+        state["trump"] = self.trump_suit
+        return state
+
+    def get_gmcp_private_state(self, player):
+
+        # Seated players get their hand, and their legal plays on their turn.
+        seat = self.get_seat_of_player(player)
+        if not seat or getattr(seat.data, "hand", None) is None:
+            return None
+        may_play = self.state.get() == "playing" and seat == self.turn
+        return seat.data.hand.get_state(self.led_suit, may_play)
+
     def show(self, player):
         self.display(player)
         player.tell_cc(self.get_metadata())
@@ -153,13 +175,14 @@ class Whist(SeatedGame):
 
         self.bc_pre("^R%s^~ (%s%s^~) gives the cards a good shuffle...\n" % (dealer_name, self.get_color_code(self.dealer), self.dealer))
         deck = new_deck()
-        deck.shuffle()
+        deck.shuffle(self.random)
 
         # Deal out all of the cards.  We'll flip the last one; that determines
         # the trump suit for the hand.
         self.bc_pre("^R%s^~ deals the cards out to all the players.\n" % dealer_name)
         for seat in self.seats:
-            seat.data.hand = Hand()
+            seat.data.hand = PlayingCardHand()
+            seat.data.voids = []
         for i in range(13):
             for seat in self.seats:
                 seat.data.hand.add(deck.discard())
@@ -230,12 +253,17 @@ class Whist(SeatedGame):
 
             this_suit = potential_card.suit
             if (this_suit != self.led_suit and
-               hand_has_suit(seat.data.hand, self.led_suit)):
+               seat.data.hand.has_suit(self.led_suit)):
 
                 # You can't play off-suit if you can match the led suit.
                 self.tell_pre(player, "You can't throw off; you have the led suit.\n")
                 return False
 
+            # Throwing off shows everyone they're out of the led suit, which
+            # the bots take into account.
+            if this_suit != self.led_suit and self.led_suit not in seat.data.voids:
+                seat.data.voids.append(self.led_suit)
+
         else:
 
             # No led suit; they're the leader.
@@ -425,9 +453,65 @@ class Whist(SeatedGame):
     def resolve(self, winning_partnership):
 
         if self.ns == winning_partnership:
-            name_one = self.seats[0].player_name
-            name_two = self.seats[2].player_name
+            seat_one, seat_two = self.seats[0], self.seats[2]
         else:
-            name_one = self.seats[1].player_name
-            name_two = self.seats[3].player_name
+            seat_one, seat_two = self.seats[1], self.seats[3]
+        self.set_winners([seat_one, seat_two])
+        name_one = seat_one.player_name
+        name_two = seat_two.player_name
         self.bc_pre("^G%s^~ and ^G%s^~ win!\n" % (name_one, name_two))
+
+    def get_rating_sides(self):
+
+        return [[self.seats[0], self.seats[2]], [self.seats[1], self.seats[3]]]
+
+    def encode_state(self, encoder):
+
+        super(Whist, self).encode_state(encoder)
+        encoder.write_varint(self.goal)
+        self.encode_seats(encoder)
+        encoder.write_varint(self.ns.score)
+        encoder.write_varint(self.ew.score)
+
+        # Nothing else exists until the first deal.
+        dealt = self.dealer is not None
+        encoder.write_bool(dealt)
+        if dealt:
+            seats = [None] + self.seats
+            encoder.write_varint(self.ns.tricks)
+            encoder.write_varint(self.ew.tricks)
+            encoder.write_index(self.trump_suit, SUIT_CHOICES)
+            encoder.write_index(self.led_suit, SUIT_CHOICES)
+            encoder.write_index(self.turn, seats)
+            encoder.write_index(self.dealer, seats)
+            for seat in self.seats:
+                encoder.write_cards(seat.data.hand)
+                encoder.write_card(seat.data.card)
+                encoder.write_str_list(seat.data.voids)
+            encoder.write_cards(self.trick)
+        self.layout.encode(encoder)
+
+    def decode_state(self, decoder):
+
+        super(Whist, self).decode_state(decoder)
+        self.goal = decoder.read_varint()
+        self.decode_seats(decoder)
+        self.ns.score = decoder.read_varint()
+        self.ew.score = decoder.read_varint()
+
+        if decoder.read_bool():
+            seats = [None] + self.seats
+            self.ns.tricks = decoder.read_varint()
+            self.ew.tricks = decoder.read_varint()
+            self.trump_suit = decoder.read_index(SUIT_CHOICES)
+            self.led_suit = decoder.read_index(SUIT_CHOICES)
+            self.turn = decoder.read_index(seats)
+            self.dealer = decoder.read_index(seats)
+            for seat in self.seats:
+                seat.data.hand = cards_to_hand(decoder.read_cards(code_to_card))
+                seat.data.card = decoder.read_card(code_to_card)
+                seat.data.voids = decoder.read_str_list()
+            self.trick = Hand()
+            for card in decoder.read_cards(code_to_card):
+                self.trick.add(card)
+        self.layout.decode(decoder, code_to_card)
@@ -0,0 +1,43 @@
+# Giles: whist_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Whist bot.  Every trick over six scores, so the bot simply plays for
+# as many tricks for its side as it can get, by determinized Monte Carlo
+# search over the rest of the deal.
+
+from giles.games.trick_search import choose_card, get_deal, index_to_str
+
+# North and South are partners, as are East and West.
+TEAMS = (0, 1, 0, 1)
+
+def get_position(table, seat):
+
+    if table.state.get() != "playing" or table.turn != seat:
+        return None
+
+    # The table counts tricks by side; those are as good as by seat here.
+    return (get_deal(table, seat), (table.ns.tricks, table.ew.tricks, 0, 0))
+
+def choose_move(position, should_stop):
+
+    deal, tricks = position
+    side = TEAMS[deal[0]]
+
+    def score(sim_tricks):
+        return sim_tricks[side] + sim_tricks[side + 2]
+
+    card = choose_card(deal, tricks, TEAMS, score, None, should_stop)
+    return "play %s" % index_to_str(card)
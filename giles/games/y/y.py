@@ -15,8 +15,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from giles.utils import booleanize
-from giles.utils import demangle_move
+from giles.utils import demangle_move, get_snapshot
 from giles.state import State
+from giles.games.codec import CodecError
 from giles.games.seated_game import SeatedGame
 from giles.games.seat import Seat
 
@@ -42,6 +43,11 @@ BLACK = "black"
 
 COL_CHARACTERS = "abcdefghijklmnopqrstuvwxyz"
 
+# Everything a cell, the turn, or the resigner can be, and the kinds of
+# entries in the move list, for snapshots.
+SIDES = (None, WHITE, BLACK, INVALID)
+MOVE_KINDS = ("move", "swap", "resign")
+
 TAGS = ["abstract", "connection", "hex", "2p"]
 
 CONFIG_PARAMS = (
@@ -70,6 +76,7 @@ class Y(SeatedGame):
         self.prefix = "(^RY^~): "
         self.log_prefix = "%s/%s: " % (self.table_display_name, self.game_display_name)
         self.config_params = CONFIG_PARAMS
+        self.bot_engine = "giles.games.y.y_bot"
 
         # Y-specific guff.
         self.seats[0].data.color = WHITE
@@ -78,6 +85,9 @@ class Y(SeatedGame):
         self.seats[1].data.color_code = "^K"
         self.board = None
         self.printable_board = None
+        self.board_snapshot = None
+        self.compact_board = None
+        self.compact_snapshot = None
         self.size = 19
         self.empty_space_count = None
         self.master = False
@@ -214,6 +224,7 @@ class Y(SeatedGame):
     def update_printable_board(self):
 
         self.printable_board = []
+        self.compact_board = None
         slash_line = " "
         char_line = ""
         for x in range(self.size):
@@ -242,12 +253,39 @@ class Y(SeatedGame):
         self.printable_board.append(slash_line + "\n")
         self.printable_board.append(char_line + "\n")
 
+    def update_compact_board(self):
+
+        # The compact board is the same triangle pushed flush left: no
+        # indentation, no spacing, and just the letters across the top.
+        self.compact_board = ["   " + COL_CHARACTERS[:self.size] + "\n"]
+        for x in range(self.size):
+            msg = "%2d " % (x + 1)
+            for y in range(x + 1):
+                piece = self.board[y][x]
+                if (y, x) in self.last_moves:
+                    msg += "^5"
+                if piece == BLACK:
+                    msg += "^Kx^~"
+                elif piece == WHITE:
+                    msg += "^Wo^~"
+                elif y % 2 == 0:
+                    msg += "^m,^~"
+                else:
+                    msg += "^M.^~"
+            self.compact_board.append(msg + "\n")
+
     def print_board(self, player):
 
         if not self.printable_board:
             self.update_printable_board()
-        for line in self.printable_board:
-            player.tell_cc(line)
+        if player.config["compact_board"]:
+            if not self.compact_board:
+                self.update_compact_board()
+            self.compact_snapshot = get_snapshot(self.compact_snapshot, self.compact_board)
+            player.tell_cc(self.compact_snapshot)
+            return
+        self.board_snapshot = get_snapshot(self.board_snapshot, self.printable_board)
+        player.tell_cc(self.board_snapshot)
 
     def get_turn_str(self):
         if self.state.get() == "playing":
@@ -496,5 +534,57 @@ class Y(SeatedGame):
         for x_delta, y_delta in Y_DELTAS:
             self.update_adjacency(x + x_delta, y + y_delta, color)
 
+    def encode_state(self, encoder):
+
+        super(Y, self).encode_state(encoder)
+        encoder.write_varint(self.size)
+        encoder.write_bool(self.master)
+        self.encode_seats(encoder)
+        encoder.write_index(self.turn, SIDES)
+        encoder.write_varint(self.turn_number)
+        encoder.write_index(self.resigner, SIDES)
+        encoder.write_varint(self.empty_space_count)
+        encoder.write_choice_cells([x for column in self.board for x in column], SIDES)
+        encoder.write_int_list([x for move in self.last_moves for x in move])
+
+        # Moves in the move list are lists of coordinates, one or two of
+        # them depending on the mode; swaps and resignations are just words.
+        encoder.write_varint(len(self.move_list))
+        for move in self.move_list:
+            if isinstance(move, list):
+                encoder.write_index("move", MOVE_KINDS)
+                encoder.write_int_list([x for loc in move for x in loc])
+            else:
+                encoder.write_index(move, MOVE_KINDS)
+
+    def decode_state(self, decoder):
+
+        super(Y, self).decode_state(decoder)
+        self.size = decoder.read_varint()
+        self.master = decoder.read_bool()
+        self.decode_seats(decoder)
+        self.turn = decoder.read_index(SIDES)
+        self.turn_number = decoder.read_varint()
+        self.resigner = decoder.read_index(SIDES)
+        self.empty_space_count = decoder.read_varint()
+        cells = decoder.read_choice_cells(SIDES)
+        if len(cells) != self.size * self.size:
+            raise CodecError("Snapshot board is the wrong size.")
+        self.board = [cells[x * self.size:(x + 1) * self.size]
+                      for x in range(self.size)]
+        moves = decoder.read_int_list()
+        self.last_moves = zip(moves[::2], moves[1::2])
+
+        self.move_list = []
+        for i in range(decoder.read_varint()):
+            kind = decoder.read_index(MOVE_KINDS)
+            if kind == "move":
+                moves = decoder.read_int_list()
+                self.move_list.append(zip(moves[::2], moves[1::2]))
+            else:
+                self.move_list.append(kind)
+        self.update_printable_board()
+
     def resolve(self, winner):
+        self.set_winners([winner])
         self.channel.broadcast_cc(self.prefix + "^C%s^~ wins!\n" % (winner))
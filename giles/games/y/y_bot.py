@@ -0,0 +1,135 @@
+# Giles: y_bot.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Y bot.  Like Hex, a full Y board always has exactly one winner, so
+# playouts fill the board at random.  In Master Y each turn after the first
+# is two stones, which the search treats as two moves in a row by the same
+# player.
+
+from giles.games.y.y import COL_CHARACTERS, Y_DELTAS, WHITE, BLACK, INVALID
+from giles.games.search import monte_carlo
+
+import random
+
+# Cells are 0 for empty, the side's number, or 3 for the half of the
+# square the triangle doesn't use; (x, y) is x * size + y.
+SIDE_NUMBERS = {None: 0, WHITE: 1, BLACK: 2, INVALID: 3}
+
+_NEIGHBOR_CACHE = {}
+
+def get_neighbors(size):
+
+    if size in _NEIGHBOR_CACHE:
+        return _NEIGHBOR_CACHE[size]
+
+    neighbors = []
+    for x in range(size):
+        for y in range(size):
+            neighbors.append([(x + x_d) * size + y + y_d
+                              for x_d, y_d in Y_DELTAS
+                              if 0 <= x + x_d <= y + y_d < size])
+    _NEIGHBOR_CACHE[size] = neighbors
+    return neighbors
+
+def get_position(table, seat):
+
+    if table.state.get() != "playing" or table.turn != seat.data.color:
+        return None
+    cells = tuple(SIDE_NUMBERS[x] for column in table.board for x in column)
+    stones = 1
+    if table.master and table.turn_number > 1 and table.empty_space_count > 1:
+        stones = 2
+    return (table.size, cells, SIDE_NUMBERS[table.turn], stones, table.master)
+
+def get_winner(size, cells):
+
+    # Whoever has a group touching all three sides has won; if White
+    # doesn't, Black does.
+    neighbors = get_neighbors(size)
+    seen = set()
+    for start in range(size):
+        if cells[start] != 1 or start in seen:
+            continue
+        touch_bottom = touch_right = False
+        stack = [start]
+        while stack:
+            index = stack.pop()
+            if index in seen:
+                continue
+            seen.add(index)
+            x, y = divmod(index, size)
+            if y == size - 1:
+                touch_bottom = True
+            if x == y:
+                touch_right = True
+            stack.extend(z for z in neighbors[index] if cells[z] == 1)
+        if touch_bottom and touch_right:
+            return 1
+    return 2
+
+def choose_move(position, should_stop):
+
+    size, cells, mover, stones, master = position
+
+    # A state is the cells, who is to move, and how many stones they have
+    # left to place this turn.
+    def next_turn(side, stones_left):
+        if stones_left > 1:
+            return side, stones_left - 1
+        if master:
+            return 3 - side, 2
+        return 3 - side, 1
+
+    def get_mover(state):
+        return state[1]
+
+    def get_moves(state):
+        return [i for i, x in enumerate(state[0]) if not x]
+
+    def play(state, move):
+        new_cells = list(state[0])
+        new_cells[move] = state[1]
+        return (new_cells,) + next_turn(state[1], state[2])
+
+    def playout(state):
+        new_cells = list(state[0])
+        empty = [i for i, x in enumerate(new_cells) if not x]
+        random.shuffle(empty)
+        side, stones_left = state[1], state[2]
+        for index in empty:
+            new_cells[index] = side
+            side, stones_left = next_turn(side, stones_left)
+        return get_winner(size, new_cells)
+
+    state = (cells, mover, stones)
+    root = monte_carlo(state, get_mover, get_moves, play, playout, should_stop)
+
+    # A two-stone turn takes the best second stone the search found after
+    # the best first one.
+    moves = []
+    node = root
+    while len(moves) < stones:
+        node = node and node.get_best_child()
+        if node:
+            moves.append(node.move)
+        else:
+            moves.append(random.choice([x for x in get_moves(state)
+                                        if x not in moves]))
+    move_strs = []
+    for move in moves:
+        x, y = divmod(move, size)
+        move_strs.append("%s%d" % (COL_CHARACTERS[x], y + 1))
+    return "move %s" % " ".join(move_strs)
@@ -0,0 +1,158 @@
+# Giles: glicko.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# The Glicko-2 rating system, as laid out in Mark Glickman's "Example of
+# the Glicko-2 system".  Ratings are (rating, deviation, volatility)
+# tuples on the familiar Elo-like scale; every game is its own rating
+# period, so ratings move as soon as a game ends.
+
+import math
+
+DEFAULT_RATING = 1500.0
+DEFAULT_DEVIATION = 350.0
+DEFAULT_VOLATILITY = 0.06
+NEW_RATING = (DEFAULT_RATING, DEFAULT_DEVIATION, DEFAULT_VOLATILITY)
+
+# How much volatility can change; Glickman suggests 0.3 to 1.2, lower
+# for games where upsets are rarer.
+TAU = 0.5
+
+# Converts between the displayed scale and the one the maths works in.
+SCALE = 173.7178
+
+# How precisely the new volatility is found, and how many steps finding it
+# can take before settling for what it has; it usually takes a handful.
+EPSILON = 0.000001
+MAX_ITERATIONS = 100
+
+# Ratings with a deviation above this haven't settled yet.
+PROVISIONAL_DEVIATION = 110.0
+
+# What the score of a side was, by outcome.
+WIN_SCORE = 1.0
+DRAW_SCORE = 0.5
+LOSS_SCORE = 0.0
+
+def _g(phi):
+    return 1.0 / math.sqrt(1.0 + 3.0 * phi * phi / (math.pi * math.pi))
+
+def _expected(mu, opp_mu, opp_phi):
+    return 1.0 / (1.0 + math.exp(-_g(opp_phi) * (mu - opp_mu)))
+
+def _new_volatility(phi, sigma, delta, v):
+
+    # Step 5 of the paper: find the volatility where f(x) = 0 by the
+    # Illinois algorithm.
+    a = math.log(sigma * sigma)
+    phi2 = phi * phi
+    delta2 = delta * delta
+
+    def f(x):
+        ex = math.exp(x)
+        return (ex * (delta2 - phi2 - v - ex) /
+                (2.0 * (phi2 + v + ex) ** 2) - (x - a) / (TAU * TAU))
+
+    big_a = a
+    if delta2 > phi2 + v:
+        big_b = math.log(delta2 - phi2 - v)
+    else:
+        k = 1
+        while f(a - k * TAU) < 0 and k < MAX_ITERATIONS:
+            k += 1
+        big_b = a - k * TAU
+
+    f_a = f(big_a)
+    f_b = f(big_b)
+    iterations = 0
+    while abs(big_b - big_a) > EPSILON and iterations < MAX_ITERATIONS:
+        iterations += 1
+        big_c = big_a + (big_a - big_b) * f_a / (f_b - f_a)
+        f_c = f(big_c)
+        if f_c * f_b <= 0:
+            big_a, f_a = big_b, f_b
+        else:
+            f_a /= 2.0
+        big_b, f_b = big_c, f_c
+
+    return math.exp(big_a / 2.0)
+
+def rate(rating, results):
+    """Return the new rating of a player after a rating period.
+
+    results is a list of (opponent rating, score) pairs, where the score
+    is WIN_SCORE, DRAW_SCORE or LOSS_SCORE.  A player with no results
+    just grows less certain.
+    """
+
+    r, rd, sigma = rating
+    mu = (r - DEFAULT_RATING) / SCALE
+    phi = rd / SCALE
+
+    if not results:
+        phi = math.sqrt(phi * phi + sigma * sigma)
+        return (r, phi * SCALE, sigma)
+
+    inv_v = 0.0
+    improvement = 0.0
+    for opponent, score in results:
+        opp_mu = (opponent[0] - DEFAULT_RATING) / SCALE
+        opp_phi = opponent[1] / SCALE
+        g = _g(opp_phi)
+        e = _expected(mu, opp_mu, opp_phi)
+        inv_v += g * g * e * (1.0 - e)
+        improvement += g * (score - e)
+    v = 1.0 / inv_v
+    delta = v * improvement
+
+    sigma = _new_volatility(phi, sigma, delta, v)
+    phi_star = math.sqrt(phi * phi + sigma * sigma)
+    phi = 1.0 / math.sqrt(1.0 / (phi_star * phi_star) + 1.0 / v)
+    mu += phi * phi * improvement
+
+    return (mu * SCALE + DEFAULT_RATING, phi * SCALE, sigma)
+
+def combine(ratings):
+
+    # Stands a partnership in for a single player: the mean of their
+    # ratings, with the deviation of that mean, taking each rating as an
+    # independent estimate.  Volatility doesn't matter for an opponent.
+    count = float(len(ratings))
+    r = sum(x[0] for x in ratings) / count
+    rd = math.sqrt(sum(x[1] * x[1] for x in ratings)) / count
+    return (r, rd, DEFAULT_VOLATILITY)
+
+def rate_sides(side_ratings, side_scores):
+    """Rate a game between two sides of one or more players each.
+
+    side_ratings is a list of two lists of ratings; side_scores the score
+    each side got.  Every player is rated against the other side as a
+    whole.  Returns the new ratings in the same shape.
+    """
+
+    teams = [combine(x) for x in side_ratings]
+    new_ratings = []
+    for index, ratings in enumerate(side_ratings):
+        opponent = teams[1 - index]
+        score = side_scores[index]
+        new_ratings.append([rate(x, [(opponent, score)]) for x in ratings])
+    return new_ratings
+
+def get_rating_str(rating):
+
+    # Ratings that haven't settled get a question mark, as is traditional.
+    if rating[1] > PROVISIONAL_DEVIATION:
+        return "%d?" % int(round(rating[0]))
+    return "%d" % int(round(rating[0]))
@@ -0,0 +1,236 @@
+# Giles: journal.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import os.path
+import random
+import sys
+
+# Same hokiness as the account database.
+JOURNAL_PATH = os.path.join(sys.path[0], 'data', 'tables.journal')
+
+# Commands are whatever bytes the client sent, which needn't be valid UTF-8;
+# treating them as Latin-1 gets every byte through JSON and back unchanged.
+JOURNAL_ENCODING = "latin-1"
+
+# How long the random seeds journaled for tables are.
+SEED_BITS = 128
+
+# The journal is cut down to the live tables once the records of tables
+# that have ended take up at least this many bytes, and at least as many
+# as the live tables' do.
+COMPACT_MIN_BYTES = 1024 * 1024
+
+def _encode(record):
+
+    return json.dumps(record, encoding=JOURNAL_ENCODING, separators=(",", ":"))
+
+def _decode(record):
+
+    # Turns the unicode strings JSON hands back into the plain strings the
+    # rest of Giles expects.
+    return [x.encode(JOURNAL_ENCODING) if isinstance(x, unicode) else x
+            for x in record]
+
+def get_live_records(records, live_ids):
+
+    # The records needed to rebuild just the tables with the given ids:
+    # their own, and the leaves since the oldest of them was made.
+    first = len(records)
+    for index, record in enumerate(records):
+        if record[0] == "new" and record[1] in live_ids:
+            first = index
+            break
+    return [x for x in records[first:] if x[0] == "leave" or x[1] in live_ids]
+
+class AbsentPlayer(object):
+    """A stand-in for a player who was at a table when the server went down
+    and hasn't logged back in yet.  Tables rebuilt from the journal seat
+    these in place of the real players, who are swapped back in by name
+    when they return.  Anything said to an absent player goes nowhere.
+    """
+
+    def __init__(self, name, server):
+
+        self.name = name.lower()
+        self.display_name = name
+        self.server = server
+        self.location = None
+        self.config = {
+            "color": False,
+            "timestamps": False,
+            "focus_table": None,
+            "live_board": False,
+            "compact_board": False,
+        }
+
+    def __repr__(self):
+        return self.display_name
+
+    def tell(self, msg):
+        pass
+
+    def tell_cc(self, msg):
+        pass
+
+    def wants_gmcp(self, package):
+        return False
+
+    def send_gmcp(self, package, data=None):
+        pass
+
+    def prompt(self):
+        pass
+
+class Journal(object):
+    """An append-only record of everything needed to rebuild the running
+    tables: their creation, every command sent to them, the random seeds
+    those commands and any ticks used, players leaving, and tables ending.
+    All tables share one file, one JSON record per line, so that a flush
+    is a single write and a single fsync however many tables are busy.
+
+    Records are buffered by record() and only written out by flush(),
+    which the server calls on a timer; a crash loses at most one
+    interval's worth of moves.
+
+    The records of tables that have ended are dead weight.  The journal
+    keeps count of how many bytes they take up, and once should_compact()
+    says they're worth it, compact() rewrites it with just the live ones.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+
+        self.path = path
+        self.file = None
+        self.buffer = []
+        self.next_id = 1
+
+        # Bytes written for each live table, and in all, and for tables
+        # that have since ended.
+        self.table_bytes = {}
+        self.live_bytes = 0
+        self.dead_bytes = 0
+
+        # Seeds come from the system's own source of randomness, and are
+        # long enough that nobody can work one out from the cards they're
+        # dealt and so learn everyone else's.
+        self.seed_source = random.SystemRandom()
+
+    def new_seed(self):
+
+        return self.seed_source.getrandbits(SEED_BITS)
+
+    def new_table_id(self):
+
+        table_id = self.next_id
+        self.next_id += 1
+        return table_id
+
+    def read(self):
+
+        # Returns every intact record in the journal.  A crash can leave
+        # a partial last line, which is quietly dropped.
+        records = []
+        if not os.path.exists(self.path):
+            return records
+
+        journal_file = open(self.path, "rb")
+        for line in journal_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, list) and record:
+                records.append(_decode(record))
+        journal_file.close()
+
+        for record in records:
+            if record[0] == "new" and record[1] >= self.next_id:
+                self.next_id = record[1] + 1
+        return records
+
+    def rewrite(self, records):
+
+        # Replaces the journal with just the records given, safely: the
+        # new journal is synced to disk before it takes the old one's name.
+        # Leaves the journal open for appending.
+        self.close()
+        tmp_path = self.path + ".tmp"
+        journal_file = open(tmp_path, "wb")
+        self.table_bytes = {}
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        for record in records:
+            line = _encode(record)
+            journal_file.write(line + "\n")
+            self.count_bytes(record, len(line) + 1)
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+        journal_file.close()
+        os.rename(tmp_path, self.path)
+        self.open()
+
+    def open(self):
+
+        self.file = open(self.path, "ab")
+
+    def count_bytes(self, record, size):
+
+        # Leaves belong to no one table, and are too small to matter.
+        kind, table_id = record[0], record[1]
+        if kind == "leave":
+            return
+        if kind == "end":
+            self.dead_bytes += size + self.table_bytes.get(table_id, 0)
+            self.live_bytes -= self.table_bytes.pop(table_id, 0)
+            return
+        self.table_bytes[table_id] = self.table_bytes.get(table_id, 0) + size
+        self.live_bytes += size
+
+    def record(self, *record):
+
+        if self.file:
+            line = _encode(record)
+            self.buffer.append(line)
+            self.count_bytes(record, len(line) + 1)
+
+    def should_compact(self):
+
+        return (self.dead_bytes >= COMPACT_MIN_BYTES and
+                self.dead_bytes >= self.live_bytes)
+
+    def compact(self, live_ids):
+
+        # Cuts the journal down to the records of the tables with the
+        # given ids.
+        self.flush()
+        self.rewrite(get_live_records(self.read(), set(live_ids)))
+
+    def flush(self):
+
+        if self.file and self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.buffer = []
+
+    def close(self):
+
+        if self.file:
+            self.flush()
+            self.file.close()
+            self.file = None
@@ -26,6 +26,12 @@ class Log(object):
         else:
             self.prefix = ""
 
+        # Muted while tables are rebuilt from the journal, so that the
+        # replay doesn't log everything a second time.
+        self.muted = False
+
     def log(self, message):
+        if self.muted:
+            return
         timestamp = time.strftime("%Y%m%d.%H%M%S")
         print("%s [%s] %s" % (self.prefix, timestamp, message))
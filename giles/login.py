@@ -15,6 +15,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from giles.state import State
+from giles.utils import Struct
+
+# Passwords shorter than this aren't worth the hashing.
+MIN_PASSWORD_LENGTH = 4
+
+# The parts of logging in that need what the player has already told us.
+PENDING_SUBSTATES = ("password_entry", "checking_password",
+                     "new_password_entry", "confirm_password_entry",
+                     "registering")
 
 class Login(object):
 
@@ -22,13 +31,46 @@ class Login(object):
 
         self.server = server
 
+        # What each player part-way through logging in has told us so far.
+        self.pending = {}
+
+    def remove_player(self, player):
+
+        self.pending.pop(player, None)
+
+    def password_prompt(self, player, prompt_str="Password: "):
+
+        # Typed passwords come back as stars.
+        player.client.telnet_echo_password = True
+        player.tell(prompt_str)
+
+    def get_password(self, player):
+
+        password = player.client.get_command()
+        if password is not None:
+            player.client.telnet_echo_password = False
+        return password
+
+    def restart(self, player):
+
+        self.pending.pop(player, None)
+        player.client.telnet_echo_password = False
+        player.state.set_sub("entry_prompt")
+
     def handle(self, player):
 
         state = player.state
 
         substate = state.get_sub()
+        account_manager = self.server.account_manager
+        pending = self.pending.get(player)
+
+        if substate in PENDING_SUBSTATES and not pending:
 
-        if substate == None:
+            # Whatever they'd told us was lost, probably to an upgrade.
+            self.restart(player)
+
+        elif substate == None:
 
             # Just logged in.  Print the helpful banner.
             player.tell_cc("\n\n\n                       Welcome to ^G%s^~!\n\n" % self.server.name)
@@ -48,16 +90,119 @@ class Login(object):
             name = player.client.get_command()
             if name:
 
-                # Attempt to set their name to the one they requested.
-                is_valid = player.set_name(name)
+                name = name.strip()
+                if not player.check_name(name):
+                    state.set_sub("entry_prompt")
+
+                elif account_manager.is_registered(name):
 
-                if is_valid:
+                    # Someone's name.  Make sure it's theirs; if so, they get
+                    # it as it was registered.
+                    name = account_manager.get_account(name)[0]
+                    self.pending[player] = Struct({"name": name, "result": None})
+                    self.password_prompt(player)
+                    state.set_sub("password_entry")
 
-                    # Welcome them and move them to chat.
-                    player.tell("\nWelcome, %s!\n" % player)
-                    player.state = State("chat")
+                elif account_manager.conn:
 
-                    self.server.log.log("%s logged in from %s." % (player, player.client.addrport()))
+                    # A new name, which they can register if they like.
+                    self.pending[player] = Struct({"name": name, "result": None})
+                    player.tell("\nThe name %s is not registered.  To register it, choose a password;\nto play as a guest, just press enter.\n\n" % name)
+                    self.password_prompt(player, "Choose a password: ")
+                    state.set_sub("new_password_entry")
 
                 else:
-                    state.set_sub("entry_prompt")
+
+                    # No accounts to be had; everyone's a guest.
+                    self.finish(player, name)
+
+        elif substate == "password_entry":
+
+            password = self.get_password(player)
+            if password is not None:
+
+                # The hashing happens off the main loop; we'll check back.
+                pending.result = account_manager.check_password(pending.name, password)
+                state.set_sub("checking_password")
+
+        elif substate == "checking_password":
+
+            if pending.result.ready():
+                if pending.result.get():
+                    player.account = pending.name.lower()
+                    self.finish(player, pending.name)
+                else:
+                    player.tell("\nIncorrect password.\n")
+                    self.server.log.log("Failed login as %s from %s." % (pending.name, player.client.addrport()))
+                    self.restart(player)
+
+        elif substate == "new_password_entry":
+
+            password = self.get_password(player)
+            if password is not None:
+
+                if not password:
+
+                    # A guest, then.
+                    self.finish(player, pending.name)
+
+                elif len(password) < MIN_PASSWORD_LENGTH:
+                    player.tell("\nPasswords must be at least %d characters long.\n" % MIN_PASSWORD_LENGTH)
+                    self.password_prompt(player, "Choose a password: ")
+
+                else:
+                    pending.result = account_manager.hash_password(password)
+                    pending.password = password
+                    self.password_prompt(player, "Enter it again to confirm: ")
+                    state.set_sub("confirm_password_entry")
+
+        elif substate == "confirm_password_entry":
+
+            password = self.get_password(player)
+            if password is not None:
+
+                if password != pending.password:
+                    player.tell("\nThe passwords don't match.\n")
+                    pending.result = None
+                    self.password_prompt(player, "Choose a password: ")
+                    state.set_sub("new_password_entry")
+                else:
+                    pending.password = None
+                    state.set_sub("registering")
+
+        elif substate == "registering":
+
+            if pending.result.ready():
+                if account_manager.register(player, pending.name, pending.result.get()):
+                    player.tell("\nThe name %s is now registered to you.\n" % pending.name)
+                    self.finish(player, pending.name)
+                else:
+                    player.tell("\nSomeone else just registered that name.\n")
+                    self.restart(player)
+
+    def finish(self, player, name):
+
+        # Returns whether they made it in.
+        self.pending.pop(player, None)
+
+        # Attempt to set their name to the one they requested.
+        is_valid = player.set_name(name)
+
+        if is_valid:
+
+            # Welcome them and move them to chat.
+            player.tell("\nWelcome, %s!\n" % player)
+            player.state = State("chat")
+
+            self.server.log.log("%s logged in from %s." % (player, player.client.addrport()))
+
+            # If they were at any tables when the server went down,
+            # put them back, and back into any tournaments they're in.
+            self.server.game_master.reseat_player(player)
+            self.server.tournament_manager.reseat_player(player)
+
+        else:
+            player.account = None
+            player.state.set_sub("entry_prompt")
+
+        return is_valid
@@ -14,7 +14,15 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from giles.utils import name_is_valid, MAX_NAME_LENGTH
+from giles.utils import name_is_valid, Snapshot, Struct, MAX_NAME_LENGTH
+from miniboa.xterm import colorize, strip_caret_codes
+
+# DEC save/restore cursor, and the CSI sequences for moving the cursor up
+# and clearing a line.
+SAVE_CURSOR = "\x1b7"
+RESTORE_CURSOR = "\x1b8"
+CURSOR_UP = "\x1b[%dA"
+CLEAR_LINE = "\r\x1b[2K"
 
 class Player(object):
     """A player on Giles.  Tracks their name, current location, and other
@@ -38,15 +46,23 @@ class Player(object):
 
             "color": True,
             "timestamps": False,
+            "live_board": False,
+            "compact_board": False,
         }
         self.state = state
 
+        # The (lowercase) name of the account they logged in to, if any.
+        self.account = None
+
+        # The board last drawn in full, for live board updates.
+        self.live_board = None
+
     def __repr__(self):
         return self.display_name
 
-    def set_name(self, name):
+    def check_name(self, name):
 
-        name = name.strip()
+        # Returns whether the player could take this name right now.
         lower_name = name.lower()
 
         # Fail if:
@@ -69,6 +85,22 @@ class Player(object):
             self.server.log.log("%s attempted to change to non-valid name %s." % (self.name, name))
             return False
 
+        return True
+
+    def set_name(self, name):
+
+        name = name.strip()
+        lower_name = name.lower()
+        if not self.check_name(name):
+            return False
+
+        # Registered names belong to whoever logged in to them.
+        if (lower_name != self.account and
+           self.server.account_manager.is_registered(name)):
+            self.tell("That name is registered to someone else.\n")
+            self.server.log.log("%s attempted to change to registered name %s." % (self.name, name))
+            return False
+
         # Okay, the name looks legitimate.
         self.server.log.log("%s is now known as %s." % (self, name))
         self.display_name = name
@@ -94,13 +126,135 @@ class Player(object):
     def tell(self, msg):
         if self.config["timestamps"]:
             msg = "(%s) %s" % (self.server.timestamp, msg)
+        self.note_output(msg)
         self.client.send(msg)
 
     def tell_cc(self, msg):
+
+        # Layouts and boards hand over a shared snapshot, compact or not
+        # as the player likes, which carries its own colorized text; only
+        # the timestamp needs colorizing here.
+        if hasattr(msg, "get_snapshot"):
+            msg = msg.get_snapshot(self.config["compact_board"])
+        if isinstance(msg, Snapshot):
+
+            # A newer version of the board already on screen can be sent
+            # as just the lines that changed.
+            if self.send_board_delta(msg):
+                return
+
+            use_ansi = self.client.use_ansi
+            text = msg.encode(use_ansi)
+            if self.config["timestamps"]:
+                text = colorize("(^C%s^~) " % self.server.timestamp, use_ansi) + text
+            self.note_output(msg.text, msg, caret_coded=True)
+            self.client.send(text)
+            return
+
         if self.config["timestamps"]:
             msg = "(^C%s^~) %s" % (self.server.timestamp, msg)
+        self.note_output(msg, caret_coded=True)
         self.client.send_cc(msg)
 
+    def wants_gmcp(self, package):
+
+        # Only clients that negotiated GMCP and subscribed to the package
+        # get its messages.
+        return (hasattr(self.client, "has_gmcp") and self.client.has_gmcp()
+                and self.client.gmcp_supports_package(package))
+
+    def send_gmcp(self, package, data=None):
+
+        if self.wants_gmcp(package):
+            self.client.send_gmcp(package, data)
+
+    def live_board_is_usable(self):
+
+        # Live boards need the user to want them, ANSI to move the cursor
+        # with, and a window size so we know what's still on screen.
+        return (self.config["live_board"] and self.client.use_ansi and
+                hasattr(self.client, "has_naws") and self.client.has_naws())
+
+    def note_output(self, text, snapshot=None, caret_coded=False):
+
+        # Keeps count of the lines that have gone out since the live board
+        # was drawn, so we know how far up the screen it now is.  A board
+        # snapshot that ends a line can become the new live board.
+        if not self.live_board_is_usable():
+            self.live_board = None
+            return
+
+        if (snapshot and snapshot.lineage and text.endswith("\n")):
+            self.live_board = Struct()
+            self.live_board.lineage = snapshot.lineage
+            self.live_board.version = snapshot.version
+            self.live_board.lines = text.split("\n")[:-1]
+            self.live_board.lines_below = 0
+            self.live_board.size = (self.client.columns, self.client.rows)
+
+            # Timestamps go in front of the first line, if they're on.
+            self.live_board.timestamped = self.config["timestamps"]
+            return
+
+        if self.live_board:
+            if caret_coded:
+                text = strip_caret_codes(text)
+            columns = max(self.client.columns, 1)
+            lines = text.split("\n")
+            added = len(lines) - 1
+            for line in lines:
+                added += max(len(line) - 1, 0) // columns
+            self.live_board.lines_below += added
+
+    def note_input(self):
+
+        # The user hitting enter moves everything up a line, too.
+        if self.live_board:
+            self.live_board.lines_below += 1
+
+    def send_board_delta(self, snapshot):
+
+        # Returns True if the snapshot could be sent as a delta against the
+        # live board.  Anything that might have left the screen out of step
+        # with what we remember gets a full redraw instead: a different
+        # board, the same version again (someone asking to see it), a
+        # changed shape or window size, or lines that have scrolled away.
+        board = self.live_board
+        if (not board or not self.live_board_is_usable() or
+           board.lineage is not snapshot.lineage or
+           snapshot.version <= board.version or
+           board.size != (self.client.columns, self.client.rows) or
+           not snapshot.text.endswith("\n")):
+            return False
+
+        new_lines = snapshot.text.split("\n")[:-1]
+        count = len(new_lines)
+        if count != len(board.lines):
+            return False
+
+        changed = [i for i in range(count) if new_lines[i] != board.lines[i]]
+        if changed and board.lines_below + count - changed[0] >= self.client.rows:
+            return False
+
+        ansi_lines = snapshot.get_ansi_lines()
+        delta = [SAVE_CURSOR]
+        for i in changed:
+            delta.append(RESTORE_CURSOR)
+            delta.append(CURSOR_UP % (board.lines_below + count - i))
+            delta.append(CLEAR_LINE)
+
+            # Redrawing the first line wipes out its timestamp, too.
+            if i == 0 and board.timestamped:
+                delta.append(colorize("(^C%s^~) " % self.server.timestamp, True))
+            delta.append(ansi_lines[i])
+        delta.append(RESTORE_CURSOR)
+
+        board.version = snapshot.version
+        board.lines = new_lines
+        if changed:
+            self.client.send("".join(delta))
+        return True
+
     def prompt(self):
         if self.server.admin_manager.is_admin(self):
             loc_color_code = "^R"
@@ -0,0 +1,450 @@
+# Giles: results_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles import glicko
+from giles.bot_manager import BOT_NAME_PREFIX
+from giles.utils import get_plural_str
+
+import os.path
+import sqlite3
+import sys
+import time
+
+# Same hokiness as the account database.
+RESULTS_PATH = os.path.join(sys.path[0], 'data', 'results.db')
+
+# How each participant fared.
+WIN = "win"
+LOSS = "loss"
+DRAW = "draw"
+
+# How many games history shows.
+HISTORY_LENGTH = 10
+
+# Recomputing ratings reads the history this many participants at a time.
+RECOMPUTE_CHUNK_SIZE = 10000
+
+# The score a side gets for each outcome.
+OUTCOME_SCORES = {
+    WIN: glicko.WIN_SCORE,
+    DRAW: glicko.DRAW_SCORE,
+    LOSS: glicko.LOSS_SCORE,
+}
+
+# See the account manager; the same goes for the statements here.
+STATEMENT_CACHE_SIZE = 16
+
+INSERT_RESULT = """INSERT INTO results (game, game_display, table_name,
+    finished, duration, moves, snapshot) VALUES (?, ?, ?, ?, ?, ?, ?)"""
+INSERT_PARTICIPANT = """INSERT INTO participants (result_id, player,
+    display_name, seat, outcome, game, side) VALUES (?, ?, ?, ?, ?, ?, ?)"""
+REPLACE_RATING = """INSERT OR REPLACE INTO ratings (player, game, rating,
+    deviation, volatility) VALUES (?, ?, ?, ?, ?)"""
+SELECT_RATINGS = """SELECT game, rating, deviation, volatility FROM ratings
+    WHERE player = ?"""
+SELECT_RATED = """SELECT result_id, game, player, side, outcome
+    FROM participants WHERE side IS NOT NULL ORDER BY result_id"""
+
+# Both of these are answered from the participant indexes alone, however
+# many games everyone else has played.
+SELECT_HISTORY = """SELECT r.id, r.game_display, r.table_name, r.finished,
+    r.duration, r.moves, p.outcome FROM participants p
+    JOIN results r ON r.id = p.result_id
+    WHERE p.player = ? ORDER BY p.result_id DESC LIMIT ?"""
+SELECT_GAME_HISTORY = """SELECT r.id, r.game_display, r.table_name,
+    r.finished, r.duration, r.moves, p.outcome FROM participants p
+    JOIN results r ON r.id = p.result_id
+    WHERE p.player = ? AND p.game = ? ORDER BY p.result_id DESC LIMIT ?"""
+SELECT_OPPONENTS = """SELECT display_name FROM participants
+    WHERE result_id = ? AND (player IS NULL OR player != ?)"""
+SELECT_RECORD = """SELECT game, outcome, COUNT(*) FROM participants
+    WHERE player = ? GROUP BY game, outcome"""
+
+def create_tables(conn):
+
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS results (
+        id INTEGER PRIMARY KEY,
+        game TEXT,
+        game_display TEXT,
+        table_name TEXT,
+        finished INTEGER,
+        duration INTEGER,
+        moves INTEGER,
+        snapshot BLOB
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS participants (
+        result_id INTEGER,
+        player TEXT,
+        display_name TEXT,
+        seat TEXT,
+        outcome TEXT,
+        game TEXT,
+        side INTEGER
+    )""")
+
+    # Results kept before ratings existed have no sides, and stay unrated.
+    columns = [x[1] for x in cursor.execute("PRAGMA table_info(participants)")]
+    if "side" not in columns:
+        cursor.execute("ALTER TABLE participants ADD COLUMN side INTEGER")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS ratings (
+        player TEXT,
+        game TEXT,
+        rating REAL,
+        deviation REAL,
+        volatility REAL,
+        PRIMARY KEY (player, game)
+    )""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS participants_player
+        ON participants (player, result_id)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS participants_record
+        ON participants (player, game, outcome)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS participants_result
+        ON participants (result_id)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS results_game
+        ON results (game, id)""")
+    conn.commit()
+    cursor.close()
+
+def rate_result(ratings, game, participants):
+
+    # Moves the ratings of everyone in one result, given as (player, side,
+    # outcome) triples, and returns the keys of the ratings it changed.
+    # Ratings are kept in a dictionary keyed by (player, game).
+    sides = [[], []]
+    scores = [None, None]
+    for player, side, outcome in participants:
+        sides[side].append(player)
+        scores[side] = OUTCOME_SCORES[outcome]
+    if not sides[0] or not sides[1]:
+        return []
+
+    side_ratings = [[ratings.get((x, game), glicko.NEW_RATING) for x in y]
+                    for y in sides]
+    new_ratings = glicko.rate_sides(side_ratings, scores)
+    keys = []
+    for side, players in enumerate(sides):
+        for index, player in enumerate(players):
+            ratings[(player, game)] = new_ratings[side][index]
+            keys.append((player, game))
+    return keys
+
+def recompute_ratings(conn, chunk_size=RECOMPUTE_CHUNK_SIZE):
+    """Throw away every rating and work them all out again from the
+    recorded results, oldest first, as after a change to the formula.
+
+    Results are streamed from the database rather than read all at once,
+    so only the ratings themselves are held in memory.  Run this with the
+    server down; a running server would write its own ratings back.
+    Returns how many results were rated.
+    """
+
+    ratings = {}
+    count = 0
+    cursor = conn.execute(SELECT_RATED)
+    current_id = None
+    current_game = None
+    participants = []
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        for result_id, game, player, side, outcome in rows:
+            if result_id != current_id:
+                if participants:
+                    rate_result(ratings, current_game, participants)
+                    count += 1
+                current_id = result_id
+                current_game = game
+                participants = []
+            participants.append((player, side, outcome))
+        if not rows:
+            break
+    if participants:
+        rate_result(ratings, current_game, participants)
+        count += 1
+
+    with conn:
+        conn.execute("DELETE FROM ratings")
+        conn.executemany(REPLACE_RATING, [x + y for x, y in ratings.items()])
+    return count
+
+def get_duration_str(seconds):
+
+    minutes, seconds = seconds / 60, seconds % 60
+    if minutes < 60:
+        return "%d:%0.2d" % (minutes, seconds)
+    return "%d:%0.2d:%0.2d" % (minutes / 60, minutes % 60, seconds)
+
+class ResultsManager(object):
+    """Keeps the results of finished games: who sat where, who won, how
+    long it took, and the final state of the table, and answers players'
+    questions about them.  If the database can't be opened, nothing is
+    kept.
+
+    Results are written behind, like configs: record() only queues them,
+    and flush(), which the server calls on a timer, inserts everything
+    queued since the last flush in a single transaction.
+
+    Results are only kept under the names of registered players, and of
+    bots, whose names no player can take; anyone could use a guest's name
+    next, so guests go down unnamed.
+
+    Ratings move as each result is recorded.  Those of players who are
+    logged in stay in memory, so that listings can show them freely.
+    """
+
+    def __init__(self, server):
+
+        self.server = server
+        self.queue = []
+
+        # Ratings by (player, game), the players whose ratings have all been
+        # read in, and the ratings changed since the last flush.
+        self.ratings = {}
+        self.loaded = set()
+        self.dirty_ratings = set()
+
+        self.conn = None
+        self.open()
+
+    def log(self, message):
+        self.server.log.log("[RESULTS] %s" % message)
+
+    def open(self):
+
+        try:
+            self.conn = sqlite3.connect(RESULTS_PATH,
+                                        cached_statements=STATEMENT_CACHE_SIZE)
+            self.conn.text_factory = str
+            create_tables(self.conn)
+
+        except:
+            self.log("Unable to open results database.")
+            self.conn = None
+
+    def is_recorded(self, name):
+
+        # Whether results are kept under this name.
+        return (name.startswith(BOT_NAME_PREFIX.lower()) or
+                self.server.account_manager.is_registered(name))
+
+    def record(self, table):
+
+        # Queues the result of a finished table.  Tables that ended without
+        # one, such as those terminated partway through, have no winners
+        # set and are passed over.
+        if not self.conn or getattr(table, "winners", None) is None:
+            return
+
+        finished = time.time()
+        try:
+            snapshot = sqlite3.Binary(table.snapshot())
+        except Exception as e:
+            self.log("Unable to snapshot %s: %s" % (table, e))
+            snapshot = None
+
+        # Games that don't pit two sides against one another, such as
+        # three-way games, are kept but not rated.  Nor are games with a
+        # guest in them, as a guest's rating would go to whoever took the
+        # name next.
+        sides = {}
+        for index, side in enumerate(table.get_rating_sides() or []):
+            for seat in side:
+                sides[seat] = index
+        if any(x.player and not self.is_recorded(x.player.name)
+               for x in sides):
+            sides = {}
+
+        participants = []
+        rated = []
+        for seat in table.seats:
+            if not seat.player:
+                continue
+            if not table.winners:
+                outcome = DRAW
+            elif seat in table.winners:
+                outcome = WIN
+            else:
+                outcome = LOSS
+            side = sides.get(seat)
+            name = seat.player.name
+            if not self.is_recorded(name):
+                name = None
+            participants.append((name, repr(seat.player), seat.display_name,
+                                 outcome, table.game_name, side))
+            if side is not None:
+                self.load_ratings(seat.player.name)
+                rated.append((seat.player.name, side, outcome))
+
+        self.queue.append(((table.game_name, table.game_display_name,
+                            table.table_display_name, int(finished),
+                            int(finished - table.created), table.move_count,
+                            snapshot), participants))
+        if rated:
+            self.dirty_ratings.update(rate_result(self.ratings,
+                                                  table.game_name, rated))
+
+    def flush(self):
+
+        if not self.conn or not self.queue:
+            return
+
+        try:
+            with self.conn:
+                rows = []
+                for result, participants in self.queue:
+                    result_id = self.conn.execute(INSERT_RESULT, result).lastrowid
+                    rows.extend((result_id,) + x for x in participants)
+                self.conn.executemany(INSERT_PARTICIPANT, rows)
+                self.conn.executemany(REPLACE_RATING,
+                   [x + self.ratings[x] for x in self.dirty_ratings])
+        except sqlite3.Error as e:
+            self.log("Unable to save results: %s" % e)
+            return
+
+        self.queue = []
+        self.dirty_ratings = set()
+
+        # Only keep the ratings of players who are around to need them.
+        online = set(x.name for x in self.server.players)
+        for key in self.ratings.keys():
+            if key[0] not in online:
+                del self.ratings[key]
+        self.loaded &= online
+
+    def load_ratings(self, name):
+
+        # Reads in all of a player's ratings, once; the ones changed since
+        # the last flush are newer than what's saved.  Guests are never
+        # rated, whatever was once saved under their name.
+        if (name in self.loaded or not self.conn or
+           not self.is_recorded(name)):
+            return
+        for game, rating, deviation, volatility in self.conn.execute(SELECT_RATINGS, (name,)):
+            if (name, game) not in self.dirty_ratings:
+                self.ratings[(name, game)] = (rating, deviation, volatility)
+        self.loaded.add(name)
+
+    def get_rating(self, name, game):
+
+        self.load_ratings(name)
+        return self.ratings.get((name, game), glicko.NEW_RATING)
+
+    def get_rating_str(self, name, game):
+
+        return glicko.get_rating_str(self.get_rating(name, game))
+
+    def close(self):
+
+        self.flush()
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def show_history(self, player, name, game=None):
+
+        if not self.conn:
+            player.tell_cc("Game results aren't being kept right now.\n")
+            return
+
+        # Anything still queued should show up too.
+        self.flush()
+        lower_name = name.lower()
+        if game:
+            rows = self.conn.execute(SELECT_GAME_HISTORY,
+                    (lower_name, game.lower(), HISTORY_LENGTH)).fetchall()
+        else:
+            rows = self.conn.execute(SELECT_HISTORY,
+                    (lower_name, HISTORY_LENGTH)).fetchall()
+
+        if not rows:
+            player.tell_cc("^Y%s^~ has no recorded games.\n" % name)
+            return
+
+        player.tell_cc("\n^RRECENT GAMES^~ for ^Y%s^~:\n\n" % name)
+        for result_id, game_display, table_name, finished, duration, moves, outcome in rows:
+            opponents = [x[0] for x in self.conn.execute(SELECT_OPPONENTS,
+                                                         (result_id, lower_name))]
+            if outcome == WIN:
+                outcome_str = "^Gwon^~"
+            elif outcome == LOSS:
+                outcome_str = "^Rlost^~"
+            else:
+                outcome_str = "^Ydrew^~"
+            if opponents:
+                against_str = " against ^C%s^~" % "^~, ^C".join(opponents)
+            else:
+                against_str = ""
+            player.tell_cc("   %s ^M%s^~ (^R%s^~) %s%s; %s in %s.\n" %
+                           (time.strftime("%Y-%m-%d %H:%M", time.localtime(finished)),
+                            game_display, table_name, outcome_str, against_str,
+                            get_plural_str(moves, "move"),
+                            get_duration_str(duration)))
+        player.tell("\n")
+        self.log("%s requested the game history of %s." % (player, name))
+
+    def show_ratings(self, player, name):
+
+        if not self.conn:
+            player.tell_cc("Game results aren't being kept right now.\n")
+            return
+
+        lower_name = name.lower()
+        self.load_ratings(lower_name)
+        games = sorted(x[1] for x in self.ratings if x[0] == lower_name)
+        if not games:
+            player.tell_cc("^Y%s^~ has no ratings yet.\n" % name)
+            return
+
+        player.tell_cc("\n^RRATINGS^~ for ^Y%s^~:\n\n" % name)
+        for game in games:
+            rating = self.ratings[(lower_name, game)]
+            player.tell_cc("   ^M%s^~: ^C%s^~ (deviation %d)\n" %
+                           (game, glicko.get_rating_str(rating),
+                            int(round(rating[1]))))
+        player.tell("\n")
+        self.log("%s requested the ratings of %s." % (player, name))
+
+    def show_record(self, player, name):
+
+        if not self.conn:
+            player.tell_cc("Game results aren't being kept right now.\n")
+            return
+
+        self.flush()
+        records = {}
+        for game, outcome, count in self.conn.execute(SELECT_RECORD,
+                                                      (name.lower(),)):
+            records.setdefault(game, {})[outcome] = count
+
+        if not records:
+            player.tell_cc("^Y%s^~ has no recorded games.\n" % name)
+            return
+
+        player.tell_cc("\n^RWIN/LOSS RECORD^~ for ^Y%s^~:\n\n" % name)
+        total = {WIN: 0, LOSS: 0, DRAW: 0}
+        for game in sorted(records):
+            counts = records[game]
+            for outcome in total:
+                total[outcome] += counts.get(outcome, 0)
+            player.tell_cc("   ^M%s^~: ^G%d^~ won, ^R%d^~ lost, ^Y%d^~ drawn\n" %
+                           (game, counts.get(WIN, 0), counts.get(LOSS, 0),
+                            counts.get(DRAW, 0)))
+        player.tell_cc("\n   ^!Overall^.: ^G%d^~ won, ^R%d^~ lost, ^Y%d^~ drawn\n\n" %
+                       (total[WIN], total[LOSS], total[DRAW]))
+        self.log("%s requested the win/loss record of %s." % (player, name))
@@ -0,0 +1,292 @@
+# Giles: seek_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import bisect
+import itertools
+import time
+
+# Only games that two players can sit down to can be sought.
+SEEK_TAG = "2p"
+
+# How far from their own rating a seeker's opponent can be.  Seekers who
+# don't say get a narrow range to begin with, widened every time the
+# scheduler runs until it reaches the maximum.
+DEFAULT_SEEK_RANGE = 100
+SEEK_RANGE_STEP = 50
+MAX_SEEK_RANGE = 500
+
+# Tables made for matched seekers are named this and a number.
+MATCH_TABLE_PREFIX = "match"
+
+class Seek(object):
+    """One player looking for a game of one kind against someone rated
+    within some range of them.
+    """
+
+    def __init__(self, seek_id, player, game_key, rating, rating_range,
+                 widening):
+
+        self.seek_id = seek_id
+        self.player = player
+        self.game_key = game_key
+        self.rating = rating
+        self.rating_range = rating_range
+        self.widening = widening
+        self.created = time.time()
+
+    def get_key(self):
+        return (self.rating, self.seek_id)
+
+    def accepts(self, other):
+
+        # Both players have to be happy with the difference in ratings.
+        diff = abs(self.rating - other.rating)
+        return (self.player != other.player and diff <= self.rating_range
+                and diff <= other.rating_range)
+
+class SeekPool(object):
+    """The open seeks for a single game, kept sorted by rating so that the
+    closest opponents to any seeker are found with a binary search.
+    """
+
+    def __init__(self):
+
+        self.keys = []
+        self.seeks = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, seek):
+
+        bisect.insort(self.keys, seek.get_key())
+        self.seeks[seek.seek_id] = seek
+
+    def remove(self, seek):
+
+        index = bisect.bisect_left(self.keys, seek.get_key())
+        if index < len(self.keys) and self.keys[index] == seek.get_key():
+            del self.keys[index]
+            del self.seeks[seek.seek_id]
+
+    def find_match(self, seek):
+
+        # A seek that has already been withdrawn or matched can't be
+        # matched again.
+        if self.seeks.get(seek.seek_id) is not seek:
+            return None
+
+        # Walk outwards from the seeker's place in the pool, nearest
+        # rating first, until everyone left is out of their range.
+        index = bisect.bisect_left(self.keys, seek.get_key())
+        below = index - 1
+        above = index
+        while below >= 0 or above < len(self.keys):
+            below_diff = above_diff = None
+            if below >= 0:
+                below_diff = seek.rating - self.keys[below][0]
+            if above < len(self.keys):
+                above_diff = self.keys[above][0] - seek.rating
+            if above_diff is None or (below_diff is not None and
+                                      below_diff < above_diff):
+                diff = below_diff
+                other = self.seeks[self.keys[below][1]]
+                below -= 1
+            else:
+                diff = above_diff
+                other = self.seeks[self.keys[above][1]]
+                above += 1
+
+            if diff > seek.rating_range:
+                return None
+            if other is not seek and seek.accepts(other):
+                return other
+        return None
+
+class SeekManager(object):
+    """Pairs up players looking for a game with opponents of a similar
+    rating, makes them a table, and sits them down at it.
+
+    A new seek is matched straight away if it can be; the rest wait for
+    the scheduler, which the server runs on a timer, to widen their
+    ranges and try again.  Only the players involved hear about any of
+    it.
+    """
+
+    def __init__(self, server):
+
+        self.server = server
+        self.pools = {}
+        self.player_seeks = {}
+        self.seek_ids = itertools.count(1)
+        self.table_ids = itertools.count(1)
+
+    def log(self, message):
+        self.server.log.log("[SEEK] %s" % message)
+
+    def get_game_name(self, game_key):
+
+        # Ratings are kept under the name tables of a game give, which
+        # the game handle learns when the first one is made.
+        return self.server.game_master.games[game_key].game_name or game_key
+
+    def add_seek(self, player, game_key, rating_range=None):
+
+        # Adds a seek without trying to match it, replacing any the player
+        # already had for the game.
+        self.remove_seek(player, game_key)
+        rating = self.server.results_manager.get_rating(player.name,
+                        self.get_game_name(game_key))[0]
+        widening = rating_range is None
+        if widening:
+            rating_range = DEFAULT_SEEK_RANGE
+        seek = Seek(next(self.seek_ids), player, game_key, rating,
+                    rating_range, widening)
+        self.pools.setdefault(game_key, SeekPool()).add(seek)
+        self.player_seeks.setdefault(player, {})[game_key] = seek
+        return seek
+
+    def remove_seek(self, player, game_key):
+
+        seek = self.player_seeks.get(player, {}).pop(game_key, None)
+        if seek:
+            self.pools[game_key].remove(seek)
+            if not self.player_seeks[player]:
+                del self.player_seeks[player]
+        return seek
+
+    def get_seeks(self):
+
+        # Every open seek, oldest first.
+        return sorted((x for y in self.player_seeks.values() for x in y.values()),
+                      key=lambda x: x.created)
+
+    def remove_player(self, player):
+
+        for game_key in self.player_seeks.get(player, {}).keys():
+            self.remove_seek(player, game_key)
+
+    def seek(self, player, game_key, range_str=None):
+
+        game_master = self.server.game_master
+        game_key = game_key.lower()
+        if not game_master.is_game(game_key):
+            player.tell_cc("No such game ^R%s^~.\n" % game_key)
+            return False
+
+        handle = game_master.games[game_key]
+        if handle.admin_only and not self.server.admin_manager.is_admin(player):
+            player.tell_cc("You cannot seek ^R%s^~; it is admin-only.\n" % game_key)
+            return False
+        if SEEK_TAG not in handle.tags:
+            player.tell_cc("^R%s^~ isn't a two-player game; make a table and invite people instead.\n" % game_key)
+            return False
+
+        rating_range = None
+        if range_str:
+            if range_str.lower() == "any":
+                rating_range = float("inf")
+            elif range_str.isdigit():
+                rating_range = int(range_str)
+            else:
+                player.tell_cc("Invalid rating range ^R%s^~.\n" % range_str)
+                return False
+
+        seek = self.add_seek(player, game_key, rating_range)
+        if seek.widening:
+            range_msg = "within ^C%d^~ for now" % seek.rating_range
+        elif rating_range == float("inf"):
+            range_msg = "of any rating"
+        else:
+            range_msg = "within ^C%d^~" % seek.rating_range
+        player.tell_cc("You are now seeking a game of ^M%s^~ against someone %s.\n" % (game_key, range_msg))
+        self.log("%s is seeking %s (%d, range %s)." % (player, game_key, seek.rating, seek.rating_range))
+
+        other = self.pools[game_key].find_match(seek)
+        if other:
+            self.match(seek, other)
+        return True
+
+    def unseek(self, player, game_key=None):
+
+        if game_key:
+            game_keys = [game_key.lower()]
+        else:
+            game_keys = self.player_seeks.get(player, {}).keys()
+
+        removed = [x for x in game_keys if self.remove_seek(player, x)]
+        if removed:
+            player.tell_cc("You are no longer seeking ^M%s^~.\n" % "^~, ^M".join(sorted(removed)))
+            self.log("%s stopped seeking %s." % (player, ", ".join(removed)))
+        else:
+            player.tell_cc("You weren't seeking that.\n")
+
+    def list_seeks(self, player):
+
+        player.tell_cc("\n^RSEEKS^~:\n\n")
+        seeking = False
+        for game_key in sorted(self.pools):
+            pool = self.pools[game_key]
+            if pool:
+                seeking = True
+                mine = ""
+                if game_key in self.player_seeks.get(player, {}):
+                    mine = " (^Cincluding you^~)"
+                player.tell_cc("   ^M%s^~: %d seeking%s\n" % (game_key, len(pool), mine))
+        if not seeking:
+            player.tell_cc("   ^!Nobody is seeking a game right now.^.\n")
+        player.tell("\n")
+
+    def match(self, seek, other):
+
+        # Make the table in the name of whoever's been waiting longer, then
+        # sit them both down.  Joining goes through the game master like
+        # any other table command, so it's journaled.
+        if other.created < seek.created:
+            seek, other = other, seek
+        game_key = seek.game_key
+        for player in (seek.player, other.player):
+            self.remove_player(player)
+
+        game_master = self.server.game_master
+        table_name = game_master.get_free_table_name(MATCH_TABLE_PREFIX,
+                                                     self.table_ids)
+        if not game_master.new_table(seek.player, game_key, table_name,
+                                     "personal"):
+            other.player.tell_cc("Your match for ^M%s^~ fell through; seek again.\n" % game_key)
+            return False
+
+        for player, opponent in ((seek.player, other.player),
+                                 (other.player, seek.player)):
+            player.tell_cc("You have been matched with ^Y%s^~ for a game of ^M%s^~ at ^R%s^~.\n" % (opponent, game_key, table_name))
+            game_master.handle(player, table_name, "join")
+        self.log("Matched %s and %s for %s at %s." % (seek.player, other.player, game_key, table_name))
+        return True
+
+    def tick(self):
+
+        # Widen everyone's ranges a step, oldest seeks first, and try to
+        # match them again.  Matching a player withdraws all their other
+        # seeks, so skip any that are gone by the time we get to them.
+        for seek in self.get_seeks():
+            if self.player_seeks.get(seek.player, {}).get(seek.game_key) is not seek:
+                continue
+            if seek.widening and seek.rating_range < MAX_SEEK_RANGE:
+                seek.rating_range = min(seek.rating_range + SEEK_RANGE_STEP,
+                                        MAX_SEEK_RANGE)
+            other = self.pools[seek.game_key].find_match(seek)
+            if other:
+                self.match(seek, other)
@@ -23,6 +23,7 @@ import traceback
 
 from giles.account_manager import AccountManager
 from giles.admin_manager import AdminManager
+from giles.bot_manager import BotManager
 from giles.channel_manager import ChannelManager
 from giles.chat import Chat
 from giles.configurator import Configurator
@@ -32,7 +33,11 @@ from giles.location import Location
 from giles.log import Log
 from giles.login import Login
 from giles.player import Player
+from giles.results_manager import ResultsManager
+from giles.seek_manager import SeekManager
 from giles.state import State
+from giles.tournament_manager import TournamentManager
+from giles.upgrade import hand_off, load_handoff, restore_handoff
 
 # How many seconds and, if time is wonky, ticks should pass between cleanup
 # sweeps?  Tweak as appropriate; a tick should occur at very close to the
@@ -51,6 +56,31 @@ KEEPALIVE_INTERVAL_TICKS = 1500
 GAMEPLAY_INTERVAL_SECONDS = 0.5
 GAMEPLAY_INTERVAL_TICKS = 20
 
+# And flushing the table journal to disk?  This is the most play a crash
+# can lose.
+JOURNAL_INTERVAL_SECONDS = 1
+JOURNAL_INTERVAL_TICKS = 20
+
+# And saving changed player configs?  These are only preferences, so they
+# can wait a while and be written together.
+ACCOUNT_INTERVAL_SECONDS = 30
+ACCOUNT_INTERVAL_TICKS = 600
+
+# And saving the results of finished games?  Nobody's waiting on these
+# either, but a crash loses whatever hasn't been written.
+RESULTS_INTERVAL_SECONDS = 5
+RESULTS_INTERVAL_TICKS = 100
+
+# And pairing up players seeking games?  Every run widens the range of
+# ratings the waiting seekers will accept.
+SEEK_INTERVAL_SECONDS = 10
+SEEK_INTERVAL_TICKS = 200
+
+# And moving tournaments along?  A round that's over waits this long for
+# the next one to be paired.
+TOURNAMENT_INTERVAL_SECONDS = 2
+TOURNAMENT_INTERVAL_TICKS = 40
+
 class Server(object):
     """The Giles server itself.  Tracks all players, games in progress,
     and so on.
@@ -70,6 +100,7 @@ class Server(object):
         self.players = []
         self.spaces = []
         self.should_run = True
+        self.should_upgrade = False
         self.startup_datetime = None
         self.timestamp = None
         self.current_day = None
@@ -80,8 +111,12 @@ class Server(object):
         self.die_roller = DieRoller()
         self.configurator = Configurator()
         self.account_manager = AccountManager(self)
+        self.results_manager = ResultsManager(self)
         self.channel_manager = ChannelManager(self)
         self.game_master = GameMaster(self)
+        self.seek_manager = SeekManager(self)
+        self.tournament_manager = TournamentManager(self)
+        self.bot_manager = BotManager(self)
         self.chat = Chat(self)
         self.login = Login(self)
 
@@ -95,16 +130,34 @@ class Server(object):
         self.wall = self.channel_manager.channels[0]
         self.log.log("Server started up.")
 
+        # Bring back any tables that were running when we last went down,
+        # and the tournaments being played on them.
+        self.game_master.recover_tables()
+        self.tournament_manager.recover_tournaments()
+
     def instantiate(self, port, timeout=.05):
+
+        # If we were started by an upgrade, carry on with the old server's
+        # listening socket and connections rather than making new ones.
+        handoff = load_handoff()
         self.telnet = TelnetServer(
            port=port,
            address='',
            on_connect=self.connect_client,
            on_disconnect=self.disconnect_client,
-           timeout=timeout)
+           timeout=timeout,
+           server_socket=handoff and handoff["server_socket"])
         self.log.log("Listening on port %d." % port)
         self.startup_datetime = datetime.now()
         self.update_timestamp()
+        if handoff:
+            restore_handoff(self, handoff)
+
+    def upgrade(self):
+
+        # Only comes back if the upgrade failed.
+        hand_off(self)
+        self.should_upgrade = False
 
     def update_timestamp(self):
         old_timestamp = self.timestamp
@@ -120,6 +173,10 @@ class Server(object):
 
         cleanup_time = keepalive_time = gametick_time = time.time()
         cleanup_ticker = keepalive_ticker = gametick_ticker = 0
+        journal_time = account_time = results_time = cleanup_time
+        journal_ticker = account_ticker = results_ticker = 0
+        seek_time = tournament_time = cleanup_time
+        seek_ticker = tournament_ticker = 0
         while self.should_run:
             self.telnet.poll()
             self.handle_players()
@@ -147,6 +204,7 @@ class Server(object):
             if ((gametick_time + GAMEPLAY_INTERVAL_SECONDS <= curr_time) or
              ((gametick_ticker % GAMEPLAY_INTERVAL_TICKS) == 0)):
                 self.game_master.tick()
+                self.bot_manager.tick()
                 gametick_time = curr_time
                 gametick_ticker = 0
 
@@ -158,6 +216,48 @@ class Server(object):
                         self.announce_midnight()
                     self.update_prompts()
 
+            journal_ticker += 1
+            if ((journal_time + JOURNAL_INTERVAL_SECONDS <= curr_time) or
+             ((journal_ticker % JOURNAL_INTERVAL_TICKS) == 0)):
+                self.game_master.journal.flush()
+                journal_time = curr_time
+                journal_ticker = 0
+
+            account_ticker += 1
+            if ((account_time + ACCOUNT_INTERVAL_SECONDS <= curr_time) or
+             ((account_ticker % ACCOUNT_INTERVAL_TICKS) == 0)):
+                self.account_manager.flush()
+                account_time = curr_time
+                account_ticker = 0
+
+            results_ticker += 1
+            if ((results_time + RESULTS_INTERVAL_SECONDS <= curr_time) or
+             ((results_ticker % RESULTS_INTERVAL_TICKS) == 0)):
+                self.results_manager.flush()
+                results_time = curr_time
+                results_ticker = 0
+
+            seek_ticker += 1
+            if ((seek_time + SEEK_INTERVAL_SECONDS <= curr_time) or
+             ((seek_ticker % SEEK_INTERVAL_TICKS) == 0)):
+                self.seek_manager.tick()
+                seek_time = curr_time
+                seek_ticker = 0
+
+            tournament_ticker += 1
+            if ((tournament_time + TOURNAMENT_INTERVAL_SECONDS <= curr_time) or
+             ((tournament_ticker % TOURNAMENT_INTERVAL_TICKS) == 0)):
+                self.tournament_manager.tick()
+                tournament_time = curr_time
+                tournament_ticker = 0
+
+            if self.should_upgrade:
+                self.upgrade()
+
+        self.bot_manager.close()
+        self.game_master.journal.close()
+        self.account_manager.close()
+        self.results_manager.close()
         self.log.log("Server shutting down.")
 
     def connect_client(self, client):
@@ -174,14 +274,20 @@ class Server(object):
         client.request_will_echo()
         client.request_will_sga()
 
+        # Offer GMCP for clients that want game state out-of-band.
+        client.request_will_gmcp()
+
     def disconnect_client(self, client):
         self.log.log("Client disconnect on port %s." % client.addrport())
 
         for player in self.players:
             if client == player.client:
+                self.account_manager.remove_player(player)
                 self.admin_manager.remove_player(player)
+                self.login.remove_player(player)
                 self.channel_manager.remove_player(player)
                 self.game_master.remove_player(player)
+                self.seek_manager.remove_player(player)
                 self.players.remove(player)
                 if player.location:
                     player.location.remove_player(player, "^!%s^. has disconnected from the server.\n" % player)
@@ -0,0 +1,819 @@
+# Giles: tournament_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles.utils import Snapshot, Struct, get_plural_str, name_is_valid
+
+import cPickle
+import itertools
+import os
+import os.path
+import sys
+import time
+
+# Same hokiness as the account database.
+TOURNAMENT_PATH = os.path.join(sys.path[0], 'data', 'tournaments.dat')
+
+# After a crash, players get this long to log back in before any game
+# they aren't there for is forfeit.
+RECOVERY_WAIT_SECONDS = 120
+
+# Tournaments are played in two-player games.
+TOURNAMENT_TAG = "2p"
+
+SWISS = "swiss"
+ROUND_ROBIN = "rr"
+KNOCKOUT = "ko"
+STYLE_NAMES = {
+    SWISS: "Swiss",
+    ROUND_ROBIN: "round-robin",
+    KNOCKOUT: "knockout",
+}
+STYLE_ALIASES = {
+    "swiss": SWISS, "sw": SWISS,
+    "roundrobin": ROUND_ROBIN, "rr": ROUND_ROBIN,
+    "knockout": KNOCKOUT, "ko": KNOCKOUT,
+}
+
+# A game's result is the name of the player who won it, or this for a
+# draw.  Names are never empty.
+DRAW_RESULT = ""
+
+WIN_POINTS = 1.0
+DRAW_POINTS = 0.5
+BYE_POINTS = 1.0
+
+# Tables made for tournament games are named this and a number.
+TOURNAMENT_TABLE_PREFIX = "tn"
+
+class Tournament(object):
+    """One tournament: who's in it, what they've scored, and the games of
+    the round being played.  Players are tracked by name, so that none of
+    this refers to the connections they happen to be on.
+    """
+
+    def __init__(self, name, game_key, game_name, style, director, rounds):
+
+        self.name = name.lower()
+        self.display_name = name
+        self.game_key = game_key
+        self.game_name = game_name
+        self.style = style
+        self.director = director
+        self.rounds = rounds
+        self.state = "signup"
+
+        self.players = []
+        self.display_names = {}
+        self.seeds = {}
+        self.withdrawn = set()
+
+        self.scores = {}
+        self.opponents = {}
+        self.whites = {}
+        self.byes = set()
+        self.eliminated = {}
+        self.results = []
+
+        self.round = 0
+        self.pairings = []
+        self.schedule = None
+        self.standings = None
+
+    def __repr__(self):
+        return self.display_name
+
+    def add_player(self, name, display_name):
+
+        self.players.append(name)
+        self.display_names[name] = display_name
+
+    def remove_player(self, name):
+
+        self.players.remove(name)
+        del self.display_names[name]
+
+    def get_active(self):
+
+        return [x for x in self.players if x not in self.withdrawn and
+                x not in self.eliminated]
+
+    def get_default_rounds(self):
+
+        # A knockout takes as many rounds as it takes to halve the field
+        # down to one, which is also plenty for a Swiss to find a winner.
+        # Asking a Swiss for more rounds than a round robin would have
+        # only makes for rematches.
+        count = len(self.players)
+        all_play_all = count - 1 + count % 2
+        if self.style == ROUND_ROBIN:
+            return all_play_all
+        if self.style == SWISS and self.rounds:
+            return min(self.rounds, all_play_all)
+        return (count - 1).bit_length()
+
+    def start(self, seeds):
+
+        self.seeds = seeds
+        for name in self.players:
+            self.scores[name] = 0.0
+            self.opponents[name] = []
+            self.whites[name] = 0
+
+        # Seeding goes by rating at the start; everything after that goes
+        # by what happens here.
+        self.players.sort(key=lambda x: (-seeds[x], x))
+        self.rounds = self.get_default_rounds()
+        if self.style == ROUND_ROBIN:
+            self.schedule = get_round_robin_schedule(self.players)
+        self.state = "running"
+
+    def get_rank_key(self, name):
+        return (-self.scores[name], -self.seeds[name], name)
+
+    def pair_round(self):
+
+        # Returns the games of the next round as (white, black) pairs, with
+        # None as the black of a bye.
+        if self.style == ROUND_ROBIN:
+            games = self.schedule[self.round - 1]
+
+            # Withdrawn players forfeit what's left of their schedule;
+            # the bye goes to whoever would have been playing them.
+            paired = []
+            for white, black in games:
+                if white in self.withdrawn:
+                    white, black = black, None
+                elif black in self.withdrawn:
+                    black = None
+                if white and white not in self.withdrawn:
+                    paired.append((white, black))
+            return paired
+
+        if self.style == KNOCKOUT:
+            return pair_knockout(self.get_active(), self.byes)
+
+        ranked = sorted(self.get_active(), key=self.get_rank_key)
+        return pair_swiss(ranked, self.opponents, self.byes, self.whites)
+
+    def is_over(self):
+
+        if self.style == KNOCKOUT:
+            return len(self.get_active()) <= 1
+        return self.round >= self.rounds or len(self.get_active()) < 2
+
+    def score_round(self):
+
+        for pairing in self.pairings:
+            white, black = pairing.white, pairing.black
+            if black is None:
+                self.scores[white] += BYE_POINTS
+                self.byes.add(white)
+                continue
+
+            self.opponents[white].append(black)
+            self.opponents[black].append(white)
+            self.whites[white] += 1
+            self.results.append((white, black, pairing.result))
+            if pairing.result == DRAW_RESULT:
+                self.scores[white] += DRAW_POINTS
+                self.scores[black] += DRAW_POINTS
+            else:
+                self.scores[pairing.result] += WIN_POINTS
+                loser = black if pairing.result == white else white
+                if self.style == KNOCKOUT:
+                    self.eliminated[loser] = self.round
+
+    def get_tiebreaks(self):
+
+        # Swiss ties are broken by the strength of the opposition
+        # (Buchholz); round-robin ties, where everyone had the same
+        # opposition, by the strength of the players beaten
+        # (Sonneborn-Berger).
+        tiebreaks = dict((x, 0.0) for x in self.players)
+        if self.style == SWISS:
+            for name in self.players:
+                tiebreaks[name] = sum(self.scores[x] for x in self.opponents[name])
+        else:
+            for white, black, result in self.results:
+                if result == DRAW_RESULT:
+                    tiebreaks[white] += DRAW_POINTS * self.scores[black]
+                    tiebreaks[black] += DRAW_POINTS * self.scores[white]
+                elif result == white:
+                    tiebreaks[white] += self.scores[black]
+                else:
+                    tiebreaks[black] += self.scores[white]
+        return tiebreaks
+
+    def render_standings(self):
+
+        # Builds the standings once, when a round ends; everyone who asks
+        # until the next one is shown the same snapshot.
+        if self.state == "finished":
+            header = "Final standings"
+        else:
+            header = "Standings after round ^C%d^~ of ^C%d^~" % (self.round, self.rounds)
+        lines = ["\n%s for ^G%s^~ (^M%s^~, %s):\n\n" % (header, self.display_name,
+                 self.game_key, STYLE_NAMES[self.style])]
+
+        if self.style == KNOCKOUT:
+            ranked = sorted(self.players,
+                            key=lambda x: (-self.eliminated.get(x, self.round + 1),
+                                           -self.seeds[x], x))
+            for index, name in enumerate(ranked):
+                if name in self.withdrawn:
+                    status = "withdrew"
+                elif name in self.eliminated:
+                    status = "out in round %d" % self.eliminated[name]
+                elif self.state == "finished":
+                    status = "^Ywinner^~"
+                else:
+                    status = "still in"
+                lines.append("   %3d. ^Y%-16s^~ %s\n" % (index + 1, self.display_names[name], status))
+
+        else:
+            tiebreaks = self.get_tiebreaks()
+            ranked = sorted(self.players,
+                            key=lambda x: (-self.scores[x], -tiebreaks[x],
+                                           -self.seeds[x], x))
+            for index, name in enumerate(ranked):
+                withdrawn = ""
+                if name in self.withdrawn:
+                    withdrawn = " (withdrew)"
+                lines.append("   %3d. ^Y%-16s^~ ^C%4.1f^~  (%.2f)%s\n" % (index + 1,
+                             self.display_names[name], self.scores[name],
+                             tiebreaks[name], withdrawn))
+
+        lines.append("\n")
+        self.standings = Snapshot("".join(lines))
+
+def get_round_robin_schedule(players):
+
+    # The circle method: one player stays put while the rest rotate past
+    # them, so everyone meets everyone once.  With an odd number, whoever
+    # is drawn against the empty slot has the bye that round.  Colors
+    # alternate by round and board.
+    slots = list(players)
+    if len(slots) % 2:
+        slots.append(None)
+    count = len(slots)
+    schedule = []
+    for round_index in range(count - 1):
+        games = []
+        for index in range(count // 2):
+            white, black = slots[index], slots[count - 1 - index]
+            if (round_index + index) % 2:
+                white, black = black, white
+            if white is None:
+                white, black = black, white
+            games.append((white, black))
+        schedule.append(games)
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    return schedule
+
+def pair_knockout(active, byes):
+
+    # Top seed plays bottom seed, and so on inwards.  With an odd number
+    # left, the best seed who hasn't had a bye yet gets one.
+    active = list(active)
+    games = []
+    if len(active) % 2:
+        bye = next((x for x in active if x not in byes), active[0])
+        active.remove(bye)
+        games.append((bye, None))
+    count = len(active)
+    for index in range(count // 2):
+        games.append((active[index], active[count - 1 - index]))
+    return games
+
+def pair_swiss(ranked, opponents, byes, whites):
+
+    # Pairs each player, best first, with the best-ranked player below
+    # them that they haven't met, falling back on a rematch only if there
+    # is nobody else.  That never backtracks, so a round takes at worst
+    # quadratic time in the number of players rather than exponential;
+    # in practice almost everyone is paired within their score group on
+    # the first try.  The bye goes to the lowest-ranked player who hasn't
+    # had one.  Whoever has had white less gets it this time.
+    ranked = list(ranked)
+    games = []
+    if len(ranked) % 2:
+        bye = next((x for x in reversed(ranked) if x not in byes), ranked[-1])
+        ranked.remove(bye)
+        games.append((bye, None))
+
+    while ranked:
+        player = ranked.pop(0)
+        played = opponents[player]
+        index = next((i for i, x in enumerate(ranked) if x not in played), 0)
+        other = ranked.pop(index)
+        if whites[other] < whites[player]:
+            games.append((other, player))
+        else:
+            games.append((player, other))
+    return games
+
+class TournamentManager(object):
+    """Runs tournaments: signs players up, pairs them each round, makes
+    a table for every game of the round, and scores the round once every
+    game in it is over.
+
+    Results come in through the hook games call when they resolve; a
+    game whose table goes away without one counts as a draw, or in a
+    knockout is replayed.  The standings are rendered once a round and
+    shared by everyone who asks for them.
+
+    Players who disconnect stay in; they forfeit any game they aren't
+    around to start, and pick up where they were when they come back.
+
+    Tournaments that haven't finished are saved whole whenever they
+    change, and brought back after a crash once the journal has rebuilt
+    the tables their games are on.
+    """
+
+    def __init__(self, server):
+
+        self.server = server
+        self.tournaments = {}
+        self.table_pairings = {}
+        self.table_ids = itertools.count(1)
+        self.resume_time = 0
+
+    def log(self, message):
+        self.server.log.log("[TN] %s" % message)
+
+    def get_tournament(self, player, name):
+
+        tournament = self.tournaments.get(name.lower())
+        if not tournament:
+            player.tell_cc("No such tournament ^R%s^~.\n" % name)
+        return tournament
+
+    def can_direct(self, player, tournament):
+
+        if (player.name == tournament.director or
+           self.server.admin_manager.is_admin(player)):
+            return True
+        player.tell_cc("Only the director of ^G%s^~ can do that.\n" % tournament)
+        return False
+
+    def get_channel(self, tournament):
+        return self.server.channel_manager.has_channel(tournament.name)
+
+    def tell(self, name, msg):
+
+        player = self.server.get_player(name)
+        if player:
+            player.tell_cc(msg)
+
+    def handle(self, player, command_str):
+
+        # tournament [list]
+        # tournament new <name> <game> swiss|rr|ko [<rounds>]
+        # tournament join|leave|start|cancel|standings|pairings <name>
+        command_bits = command_str.split() if command_str else []
+        if not command_bits or command_bits[0].lower() in ('list', 'ls'):
+            self.list_tournaments(player)
+            return
+
+        primary = command_bits[0].lower()
+        other_bits = command_bits[1:]
+        if primary in ('new',) and len(other_bits) in (3, 4):
+            self.new_tournament(player, *other_bits)
+            return
+
+        if len(other_bits) != 1:
+            player.tell("Invalid tournament command.\n")
+            return
+        tournament = self.get_tournament(player, other_bits[0])
+        if not tournament:
+            return
+
+        if primary in ('join', 'j'):
+            self.join(player, tournament)
+        elif primary in ('leave', 'withdraw'):
+            self.leave(player, tournament)
+        elif primary in ('start',):
+            if self.can_direct(player, tournament):
+                self.start(player, tournament)
+        elif primary in ('cancel',):
+            if self.can_direct(player, tournament):
+                self.finish(tournament, "^G%s^~ has been cancelled by %s.\n" % (tournament, player))
+        elif primary in ('standings', 'st'):
+            self.show_standings(player, tournament)
+        elif primary in ('pairings', 'pa'):
+            self.show_pairings(player, tournament)
+        else:
+            player.tell("Invalid tournament command.\n")
+
+    def new_tournament(self, player, name, game_key, style_str, rounds_str=None):
+
+        game_master = self.server.game_master
+        game_key = game_key.lower()
+        if not name_is_valid(name):
+            player.tell_cc("Invalid tournament name.\n")
+            return False
+
+        existing = self.tournaments.get(name.lower())
+        if existing and existing.state != "finished":
+            player.tell_cc("A tournament named ^R%s^~ is already running.\n" % name)
+            return False
+
+        if not game_master.is_game(game_key):
+            player.tell_cc("No such game ^R%s^~.\n" % game_key)
+            return False
+        handle = game_master.games[game_key]
+        if handle.admin_only and not self.server.admin_manager.is_admin(player):
+            player.tell_cc("You cannot run a tournament of ^R%s^~; it is admin-only.\n" % game_key)
+            return False
+        if TOURNAMENT_TAG not in handle.tags:
+            player.tell_cc("Tournaments need a two-player game, which ^R%s^~ isn't.\n" % game_key)
+            return False
+
+        style = STYLE_ALIASES.get(style_str.lower())
+        if not style:
+            player.tell_cc("Invalid tournament style ^R%s^~; use swiss, rr, or ko.\n" % style_str)
+            return False
+
+        rounds = None
+        if rounds_str:
+            if style != SWISS or not rounds_str.isdigit() or not int(rounds_str):
+                player.tell_cc("Only Swiss tournaments take a number of rounds.\n")
+                return False
+            rounds = int(rounds_str)
+
+        # The tournament gets a channel of its own, where the rounds and
+        # standings are announced.
+        channel_manager = self.server.channel_manager
+        channel = channel_manager.has_channel(name)
+        if channel and existing:
+            channel.persistent = True
+        elif not channel_manager.add_channel(name, persistent=True):
+            player.tell_cc("A channel named ^R%s^~ already exists.\n" % name)
+            return False
+        channel_manager.connect(player, name)
+
+        tournament = Tournament(name, game_key, handle.game_name or game_key,
+                                style, player.name, rounds)
+        self.tournaments[tournament.name] = tournament
+        self.server.wall.broadcast_cc("%s is running a %s tournament of ^M%s^~ called ^G%s^~.\n" % (player, STYLE_NAMES[style], game_key, name))
+        self.log("%s created %s tournament %s of %s." % (player, style, name, game_key))
+        self.save()
+        return True
+
+    def join(self, player, tournament):
+
+        if tournament.state != "signup":
+            player.tell_cc("^G%s^~ isn't taking players any more.\n" % tournament)
+            return
+        if player.name in tournament.display_names:
+            player.tell_cc("You're already in ^G%s^~.\n" % tournament)
+            return
+
+        tournament.add_player(player.name, player.display_name)
+        self.server.channel_manager.connect(player, tournament.name)
+        self.get_channel(tournament).broadcast_cc("^Y%s^~ has joined; %s signed up.\n" % (player, get_plural_str(len(tournament.players), "player")))
+        self.log("%s joined tournament %s." % (player, tournament))
+        self.save()
+
+    def leave(self, player, tournament):
+
+        if player.name not in tournament.display_names:
+            player.tell_cc("You aren't in ^G%s^~.\n" % tournament)
+            return
+        self.withdraw(tournament, player.name)
+
+    def withdraw(self, tournament, name):
+
+        # Before the start, leaving is just leaving.  After it, a player
+        # who's still playing loses their game and isn't paired again.
+        display_name = tournament.display_names[name]
+        channel = self.get_channel(tournament)
+        if tournament.state == "signup":
+            tournament.remove_player(name)
+            channel.broadcast_cc("^Y%s^~ has left.\n" % display_name)
+        elif tournament.state == "running" and name not in tournament.withdrawn:
+            tournament.withdrawn.add(name)
+            if tournament.style == KNOCKOUT:
+                tournament.eliminated.setdefault(name, tournament.round)
+            for pairing in tournament.pairings:
+                if pairing.result is None and name in (pairing.white, pairing.black):
+                    pairing.result = pairing.black if name == pairing.white else pairing.white
+                    self.table_pairings.pop(pairing.table_name, None)
+            channel.broadcast_cc("^Y%s^~ has withdrawn.\n" % display_name)
+        else:
+            return
+        self.log("%s left tournament %s." % (display_name, tournament))
+        self.save()
+
+    def start(self, player, tournament):
+
+        if tournament.state != "signup":
+            player.tell_cc("^G%s^~ has already started.\n" % tournament)
+            return
+        if len(tournament.players) < 2:
+            player.tell_cc("^G%s^~ needs at least two players to start.\n" % tournament)
+            return
+
+        results_manager = self.server.results_manager
+        seeds = dict((x, results_manager.get_rating(x, tournament.game_name)[0])
+                     for x in tournament.players)
+        tournament.start(seeds)
+        self.get_channel(tournament).broadcast_cc("^G%s^~ has started: %s, %s.\n" % (tournament,
+                get_plural_str(len(tournament.players), "player"),
+                get_plural_str(tournament.rounds, "round")))
+        self.log("%s started tournament %s with %d players." % (player, tournament, len(tournament.players)))
+        self.start_round(tournament)
+        self.save()
+
+    def start_round(self, tournament):
+
+        tournament.round += 1
+        tournament.pairings = []
+        for board, (white, black) in enumerate(tournament.pair_round()):
+            pairing = Struct({"board": board + 1, "white": white,
+                              "black": black, "table_name": None,
+                              "result": None})
+            tournament.pairings.append(pairing)
+
+        self.get_channel(tournament).broadcast_cc("Round ^C%d^~ of ^C%d^~ is starting, with %s.\n" % (tournament.round, tournament.rounds, get_plural_str(len([x for x in tournament.pairings if x.black]), "game")))
+        for pairing in tournament.pairings:
+            if pairing.black is None:
+                pairing.result = pairing.white
+                self.tell(pairing.white, "You have a bye in round ^C%d^~ of ^G%s^~.\n" % (tournament.round, tournament))
+            elif not self.make_table(tournament, pairing):
+                return
+
+    def make_table(self, tournament, pairing):
+
+        # Both players are seated with the ordinary join command, through
+        # the game master, so the table's journal is like any other.
+        # Anyone who's not around to play loses this game, and only this
+        # one.  A knockout needs a winner even if neither is, so the
+        # higher seed goes through.
+        server = self.server
+        white = server.get_player(pairing.white)
+        black = server.get_player(pairing.black)
+        if not white or not black:
+            if white or black:
+                pairing.result = (white or black).name
+                absent = pairing.black if white else pairing.white
+                self.tell(pairing.result, "^Y%s^~ isn't here for round ^C%d^~ of ^G%s^~; you win by forfeit.\n" % (tournament.display_names[absent], tournament.round, tournament))
+            elif tournament.style == KNOCKOUT:
+                pairing.result = pairing.white
+            else:
+                pairing.result = DRAW_RESULT
+            return True
+
+        game_master = server.game_master
+        table_name = game_master.get_free_table_name(TOURNAMENT_TABLE_PREFIX,
+                                                     self.table_ids)
+        if not game_master.new_table(white, tournament.game_key, table_name,
+                                     "personal"):
+            self.finish(tournament, "^G%s^~ has been stopped; a table couldn't be made for it.\n" % tournament)
+            return False
+
+        pairing.table_name = table_name
+        self.table_pairings[table_name] = (tournament, pairing)
+        for player, opponent in ((white, black), (black, white)):
+            player.tell_cc("Round ^C%d^~ of ^G%s^~: you are playing ^Y%s^~ at ^R%s^~.\n" % (tournament.round, tournament, opponent, table_name))
+            game_master.handle(player, table_name, "join")
+        return True
+
+    def note_result(self, table):
+
+        # Called when a game resolves.  Seats are filled in the order the
+        # players joined, white first.
+        entry = self.table_pairings.pop(table.table_name, None)
+        if not entry:
+            return
+        tournament, pairing = entry
+        if not table.winners:
+            if tournament.style == KNOCKOUT:
+                self.replay(tournament, pairing)
+            else:
+                pairing.result = DRAW_RESULT
+        elif table.seats.index(table.winners[0]) == 0:
+            pairing.result = pairing.white
+        else:
+            pairing.result = pairing.black
+        self.save()
+
+    def remove_table(self, table):
+
+        # A table that goes away before its game resolved -- it crashed,
+        # or the players abandoned it -- has no winner.
+        entry = self.table_pairings.pop(table.table_name, None)
+        if entry:
+            tournament, pairing = entry
+            if tournament.style == KNOCKOUT:
+                self.replay(tournament, pairing)
+            else:
+                pairing.result = DRAW_RESULT
+            self.save()
+
+    def replay(self, tournament, pairing):
+
+        # Knockout games need a winner, so drawn ones are played again
+        # on a fresh table the next time the manager ticks.
+        pairing.table_name = None
+        for name in (pairing.white, pairing.black):
+            self.tell(name, "Your game in ^G%s^~ had no winner; it will be replayed.\n" % tournament)
+
+    def reseat_player(self, player):
+
+        # Players who disconnect stay in their tournaments; only leaving
+        # withdraws them.  When they log back in, they rejoin the channel,
+        # and the seat at any game of theirs that's still going, with the
+        # table's own replace command so that it's journaled.
+        game_master = self.server.game_master
+        for tournament in self.tournaments.values():
+            if (tournament.state == "finished" or
+               player.name not in tournament.display_names):
+                continue
+            self.server.channel_manager.connect(player, tournament.name)
+            for pairing in tournament.pairings:
+                if pairing.result is not None or not pairing.table_name:
+                    continue
+                if player.name not in (pairing.white, pairing.black):
+                    continue
+                table = game_master.get_table(pairing.table_name)
+                seat = table and table.seats[player.name != pairing.white]
+                if seat and not seat.player:
+                    game_master.handle(player, pairing.table_name,
+                                       "replace %s %s" % (seat.name, player.name))
+
+    def finish(self, tournament, msg):
+
+        for pairing in tournament.pairings:
+            self.table_pairings.pop(pairing.table_name, None)
+        tournament.state = "finished"
+        channel = self.get_channel(tournament)
+        if channel:
+            channel.broadcast_cc(msg)
+            channel.persistent = False
+        self.log("Tournament %s finished." % tournament)
+        self.save()
+
+    def tick(self):
+
+        if time.time() < self.resume_time:
+            return
+
+        changed = False
+        for tournament in self.tournaments.values():
+            if tournament.state != "running":
+                continue
+
+            pending = [x for x in tournament.pairings if x.result is None]
+            for pairing in pending:
+                if not pairing.table_name:
+                    changed = True
+                    if not self.make_table(tournament, pairing):
+                        break
+            if pending or tournament.state != "running":
+                continue
+
+            # Every game of the round is in, so score it, and tell
+            # everyone following along how things stand.
+            tournament.score_round()
+            over = tournament.is_over()
+            if over:
+                tournament.state = "finished"
+            tournament.render_standings()
+            channel = self.get_channel(tournament)
+            if channel:
+                for player in channel.listeners:
+                    player.tell_cc(tournament.standings)
+            if over:
+                self.finish(tournament, "^G%s^~ is over!\n" % tournament)
+            else:
+                self.start_round(tournament)
+                changed = True
+        if changed:
+            self.save()
+
+    def show_standings(self, player, tournament):
+
+        if not tournament.standings:
+            player.tell_cc("^G%s^~ has no standings until its first round is over.\n" % tournament)
+            return
+        player.tell_cc(tournament.standings)
+
+    def show_pairings(self, player, tournament):
+
+        if not tournament.pairings:
+            player.tell_cc("^G%s^~ hasn't started yet.\n" % tournament)
+            return
+
+        names = tournament.display_names
+        player.tell_cc("\nRound ^C%d^~ of ^G%s^~:\n\n" % (tournament.round, tournament))
+        for pairing in tournament.pairings:
+            if pairing.black is None:
+                player.tell_cc("   %3d. ^Y%s^~ has a bye.\n" % (pairing.board, names[pairing.white]))
+                continue
+            if pairing.result is None:
+                status = "playing at ^R%s^~" % pairing.table_name
+            elif pairing.result == DRAW_RESULT:
+                status = "drawn"
+            else:
+                status = "won by ^Y%s^~" % names[pairing.result]
+            player.tell_cc("   %3d. ^Y%s^~ vs. ^Y%s^~: %s\n" % (pairing.board, names[pairing.white], names[pairing.black], status))
+        player.tell("\n")
+
+    def list_tournaments(self, player):
+
+        player.tell_cc("\n^RTOURNAMENTS^~:\n\n")
+        found = False
+        for name in sorted(self.tournaments):
+            tournament = self.tournaments[name]
+            found = True
+            if tournament.state == "signup":
+                status = "signing up, %s" % get_plural_str(len(tournament.players), "player")
+            elif tournament.state == "running":
+                status = "round ^C%d^~ of ^C%d^~" % (tournament.round, tournament.rounds)
+            else:
+                status = "finished"
+            player.tell_cc("   ^G%s^~: %s ^M%s^~, %s\n" % (tournament, STYLE_NAMES[tournament.style], tournament.game_key, status))
+        if not found:
+            player.tell_cc("   ^!No tournaments are running.^.\n")
+        player.tell("\n")
+
+    def save(self):
+
+        # Writes out every tournament that hasn't finished.  They're small,
+        # so they're written whole, to a new file that's synced to disk
+        # before it takes the old one's name.
+        live = dict((x, y) for x, y in self.tournaments.items()
+                    if y.state != "finished")
+        tmp_path = TOURNAMENT_PATH + ".tmp"
+        try:
+            tournament_file = open(tmp_path, "wb")
+            cPickle.dump(live, tournament_file, cPickle.HIGHEST_PROTOCOL)
+            tournament_file.flush()
+            os.fsync(tournament_file.fileno())
+            tournament_file.close()
+            os.rename(tmp_path, TOURNAMENT_PATH)
+        except (IOError, OSError) as e:
+            self.log("Unable to save tournaments: %s" % e)
+
+    def recover_tournaments(self):
+
+        # Brings back the tournaments that were running when the server
+        # last went down, with their channels.  A game whose table didn't
+        # come back with the journal is played again from the start.
+        if not os.path.exists(TOURNAMENT_PATH):
+            return
+        try:
+            tournament_file = open(TOURNAMENT_PATH, "rb")
+            tournaments = cPickle.load(tournament_file)
+            tournament_file.close()
+        except Exception as e:
+            self.log("Unable to read the saved tournaments: %s" % e)
+            return
+
+        game_master = self.server.game_master
+        channel_manager = self.server.channel_manager
+        for tournament in tournaments.values():
+            self.tournaments[tournament.name] = tournament
+            channel = channel_manager.has_channel(tournament.name)
+            if channel:
+                channel.persistent = True
+            else:
+                channel_manager.add_channel(tournament.display_name,
+                                            persistent=True)
+            for pairing in tournament.pairings:
+                if pairing.result is not None or not pairing.table_name:
+                    continue
+                if game_master.get_table(pairing.table_name):
+                    self.table_pairings[pairing.table_name] = (tournament, pairing)
+                else:
+                    pairing.table_name = None
+        if tournaments:
+            self.resume_time = time.time() + RECOVERY_WAIT_SECONDS
+            self.log("Recovered %s." % get_plural_str(len(tournaments), "tournament"))
+
+    def get_handoff_state(self):
+
+        # Tournaments are plain data, so they go across an upgrade as they
+        # are, with the tables their games are on.
+        return (self.tournaments, self.table_pairings)
+
+    def restore_handoff_state(self, state):
+
+        # Nobody has to log back in after an upgrade, so there's nothing
+        # to wait for.
+        self.tournaments, self.table_pairings = state
+        self.resume_time = 0
@@ -0,0 +1,232 @@
+# Giles: upgrade.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Upgrading the server in place.  The running server writes out everything
+# about its connections that isn't in the table journal, then exec()s a
+# fresh copy of itself; file descriptors survive exec(), so the new server
+# picks up the listening socket and every client socket as they were, and
+# nobody gets disconnected.  Tables come back the same way they do after a
+# crash, by replaying the journal.
+
+from giles.journal import AbsentPlayer
+from giles.player import Player
+from giles.state import State
+
+import cPickle
+import fcntl
+import os
+import socket
+import sys
+import tempfile
+import traceback
+
+# Where the new server finds the state file, if it's taking over.
+UPGRADE_ENV = "GILES_UPGRADE_STATE"
+
+def _keep_on_exec(fd):
+
+    flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+    fcntl.fcntl(fd, fcntl.F_SETFD, flags & ~fcntl.FD_CLOEXEC)
+
+def _adopt_socket(fd):
+
+    # fromfd() duplicates the descriptor, so close the original.
+    sock = socket.fromfd(fd, socket.AF_INET, socket.SOCK_STREAM)
+    os.close(fd)
+    return sock
+
+def hand_off(server):
+    """Replace the running server with a freshly started copy of itself,
+    handing over every connection.  Only returns if that failed, in which
+    case the server carries on as it was.
+    """
+
+    closed = []
+    state_path = None
+    try:
+        state = get_handoff_state(server)
+
+        # The tables are rebuilt from the journal, so it had better be
+        # complete, and it's cut down to the live tables first so that the
+        # new server only replays those.  Config changes and game results
+        # waiting to be saved go out with their databases.  Bots thinking
+        # about a move start again afterwards, or on their own the next
+        # time they're needed if the upgrade fails.
+        server.bot_manager.close()
+        server.game_master.compact_journal()
+        for store in (server.game_master.journal, server.account_manager,
+                      server.results_manager):
+            closed.append(store)
+            store.close()
+
+        for fd in [state["server_fd"]] + [x["fd"] for x in state["players"]]:
+            _keep_on_exec(fd)
+
+        state_fd, state_path = tempfile.mkstemp(prefix="giles-upgrade-")
+        state_file = os.fdopen(state_fd, "wb")
+        cPickle.dump(state, state_file, cPickle.HIGHEST_PROTOCOL)
+        state_file.close()
+
+        os.environ[UPGRADE_ENV] = state_path
+        server.log.log("Handing off %d connection(s) to the new server." % len(state["players"]))
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    except Exception as e:
+        server.log.log("Upgrade failed: %s\n%s" % (e, traceback.format_exc()))
+        os.environ.pop(UPGRADE_ENV, None)
+        if state_path and os.path.exists(state_path):
+            os.remove(state_path)
+
+        # Reopen whatever was closed, even if closing it is what failed.
+        for store in closed:
+            try:
+                store.open()
+            except Exception as e:
+                server.log.log("Unable to reopen after the failed upgrade: %s" % e)
+        for admin in server.admin_manager.admins:
+            admin.tell_cc("^RThe upgrade failed^~; the server carries on as it was.  Check the log.\n")
+        return False
+
+def get_handoff_state(server):
+
+    # Everything about the server the journal doesn't cover, ready to be
+    # pickled.  Players are referred to by their index in the player list.
+    players = list(server.players)
+    player_state = []
+    for player in players:
+        client = player.client
+        player_state.append({
+            "fd": client.fileno,
+            "address": (client.address, client.port),
+            "client": client.get_handoff_state(),
+            "display_name": player.display_name,
+            "account": player.account,
+            "config": player.config,
+            "state": (player.state.get(), player.state.get_sub()),
+            "location": player.location and player.location.name,
+        })
+
+    channel_state = []
+    for channel in server.channel_manager.channels:
+        channel_state.append({
+            "display_name": channel.display_name,
+            "persistent": channel.persistent,
+            "notifications": channel.notifications,
+            "gameable": channel.gameable,
+            "key": channel.key,
+            "listeners": [players.index(x) for x in channel.listeners
+                          if x in players],
+        })
+
+    return {
+        "server_fd": server.telnet.server_fileno,
+        "startup_datetime": server.startup_datetime,
+        "players": player_state,
+        "channels": channel_state,
+        "admins": [players.index(x) for x in server.admin_manager.admins
+                   if x in players],
+        "seeks": [(players.index(x.player), x.game_key, x.rating_range,
+                   x.widening, x.created)
+                  for x in server.seek_manager.get_seeks()
+                  if x.player in players],
+        "tournaments": server.tournament_manager.get_handoff_state(),
+    }
+
+def load_handoff():
+    """If this server was started by hand_off(), return the state the old
+    server left, with the listening socket ready for use as "server_socket".
+    Otherwise, return None.
+    """
+
+    state_path = os.environ.pop(UPGRADE_ENV, None)
+    if not state_path:
+        return None
+
+    state_file = open(state_path, "rb")
+    state = cPickle.load(state_file)
+    state_file.close()
+    os.remove(state_path)
+
+    state["server_socket"] = _adopt_socket(state["server_fd"])
+    return state
+
+def restore_handoff(server, state):
+    """Bring back the players, channels, and admins the old server had,
+    with the state returned by load_handoff().  The telnet server must
+    already be running on the handed-over listening socket.
+    """
+
+    if state["startup_datetime"]:
+        server.startup_datetime = state["startup_datetime"]
+
+    players = []
+    for saved in state["players"]:
+        sock = _adopt_socket(saved["fd"])
+        client = server.telnet.adopt_client(sock, saved["address"],
+                                            saved["client"])
+        player = Player(client, server, saved["display_name"])
+
+        # Updating the config, rather than replacing it, keeps the defaults
+        # for any settings the new code added.
+        player.config.update(saved["config"])
+        player.account = saved.get("account")
+        server.account_manager.track(player)
+        primary, secondary = saved["state"]
+        player.state = State(primary)
+        player.state.set_sub(secondary)
+        if saved["location"]:
+            player.location = server.get_space(saved["location"])
+            player.location.players.append(player)
+        server.players.append(player)
+        players.append(player)
+
+    # Seat the players at the tables the journal rebuilt before restoring
+    # the channels, so that the table channels end up as they were.
+    for player in players:
+        if player.state.get() != "login":
+            server.game_master.reseat_player(player, notify=False)
+
+    channel_manager = server.channel_manager
+    for saved in state["channels"]:
+        channel = channel_manager.has_channel(saved["display_name"])
+        if not channel:
+            channel = channel_manager.add_channel(saved["display_name"],
+                    saved["persistent"], saved["notifications"],
+                    saved["gameable"], saved["key"])
+            if not channel:
+                continue
+        channel.listeners = ([players[x] for x in saved["listeners"]] +
+                             [x for x in channel.listeners
+                              if isinstance(x, AbsentPlayer)])
+
+    for index in state["admins"]:
+        server.admin_manager.admins.append(players[index])
+
+    # Seeks keep their place in the queue, and however far they'd widened.
+    for index, game_key, rating_range, widening, created in state.get("seeks", []):
+        if server.game_master.is_game(game_key):
+            seek = server.seek_manager.add_seek(players[index], game_key,
+                                                rating_range)
+            seek.widening = widening
+            seek.created = created
+
+    if "tournaments" in state:
+        server.tournament_manager.restore_handoff_state(state["tournaments"])
+
+    # The clients still have their prompts, which get redrawn after this.
+    for player in players:
+        player.tell_cc("^GThe server has been upgraded.^~\n")
+    server.log.log("Took over %d connection(s) from the old server." % len(players))
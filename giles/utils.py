@@ -16,6 +16,8 @@
 
 import functools
 
+from miniboa.xterm import colorize
+
 class Struct(object):
     # Empty class, useful for making "structs."
 
@@ -26,6 +28,77 @@ class Struct(object):
         for attribute in attributes:
             setattr(self, attribute, attributes[attribute])
 
+class Snapshot(object):
+    """A finished piece of caret-coded text, such as a rendered board, that
+    remembers its colorized forms.  Snapshots are never modified; a changed
+    board gets a new snapshot with a higher version.  Telling the same
+    snapshot to any number of players colorizes it at most once with ANSI
+    codes and once without.
+
+    Successive snapshots of the same board share a lineage, which is what
+    lets live boards know that a new snapshot replaces one already on a
+    player's screen.
+    """
+
+    __slots__ = ("text", "version", "parts", "lineage", "ansi_text",
+                 "plain_text", "ansi_lines")
+
+    def __init__(self, text, version=0, parts=None, lineage=None):
+
+        self.text = text
+        self.version = version
+        self.parts = parts
+        self.lineage = lineage
+        self.ansi_text = None
+        self.plain_text = None
+        self.ansi_lines = None
+
+    def __repr__(self):
+        return self.text
+
+    def __str__(self):
+        return self.text
+
+    def encode(self, ansi=True):
+
+        if ansi:
+            if self.ansi_text is None:
+                self.ansi_text = colorize(self.text, True)
+            return self.ansi_text
+        if self.plain_text is None:
+            self.plain_text = colorize(self.text, False)
+        return self.plain_text
+
+    def get_ansi_lines(self):
+
+        # The ANSI version of each line on its own, for redrawing lines
+        # individually.
+        if self.ansi_lines is None:
+            self.ansi_lines = [colorize(x, True) for x in self.text.split("\n")]
+        return self.ansi_lines
+
+def get_snapshot(previous, parts):
+
+    # Returns a snapshot of the given list of caret-coded strings.  If the
+    # previous snapshot was made from these very same strings, it's still
+    # good, and is handed back as-is; otherwise we make a new one.  Boards
+    # build fresh strings for anything that changes, so checking identity
+    # is enough (and much cheaper than comparing the text).
+    if previous and previous.parts and len(previous.parts) == len(parts):
+        for old, new in zip(previous.parts, parts):
+            if old is not new:
+                break
+        else:
+            return previous
+
+    version = 0
+    lineage = object()
+    if previous:
+        version = previous.version + 1
+        lineage = previous.lineage
+    parts = tuple(parts)
+    return Snapshot("".join(parts), version, parts, lineage)
+
 def booleanize(msg):
     # This returns:
     # -1 for False
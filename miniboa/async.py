@@ -55,7 +55,7 @@ class TelnetServer(object):
     Poll sockets for new connections and sending/receiving data from clients.
     """
     def __init__(self, port=7777, address='', on_connect=_on_connect,
-            on_disconnect=_on_disconnect, timeout=0.005):
+            on_disconnect=_on_disconnect, timeout=0.005, server_socket=None):
         """
         Create a new Telnet Server.
 
@@ -75,6 +75,10 @@ class TelnetServer(object):
 
         timeout -- amount of time that Poll() will wait from user inport
             before returning.  Also frees a slice of CPU time.
+
+        server_socket -- an already-listening socket to use instead of
+            binding a new one, such as one handed over by a previous
+            process.
         """
 
         self.port = port
@@ -83,14 +87,15 @@ class TelnetServer(object):
         self.on_disconnect = on_disconnect
         self.timeout = timeout
 
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        try:
-            server_socket.bind((address, port))
-            server_socket.listen(5)
-        except socket.error, err:
-            print >> sys.stderr, "Unable to create the server socket:", err
-            sys.exit(1)
+        if not server_socket:
+            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                server_socket.bind((address, port))
+                server_socket.listen(5)
+            except socket.error, err:
+                print >> sys.stderr, "Unable to create the server socket:", err
+                sys.exit(1)
 
         self.server_socket = server_socket
         self.server_fileno = server_socket.fileno()
@@ -112,6 +117,17 @@ class TelnetServer(object):
         return self.clients.values()
 
 
+    def adopt_client(self, sock, addr_tup, state):
+        """
+        Add a client whose connection was handed over from another process,
+        restoring it from the state it had there.  Returns the client; the
+        on_connect handler is not called.
+        """
+        client = TelnetClient(sock, addr_tup)
+        client.set_handoff_state(state)
+        self.clients[client.fileno] = client
+        return client
+
     def poll(self):
         """
         Perform a non-blocking scan of recv and send states on the server
@@ -20,6 +20,7 @@
 Manage one Telnet client connected via a TCP/IP socket.
 """
 
+import json
 import socket
 import time
 
@@ -98,6 +99,11 @@ SGA     = chr(  3)      # Suppress Go-Ahead
 TTYPE   = chr( 24)      # Terminal Type
 NAWS    = chr( 31)      # Negotiate About Window Size
 LINEMO  = chr( 34)      # Line Mode
+GMCP    = chr(201)      # Generic Mud Communication Protocol
+
+## Sub-negotiations are normally tiny, but GMCP messages carry JSON.
+SB_MAX_LENGTH = 64
+GMCP_SB_MAX_LENGTH = 4096
 
 
 #-----------------------------------------------------------------Telnet Option
@@ -156,6 +162,7 @@ class TelnetClient(object):
         self.telnet_got_cr = False  # Ignore LF/NUL if last char was CR
         self.ansi_got_esc = False   # Did ESC begin an ANSI/VT100+ code?
         self.ansi_buffer = ''       # Buffer for keyboard escape codes
+        self.gmcp_supports = set()  # GMCP packages the DE subscribed to
 
     def get_command(self):
         """
@@ -247,6 +254,34 @@ class TelnetClient(object):
         """
         return time.time() - self.connect_time
 
+    def get_handoff_state(self):
+        """
+        Return everything about the connection other than the socket itself,
+        as plain data, so that another process given the socket can carry
+        on with it where this one left off.
+        """
+        state = dict(self.__dict__)
+        del state['sock']
+        del state['fileno']
+        state['telnet_opt_dict'] = dict((option, (x.local_option,
+            x.remote_option, x.reply_pending))
+            for option, x in self.telnet_opt_dict.items())
+        return state
+
+    def set_handoff_state(self, state):
+        """
+        Pick up a connection from the state get_handoff_state() returned.
+        """
+        state = dict(state)
+        opt_dict = {}
+        for option, (local, remote, pending) in state.pop('telnet_opt_dict').items():
+            opt_dict[option] = TelnetOption()
+            opt_dict[option].local_option = local
+            opt_dict[option].remote_option = remote
+            opt_dict[option].reply_pending = pending
+        self.__dict__.update(state)
+        self.telnet_opt_dict = opt_dict
+
     def request_will_sga(self):
         """
         Request DE to Suppress Go-Ahead.  See RFC 858.
@@ -292,6 +327,48 @@ class TelnetClient(object):
         self._iac_do(NAWS)
         self._note_reply_pending(NAWS, True)
 
+    def has_naws(self):
+        """
+        Returns True if the DE has agreed to tell us its window size.
+        """
+        return self._check_remote_option(NAWS) is True
+
+    def request_will_gmcp(self):
+        """
+        Offer out-of-band GMCP messages to the DE.
+        """
+        self._iac_will(GMCP)
+        self._note_reply_pending(GMCP, True)
+
+    def has_gmcp(self):
+        """
+        Returns True if the DE has agreed to take GMCP messages.
+        """
+        return self._check_local_option(GMCP) is True
+
+    def gmcp_supports_package(self, package):
+        """
+        Returns True if the DE subscribed to the package (e.g. 'Giles') or
+        one of its parents via Core.Supports.
+        """
+        bits = package.lower().split('.')
+        for i in range(1, len(bits) + 1):
+            if '.'.join(bits[:i]) in self.gmcp_supports:
+                return True
+        return False
+
+    def send_gmcp(self, package, data=None):
+        """
+        Send a GMCP message, with data encoded as JSON.  Bypasses the
+        prompt redraw in send(), as it never reaches the screen.
+        """
+        msg = package
+        if data is not None:
+            msg += ' ' + json.dumps(data, separators=(',', ':'))
+        self.send_buffer += '%c%c%c%s%c%c' % (IAC, SB, GMCP,
+            msg.replace(IAC, IAC + IAC), IAC, SE)
+        self.send_pending = True
+
     def request_terminal_type(self):
         """
         Begins the Telnet negotiations to request the terminal type from
@@ -452,7 +529,10 @@ class TelnetClient(object):
             ## Are we currenty in a sub-negotion?
             elif self.telnet_got_sb is True:
                 ## Sanity check on length
-                if len(self.telnet_sb_buffer) < 64:
+                limit = SB_MAX_LENGTH
+                if self.telnet_sb_buffer[:1] == GMCP:
+                    limit = GMCP_SB_MAX_LENGTH
+                if len(self.telnet_sb_buffer) < limit:
                     self.telnet_sb_buffer += byte
                 else:
                     self.telnet_got_sb = False
@@ -607,6 +687,17 @@ class TelnetClient(object):
                     self._iac_will(SGA)
                     ## Just nod
 
+            elif option == GMCP:
+
+                if self._check_reply_pending(GMCP):
+                    self._note_reply_pending(GMCP, False)
+                    self._note_local_option(GMCP, True)
+
+                elif (self._check_local_option(GMCP) is False or
+                        self._check_local_option(GMCP) is UNKNOWN):
+                    self._note_local_option(GMCP, True)
+                    self._iac_will(GMCP)
+
             else:
 
                 ## ALL OTHER OTHERS = Default to refusing once
@@ -656,6 +747,18 @@ class TelnetClient(object):
                     self._iac_will(SGA)
                     ## Just nod
 
+            elif option == GMCP:
+
+                if self._check_reply_pending(GMCP):
+                    self._note_reply_pending(GMCP, False)
+                    self._note_local_option(GMCP, False)
+
+                elif (self._check_local_option(GMCP) is True or
+                        self._check_local_option(GMCP) is UNKNOWN):
+                    self._note_local_option(GMCP, False)
+                    self._iac_wont(GMCP)
+                self.gmcp_supports = set()
+
             else:
 
                 ## ALL OTHER OPTIONS = Default to ignoring
@@ -773,8 +876,41 @@ class TelnetClient(object):
 
                 #print "Screen is %d x %d" % (self.columns, self.rows)
 
+            if bloc[0] == GMCP:
+                self._gmcp_decoder(bloc[1:])
+
         self.telnet_sb_buffer = ''
 
+    def _gmcp_decoder(self, msg):
+        """
+        Handles the Core.Supports messages a DE uses to pick the GMCP
+        packages it wants; anything else is ignored.
+        """
+        bits = msg.split(' ', 1)
+        package = bits[0].lower()
+        if package not in ('core.supports.set', 'core.supports.add',
+                'core.supports.remove'):
+            return
+        try:
+            modules = json.loads(bits[1])
+        except (IndexError, ValueError):
+            print "Bad GMCP data for %s" % package
+            return
+        if not isinstance(modules, list):
+            return
+
+        ## Entries look like "Giles 1"; we only care about the name.
+        names = set()
+        for module in modules:
+            if isinstance(module, basestring) and module.strip():
+                names.add(str(module.split()[0].lower()))
+        if package == 'core.supports.set':
+            self.gmcp_supports = names
+        elif package == 'core.supports.add':
+            self.gmcp_supports |= names
+        else:
+            self.gmcp_supports -= names
+
 
     #---[ State Juggling for Telnet Options ]----------------------------------
 
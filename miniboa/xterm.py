@@ -71,16 +71,195 @@ def strip_caret_codes(text):
     return text.replace('\x00', '^')
 
 
+#--[ SGR Attribute Tracking ]--------------------------------------------------
+
+## Attributes are tracked as (bold, foreground, background, underline,
+## inverse).  UNKNOWN means nothing in the text so far has set it, so it is
+## whatever the terminal was left with.
+UNKNOWN = object()
+_DEFAULT_ATTRS = (False, None, None, False, False)
+_UNKNOWN_ATTRS = (UNKNOWN,) * 5
+_BLANK = ' \r\n'
+_CARET_TOKEN = re.compile(r'(\^.)', re.DOTALL)
+
+
+def _sgr_changes(code):
+    """
+    Turn an SGR sequence from the table into a list of (index, value)
+    attribute changes.  Returns None for anything that isn't SGR.
+    """
+    if not (code.startswith('\x1b[') and code.endswith('m')):
+        return None
+    changes = []
+    for param in code[2:-1].split(';'):
+        param = int(param)
+        if param == 0:
+            changes.extend(enumerate(_DEFAULT_ATTRS))
+        elif param == 1:
+            changes.append((0, True))
+        elif param == 22:
+            changes.append((0, False))
+        elif 30 <= param <= 37:
+            changes.append((1, param))
+        elif param == 39:
+            changes.append((1, None))
+        elif 40 <= param <= 47:
+            changes.append((2, param))
+        elif param == 49:
+            changes.append((2, None))
+        elif param in (4, 24):
+            changes.append((3, param == 4))
+        elif param in (7, 27):
+            changes.append((4, param == 7))
+    return changes
+
+
+_CARET_CHANGES = dict((token, _sgr_changes(code))
+    for token, code in _ANSI_CODES)
+_CARET_ANSI = dict(_ANSI_CODES)
+
+
+def _sgr_param(index, value):
+    """
+    The SGR parameter that sets one attribute to a known value.
+    """
+    if index == 0:
+        return '1' if value else '22'
+    elif index == 1:
+        return str(value) if value else '39'
+    elif index == 2:
+        return str(value) if value else '49'
+    elif index == 3:
+        return '4' if value else '24'
+    return '7' if value else '27'
+
+
+def _sgr_transition(current, wanted, indices=range(5)):
+    """
+    Return the shortest SGR sequence that takes the terminal from the
+    current attributes to the wanted ones, looking only at the given
+    attribute indices, and the attributes it leaves the terminal with.
+    """
+    params = []
+    result = list(current)
+    for i in indices:
+        if wanted[i] is not UNKNOWN and wanted[i] != current[i]:
+            params.append(_sgr_param(i, wanted[i]))
+            result[i] = wanted[i]
+    if not params:
+        return '', current
+
+    ## A full reset followed by what's left on can beat turning things off
+    ## one at a time, as long as we know everything the reset would touch.
+    if len(indices) == 5 and UNKNOWN not in wanted:
+        reset = ['0'] + [_sgr_param(i, wanted[i]) for i in range(5)
+            if wanted[i] != _DEFAULT_ATTRS[i]]
+        if len(';'.join(reset)) < len(';'.join(params)):
+            params = reset
+            result = wanted
+    return '\x1b[%sm' % ';'.join(params), tuple(result)
+
+
+def _blank_indices(current, wanted):
+    """
+    The attributes that can show on a space or line break.  With underline
+    and inverse off in both states that's just the background.
+    """
+    if (current[3] is False and wanted[3] is False and
+       current[4] is False and wanted[4] is False):
+        return (2,)
+    return range(5)
+
+
+## Only a handful of attribute states ever turn up, so the work of moving
+## between them is remembered.
+_APPLIED = {}
+_TRANSITIONS = {}
+
+
+def _apply_caret(attrs, token):
+    """
+    Return the attributes after the SGR caret code token.
+    """
+    key = (attrs, token)
+    if key not in _APPLIED:
+        result = list(attrs)
+        for i, value in _CARET_CHANGES[token]:
+            result[i] = value
+        _APPLIED[key] = tuple(result)
+    return _APPLIED[key]
+
+
+def _cached_transition(current, wanted, blank):
+    """
+    _sgr_transition() for everything, or for a blank if blank is True.
+    """
+    key = (current, wanted, blank)
+    if key not in _TRANSITIONS:
+        if blank:
+            indices = _blank_indices(current, wanted)
+        else:
+            indices = range(5)
+        _TRANSITIONS[key] = _sgr_transition(current, wanted, indices)
+    return _TRANSITIONS[key]
+
+
+def _colorize_ansi(text):
+    """
+    Replace caret codes with ANSI sequences, tracking the attributes they
+    set so that only the changes that show up are sent.  Runs of identical
+    colors, resets right before a new color, and color changes over blank
+    space all collapse; the terminal is always left in the state the caret
+    codes asked for.
+    """
+    out = []
+    current = wanted = _UNKNOWN_ATTRS
+    for chunk in _CARET_TOKEN.split(text):
+        if not chunk:
+            continue
+        if chunk[0] == '^' and len(chunk) == 2:
+            if chunk == '^^':
+                chunk = '^'
+            elif chunk in _CARET_CHANGES:
+                if _CARET_CHANGES[chunk] is None:
+
+                    ## Clearing the screen or line paints the background.
+                    code, current = _cached_transition(current, wanted, False)
+                    out.append(code)
+                    out.append(_CARET_ANSI[chunk])
+                else:
+                    wanted = _apply_caret(wanted, chunk)
+                continue
+
+        if wanted != current:
+
+            ## Blanks only show the background, so that's all that has to
+            ## be brought up to date before them.  It always is before a
+            ## line break, as one that scrolls the screen paints the new
+            ## line with it.
+            stripped = chunk.lstrip(_BLANK)
+            if stripped != chunk:
+                code, current = _cached_transition(current, wanted, True)
+                out.append(code)
+                out.append(chunk[:len(chunk) - len(stripped)])
+                chunk = stripped
+            if chunk:
+                code, current = _cached_transition(current, wanted, False)
+                out.append(code)
+        out.append(chunk)
+
+    code, current = _cached_transition(current, wanted, False)
+    out.append(code)
+    return ''.join(out)
+
+
 def colorize(text, ansi=True):
     """
     If the client wants ansi, replace the tokens with ansi sequences --
     otherwise, simply strip them out.
     """
     if ansi:
-        text = text.replace('^^', '\x00')
-        for token, code in _ANSI_CODES:
-            text = text.replace(token, code)
-        text = text.replace('\x00', '^')
+        text = _colorize_ansi(text)
     else:
         text = strip_caret_codes(text)
     return text
@@ -0,0 +1,30 @@
+#!/usr/bin/env python2
+# Giles: recompute_ratings.py, rebuilding ratings from recorded results.
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Run this with the server down, after changing how ratings are worked
+# out; it replays every rated result in the order they were played.
+
+import giles.results_manager
+import sqlite3
+
+conn = sqlite3.connect(giles.results_manager.RESULTS_PATH)
+conn.text_factory = str
+giles.results_manager.create_tables(conn)
+count = giles.results_manager.recompute_ratings(conn)
+conn.close()
+
+print("Recomputed ratings from %d results." % count)
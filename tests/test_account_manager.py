@@ -0,0 +1,93 @@
+# Giles: test_account_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles import account_manager
+from giles.account_manager import AccountManager
+from giles.utils import Struct
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+class FakeLog(object):
+
+    def __init__(self):
+        self.lines = []
+
+    def log(self, message):
+        self.lines.append(message)
+
+class OpenTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dir_path = tempfile.mkdtemp()
+        self.account_path = account_manager.ACCOUNT_PATH
+        account_manager.ACCOUNT_PATH = os.path.join(self.dir_path, "accounts.db")
+        self.server = Struct()
+        self.server.log = FakeLog()
+        self.server.players = []
+        self.managers = []
+
+    def tearDown(self):
+
+        for manager in self.managers:
+            manager.close()
+        account_manager.ACCOUNT_PATH = self.account_path
+        shutil.rmtree(self.dir_path)
+
+    def open_manager(self):
+
+        manager = AccountManager(self.server)
+        self.managers.append(manager)
+        return manager
+
+    def test_open(self):
+
+        manager = self.open_manager()
+        self.assertTrue(manager.conn)
+        self.assertFalse(manager.is_registered("Alice"))
+
+    def test_duplicate_names(self):
+
+        # A database from before names were unique, with one name twice.
+        conn = sqlite3.connect(account_manager.ACCOUNT_PATH)
+        conn.execute("CREATE TABLE accounts (id INTEGER PRIMARY KEY, name TEXT, pw_hash TEXT, config BLOB)")
+        conn.executemany("INSERT INTO accounts (name) VALUES (?)",
+                         [("Alice",), ("alice",), ("Bob",)])
+        conn.commit()
+        conn.close()
+
+        self.assertRaises(SystemExit, self.open_manager)
+        self.assertTrue(any("Alice" in x and "Bob" not in x
+                            for x in self.server.log.lines))
+
+    def test_unreadable_database(self):
+
+        # Anything else just leaves everyone a guest, saying why.
+        account_file = open(account_manager.ACCOUNT_PATH, "wb")
+        account_file.write("This is not a database." * 100)
+        account_file.close()
+
+        manager = self.open_manager()
+        self.assertEqual(manager.conn, None)
+        self.assertTrue(any("not a database" in x
+                            for x in self.server.log.lines))
+
+if __name__ == "__main__":
+    unittest.main()
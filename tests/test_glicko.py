@@ -0,0 +1,74 @@
+# Giles: test_glicko.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles import glicko
+
+import unittest
+
+# The worked example from Glickman's paper, whose answers are a little off
+# from rounding along the way.
+EXAMPLE_RATING = (1500.0, 200.0, 0.06)
+EXAMPLE_RESULTS = [
+    ((1400.0, 30.0, 0.06), glicko.WIN_SCORE),
+    ((1550.0, 100.0, 0.06), glicko.LOSS_SCORE),
+    ((1700.0, 300.0, 0.06), glicko.LOSS_SCORE),
+]
+
+class RateTest(unittest.TestCase):
+
+    def assertExample(self, rating):
+
+        r, rd, sigma = rating
+        self.assertAlmostEqual(r, 1464.06, delta=0.01)
+        self.assertAlmostEqual(rd, 151.52, delta=0.01)
+        self.assertAlmostEqual(sigma, 0.05999, delta=0.00001)
+
+    def test_paper_example(self):
+        self.assertExample(glicko.rate(EXAMPLE_RATING, EXAMPLE_RESULTS))
+
+    def test_volatility_gives_up(self):
+
+        # With no tolerance at all the search can only stop by running out
+        # of steps, by which point it has long since found the answer.
+        epsilon = glicko.EPSILON
+        glicko.EPSILON = 0.0
+        try:
+            self.assertExample(glicko.rate(EXAMPLE_RATING, EXAMPLE_RESULTS))
+        finally:
+            glicko.EPSILON = epsilon
+
+    def test_no_results(self):
+
+        r, rd, sigma = glicko.rate(EXAMPLE_RATING, [])
+        self.assertEqual((r, sigma), (1500.0, 0.06))
+        self.assertTrue(rd > 200.0)
+
+class CombineTest(unittest.TestCase):
+
+    def test_single(self):
+        self.assertEqual(glicko.combine([EXAMPLE_RATING]), EXAMPLE_RATING)
+
+    def test_partnership(self):
+
+        # Two equally sure players make a surer mean between them.
+        r, rd, sigma = glicko.combine([(1400.0, 100.0, 0.06),
+                                       (1600.0, 100.0, 0.09)])
+        self.assertAlmostEqual(r, 1500.0)
+        self.assertAlmostEqual(rd, 100.0 / 2 ** 0.5)
+        self.assertEqual(sigma, glicko.DEFAULT_VOLATILITY)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# Giles: test_journal.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles import journal
+from giles.journal import Journal, get_live_records
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class JournalTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dir_path = tempfile.mkdtemp()
+        self.journal = Journal(os.path.join(self.dir_path, "tables.journal"))
+        self.journal.open()
+        self.min_bytes = journal.COMPACT_MIN_BYTES
+        journal.COMPACT_MIN_BYTES = 0
+
+    def tearDown(self):
+
+        journal.COMPACT_MIN_BYTES = self.min_bytes
+        self.journal.close()
+        shutil.rmtree(self.dir_path)
+
+    def play_table(self, table_id, moves):
+
+        self.journal.record("new", table_id, "talpa", "t%d" % table_id,
+                            "Alice", False, 0, 1)
+        for i in range(moves):
+            self.journal.record("cmd", table_id, i, "Alice", "move a1 r")
+
+    def test_live_records(self):
+
+        records = [["leave", None, "Bob"], ["new", 1], ["cmd", 1],
+                   ["new", 2], ["leave", None, "Carol"], ["cmd", 2],
+                   ["end", 1]]
+        self.assertEqual(get_live_records(records, set([2])),
+                         [["new", 2], ["leave", None, "Carol"], ["cmd", 2]])
+        self.assertEqual(get_live_records(records, set()), [])
+
+    def test_compact(self):
+
+        self.play_table(1, 10)
+        self.play_table(2, 2)
+        self.assertFalse(self.journal.should_compact())
+        self.journal.record("end", 1)
+        self.assertTrue(self.journal.should_compact())
+
+        self.journal.compact([2])
+        records = self.journal.read()
+        self.assertEqual([x[0] for x in records], ["new", "cmd", "cmd"])
+        self.assertEqual(self.journal.dead_bytes, 0)
+        self.assertEqual(self.journal.live_bytes,
+                         os.path.getsize(self.journal.path))
+
+        # It carries on appending afterwards.
+        self.journal.record("cmd", 2, 3, "Alice", "move b1 r")
+        self.journal.flush()
+        self.assertEqual(len(self.journal.read()), 4)
+
+    def test_live_tables_worth_more(self):
+
+        # Ended tables aren't worth compacting away while the live ones
+        # still take up more room.
+        self.play_table(1, 2)
+        self.play_table(2, 10)
+        self.journal.record("end", 1)
+        self.assertFalse(self.journal.should_compact())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+# Giles: test_results_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles import results_manager
+from giles.glicko import NEW_RATING
+from giles.results_manager import ResultsManager
+from giles.utils import Struct
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+class FakePlayer(object):
+
+    def __init__(self, name):
+
+        self.name = name.lower()
+        self.display_name = name
+        self.told = []
+
+    def __repr__(self):
+        return self.display_name
+
+    def tell(self, msg):
+        self.told.append(msg)
+
+    def tell_cc(self, msg):
+        self.told.append(msg)
+
+class FakeAccountManager(object):
+
+    def __init__(self, names):
+        self.names = names
+
+    def is_registered(self, name):
+        return name.lower() in self.names
+
+class FakeLog(object):
+
+    def log(self, message):
+        pass
+
+class FakeTable(object):
+
+    def __init__(self, players, winner):
+
+        self.game_name = "hex"
+        self.game_display_name = "Hex"
+        self.table_display_name = "h1"
+        self.created = time.time()
+        self.move_count = 10
+        self.seats = []
+        for player in players:
+            seat = Struct()
+            seat.player = player
+            seat.display_name = "Seat %s" % player
+            self.seats.append(seat)
+        self.winners = [self.seats[winner]]
+
+    def snapshot(self):
+        return "snapshot"
+
+    def get_rating_sides(self):
+        return [[x] for x in self.seats]
+
+class ResultsTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dir_path = tempfile.mkdtemp()
+        self.results_path = results_manager.RESULTS_PATH
+        results_manager.RESULTS_PATH = os.path.join(self.dir_path, "results.db")
+        self.server = Struct()
+        self.server.log = FakeLog()
+        self.server.players = []
+        self.server.account_manager = FakeAccountManager(["alice", "bob"])
+        self.manager = ResultsManager(self.server)
+        self.viewer = FakePlayer("Viewer")
+
+    def tearDown(self):
+
+        self.manager.close()
+        results_manager.RESULTS_PATH = self.results_path
+        shutil.rmtree(self.dir_path)
+
+    def get_history(self, name):
+
+        self.viewer.told = []
+        self.manager.show_history(self.viewer, name)
+        return "".join(self.viewer.told)
+
+    def test_registered_history(self):
+
+        self.manager.record(FakeTable([FakePlayer("Alice"), FakePlayer("Bob")], 0))
+        history = self.get_history("Alice")
+        self.assertTrue("won" in history and "Bob" in history)
+        self.assertTrue("lost" in self.get_history("Bob"))
+
+    def test_guest_history(self):
+
+        # A guest's games don't follow their name about, but they still
+        # show up as the opponent in a registered player's history.
+        self.manager.record(FakeTable([FakePlayer("Alice"), FakePlayer("Carol")], 1))
+        self.assertTrue("no recorded games" in self.get_history("Carol"))
+        history = self.get_history("Alice")
+        self.assertTrue("lost" in history and "Carol" in history)
+
+    def test_registered_rating(self):
+
+        self.manager.record(FakeTable([FakePlayer("Alice"), FakePlayer("Bob")], 0))
+        self.assertTrue(self.manager.get_rating("alice", "hex")[0] >
+                        self.manager.get_rating("bob", "hex")[0])
+
+    def test_guest_not_rated(self):
+
+        self.manager.record(FakeTable([FakePlayer("Alice"), FakePlayer("Carol")], 0))
+        self.manager.flush()
+        self.assertEqual(self.manager.get_rating("alice", "hex"), NEW_RATING)
+        self.assertEqual(self.manager.get_rating("carol", "hex"), NEW_RATING)
+
+        # Nor does a rating saved under a guest's name count for them.
+        self.manager.record(FakeTable([FakePlayer("Alice"), FakePlayer("Bob")], 0))
+        self.manager.flush()
+        self.server.account_manager.names.remove("bob")
+        self.manager.loaded = set()
+        self.manager.ratings = {}
+        self.assertEqual(self.manager.get_rating("bob", "hex"), NEW_RATING)
+        self.assertNotEqual(self.manager.get_rating("alice", "hex"), NEW_RATING)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# Giles: test_seek_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles.seek_manager import SeekManager, SEEK_TAG
+from giles.utils import Struct
+
+import unittest
+
+class FakePlayer(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+    def tell_cc(self, msg):
+        pass
+
+class FakeGameMaster(object):
+
+    def __init__(self):
+        self.games = {}
+        for game_key in ("hex", "y"):
+            self.games[game_key] = Struct()
+            self.games[game_key].game_name = game_key
+            self.games[game_key].admin_only = False
+            self.games[game_key].tags = [SEEK_TAG]
+        self.tables = {}
+
+    def is_game(self, game_key):
+        return game_key in self.games
+
+    def get_free_table_name(self, prefix, ids):
+        return "%s%d" % (prefix, next(ids))
+
+    def new_table(self, player, game_key, table_name, scope):
+        self.tables[table_name] = (game_key, [])
+        return True
+
+    def handle(self, player, table_name, command_str):
+        self.tables[table_name][1].append(player)
+
+class FakeResultsManager(object):
+
+    def __init__(self):
+        self.ratings = {}
+
+    def get_rating(self, name, game):
+        return (self.ratings.get(name, 1500), 350, 0.06)
+
+class FakeLog(object):
+
+    def log(self, message):
+        pass
+
+class SeekManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Struct()
+        self.server.game_master = FakeGameMaster()
+        self.server.results_manager = FakeResultsManager()
+        self.server.log = FakeLog()
+        self.seek_manager = SeekManager(self.server)
+
+    def get_seated(self, player):
+        return [x for x, y in self.server.game_master.tables.items()
+                if player in y[1]]
+
+    def test_match_on_seek(self):
+        alice = FakePlayer("Alice")
+        bob = FakePlayer("Bob")
+        self.seek_manager.seek(alice, "hex")
+        self.seek_manager.seek(bob, "hex")
+        self.assertEqual(len(self.server.game_master.tables), 1)
+        self.assertFalse(self.seek_manager.player_seeks)
+
+    def test_one_player_seeking_two_games(self):
+
+        # Alice is out of everyone's range to start with, so nothing is
+        # matched until the scheduler has widened the ranges.  Both of her
+        # seeks come in range on the same tick, but she can only have one
+        # game.
+        results_manager = self.server.results_manager
+        results_manager.ratings = {"Alice": 1500, "Bob": 1700, "Carol": 1700}
+        alice = FakePlayer("Alice")
+        bob = FakePlayer("Bob")
+        carol = FakePlayer("Carol")
+        self.seek_manager.seek(bob, "hex")
+        self.seek_manager.seek(carol, "y")
+        self.seek_manager.seek(alice, "hex")
+        self.seek_manager.seek(alice, "y")
+        self.assertFalse(self.server.game_master.tables)
+
+        for i in range(10):
+            self.seek_manager.tick()
+        self.assertEqual(len(self.get_seated(alice)), 1)
+        self.assertEqual(len(self.server.game_master.tables), 1)
+        self.assertNotIn(alice, self.seek_manager.player_seeks)
+        self.assertEqual(sum(len(x) for x in self.seek_manager.pools.values()), 1)
+
+    def test_withdrawn_seek_is_not_matched(self):
+        alice = FakePlayer("Alice")
+        bob = FakePlayer("Bob")
+        seek = self.seek_manager.add_seek(alice, "hex")
+        self.seek_manager.add_seek(bob, "hex")
+        self.seek_manager.remove_seek(alice, "hex")
+        self.assertIsNone(self.seek_manager.pools["hex"].find_match(seek))
+
+if __name__ == "__main__":
+    unittest.main()
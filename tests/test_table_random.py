@@ -0,0 +1,56 @@
+# Giles: test_table_random.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles.games.game import TableRandom
+from giles.journal import SEED_BITS
+
+import random
+import unittest
+
+class TableRandomTest(unittest.TestCase):
+
+    def test_same_seed_same_deal(self):
+
+        seed = random.getrandbits(SEED_BITS)
+        deals = []
+        for i in range(2):
+            rng = TableRandom()
+            rng.set_seed(seed)
+            deck = range(52)
+            rng.shuffle(deck)
+            deals.append((deck, rng.choice("nesw"), rng.randrange(1000)))
+        self.assertEqual(deals[0], deals[1])
+
+    def test_ignores_global_seed(self):
+
+        rng = TableRandom()
+        rng.set_seed(1)
+        first = rng.random()
+        rng.set_seed(1)
+        random.seed(2)
+        self.assertEqual(rng.random(), first)
+
+    def test_seed_used(self):
+
+        rng = TableRandom()
+        rng.set_seed(1)
+        self.assertFalse(rng.seed_used())
+        rng.set_seed(1)
+        rng.getrandbits(8)
+        self.assertTrue(rng.seed_used())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+# Giles: test_tournament_manager.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from giles import tournament_manager
+from giles.tournament_manager import (Tournament, TournamentManager,
+                                      DRAW_RESULT, KNOCKOUT, SWISS)
+from giles.utils import Struct
+
+import os
+import shutil
+import tempfile
+import unittest
+
+class FakePlayer(object):
+
+    def __init__(self, name):
+
+        self.name = name.lower()
+        self.display_name = name
+        self.told = []
+
+    def __repr__(self):
+        return self.display_name
+
+    def tell_cc(self, msg):
+        self.told.append(msg)
+
+class FakeChannel(object):
+
+    def __init__(self, name):
+
+        self.name = name.lower()
+        self.display_name = name
+        self.persistent = False
+        self.listeners = []
+
+    def broadcast_cc(self, msg):
+        pass
+
+class FakeChannelManager(object):
+
+    def __init__(self):
+        self.channels = []
+
+    def has_channel(self, name):
+
+        for channel in self.channels:
+            if channel.name == name.lower():
+                return channel
+        return None
+
+    def add_channel(self, name, persistent=False):
+
+        channel = FakeChannel(name)
+        channel.persistent = persistent
+        self.channels.append(channel)
+        return channel
+
+    def connect(self, player, name):
+        self.has_channel(name).listeners.append(player)
+
+class FakeGameMaster(object):
+
+    def __init__(self):
+        self.tables = {}
+
+    def get_table(self, table_name):
+        return self.tables.get(table_name)
+
+    def get_free_table_name(self, prefix, ids):
+        return "%s%d" % (prefix, next(ids))
+
+    def new_table(self, player, game_key, table_name, scope):
+
+        self.tables[table_name] = []
+        return True
+
+    def handle(self, player, table_name, command_str):
+        self.tables[table_name].append(player)
+
+class FakeLog(object):
+
+    def log(self, message):
+        pass
+
+class TournamentTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dir_path = tempfile.mkdtemp()
+        self.tournament_path = tournament_manager.TOURNAMENT_PATH
+        tournament_manager.TOURNAMENT_PATH = os.path.join(self.dir_path,
+                                                          "tournaments.dat")
+        self.players = {}
+        self.server = self.make_server()
+        self.manager = TournamentManager(self.server)
+
+    def tearDown(self):
+
+        tournament_manager.TOURNAMENT_PATH = self.tournament_path
+        shutil.rmtree(self.dir_path)
+
+    def make_server(self):
+
+        server = Struct()
+        server.log = FakeLog()
+        server.channel_manager = FakeChannelManager()
+        server.game_master = FakeGameMaster()
+        server.get_player = self.players.get
+        return server
+
+    def login(self, name):
+
+        player = FakePlayer(name)
+        self.players[player.name] = player
+        return player
+
+    def make_tournament(self, style, names):
+
+        self.server.channel_manager.add_channel("Open", persistent=True)
+        tournament = Tournament("Open", "rps", "rps", style, names[0], None)
+        for name in names:
+            tournament.add_player(name, name.capitalize())
+        tournament.start(dict((x, 1500.0) for x in names))
+        self.manager.tournaments[tournament.name] = tournament
+        self.manager.start_round(tournament)
+        self.manager.save()
+        return tournament
+
+    def test_forfeit(self):
+
+        # Only the player who's around gets a table; the other just loses
+        # this game, and stays in.
+        self.login("Alice")
+        tournament = self.make_tournament(SWISS, ["alice", "bob"])
+        pairing = tournament.pairings[0]
+        self.assertEqual(pairing.result, "alice")
+        self.assertEqual(tournament.withdrawn, set())
+        self.assertEqual(self.server.game_master.tables, {})
+        self.assertTrue(any("forfeit" in x for x in self.players["alice"].told))
+
+    def test_knockout_nobody_here(self):
+
+        tournament = self.make_tournament(KNOCKOUT, ["alice", "bob"])
+        self.assertEqual(tournament.pairings[0].result, tournament.pairings[0].white)
+
+    def test_recover(self):
+
+        for name in ("alice", "bob", "carol", "dave"):
+            self.login(name)
+        tournament = self.make_tournament(SWISS, ["alice", "bob", "carol", "dave"])
+        first, second = tournament.pairings
+        self.manager.note_result(Struct({"table_name": first.table_name,
+                                         "winners": None}))
+        self.assertEqual(first.result, DRAW_RESULT)
+
+        # After the crash, only the first game's table came back from the
+        # journal, and nobody is logged in yet.
+        self.players.clear()
+        server = self.make_server()
+        server.game_master.tables[second.table_name] = Struct()
+        manager = TournamentManager(server)
+        manager.recover_tournaments()
+        recovered = manager.tournaments["open"]
+        self.assertEqual([x.result for x in recovered.pairings],
+                         [DRAW_RESULT, None])
+        self.assertEqual(manager.table_pairings.keys(), [second.table_name])
+        self.assertTrue(server.channel_manager.has_channel("open").persistent)
+
+        # Nothing is forfeit while the players are logging back in.
+        manager.tick()
+        self.assertEqual(recovered.round, 1)
+        self.assertEqual(recovered.pairings[1].result, None)
+
+    def test_replay_lost_table(self):
+
+        for name in ("alice", "bob"):
+            self.login(name)
+        tournament = self.make_tournament(SWISS, ["alice", "bob"])
+        server = self.make_server()
+        manager = TournamentManager(server)
+        manager.recover_tournaments()
+        pairing = manager.tournaments["open"].pairings[0]
+        self.assertEqual((pairing.table_name, pairing.result), (None, None))
+        self.assertEqual(manager.table_pairings, {})
+
+    def test_finished_not_saved(self):
+
+        tournament = self.make_tournament(SWISS, ["alice", "bob"])
+        self.manager.finish(tournament, "Over.\n")
+        manager = TournamentManager(self.make_server())
+        manager.recover_tournaments()
+        self.assertEqual(manager.tournaments, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+# Giles: test_xterm.py
+# Copyright 2014 Phil Bordelon
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# colorize() drops the color codes that wouldn't change what's on screen.
+# To check that it never drops one that would, both its output and the
+# plain one-for-one replacement of every caret code are played into a
+# small terminal emulator, and the screens they leave have to match.
+
+from miniboa.xterm import _ANSI_CODES, colorize
+
+import ast
+import os
+import random
+import re
+import tokenize
+import unittest
+
+GILES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "giles")
+
+# The states the terminal might be left in before the text arrives, as
+# (bold, foreground, background, underline, inverse).
+START_ATTRS = (
+    (False, None, None, False, False),
+    (True, 31, 44, True, True),
+    (False, 32, 41, False, False),
+    (True, None, 47, False, True),
+)
+
+RANDOM_TOKENS = ([x[0] for x in _ANSI_CODES] +
+                 ["^^", "^", "^z", "a", "b", " ", " ", "\n", "\n", "\r"])
+
+ESCAPE = re.compile(r"\x1b\[([0-9;]*)([mJK])")
+
+def replace_codes(text):
+
+    # What colorize() used to send: every caret code as its sequence.
+    text = text.replace("^^", "\x00")
+    for token, code in _ANSI_CODES:
+        text = text.replace(token, code)
+    return text.replace("\x00", "^")
+
+class Screen(object):
+    """Just enough of an xterm to tell two streams apart: SGR, erasing the
+    line and the screen, carriage returns, and line feeds that scroll.
+    Erasing and scrolling fill with the current background, and a space
+    shows nothing but its background unless it's underlined.
+    """
+
+    def __init__(self, attrs, height=3):
+
+        self.attrs = list(attrs)
+        self.height = height
+        self.rows = [self.blank_row() for i in range(height)]
+        self.scrolled = []
+        self.row = 0
+        self.col = 0
+
+    def look(self, char, attrs):
+
+        bold, fg, bg, underline, inverse = attrs
+        if inverse:
+            fg, bg = bg, fg
+        if char == " " and not underline:
+            return (" ", bg, inverse and bold)
+        return (char, bold, fg, bg, underline)
+
+    def blank_row(self):
+
+        # A row is what it's filled with and whatever's been written on it.
+        attrs = list(self.attrs)
+        attrs[3] = False
+        return (self.look(" ", attrs), {})
+
+    def set_attrs(self, params):
+
+        for param in (params or "0").split(";"):
+            param = int(param)
+            if param == 0:
+                self.attrs = [False, None, None, False, False]
+            elif param in (1, 22):
+                self.attrs[0] = param == 1
+            elif 30 <= param <= 37 or param == 39:
+                self.attrs[1] = param if param != 39 else None
+            elif 40 <= param <= 47 or param == 49:
+                self.attrs[2] = param if param != 49 else None
+            elif param in (4, 24):
+                self.attrs[3] = param == 4
+            elif param in (7, 27):
+                self.attrs[4] = param == 7
+
+    def feed(self, data):
+
+        pos = 0
+        while pos < len(data):
+            match = ESCAPE.match(data, pos)
+            if match:
+                params, kind = match.groups()
+                if kind == "m":
+                    self.set_attrs(params)
+                elif kind == "K":
+                    self.rows[self.row] = self.blank_row()
+                else:
+                    self.rows = [self.blank_row() for i in range(self.height)]
+                pos = match.end()
+                continue
+
+            char = data[pos]
+            pos += 1
+            if char == "\r":
+                self.col = 0
+            elif char == "\n":
+                self.row += 1
+                if self.row == self.height:
+                    self.scrolled.append(self.rows.pop(0))
+                    self.rows.append(self.blank_row())
+                    self.row -= 1
+            else:
+                self.rows[self.row][1][self.col] = self.look(char, self.attrs)
+                self.col += 1
+
+    def get_picture(self):
+
+        rows = self.scrolled + self.rows
+        width = max([0] + [max(x[1]) + 1 for x in rows if x[1]]) + 1
+        cells = [[x[1].get(y, x[0]) for y in range(width)] for x in rows]
+        return cells, tuple(self.attrs), self.row, self.col
+
+def get_picture(data, attrs):
+
+    # The telnet layer sends every line break as a CR LF.
+    screen = Screen(attrs)
+    screen.feed(data.replace("\n", "\r\n"))
+    return screen.get_picture()
+
+def get_source_strings():
+
+    # Every string in Giles with a caret in it.
+    strings = []
+    for dir_path, dir_names, file_names in os.walk(GILES_PATH):
+        for file_name in file_names:
+            if not file_name.endswith(".py"):
+                continue
+            source = open(os.path.join(dir_path, file_name))
+            for token in tokenize.generate_tokens(source.readline):
+                if token[0] == tokenize.STRING and "^" in token[1]:
+                    strings.append(ast.literal_eval(token[1]))
+            source.close()
+    return strings
+
+class ColorizeTest(unittest.TestCase):
+
+    def assertSameScreen(self, text):
+
+        for attrs in START_ATTRS:
+            self.assertEqual(get_picture(colorize(text), attrs),
+                             get_picture(replace_codes(text), attrs),
+                             "%r from %r" % (text, attrs))
+
+    def test_source_strings(self):
+
+        strings = get_source_strings()
+        self.assertTrue(strings)
+        for text in strings:
+            self.assertSameScreen(text)
+
+    def test_random_strings(self):
+
+        rng = random.Random(0)
+        for i in range(5000):
+            self.assertSameScreen("".join(rng.choice(RANDOM_TOKENS)
+                                          for j in range(rng.randint(1, 14))))
+
+    def test_background_before_line_break(self):
+
+        for text in ("x^4\n\n\ny", "^4\n\n\n", "^~a^4^B\n\n\nx",
+                     "^I^4x^i\n\n\n", "^4x^~\n\n\ny", "^4^U x^u\n\n\ny"):
+            self.assertSameScreen(text)
+            code = colorize(text)
+            self.assertTrue(code.index("44") < code.index("\n"), repr(code))
+
+    def test_drops_redundant_codes(self):
+
+        self.assertEqual(colorize("^R^Rx^Gy^~"), "\x1b[1;31mx\x1b[32my\x1b[0m")
+        self.assertEqual(colorize("^Wa ^Wb^~"), "\x1b[1;37ma b\x1b[0m")
+        self.assertEqual(colorize("plain", False), "plain")
+
+if __name__ == "__main__":
+    unittest.main()